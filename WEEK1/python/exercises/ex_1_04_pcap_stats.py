@@ -4,22 +4,41 @@
 This script reads a PCAP file and prints a few basic statistics that are useful
 in early labs: total packets, bytes and protocol counts.
 
-It supports two backends:
-- scapy (preferred, if installed)
-- dpkt (fallback)
+It supports three backends:
+- native (default): streams pcap or pcapng through python/utils/pcap_reader.py,
+  no dependencies, constant memory, and also builds a 5-tuple flow table
+- scapy (if installed): loads every packet as a Scapy object, slow and
+  memory-hungry on large captures, but handy for exploring layers
+- dpkt (if installed)
 
 Examples
 --------
 python3 python/exercises/ex_1_04_pcap_stats.py --pcap artifacts/demo.pcap
+python3 python/exercises/ex_1_04_pcap_stats.py --pcap artifacts/demo.pcap --flows 10 --timing
 """
 
 from __future__ import annotations
 
 import argparse
+import sys
+import time
 from collections import Counter
 from pathlib import Path
 from typing import Any
 
+# Local utility import
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from python.utils.pcap_reader import FlowTable, format_tcp_flags, read_flows  # noqa: E402
+
+
+def stats_native(path: Path) -> dict[str, Any]:
+    table = read_flows(path)
+    return {"packets": table.packets, "bytes": table.bytes,
+            "protocols": table.protocol_counts(), "flow_table": table}
+
 
 def stats_with_scapy(path: Path) -> dict[str, Any]:
     from scapy.all import rdpcap  # type: ignore
@@ -77,25 +96,44 @@ def stats_with_dpkt(path: Path) -> dict[str, Any]:
 def main() -> int:
     ap = argparse.ArgumentParser(description="Compute basic statistics from a PCAP file.")
     ap.add_argument("--pcap", type=Path, required=True, help="Path to a PCAP file.")
-    ap.add_argument("--backend", choices=["auto", "scapy", "dpkt"], default="auto", help="Parser backend.")
+    ap.add_argument("--backend", choices=["auto", "native", "scapy", "dpkt"], default="auto",
+                    help="Parser backend (auto = native).")
+    ap.add_argument("--flows", type=int, default=0, metavar="N",
+                    help="Also print the N largest flows (native backend).")
+    ap.add_argument("--timing", action="store_true", help="Print parse time and throughput.")
     args = ap.parse_args()
 
     if not args.pcap.exists():
         print(f"PCAP missing: {args.pcap}")
         return 1
 
-    backend = args.backend
-    if backend == "auto":
-        try:
-            import scapy  # type: ignore  # noqa: F401
-            backend = "scapy"
-        except Exception:
-            backend = "dpkt"
+    backend = "native" if args.backend == "auto" else args.backend
+    backends = {"native": stats_native, "scapy": stats_with_scapy, "dpkt": stats_with_dpkt}
 
-    s = stats_with_scapy(args.pcap) if backend == "scapy" else stats_with_dpkt(args.pcap)
+    start = time.perf_counter()
+    s = backends[backend](args.pcap)
+    elapsed = time.perf_counter() - start
     print(f"PCAP packets={s['packets']} bytes={s['bytes']} protocols={s['protocols']}")
+
+    table = s.get("flow_table")
+    if args.flows and table is not None:
+        print_flows(table, args.flows)
+    if args.timing:
+        rate = s["packets"] / elapsed if elapsed else 0.0
+        print(f"Parsed with {backend} in {elapsed:.2f} s ({rate:,.0f} packets/s, "
+              f"{s['bytes'] / max(elapsed, 1e-9) / 1e6:.0f} MB/s)")
     return 0
 
 
+def print_flows(table: FlowTable, n: int) -> None:
+    print(f"Flows: {len(table.flows)} (top {min(n, len(table.flows))} by bytes)")
+    print(f"  {'proto':<6} {'source':<40} {'destination':<40} {'packets':>9} {'bytes':>12} {'dur_s':>8}  flags")
+    for f in table.top_flows(n):
+        src = f"{f.src}:{f.sport}" if ":" not in f.src else f"[{f.src}]:{f.sport}"
+        dst = f"{f.dst}:{f.dport}" if ":" not in f.dst else f"[{f.dst}]:{f.dport}"
+        flags = format_tcp_flags(f.tcp_flags) if f.proto == "TCP" else ""
+        print(f"  {f.proto:<6} {src:<40} {dst:<40} {f.packets:>9} {f.bytes:>12} {f.duration:>8.3f}  {flags}")
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Week 10 - FTP throughput measurement for the Docker laboratory.
+
+Uploads a generated file (STOR) and downloads it again (RETR) with Python
+ftplib, then prints MB/s for each direction. Run it against the server
+started with and without ``--no-sendfile`` to see what sendfile() saves on
+the download path.
+
+Examples
+--------
+    python3 ftp_bench.py --size-mb 1024
+    python3 ftp_bench.py --host 172.20.0.21 --port 2121 --size-mb 256 --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from ftplib import FTP
+
+BLOCK = 1024 * 1024
+
+
+class _PatternReader:
+    """File-like source of `size` pseudo-random bytes (no temporary file)."""
+
+    def __init__(self, size: int) -> None:
+        self.remaining = size
+        self.block = os.urandom(BLOCK)
+        self.sha = hashlib.sha256()
+
+    def read(self, n: int = BLOCK) -> bytes:
+        n = min(n, BLOCK, self.remaining)
+        self.remaining -= n
+        data = self.block[:n]
+        self.sha.update(data)
+        return data
+
+
+class _Sink:
+    """RETR callback: counts and hashes the data, keeps nothing."""
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.sha = hashlib.sha256()
+
+    def __call__(self, data: bytes) -> None:
+        self.size += len(data)
+        self.sha.update(data)
+
+
+def run(host: str, port: int, size_mb: int, runs: int, remote: str) -> int:
+    size = size_mb * BLOCK
+    ftp = FTP()
+    ftp.connect(host, port, timeout=60)
+    ftp.login("labftp", "labftp")
+    ftp.voidcmd("TYPE I")  # binary: the server can use sendfile()
+    ftp.cwd("uploads")
+
+    print(f"[INFO] {host}:{port}, file {size_mb} MiB, {runs} run(s)")
+    print(f"{'run':>4} {'STOR MB/s':>10} {'RETR MB/s':>10}  check")
+    ok = True
+    try:
+        for run_no in range(1, runs + 1):
+            source = _PatternReader(size)
+            start = time.perf_counter()
+            ftp.storbinary(f"STOR {remote}", source, blocksize=BLOCK)
+            stor = size / (time.perf_counter() - start) / 1e6
+
+            sink = _Sink()
+            start = time.perf_counter()
+            ftp.retrbinary(f"RETR {remote}", sink, blocksize=BLOCK)
+            retr = size / (time.perf_counter() - start) / 1e6
+
+            same = sink.size == size and sink.sha.digest() == source.sha.digest()
+            ok = ok and same
+            print(f"{run_no:>4} {stor:>10.1f} {retr:>10.1f}  {'OK' if same else 'MISMATCH'}")
+        ftp.delete(remote)
+    finally:
+        ftp.quit()
+    return 0 if ok else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Week 10 FTP throughput (STOR/RETR)")
+    parser.add_argument("--host", default="127.0.0.1", help="FTP server address")
+    parser.add_argument("--port", type=int, default=2121, help="Control port")
+    parser.add_argument("--size-mb", type=int, default=1024, help="File size in MiB")
+    parser.add_argument("--runs", type=int, default=2, help="Upload/download rounds")
+    parser.add_argument("--remote", default="bench.bin", help="Name in uploads/")
+    args = parser.parse_args()
+    sys.exit(run(args.host, args.port, args.size_mb, args.runs, args.remote))
+
+
+if __name__ == "__main__":
+    main()
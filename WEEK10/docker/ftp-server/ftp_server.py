@@ -9,6 +9,10 @@ Notes
 - This configuration is deliberately simple and suitable for local teaching
   environments only.
 - The user credentials are hard-coded for reproducibility.
+- Binary (TYPE I) downloads use sendfile(): the file body goes from the page
+  cache to the socket without passing through Python. ASCII transfers and
+  uploads use buffered reads/writes (``--buffer-kb``).
+- ``ftp_bench.py`` measures upload/download throughput against this server.
 
 Default credentials
 -------------------
@@ -23,7 +27,7 @@ import os
 from pathlib import Path
 
 from pyftpdlib.authorizers import DummyAuthorizer
-from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.handlers import DTPHandler, FileProducer, FTPHandler
 from pyftpdlib.servers import FTPServer
 
 
@@ -55,6 +59,17 @@ def main() -> None:
         default="30000-30009",
         help="Passive port range, e.g. 30000-30009",
     )
+    parser.add_argument(
+        "--no-sendfile",
+        action="store_true",
+        help="Send files through Python buffers instead of sendfile() (for comparison)",
+    )
+    parser.add_argument(
+        "--buffer-kb",
+        type=int,
+        default=256,
+        help="Data channel read/write size in KiB (pyftpdlib default: 64)",
+    )
     args = parser.parse_args()
 
     root = Path(args.root)
@@ -81,6 +96,14 @@ def main() -> None:
     except Exception:
         raise SystemExit("Invalid passive port range. Example: 30000-30009")
 
+    # Data channel: sendfile() for binary RETR; bigger socket reads for STOR
+    # and for the buffered path (ASCII mode or --no-sendfile).
+    handler.use_sendfile = not args.no_sendfile and hasattr(os, "sendfile")
+    buffer_size = args.buffer_kb * 1024
+    DTPHandler.ac_in_buffer_size = buffer_size
+    DTPHandler.ac_out_buffer_size = buffer_size
+    FileProducer.buffer_size = buffer_size
+
     # Avoid extremely verbose output unless explicitly requested.
     if os.environ.get("WEEK10_FTP_DEBUG") == "1":
         handler.log_prefix = "%(remote_ip)s:%(remote_port)s -"
@@ -95,6 +118,7 @@ def main() -> None:
     print(f"[INFO] Root: {root}")
     print("[INFO] User: labftp / Password: labftp")
     print(f"[INFO] Passive ports: {args.passive_ports}")
+    print(f"[INFO] sendfile: {'on' if handler.use_sendfile else 'off'}, buffer {args.buffer_kb} KiB")
 
     server.serve_forever()
 
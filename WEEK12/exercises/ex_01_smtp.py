@@ -29,6 +29,12 @@ Usage:
     # Analyse envelope vs headers
     python3 ex_01_smtp.py analyze --spool ./spool_s12
     
+    # Rebuild the spool index (existing spools, files copied by hand)
+    python3 ex_01_smtp.py reindex --spool ./spool_s12
+    
+    # Benchmark: listing from index vs parsing .eml files
+    python3 ex_01_smtp.py bench-list --count 100000
+    
     # Selftest
     python3 ex_01_smtp.py --selftest
 
@@ -38,10 +44,14 @@ Revolvix&Hypotheticalandrei
 import argparse
 import datetime
 import os
+import queue
 import re
+import shutil
 import socket
 import smtplib
+import sqlite3
 import sys
+import tempfile
 import threading
 import time
 import uuid
@@ -94,51 +104,334 @@ ENVELOPE vs MESSAGE:
 """
 
 
+# =============================================================================
+# INDEX SPOOL
+# =============================================================================
+# Fiecare mesaj ramane un fisier .eml, dar la salvare scriem si un rand intr-un
+# index SQLite (spool/.index.sqlite3): envelope, headerele cheie, dimensiunea
+# si offset-ul la care incepe mesajul RFC 5322 in fisier (dupa X-Envelope-*).
+# Listarea si analiza interogheaza indexul in loc sa citeasca fiecare fisier.
+
+INDEX_FILENAME = ".index.sqlite3"
+ENVELOPE_HEADERS = ("x-envelope-from", "x-envelope-to", "x-received")
+HEADER_SCAN_BYTES = 65536
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w.-]+')
+
+
+def _addr(value: str) -> str:
+    """Extrage adresa email dintr-un header (ex: 'Nume <a@b.c>' -> 'a@b.c')."""
+    match = EMAIL_RE.search(value or "")
+    return match.group().lower() if match else ""
+
+
+def _parse_header_block(raw: bytes) -> tuple:
+    """
+    Parseaza blocul de headere de la inceputul unui fisier .eml.
+    
+    Returns:
+        (headers, offset) - dict cu numele in litere mici (doar prima
+        aparitie) si offset-ul in octeti al primei linii care nu este
+        un header de envelope (X-Envelope-From/To, X-Received)
+    """
+    headers = {}
+    offset = 0
+    in_envelope = True
+    last = None
+    pos = 0
+    while pos < len(raw):
+        end = raw.find(b"\n", pos)
+        if end < 0:
+            end = len(raw)
+        line = raw[pos:end].rstrip(b"\r").decode("utf-8", errors="replace")
+        if not line:
+            break
+        if line[0] in " \t" and last is not None:
+            # Header pliat (RFC 5322 folding)
+            headers[last] += " " + line.strip()
+        else:
+            name, sep, value = line.partition(":")
+            name = name.strip().lower()
+            if not sep:
+                break
+            if in_envelope and name not in ENVELOPE_HEADERS:
+                in_envelope = False
+                offset = pos
+            last = name if name not in headers else None
+            if last is not None:
+                headers[name] = value.strip()
+        pos = end + 1
+    if in_envelope:
+        offset = pos
+    return headers, offset
+
+
+def _spool_record(filename: str, raw_head: bytes, size: int) -> dict:
+    """Construieste randul de index pentru un mesaj."""
+    headers, offset = _parse_header_block(raw_head)
+    env_from = headers.get("x-envelope-from", "")
+    hdr_from = headers.get("from", "")
+    return {
+        "filename": filename,
+        "env_from": env_from,
+        "env_to": headers.get("x-envelope-to", ""),
+        "hdr_from": hdr_from,
+        "hdr_to": headers.get("to", ""),
+        "subject": headers.get("subject", ""),
+        "size": size,
+        "offset": offset,
+        "received": headers.get("x-received", ""),
+        "from_mismatch": int(bool(env_from and hdr_from)
+                             and _addr(env_from) != _addr(hdr_from)),
+    }
+
+
+def read_spool_file(path) -> dict:
+    """Citeste doar inceputul unui .eml si intoarce randul de index."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SCAN_BYTES)
+        size = os.fstat(f.fileno()).st_size
+    return _spool_record(path.name, head, size)
+
+
+class SpoolIndex:
+    """
+    Index SQLite pentru un director spool.
+    
+    Un singur obiect poate fi folosit din mai multe thread-uri (serverul
+    salveaza din thread-ul fiecarei conexiuni); accesul e serializat cu un lock.
+    Modul WAL permite unui `list`/`analyze` din alt proces sa citeasca in timp
+    ce serverul scrie.
+    """
+    
+    COLUMNS = ("filename", "env_from", "env_to", "hdr_from", "hdr_to", "subject",
+               "size", "offset", "received", "from_mismatch")
+    
+    def __init__(self, spool_dir):
+        self.spool_dir = Path(spool_dir)
+        self.path = self.spool_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " filename TEXT PRIMARY KEY, env_from TEXT, env_to TEXT,"
+            " hdr_from TEXT, hdr_to TEXT, subject TEXT, size INTEGER,"
+            " offset INTEGER, received TEXT, from_mismatch INTEGER)"
+        )
+        self._db.commit()
+        self._insert_sql = (
+            f"INSERT OR REPLACE INTO messages ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self.COLUMNS))})"
+        )
+    
+    @classmethod
+    def exists(cls, spool_dir) -> bool:
+        return (Path(spool_dir) / INDEX_FILENAME).exists()
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+    
+    def add(self, record: dict):
+        """Adauga (sau inlocuieste) randul unui mesaj."""
+        row = tuple(record[c] for c in self.COLUMNS)
+        with self._lock:
+            self._db.execute(self._insert_sql, row)
+            self._db.commit()
+    
+    def rebuild(self) -> int:
+        """
+        Reconstruieste indexul din fisierele .eml existente.
+        
+        Citeste doar blocul de headere al fiecarui fisier. Returns numarul
+        de mesaje indexate.
+        """
+        def rows():
+            with os.scandir(self.spool_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".eml") and entry.is_file():
+                        record = read_spool_file(entry.path)
+                        yield tuple(record[c] for c in self.COLUMNS)
+        
+        with self._lock:
+            self._db.execute("DELETE FROM messages")
+            self._db.executemany(self._insert_sql, rows())
+            self._db.commit()
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    
+    def count_mismatched(self) -> int:
+        """Numarul de mesaje la care From: difera de MAIL FROM."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE from_mismatch = 1").fetchone()[0]
+    
+    def messages(self, limit: int = None, offset: int = 0) -> list:
+        """Mesajele in ordinea numelui de fisier (adica a sosirii)."""
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM messages ORDER BY filename"
+        params = ()
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = (limit, offset)
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            return [dict(zip(self.COLUMNS, row)) for row in cursor]
+
+
+def open_spool_index(spool_dir) -> SpoolIndex:
+    """Deschide indexul; daca lipseste (spool vechi), il construieste."""
+    had_index = SpoolIndex.exists(spool_dir)
+    index = SpoolIndex(spool_dir)
+    if not had_index:
+        count = index.rebuild()
+        if count:
+            print(f"[INFO] Index creat pentru spool existent ({count} mesaje)")
+    return index
+
+
 class MiniSMTPServer:
     """
     SMTP Server minimal For scopuri educationale.
     
     Implementeaza subset de comenzi For a demonstra Protocol.
+    
+    Conexiunile acceptate intra intr-o coada limitata (queue_size) din care
+    le preiau `workers` thread-uri fixe. Coada plina sau prea multe conexiuni
+    de la acelasi IP (max_per_ip) -> raspuns imediat 421 si inchidere.
+    
+    Ca la SMTPServer, 0 inseamna fara limita: workers=0 revine la un thread
+    nou per conexiune, max_per_ip=0 nu limiteaza conexiunile per IP.
     """
     
-    def __init__(self, port: int = 1025, spool_dir: str = "./spool_s12"):
+    IDLE_TIMEOUT = 300
+    
+    def __init__(self, port: int = 1025, spool_dir: str = "./spool_s12",
+                 workers: int = 16, queue_size: int = 64, max_per_ip: int = 8,
+                 backlog: int = 128):
         self.port = port
         self.spool_dir = Path(spool_dir)
         self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.index = open_spool_index(self.spool_dir)
         self.running = False
         self.server_socket = None
+        self.workers = workers
+        self.backlog = backlog
+        self.max_per_ip = max_per_ip
+        self.pending = queue.Queue(maxsize=max(1, queue_size))
+        self.per_ip = {}
+        self.per_ip_lock = threading.Lock()
+        self._threads = []
         
     def start(self):
         """Porneste serverul."""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind(('0.0.0.0', self.port))
-        self.server_socket.listen(5)
+        self.server_socket.listen(self.backlog)
+        for _ in range(self.workers):
+            self._spawn(self._worker)
         self.running = True
         
         print(f"[SMTP] Server pornit pe port {self.port}")
         print(f"[SMTP] Spool: {self.spool_dir.absolute()}")
+        if self.workers:
+            print(f"[SMTP] Workeri: {self.workers}, coada: {self.pending.maxsize}, "
+                  f"max/IP: {self.max_per_ip or 'nelimitat'}")
+        else:
+            print("[SMTP] Un thread per conexiune (fara pool)")
         print("[SMTP] Apasati Ctrl+C For a opri\n")
         
         try:
             while self.running:
                 client_sock, addr = self.server_socket.accept()
-                thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_sock, addr),
-                    daemon=True
-                )
-                thread.start()
+                client_sock.settimeout(self.IDLE_TIMEOUT)
+                if not self.workers:
+                    self._threads = [t for t in self._threads if t.is_alive()]
+                    self._spawn(self._handle_client, client_sock, addr)
+                    continue
+                reason = self._enqueue(client_sock, addr)
+                if reason:
+                    print(f"[SMTP] Refuzat {addr[0]}:{addr[1]}: {reason}")
+                    self._reject(client_sock, reason)
         except KeyboardInterrupt:
             print("\n[SMTP] Oprire server...")
+        except OSError:
+            if self.running:
+                raise
         finally:
             self.stop()
     
+    def _spawn(self, target, *args):
+        """Porneste un thread pe care stop() il asteapta inainte de a inchide indexul."""
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+    
+    def _reject(self, client_sock: socket.socket, reason: str):
+        """Raspunde 421 si inchide conexiunea."""
+        try:
+            client_sock.sendall(f"421 smtp.local {reason}\r\n".encode())
+        except OSError:
+            pass
+        client_sock.close()
+    
+    def _enqueue(self, client_sock: socket.socket, addr: tuple):
+        """Pune conexiunea in coada; returneaza motivul refuzului sau None."""
+        with self.per_ip_lock:
+            if self.max_per_ip and self.per_ip.get(addr[0], 0) >= self.max_per_ip:
+                return "Too many connections from your address"
+            try:
+                self.pending.put_nowait((client_sock, addr))
+            except queue.Full:
+                return "Server busy, try again later"
+            self.per_ip[addr[0]] = self.per_ip.get(addr[0], 0) + 1
+        return None
+    
+    def _worker(self):
+        """Worker din pool: deserveste conexiunile din coada, una cate una."""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            client_sock, addr = item
+            try:
+                self._handle_client(client_sock, addr)
+            finally:
+                with self.per_ip_lock:
+                    self.per_ip[addr[0]] -= 1
+                    if not self.per_ip[addr[0]]:
+                        del self.per_ip[addr[0]]
+    
     def stop(self):
-        """Opreste serverul."""
+        """Opreste serverul: workerii termina conexiunile curente, apoi se inchide indexul."""
+        was_running = self.running
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        if not was_running:
+            return
+        # Conexiunile inca in coada sunt refuzate, fiecare worker primeste un None
+        while True:
+            try:
+                client_sock, addr = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            self._reject(client_sock, "Server shutting down")
+            with self.per_ip_lock:
+                self.per_ip[addr[0]] -= 1
+                if not self.per_ip[addr[0]]:
+                    del self.per_ip[addr[0]]
+        for _ in range(self.workers):
+            self.pending.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.index.close()
     
     def _handle_client(self, sock: socket.socket, addr: tuple):
         """Gestioneaza o conexiune client."""
@@ -153,14 +446,14 @@ class MiniSMTPServer:
             sock.sendall((msg + "\r\n").encode())
             print(f"[SMTP] S: {msg}")
         
+        rfile = sock.makefile("rb")
+        
         def recv():
-            data = b""
-            while not data.endswith(b"\r\n"):
-                chunk = sock.recv(1024)
-                if not chunk:
-                    return None
-                data += chunk
-            line = data.decode().strip()
+            # Citire linie cu linie: un recv() poate contine mai multe linii
+            data = rfile.readline()
+            if not data:
+                return None
+            line = data.decode(errors="replace").rstrip("\r\n")
             print(f"[SMTP] C: {line}")
             return line
         
@@ -170,8 +463,12 @@ class MiniSMTPServer:
             
             while True:
                 line = recv()
-                if not line:
+                if line is None:
                     break
+                line = line.strip()
+                if not line:
+                    send("500 Command not recognized")
+                    continue
                 
                 cmd = line.split()[0].upper() if line else ""
                 arg = line[len(cmd):].strip() if len(line) > len(cmd) else ""
@@ -212,11 +509,13 @@ class MiniSMTPServer:
                     data_lines = []
                     while True:
                         data_line = recv()
+                        if data_line is None:
+                            return
                         if data_line == ".":
                             break
                         if data_line and data_line.startswith(".."):
                             data_line = data_line[1:]  # Dot unstuffing
-                        data_lines.append(data_line if data_line else "")
+                        data_lines.append(data_line)
                     
                     # Salvare
                     self._save_message(mail_from, rcpt_to, "\r\n".join(data_lines))
@@ -243,30 +542,45 @@ class MiniSMTPServer:
         except Exception as e:
             print(f"[SMTP] Error: {e}")
         finally:
+            rfile.close()
             sock.close()
             print(f"[SMTP] Conexiune inchisa: {addr[0]}:{addr[1]}")
     
     def _save_message(self, mail_from: str, rcpt_to: list, data: str):
-        """Salveaza mesajul in spool."""
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        msg_id = str(uuid.uuid4())[:8]
-        filename = f"{timestamp}_{msg_id}.eml"
+        """Salveaza mesajul in spool si il adauga in index."""
+        filename, content = format_spool_message(mail_from, rcpt_to, data)
         filepath = self.spool_dir / filename
         
-        # Adaugam informatii despre envelope
-        header = (
-            f"X-Envelope-From: {mail_from}\r\n"
-            f"X-Envelope-To: {', '.join(rcpt_to)}\r\n"
-            f"X-Received: {datetime.datetime.now().isoformat()}\r\n"
-        )
+        with open(filepath, 'wb') as f:
+            f.write(content)
         
-        with open(filepath, 'w') as f:
-            f.write(header)
-            f.write(data)
+        # Headerele se parseaza din ce avem deja in memorie, nu din fisier
+        self.index.add(_spool_record(filename, content[:HEADER_SCAN_BYTES], len(content)))
         
         print(f"[SMTP] Message salvat: {filepath}")
 
 
+def format_spool_message(mail_from: str, rcpt_to: list, data: str,
+                         now: datetime.datetime = None, msg_id: str = None) -> tuple:
+    """
+    Construieste numele si continutul unui fisier .eml din spool.
+    
+    Returns:
+        (filename, bytes) - continutul are in fata headerele de envelope
+    """
+    now = now or datetime.datetime.now()
+    msg_id = msg_id or str(uuid.uuid4())[:8]
+    filename = f"{now.strftime('%Y%m%d_%H%M%S')}_{msg_id}.eml"
+    
+    # Adaugam informatii despre envelope
+    header = (
+        f"X-Envelope-From: {mail_from}\r\n"
+        f"X-Envelope-To: {', '.join(rcpt_to)}\r\n"
+        f"X-Received: {now.isoformat()}\r\n"
+    )
+    return filename, (header + data).encode("utf-8")
+
+
 def send_email(host: str, port: int, sender: str, recipient: str, 
                subject: str, body: str, verbose: bool = False):
     """
@@ -296,41 +610,39 @@ def send_email(host: str, port: int, sender: str, recipient: str,
         return False
 
 
-def list_messages(spool_dir: str):
-    """Listeaza mesajele din spool."""
+def list_messages(spool_dir: str, limit: int = None):
+    """Listeaza mesajele din spool (din index, fara a citi fisierele)."""
     spool = Path(spool_dir)
     if not spool.exists():
         print(f"[INFO] Spool '{spool_dir}' nu exista.")
         return
     
-    files = list(spool.glob("*.eml"))
-    if not files:
+    index = open_spool_index(spool)
+    try:
+        total = index.count()
+        records = index.messages(limit=limit)
+    finally:
+        index.close()
+    
+    if not records:
         print(f"[INFO] Niciun Message in {spool_dir}")
         return
     
     print(f"\n{'='*60}")
-    print(f"Mesaje in {spool.absolute()} ({len(files)} total)")
+    print(f"Mesaje in {spool.absolute()} ({total} total)")
     print(f"{'='*60}\n")
     
-    for filepath in sorted(files):
-        with open(filepath) as f:
-            content = f.read()
-        
-        # Extrage subject
-        subject_match = re.search(r'^Subject:\s*(.+)$', content, re.MULTILINE | re.IGNORECASE)
-        subject = subject_match.group(1) if subject_match else "(fara subiect)"
-        
-        # Extrage envelope
-        env_from = re.search(r'^X-Envelope-From:\s*(.+)$', content, re.MULTILINE)
-        env_to = re.search(r'^X-Envelope-To:\s*(.+)$', content, re.MULTILINE)
-        
-        print(f"📧 {filepath.name}")
-        print(f"   Subject: {subject}")
-        if env_from:
-            print(f"   Envelope From: {env_from.group(1)}")
-        if env_to:
-            print(f"   Envelope To: {env_to.group(1)}")
+    for record in records:
+        print(f"📧 {record['filename']}")
+        print(f"   Subject: {record['subject'] or '(fara subiect)'}")
+        if record['env_from']:
+            print(f"   Envelope From: {record['env_from']}")
+        if record['env_to']:
+            print(f"   Envelope To: {record['env_to']}")
         print()
+    
+    if limit is not None and total > len(records):
+        print(f"... inca {total - len(records)} mesaje (folositi --limit)")
 
 
 def analyze_envelope_vs_headers(spool_dir: str):
@@ -340,9 +652,17 @@ def analyze_envelope_vs_headers(spool_dir: str):
     Aceasta este o lectie cheie despre SMTP!
     """
     spool = Path(spool_dir)
-    files = list(spool.glob("*.eml")) if spool.exists() else []
+    records = []
+    if spool.exists():
+        index = open_spool_index(spool)
+        try:
+            records = index.messages(limit=3)  # Primele 3 mesaje
+            total = index.count()
+            mismatched = index.count_mismatched()
+        finally:
+            index.close()
     
-    if not files:
+    if not records:
         print("[INFO] Niciun Message de analizat. Trimiteti cateva emailuri mai intai!")
         return
     
@@ -373,38 +693,95 @@ def analyze_envelope_vs_headers(spool_dir: str):
 ╚════════════════════════════════════════════════════════════════════╝
 """)
     
-    for filepath in sorted(files)[:3]:  # Primele 3 mesaje
-        with open(filepath) as f:
-            content = f.read()
-        
-        print(f"\n📧 Fiander: {filepath.name}")
+    for record in records:
+        print(f"\n📧 Fiander: {record['filename']}")
         print("-" * 50)
         
-        # Envelope
-        env_from = re.search(r'^X-Envelope-From:\s*(.+)$', content, re.MULTILINE)
-        env_to = re.search(r'^X-Envelope-To:\s*(.+)$', content, re.MULTILINE)
-        
-        # Headers
-        hdr_from = re.search(r'^From:\s*(.+)$', content, re.MULTILINE | re.IGNORECASE)
-        hdr_to = re.search(r'^To:\s*(.+)$', content, re.MULTILINE | re.IGNORECASE)
-        
         print(f"  ENVELOPE:")
-        print(f"    MAIL FROM: {env_from.group(1) if env_from else 'N/A'}")
-        print(f"    RCPT TO:   {env_to.group(1) if env_to else 'N/A'}")
+        print(f"    MAIL FROM: {record['env_from'] or 'N/A'}")
+        print(f"    RCPT TO:   {record['env_to'] or 'N/A'}")
         
         print(f"  MESSAGE HEADERS:")
-        print(f"    From:      {hdr_from.group(1) if hdr_from else 'N/A'}")
-        print(f"    To:        {hdr_to.group(1) if hdr_to else 'N/A'}")
+        print(f"    From:      {record['hdr_from'] or 'N/A'}")
+        print(f"    To:        {record['hdr_to'] or 'N/A'}")
         
         # Comparatie
-        if env_from and hdr_from:
-            env_addr = re.search(r'[\w.-]+@[\w.-]+', env_from.group(1))
-            hdr_addr = re.search(r'[\w.-]+@[\w.-]+', hdr_from.group(1))
-            if env_addr and hdr_addr:
-                if env_addr.group() == hdr_addr.group():
-                    print("  ✓ Envelope From == Message From")
-                else:
-                    print("  ⚠ DIFERENTA: Envelope From ≠ Message From!")
+        if _addr(record['env_from']) and _addr(record['hdr_from']):
+            if record['from_mismatch']:
+                print("  ⚠ DIFERENTA: Envelope From ≠ Message From!")
+            else:
+                print("  ✓ Envelope From == Message From")
+    
+    print(f"\nTotal: {total} mesaje, {mismatched} cu From: diferit de MAIL FROM")
+
+
+def benchmark_listing(count: int = 100000, spool_dir: str = None):
+    """
+    Compara listarea din index cu parsarea fisierelor .eml.
+    
+    Genereaza `count` mesaje direct pe disc (fara SMTP), apoi masoara:
+    scanarea+parsarea fisierelor, reconstruirea indexului si interogarea lui.
+    """
+    own_dir = spool_dir is None
+    spool = Path(spool_dir or tempfile.mkdtemp(prefix="s12_spool_bench_"))
+    spool.mkdir(parents=True, exist_ok=True)
+    
+    print(f"[INFO] Generare {count} mesaje in {spool} ...")
+    now = datetime.datetime.now()
+    start = time.perf_counter()
+    for i in range(count):
+        sender = f"user{i % 97}@sender.local"
+        header_from = sender if i % 10 else f"Spoofed <ceo{i % 7}@other.local>"
+        data = (f"From: {header_from}\r\nTo: Recipient <rcpt{i % 13}@recipient.local>\r\n"
+                f"Subject: Bench message {i}\r\n\r\nBody line for message {i}.\r\n")
+        filename, content = format_spool_message(sender, [f"rcpt{i % 13}@recipient.local"],
+                                                 data, now=now, msg_id=f"{i:08d}")
+        with open(spool / filename, "wb") as f:
+            f.write(content)
+    print(f"[INFO] Generare: {time.perf_counter() - start:.1f}s")
+    
+    try:
+        results = {}
+        
+        start = time.perf_counter()
+        parsed = [read_spool_file(p) for p in sorted(spool.glob("*.eml"))]
+        results["scan + parse .eml"] = time.perf_counter() - start
+        
+        index = SpoolIndex(spool)
+        start = time.perf_counter()
+        indexed = index.rebuild()
+        results["reindex (rebuild)"] = time.perf_counter() - start
+        index.close()
+        
+        # Un proces nou deschide indexul existent, ca la `list`
+        start = time.perf_counter()
+        index = SpoolIndex(spool)
+        records = index.messages()
+        results["list din index"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        index.messages(limit=50)
+        results["list din index (--limit 50)"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        mismatched = index.count_mismatched()
+        results["analyze: count From ≠ MAIL FROM"] = time.perf_counter() - start
+        index.close()
+        
+        assert len(parsed) == indexed == len(records) == count
+        assert mismatched == sum(r["from_mismatch"] for r in parsed)
+        
+        print(f"\n{'='*60}")
+        print(f"BENCHMARK LISTARE SPOOL: {count} mesaje")
+        print(f"{'='*60}")
+        for name, elapsed in results.items():
+            print(f"  {name:<34} {elapsed * 1000:>10.1f} ms")
+        speedup = results["scan + parse .eml"] / results["list din index"]
+        print(f"\n  Index vs parsare fisiere: {speedup:.1f}x mai rapid")
+        return results
+    finally:
+        if own_dir:
+            shutil.rmtree(spool, ignore_errors=True)
 
 
 def run_selftest():
@@ -414,6 +791,7 @@ def run_selftest():
     print("="*60)
     
     spool_dir = "/tmp/smtp_selftest_spool"
+    shutil.rmtree(spool_dir, ignore_errors=True)
     
     # Test 1: Start server
     print("\n[Test 1] Pornire SMTP Server...")
@@ -467,8 +845,99 @@ def run_selftest():
         print("  ✗ Niciun Message salvat")
         return False
     
-    # Cleanup
+    # Test 5: Index spool
+    print("\n[Test 5] Verification index spool...")
+    records = server.index.messages()
+    if (len(records) == 1 and records[0]["subject"] == "Selftest Subject"
+            and records[0]["env_from"] == "Test@sender.local"
+            and records[0]["filename"] == files[0].name):
+        print(f"  ✓ Index: {records[0]['filename']} ({records[0]['size']} octeti)")
+    else:
+        print(f"  ✗ Index incorect: {records}")
+        return False
+    with open(files[0], "rb") as f:
+        f.seek(records[0]["offset"])
+        first_line = f.readline()
+    rebuilt = SpoolIndex(spool_dir)
+    count = rebuilt.rebuild()
+    same = rebuilt.messages() == records
+    rebuilt.close()
+    if first_line.startswith(b"Content-Type") and count == 1 and same:
+        print("  ✓ Offset mesaj corect, reindex identic")
+    else:
+        print(f"  ✗ Offset/reindex: {first_line!r}, count={count}, identic={same}")
+        return False
+    
+    # Cleanup: workerii se opresc, indexul se inchide
     server.stop()
+    try:
+        server.index.count()
+        index_closed = False
+    except sqlite3.ProgrammingError:
+        index_closed = True
+    if any(t.is_alive() for t in server._threads) or not index_closed:
+        print("  ✗ stop() a lasat workeri activi sau indexul deschis")
+        return False
+    print("  ✓ stop(): workeri opriti, index inchis")
+    
+    # Test 6: Pool limitat - coada plina and limita per IP -> 421 imediat
+    print("\n[Test 6] Backpressure: coada plina and limita per IP...")
+    small = MiniSMTPServer(port=11026, spool_dir=spool_dir, workers=1,
+                           queue_size=1, max_per_ip=2)
+    threading.Thread(target=small.start, daemon=True).start()
+    time.sleep(0.3)
+    
+    def banner(source_ip):
+        s = socket.create_connection(("127.0.0.1", 11026), timeout=2,
+                                     source_address=(source_ip, 0))
+        s.settimeout(0.5)
+        try:
+            return s, s.recv(1024).decode()[:3]
+        except socket.timeout:
+            return s, ""
+    
+    try:
+        first, code1 = banner("127.0.0.1")   # preluat de singurul worker
+        second, code2 = banner("127.0.0.1")  # asteapta in coada, fara banner
+        third, code3 = banner("127.0.0.1")   # peste max_per_ip
+        fourth, code4 = banner("127.0.0.2")  # alt IP, dar coada e plina
+        for s in (first, second, third, fourth):
+            s.close()
+    except OSError as e:
+        print(f"  ✗ Error: {e}")
+        return False
+    finally:
+        small.stop()
+    if (code1, code2, code3, code4) == ("220", "", "421", "421"):
+        print("  ✓ 220, in coada, 421 per IP, 421 coada plina")
+    else:
+        print(f"  ✗ Coduri neasteptate: {(code1, code2, code3, code4)}")
+        return False
+    
+    # Test 7: 0 = fara limita (thread per conexiune, fara limita per IP)
+    print("\n[Test 7] workers=0 si max_per_ip=0 inseamna fara limita...")
+    codes = []
+    for port, options in ((11027, {"workers": 0}), (11028, {"max_per_ip": 0})):
+        unlimited = MiniSMTPServer(port=port, spool_dir=spool_dir, **options)
+        threading.Thread(target=unlimited.start, daemon=True).start()
+        time.sleep(0.3)
+        clients = []
+        try:
+            for _ in range(10):
+                s = socket.create_connection(("127.0.0.1", port), timeout=2)
+                clients.append(s)
+                codes.append(s.recv(1024).decode()[:3])
+        except OSError as e:
+            codes.append(str(e))
+        finally:
+            for s in clients:
+                s.close()
+            unlimited.stop()
+    if codes == ["220"] * 20:
+        print("  ✓ 10 conexiuni simultane servite in ambele configuratii")
+    else:
+        print(f"  ✗ Coduri neasteptate: {codes}")
+        return False
     
     print("\n" + "="*60)
     print("SELFTEST: TOATE TESTELE AU TRECUT ✓")
@@ -486,12 +955,16 @@ Comenzi disponibile:
   send     - Trimite un email
   list     - Listează mesajele din spool
   analyze  - Analizează envelope vs headers
+  reindex  - Reconstruiește indexul spool-ului
+  bench-list - Benchmark listare (index vs fișiere)
 
 Exemple:
   python3 ex_01_smtp.py server --port 1025
   python3 ex_01_smtp.py send --port 1025 --subject "Test"
   python3 ex_01_smtp.py list --spool ./spool_s12
   python3 ex_01_smtp.py analyze --spool ./spool_s12
+  python3 ex_01_smtp.py reindex --spool ./spool_s12
+  python3 ex_01_smtp.py bench-list --count 100000
   python3 ex_01_smtp.py --selftest
 
 Revolvix&Hypotheticalandrei
@@ -518,11 +991,23 @@ Revolvix&Hypotheticalandrei
     # List
     p_list = subparsers.add_parser('list', help='Listeaza mesajele')
     p_list.add_argument('--spool', default='./spool_s12')
+    p_list.add_argument('--limit', type=int, default=None,
+                        help='Afiseaza doar primele N mesaje')
     
     # Analyze
     p_analyze = subparsers.add_parser('analyze', help='Analizeaza envelope vs headers')
     p_analyze.add_argument('--spool', default='./spool_s12')
     
+    # Reindex
+    p_reindex = subparsers.add_parser('reindex', help='Reconstruieste indexul spool')
+    p_reindex.add_argument('--spool', default='./spool_s12')
+    
+    # Benchmark listare
+    p_bench = subparsers.add_parser('bench-list', help='Benchmark listare index vs fisiere')
+    p_bench.add_argument('--count', type=int, default=100000)
+    p_bench.add_argument('--spool', default=None,
+                         help='Director de lucru (implicit: temporar, sters la final)')
+    
     # Selftest
     parser.add_argument('--selftest', action='store_true', help='Ruleaza auto-teste')
     
@@ -545,11 +1030,24 @@ Revolvix&Hypotheticalandrei
         )
     
     elif args.command == 'list':
-        list_messages(args.spool)
+        list_messages(args.spool, args.limit)
     
     elif args.command == 'analyze':
         analyze_envelope_vs_headers(args.spool)
     
+    elif args.command == 'reindex':
+        if not Path(args.spool).exists():
+            print(f"[INFO] Spool '{args.spool}' nu exista.")
+            sys.exit(1)
+        index = SpoolIndex(args.spool)
+        start = time.perf_counter()
+        count = index.rebuild()
+        index.close()
+        print(f"[OK] Index reconstruit: {count} mesaje in {time.perf_counter() - start:.2f}s")
+    
+    elif args.command == 'bench-list':
+        benchmark_listing(args.count, args.spool)
+    
     else:
         parser.print_help()
 
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+"""
+ex_03_rpc_benchmark.py - Cross-protocol RPC benchmark suite for Week 12
+
+Extends the simple `benchmark` command from ex_02_rpc.py (a fixed number of
+small `add` calls) into a sweep over:
+- payload size (sort_list with 10 ... 1M elements)
+- concurrency (number of client threads)
+- connection reuse (HTTP/1.1 keep-alive vs a new TCP connection per call)
+
+For every call the time is split into:
+- serialisation   (building the JSON / XML request body)
+- transport       (send + server processing + receive)
+- deserialisation (parsing the response body)
+
+The client speaks HTTP/1.1 directly over a socket, so the bytes on the wire
+(request line, headers and body in both directions) are counted exactly.
+
+Results are written as JSON so that regressions can be tracked between runs:
+
+    python3 ex_03_rpc_benchmark.py --output bench_a.json
+    python3 ex_03_rpc_benchmark.py --output bench_b.json --compare bench_a.json
+
+Usage:
+    python3 ex_03_rpc_benchmark.py                       # default sweep
+    python3 ex_03_rpc_benchmark.py --sizes 10 1000 1000000 --concurrency 1 8
+    python3 ex_03_rpc_benchmark.py --external --jsonrpc-port 8080 --xmlrpc-port 8000
+    python3 ex_03_rpc_benchmark.py --selftest
+
+Revolvix&Hypotheticalandrei
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+import xmlrpc.client
+from http.server import ThreadingHTTPServer
+from socketserver import ThreadingMixIn
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+from ex_02_rpc import JSONRPCHandler, RPCFunctions
+
+
+# =============================================================================
+# CONFIGURATIE
+# =============================================================================
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_CONCURRENCY = [1, 4, 16]
+DEFAULT_CALLS = 200            # apeluri per punct de masurare (payload mic)
+DEFAULT_ITEM_BUDGET = 2000000  # elemente transferate per punct (limiteaza payload-urile mari)
+MIN_CALLS = 3
+
+PROTOCOLS = ("jsonrpc", "xmlrpc")
+RESULT_FORMAT_VERSION = 1
+
+
+# =============================================================================
+# SERVERE (HTTP/1.1 keep-alive, multi-threaded)
+# =============================================================================
+
+class KeepAliveJSONRPCHandler(JSONRPCHandler):
+    """JSONRPCHandler din ex_02_rpc cu HTTP/1.1 (keep-alive) and fara log per cerere."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # antetele and corpul pleaca in send-uri separate
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KeepAliveXMLRPCHandler(SimpleXMLRPCRequestHandler):
+    """Handler XML-RPC cu HTTP/1.1 (keep-alive)."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+
+class ThreadedXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """SimpleXMLRPCServer cu un thread per conexiune."""
+
+    daemon_threads = True
+
+
+def create_servers(host: str, jsonrpc_port: int, xmlrpc_port: int):
+    """Creeaza serverele JSON-RPC and XML-RPC folosite de benchmark."""
+    json_server = ThreadingHTTPServer((host, jsonrpc_port), KeepAliveJSONRPCHandler)
+    json_server.daemon_threads = True
+
+    xml_server = ThreadedXMLRPCServer(
+        (host, xmlrpc_port),
+        requestHandler=KeepAliveXMLRPCHandler,
+        logRequests=False,
+        allow_none=True,
+    )
+    rpc = RPCFunctions()
+    for name in dir(rpc):
+        if not name.startswith('_'):
+            xml_server.register_function(getattr(rpc, name), name)
+
+    return json_server, xml_server
+
+
+def _serve_forever(host: str, jsonrpc_port: int, xmlrpc_port: int, ready):
+    """Punct de intrare For procesul server (separat de client, alt GIL)."""
+    json_server, xml_server = create_servers(host, jsonrpc_port, xmlrpc_port)
+    threading.Thread(target=xml_server.serve_forever, daemon=True).start()
+    ready.set()
+    json_server.serve_forever()
+
+
+def start_server_process(host: str, jsonrpc_port: int, xmlrpc_port: int,
+                         timeout: float = 10.0) -> multiprocessing.Process:
+    """Porneste serverele intr-un proces separat and asteapta sa fie gata."""
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(
+        target=_serve_forever,
+        args=(host, jsonrpc_port, xmlrpc_port, ready),
+        daemon=True,
+    )
+    proc.start()
+    if not ready.wait(timeout):
+        proc.terminate()
+        raise RuntimeError("Serverele de benchmark nu au pornit")
+    return proc
+
+
+# =============================================================================
+# SERIALIZARE (separata de transport)
+# =============================================================================
+
+def _json_encode(method: str, params: list, call_id: int) -> bytes:
+    request = {"jsonrpc": "2.0", "method": method, "params": params, "id": call_id}
+    return json.dumps(request).encode()
+
+
+def _json_decode(body: bytes):
+    response = json.loads(body)
+    if "error" in response:
+        raise RuntimeError(f"RPC Error {response['error']['code']}: {response['error']['message']}")
+    return response.get("result")
+
+
+def _xml_encode(method: str, params: list, call_id: int) -> bytes:
+    return xmlrpc.client.dumps(tuple(params), methodname=method, allow_none=True).encode()
+
+
+def _xml_decode(body: bytes):
+    # xmlrpc.client.loads ridica Fault pentru erori RPC
+    return xmlrpc.client.loads(body)[0][0]
+
+
+CODECS = {
+    "jsonrpc": {"encode": _json_encode, "decode": _json_decode,
+                "path": "/", "content_type": "application/json"},
+    "xmlrpc": {"encode": _xml_encode, "decode": _xml_decode,
+               "path": "/RPC2", "content_type": "text/xml"},
+}
+
+
+# =============================================================================
+# CLIENT HTTP/1.1 MINIMAL (numara octetii de pe fir)
+# =============================================================================
+
+class WireClient:
+    """
+    Client HTTP/1.1 minimal For POST-uri RPC.
+
+    Numara exact octetii trimisi/primiti (linie de start + antete + corp).
+    Cu reuse=True pastreaza conexiunea deschisa intre apeluri; se reconecteaza
+    automat daca serverul o inchide (ex: servere HTTP/1.0 din ex_02_rpc.py).
+    """
+
+    def __init__(self, host: str, port: int, reuse: bool = True, timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.reuse = reuse
+        self.timeout = timeout
+        self.sock = None
+        self.rfile = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.connects = 0
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile('rb')
+        self.connects += 1
+
+    def close(self):
+        if self.rfile:
+            self.rfile.close()
+        if self.sock:
+            self.sock.close()
+        self.sock = None
+        self.rfile = None
+
+    def post(self, path: str, content_type: str, body: bytes) -> bytes:
+        """Trimite un POST and returneaza corpul raspunsului."""
+        if self.sock is None:
+            self._connect()
+
+        connection = "keep-alive" if self.reuse else "close"
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {connection}\r\n"
+            "\r\n"
+        ).encode('ascii')
+        self.sock.sendall(head + body)
+        self.bytes_out += len(head) + len(body)
+
+        status_line = self.rfile.readline()
+        if not status_line:
+            raise ConnectionError("Conexiune inchisa de server")
+        self.bytes_in += len(status_line)
+        version, status = status_line.split(None, 2)[:2]
+
+        length = 0
+        keep_alive = version == b"HTTP/1.1"
+        while True:
+            line = self.rfile.readline()
+            self.bytes_in += len(line)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value.strip())
+            elif name == b"connection":
+                keep_alive = value.strip().lower() == b"keep-alive"
+
+        payload = self.rfile.read(length)
+        self.bytes_in += len(payload)
+
+        if status != b"200":
+            self.close()
+            raise RuntimeError(f"HTTP {status.decode()}")
+        if not (self.reuse and keep_alive):
+            self.close()
+        return payload
+
+
+# =============================================================================
+# MASURARE
+# =============================================================================
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentila prin metoda nearest-rank (lista trebuie sa fie sortata)."""
+    if not sorted_values:
+        return 0.0
+    n = len(sorted_values)
+    # pct * n / 100, nu pct / 100 * n: 7 / 100 * 100 = 7.000000000000001
+    rank = min(max(math.ceil(pct * n / 100.0), 1), n)
+    return sorted_values[rank - 1]
+
+
+def _worker(protocol: str, host: str, port: int, payload: list, calls: int,
+            reuse: bool, out: dict):
+    """Executa `calls` apeluri sort_list and colecteaza timpii per faza."""
+    codec = CODECS[protocol]
+    client = WireClient(host, port, reuse=reuse)
+    ser, transport, deser, total = [], [], [], []
+    errors = 0
+
+    for call_id in range(calls):
+        try:
+            t0 = time.perf_counter()
+            body = codec["encode"]("sort_list", [payload], call_id)
+            t1 = time.perf_counter()
+            raw = client.post(codec["path"], codec["content_type"], body)
+            t2 = time.perf_counter()
+            result = codec["decode"](raw)
+            t3 = time.perf_counter()
+        except Exception:
+            errors += 1
+            client.close()
+            continue
+        if len(result) != len(payload):
+            errors += 1
+        ser.append(t1 - t0)
+        transport.append(t2 - t1)
+        deser.append(t3 - t2)
+        total.append(t3 - t0)
+
+    client.close()
+    out.update(ser=ser, transport=transport, deser=deser, total=total, errors=errors,
+               bytes_out=client.bytes_out, bytes_in=client.bytes_in,
+               connects=client.connects)
+
+
+def _ms(values: list) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50": round(percentile(ordered, 50) * 1000, 4),
+        "p99": round(percentile(ordered, 99) * 1000, 4),
+        "max": round(ordered[-1] * 1000, 4),
+    }
+
+
+def calls_for_size(size: int, calls: int, item_budget: int, concurrency: int) -> int:
+    """Numarul de apeluri pentru un punct: payload-urile mari primesc mai putine."""
+    scaled = min(calls, max(MIN_CALLS, item_budget // max(size, 1)))
+    return max(scaled, concurrency)
+
+
+def run_point(protocol: str, host: str, port: int, payload: list, concurrency: int,
+              reuse: bool, calls: int) -> dict:
+    """Ruleaza un punct din sweep (protocol, dimensiune, concurenta, reuse)."""
+    per_worker = [calls // concurrency + (1 if i < calls % concurrency else 0)
+                  for i in range(concurrency)]
+    outputs = [{} for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=_worker,
+                         args=(protocol, host, port, payload, n, reuse, outputs[i]))
+        for i, n in enumerate(per_worker)
+    ]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    merged = {"ser": [], "transport": [], "deser": [], "total": []}
+    errors = bytes_out = bytes_in = connects = 0
+    for out in outputs:
+        for key in merged:
+            merged[key].extend(out.get(key, []))
+        errors += out.get("errors", 0)
+        bytes_out += out.get("bytes_out", 0)
+        bytes_in += out.get("bytes_in", 0)
+        connects += out.get("connects", 0)
+
+    ok = len(merged["total"])
+    return {
+        "protocol": protocol,
+        "payload_items": len(payload),
+        "concurrency": concurrency,
+        "reuse": reuse,
+        "calls": calls,
+        "ok": ok,
+        "errors": errors,
+        "connections": connects,
+        "wall_s": round(wall, 4),
+        "calls_per_sec": round(ok / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": _ms(merged["total"]),
+        "serialise_ms": _ms(merged["ser"]),
+        "transport_ms": _ms(merged["transport"]),
+        "deserialise_ms": _ms(merged["deser"]),
+        "bytes_out_per_call": round(bytes_out / ok) if ok else 0,
+        "bytes_in_per_call": round(bytes_in / ok) if ok else 0,
+        "wire_bytes_total": bytes_out + bytes_in,
+    }
+
+
+def run_suite(host: str, ports: dict, protocols, sizes, concurrency_levels, reuse_modes,
+              calls: int, item_budget: int, seed: int = 12, quiet: bool = False) -> dict:
+    """Ruleaza intregul sweep and returneaza documentul JSON cu rezultate."""
+    rng = random.Random(seed)
+    results = []
+
+    for size in sizes:
+        payload = list(range(size))
+        rng.shuffle(payload)
+        for protocol in protocols:
+            for concurrency in concurrency_levels:
+                for reuse in reuse_modes:
+                    n = calls_for_size(size, calls, item_budget, concurrency)
+                    point = run_point(protocol, host, ports[protocol], payload,
+                                      concurrency, reuse, n)
+                    results.append(point)
+                    if not quiet:
+                        print_point(point)
+
+    return {
+        "suite": "week12-rpc-benchmark",
+        "format_version": RESULT_FORMAT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count(),
+        },
+        "config": {
+            "host": host,
+            "ports": ports,
+            "protocols": list(protocols),
+            "sizes": list(sizes),
+            "concurrency": list(concurrency_levels),
+            "reuse": list(reuse_modes),
+            "calls": calls,
+            "item_budget": item_budget,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+# =============================================================================
+# RAPORTARE
+# =============================================================================
+
+def print_header():
+    print(f"{'proto':<8} {'items':>8} {'conc':>4} {'reuse':>5} {'calls':>5} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'ser ms':>8} {'xport ms':>9} {'deser ms':>9} "
+          f"{'calls/s':>9} {'B out':>10} {'B in':>10}")
+    print("-" * 116)
+
+
+def print_point(p: dict):
+    print(f"{p['protocol']:<8} {p['payload_items']:>8} {p['concurrency']:>4} "
+          f"{'yes' if p['reuse'] else 'no':>5} {p['ok']:>5} "
+          f"{p['latency_ms']['p50']:>9.2f} {p['latency_ms']['p99']:>9.2f} "
+          f"{p['serialise_ms']['mean']:>8.2f} {p['transport_ms']['mean']:>9.2f} "
+          f"{p['deserialise_ms']['mean']:>9.2f} {p['calls_per_sec']:>9.1f} "
+          f"{p['bytes_out_per_call']:>10} {p['bytes_in_per_call']:>10}"
+          + (f"  errors={p['errors']}" if p['errors'] else ""))
+
+
+def _point_key(p: dict) -> tuple:
+    return (p["protocol"], p["payload_items"], p["concurrency"], p["reuse"])
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compara doua rulari and returneaza lista regresiilor.
+
+    Regresie = p50 mai mare sau calls/s mai mic cu mai mult de `tolerance`
+    (fractie, ex: 0.2 = 20%) fata de baseline, pe acelasi punct din sweep.
+    """
+    base = {_point_key(p): p for p in baseline.get("results", [])}
+    regressions = []
+
+    for point in current.get("results", []):
+        old = base.get(_point_key(point))
+        if old is None:
+            continue
+        old_p50, new_p50 = old["latency_ms"]["p50"], point["latency_ms"]["p50"]
+        old_cps, new_cps = old["calls_per_sec"], point["calls_per_sec"]
+        if old_p50 > 0 and new_p50 > old_p50 * (1 + tolerance):
+            regressions.append({"point": _point_key(point), "metric": "latency_p50_ms",
+                                "baseline": old_p50, "current": new_p50})
+        if old_cps > 0 and new_cps < old_cps * (1 - tolerance):
+            regressions.append({"point": _point_key(point), "metric": "calls_per_sec",
+                                "baseline": old_cps, "current": new_cps})
+    return regressions
+
+
+# =============================================================================
+# SELFTEST
+# =============================================================================
+
+def run_selftest() -> bool:
+    """Ruleaza un sweep mic and verifica structura rezultatelor."""
+    print("=" * 60)
+    print("SELFTEST: ex_03_rpc_benchmark.py")
+    print("=" * 60)
+
+    host = "127.0.0.1"
+    ports = {"jsonrpc": 18280, "xmlrpc": 18200}
+
+    print("\n[Test 1] Pornire servere in proces separat...")
+    proc = start_server_process(host, ports["jsonrpc"], ports["xmlrpc"])
+    print("  ✓ Servere pornite")
+
+    try:
+        print("\n[Test 2] Sweep mic (2 dimensiuni × 2 protocoale × 2 concurente × reuse)...")
+        doc = run_suite(host, ports, PROTOCOLS, [10, 1000], [1, 2], [True, False],
+                        calls=20, item_budget=DEFAULT_ITEM_BUDGET, quiet=True)
+        if len(doc["results"]) != 16:
+            print(f"  ✗ Numar incorect de puncte: {len(doc['results'])}")
+            return False
+        if any(p["errors"] or p["ok"] != p["calls"] for p in doc["results"]):
+            print("  ✗ Apeluri esuate in sweep")
+            return False
+        print(f"  ✓ {len(doc['results'])} puncte masurate fara erori")
+
+        print("\n[Test 3] Reutilizarea conexiunii...")
+        reused = [p for p in doc["results"] if p["reuse"]]
+        fresh = [p for p in doc["results"] if not p["reuse"]]
+        if not all(p["connections"] == p["concurrency"] for p in reused):
+            print("  ✗ Keep-alive nu a reutilizat conexiunile")
+            return False
+        if not all(p["connections"] == p["calls"] for p in fresh):
+            print("  ✗ Modul fara reuse nu a deschis o conexiune per apel")
+            return False
+        print("  ✓ keep-alive: 1 conexiune/thread, fara reuse: 1 conexiune/apel")
+
+        print("\n[Test 4] Octeti pe fir: XML-RPC > JSON-RPC...")
+        by_key = {_point_key(p): p for p in doc["results"]}
+        json_b = by_key[("jsonrpc", 1000, 1, True)]["bytes_out_per_call"]
+        xml_b = by_key[("xmlrpc", 1000, 1, True)]["bytes_out_per_call"]
+        if xml_b <= json_b:
+            print(f"  ✗ Rezultat neasteptat: xml={xml_b} json={json_b}")
+            return False
+        print(f"  ✓ 1000 elemente: JSON {json_b} B, XML {xml_b} B")
+
+        print("\n[Test 5] Serializare JSON and comparatie cu baseline...")
+        reloaded = json.loads(json.dumps(doc))
+        if compare_results(reloaded, reloaded, tolerance=0.0):
+            print("  ✗ O rulare comparata cu ea insasi nu trebuie sa aiba regresii")
+            return False
+        print("  ✓ Documentul JSON este valid and comparabil")
+    finally:
+        proc.terminate()
+        proc.join()
+
+    print("\n[Test 6] Percentila nearest-rank...")
+    hundred = list(range(1, 101))
+    got = (percentile([1, 2], 50), percentile([1, 2, 3, 4], 50), percentile(hundred, 7),
+           percentile(hundred, 99), percentile(hundred, 100), percentile([5], 0))
+    if got != (1, 2, 7, 99, 100, 5):
+        print(f"  ✗ Percentile gresite: {got}")
+        return False
+    print("  ✓ p50, p7, p99, p100 and p0 corecte")
+
+    print("\n" + "=" * 60)
+    print("SELFTEST: TOATE TESTELE AU TRECUT ✓")
+    print("=" * 60)
+    return True
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark RPC cross-protocol (JSON-RPC vs XML-RPC) - Week 12",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemple:
+  python3 ex_03_rpc_benchmark.py
+  python3 ex_03_rpc_benchmark.py --sizes 10 1000 100000 1000000 --concurrency 1 4
+  python3 ex_03_rpc_benchmark.py --output run1.json
+  python3 ex_03_rpc_benchmark.py --output run2.json --compare run1.json --tolerance 0.15
+  python3 ex_03_rpc_benchmark.py --selftest
+
+Revolvix&Hypotheticalandrei
+        """
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--jsonrpc-port', type=int, default=18080)
+    parser.add_argument('--xmlrpc-port', type=int, default=18000)
+    parser.add_argument('--external', action='store_true',
+                        help='Foloseste servere deja pornite (nu le porneste local)')
+    parser.add_argument('--protocols', nargs='+', choices=PROTOCOLS, default=list(PROTOCOLS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='Dimensiuni lista sort_list (default: 10 ... 100000)')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--reuse', choices=['both', 'yes', 'no'], default='both',
+                        help='Reutilizare conexiune HTTP (keep-alive)')
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS,
+                        help='Apeluri per punct For payload-uri mici')
+    parser.add_argument('--item-budget', type=int, default=DEFAULT_ITEM_BUDGET,
+                        help='Elemente transferate per punct (scade apelurile For payload mare)')
+    parser.add_argument('--seed', type=int, default=12)
+    parser.add_argument('--output', '-o', help='Fisier JSON cu rezultatele')
+    parser.add_argument('--json', action='store_true',
+                        help='Afiseaza doar documentul JSON la stdout')
+    parser.add_argument('--compare', help='Fisier JSON baseline For detectarea regresiilor')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Toleranta relativa For regresii (default: 0.2)')
+    parser.add_argument('--selftest', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.selftest:
+        success = run_selftest()
+        sys.exit(0 if success else 1)
+
+    ports = {"jsonrpc": args.jsonrpc_port, "xmlrpc": args.xmlrpc_port}
+    reuse_modes = {"both": [True, False], "yes": [True], "no": [False]}[args.reuse]
+
+    proc = None
+    if not args.external:
+        proc = start_server_process(args.host, args.jsonrpc_port, args.xmlrpc_port)
+
+    try:
+        if not args.json:
+            print_header()
+        doc = run_suite(args.host, ports, args.protocols, args.sizes, args.concurrency,
+                        reuse_modes, args.calls, args.item_budget, args.seed, quiet=args.json)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.join()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(doc, f, indent=2)
+        if not args.json:
+            print(f"\n[OK] Rezultate salvate in {args.output}")
+    if args.json:
+        print(json.dumps(doc, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(doc, baseline, args.tolerance)
+        if regressions:
+            print(f"\n[REGRESII] {len(regressions)} fata de {args.compare}:", file=sys.stderr)
+            for r in regressions:
+                print(f"  {r['point']}: {r['metric']} {r['baseline']} → {r['current']}",
+                      file=sys.stderr)
+            sys.exit(1)
+        print(f"\n[OK] Nicio regresie fata de {args.compare} (toleranta {args.tolerance:.0%})",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
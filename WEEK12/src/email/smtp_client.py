@@ -12,20 +12,27 @@ Utilizare:
     python3 smtp_client.py --host 127.0.0.1 --port 1025 \\
         --from sender@Test --to recipient@Test \\
         --subject "Test" --body "Message de Test"
+    python3 smtp_client.py --port 1025 --bulk 10000 --sessions 4
+    python3 smtp_client.py --benchmark --count 10000
 
 Revolvix&Hypotheticalandrei
 """
 
 import argparse
+import queue
+import re
 import smtplib
+import socket
 import sys
+import threading
+import time
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 
 
 def create_andmple_message(
@@ -225,6 +232,401 @@ def send_email(
     return False
 
 
+# =============================================================================
+# Trimitere in masa: seandune refolosita, PIPELINING, CHUNKING/BDAT
+# =============================================================================
+
+class SMTPReplyError(Exception):
+    """Raspuns SMTP neasteptat in timpul unei tranzactii bulk."""
+    
+    def __init__(self, code: int, text: str):
+        super().__init__(f"{code} {text}")
+        self.code = code
+        self.text = text
+
+
+def normalize_crlf(data: bytes) -> bytes:
+    """Converteste orice terminator de linie in CRLF (cerut de SMTP)."""
+    data = re.sub(rb'\r\n|\r|\n', b'\r\n', data)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    return data
+
+
+def dot_stuff(data: bytes) -> bytes:
+    """Dot-stuffing For DATA: orice linie care incepe cu '.' primeste inca un '.'."""
+    data = re.sub(rb'(?m)^\.', b'..', data)
+    return data
+
+
+class BulkSMTPSession:
+    """
+    O seandune SMTP persistenta, refolosita For multe mesaje.
+    
+    Spre deosebire de send_email() (o seandune smtplib per mesaj, comenzi
+    trimise in lock-step), aceasta clasa:
+    - face EHLO o singura data and trimite multe tranzactii pe aceeasi conexiune
+    - cand serverul anunta PIPELINING (RFC 2920), trimite MAIL FROM, toate
+      RCPT TO and DATA/BDAT intr-un singur write and citeste raspunsurile dupa
+    - cand serverul anunta CHUNKING (RFC 3030), trimite corpul cu
+      BDAT <n> LAST: fara dot-stuffing and fara a astepta 354
+    
+    Example:
+        with BulkSMTPSession("127.0.0.1", 1025) as session:
+            for data in messages:
+                session.send_message("a@test.local", ["b@test.local"], data)
+    """
+    
+    def __init__(self, host: str, port: int, timeout: float = 30.0,
+                 use_pipelining: bool = True, use_chunking: bool = True,
+                 helo_name: str = "bulk.s12.local"):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.use_pipelining = use_pipelining
+        self.use_chunking = use_chunking
+        self.helo_name = helo_name
+        self.features = {}
+        self.sock = None
+        self.rfile = None
+    
+    def __enter__(self):
+        self.connect()
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @property
+    def pipelining(self) -> bool:
+        return self.use_pipelining and 'pipelining' in self.features
+    
+    @property
+    def chunking(self) -> bool:
+        return self.use_chunking and 'chunking' in self.features
+    
+    def connect(self):
+        """Conectare, banner and EHLO (extenandile sunt retinute in self.features)."""
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile('rb')
+        
+        code, lines = self._read_reply()
+        if code != 220:
+            raise SMTPReplyError(code, " ".join(lines))
+        
+        self.sock.sendall(f"EHLO {self.helo_name}\r\n".encode())
+        code, lines = self._read_reply()
+        if code != 250:
+            raise SMTPReplyError(code, " ".join(lines))
+        self.features = {}
+        for line in lines[1:]:
+            keyword, _, params = line.partition(' ')
+            self.features[keyword.lower()] = params
+    
+    def close(self):
+        """QUIT and inchiderea conexiunii."""
+        if self.sock is None:
+            return
+        try:
+            self.sock.sendall(b"QUIT\r\n")
+            self._read_reply()
+        except (OSError, SMTPReplyError):
+            pass
+        self.rfile.close()
+        self.sock.close()
+        self.sock = None
+        self.rfile = None
+    
+    def _read_reply(self) -> Tuple[int, List[str]]:
+        """Citeste un raspuns (eventual multi-linie) and returneaza (cod, linii)."""
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                raise ConnectionError("Conexiune inchisa de server")
+            lines.append(line[4:].decode('utf-8', errors='replace').rstrip())
+            if line[3:4] != b'-':
+                return int(line[:3]), lines
+    
+    def send_message(self, sender: str, recipients: List[str], data: bytes) -> int:
+        """
+        Trimite un mesaj pe seandunea curenta.
+        
+        Args:
+            sender: Envelope MAIL FROM
+            recipients: Envelope RCPT TO
+            data: Mesajul RFC 5322 (antete + corp), bytes
+        
+        Returns:
+            Numarul de destinatari acceptati
+        
+        Raises:
+            SMTPReplyError: MAIL FROM, toti RCPT TO sau corpul au fost respinsi
+                (tranzactia este resetata cu RSET, seandunea ramane utilizabila)
+        """
+        data = normalize_crlf(data)
+        
+        mail_cmd = f"MAIL FROM:<{sender}>"
+        if 'size' in self.features:
+            mail_cmd += f" SIZE={len(data)}"
+        commands = [mail_cmd] + [f"RCPT TO:<{r}>" for r in recipients]
+        envelope = "".join(c + "\r\n" for c in commands).encode()
+        
+        if self.chunking:
+            body = f"BDAT {len(data)} LAST\r\n".encode() + data
+        else:
+            body = None
+        
+        if self.pipelining:
+            # Un singur write For toata tranzactia (cu BDAT) sau pana la DATA
+            if body is not None:
+                self.sock.sendall(envelope + body)
+            else:
+                self.sock.sendall(envelope + b"DATA\r\n")
+            replies = [self._read_reply() for _ in range(len(commands) + 1)]
+        else:
+            replies = []
+            for command in commands:
+                self.sock.sendall(command.encode() + b"\r\n")
+                replies.append(self._read_reply())
+                if replies[0][0] != 250:
+                    break  # MAIL FROM respins: niciun RCPT TO
+            if replies[0][0] != 250 or all(r[0] != 250 for r in replies[1:]):
+                self._reset()
+                raise SMTPReplyError(*self._first_failure(replies))
+            self.sock.sendall(body if body is not None else b"DATA\r\n")
+            replies.append(self._read_reply())
+        
+        mail_reply, rcpt_replies, last = replies[0], replies[1:-1], replies[-1]
+        accepted = sum(1 for code, _ in rcpt_replies if code == 250)
+        
+        if body is None and last[0] == 354:
+            if mail_reply[0] != 250 or not accepted:
+                # Serverul a acceptat DATA desi tranzactia e invalida: abandonam corpul
+                self.sock.sendall(b".\r\n")
+                self._read_reply()
+                self._reset()
+                raise SMTPReplyError(*self._first_failure(replies))
+            self.sock.sendall(dot_stuff(data) + b".\r\n")
+            last = self._read_reply()
+        
+        if mail_reply[0] != 250 or not accepted or last[0] != 250:
+            self._reset()
+            raise SMTPReplyError(*self._first_failure(replies[:-1] + [last]))
+        return accepted
+    
+    def _reset(self):
+        self.sock.sendall(b"RSET\r\n")
+        self._read_reply()
+    
+    @staticmethod
+    def _first_failure(replies) -> Tuple[int, str]:
+        for code, lines in replies:
+            if code not in (250, 354):
+                return code, " ".join(lines)
+        return replies[-1][0], " ".join(replies[-1][1])
+
+
+def bulk_send(
+    host: str,
+    port: int,
+    messages: Iterable[Tuple[str, List[str], bytes]],
+    sessions: int = 4,
+    use_pipelining: bool = True,
+    use_chunking: bool = True,
+    timeout: float = 30.0
+) -> dict:
+    """
+    Trimite multe mesaje printr-un pool mic de seandune SMTP paralele.
+    
+    Fiecare seandune (un thread) ia mesaje dintr-o coada comuna and le trimite
+    pe aceeasi conexiune; la o eroare de conexiune se reconecteaza o data.
+    
+    Args:
+        messages: Tupluri (sender, recipients, data)
+        sessions: Numarul de conexiuni SMTP paralele
+    
+    Returns:
+        Dict cu: sent, failed, elapsed_s, msgs_per_sec, sessions,
+        pipelining, chunking (extenandile folosite efectiv)
+    """
+    work = queue.Queue()
+    for item in messages:
+        work.put(item)
+    total = work.qsize()
+    
+    lock = threading.Lock()
+    stats = {"sent": 0, "failed": 0, "pipelining": False, "chunking": False, "errors": []}
+    
+    def worker():
+        session = BulkSMTPSession(host, port, timeout, use_pipelining, use_chunking)
+        sent = failed = 0
+        try:
+            session.connect()
+        except (OSError, SMTPReplyError) as e:
+            with lock:
+                stats["errors"].append(str(e))
+            return
+        with lock:
+            stats["pipelining"] |= session.pipelining
+            stats["chunking"] |= session.chunking
+        
+        while True:
+            try:
+                sender, recipients, data = work.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                session.send_message(sender, recipients, data)
+                sent += 1
+            except SMTPReplyError as e:
+                failed += 1
+                with lock:
+                    stats["errors"].append(str(e))
+            except OSError as e:
+                # Conexiune pierduta: reincercam mesajul pe o seandune noua
+                try:
+                    session.close()
+                except OSError:
+                    pass
+                try:
+                    session.connect()
+                    session.send_message(sender, recipients, data)
+                    sent += 1
+                except (OSError, SMTPReplyError) as retry_error:
+                    failed += 1
+                    with lock:
+                        stats["errors"].append(f"{e}; reconectare: {retry_error}")
+                    if session.sock is None:
+                        break
+        session.close()
+        with lock:
+            stats["sent"] += sent
+            stats["failed"] += failed
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, sessions))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    
+    stats["failed"] += total - stats["sent"] - stats["failed"]
+    stats.update(
+        elapsed_s=elapsed,
+        msgs_per_sec=stats["sent"] / elapsed if elapsed > 0 else 0.0,
+        sessions=sessions,
+    )
+    return stats
+
+
+def generate_test_messages(count: int, sender: str = "bulk@test.local",
+                           recipient: str = "inbox@test.local"):
+    """Genereaza `count` mesaje mici de test (sender, [recipient], bytes)."""
+    for i in range(count):
+        msg = create_andmple_message(sender, [recipient], f"Bulk test #{i}",
+                                     f"Message de test {i}.\n.Linie care incepe cu punct.\n")
+        yield sender, [recipient], msg.as_bytes()
+
+
+def _serve_smtp(mode: str, port: int, spool: str, ready):
+    """Proces separat For serverul local din smtp_server.py (alt GIL decat clientul)."""
+    import logging
+    from smtp_server import AsyncSMTPServer, SMTPServer
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    server_cls = AsyncSMTPServer if mode == "async" else SMTPServer
+    server = server_cls(listen_addr="127.0.0.1", port=port, spool_dir=spool)
+    ready.set()
+    server.start()
+
+
+def run_bulk_benchmark(count: int = 10000, sessions: int = 4, port: int = 10525) -> list:
+    """
+    Masoara mesaje/secunda For `count` mesaje contra SMTPServer local
+    (modul threaded and modul --async), in mai multe configuratii.
+    
+    Referinta send_email (o seandune smtplib per mesaj) este masurata pe
+    maxim 1000 de mesaje.
+    """
+    import multiprocessing
+    import shutil
+    import tempfile
+    
+    messages = list(generate_test_messages(count))
+    baseline_count = min(count, 1000)
+    configs = [
+        ("1 seandune, lock-step", 1, False, False),
+        ("1 seandune, PIPELINING", 1, True, False),
+        ("1 seandune, PIPELINING+BDAT", 1, True, True),
+        (f"{sessions} seanduni, PIPELINING+BDAT", sessions, True, True),
+    ]
+    results = []
+    
+    print("=" * 90)
+    print(f"BENCHMARK SMTP BULK: {count} mesaje")
+    print("=" * 90)
+    print(f"{'server':<9} {'configuratie':<34} {'trimise':>8} {'esuate':>7} "
+          f"{'timp s':>8} {'msg/s':>9}  extensii")
+    print("-" * 90)
+    
+    for mode in ("threaded", "async"):
+        spool = tempfile.mkdtemp(prefix=f"s12_bulk_{mode}_")
+        ready = multiprocessing.Event()
+        proc = multiprocessing.Process(target=_serve_smtp, args=(mode, port, spool, ready),
+                                       daemon=True)
+        proc.start()
+        ready.wait(10)
+        time.sleep(0.3)
+        
+        try:
+            # Referinta: o seandune smtplib noua For fiecare mesaj
+            start = time.perf_counter()
+            sent = 0
+            for sender, recipients, data in messages[:baseline_count]:
+                with smtplib.SMTP("127.0.0.1", port, timeout=10) as smtp:
+                    smtp.sendmail(sender, recipients, data)
+                    sent += 1
+            elapsed = time.perf_counter() - start
+            row = {"server": mode, "config": "send_email (smtplib/mesaj)", "sent": sent,
+                   "failed": baseline_count - sent, "elapsed_s": elapsed,
+                   "msgs_per_sec": sent / elapsed}
+            results.append(row)
+            _print_bench_row(row)
+            
+            for label, n_sessions, pipelining, chunking in configs:
+                stats = bulk_send("127.0.0.1", port, messages, n_sessions,
+                                  use_pipelining=pipelining, use_chunking=chunking)
+                used = []
+                if stats["pipelining"]:
+                    used.append("PIPELINING")
+                if stats["chunking"]:
+                    used.append("BDAT")
+                row = {"server": mode, "config": label, "sent": stats["sent"],
+                       "failed": stats["failed"], "elapsed_s": stats["elapsed_s"],
+                       "msgs_per_sec": stats["msgs_per_sec"],
+                       "extensions_used": used}
+                results.append(row)
+                _print_bench_row(row)
+        finally:
+            proc.terminate()
+            proc.join()
+            shutil.rmtree(spool, ignore_errors=True)
+    
+    print("-" * 90)
+    print("Note: serverul threaded nu anunta PIPELINING/CHUNKING, deci clientul")
+    print("      revine la lock-step (dar refoloseste seandunea).")
+    return results
+
+
+def _print_bench_row(row: dict):
+    print(f"{row['server']:<9} {row['config']:<34} {row['sent']:>8} {row['failed']:>7} "
+          f"{row['elapsed_s']:>8.2f} {row['msgs_per_sec']:>9.0f}  "
+          f"{'+'.join(row.get('extensions_used') or []) or '-'}")
+
+
 def interactive_mode(host: str, port: int):
     """
     Mod interactiv For sendrea manuala de comenzi SMTP.
@@ -294,6 +696,12 @@ Exemple de usefulizare:
   # Mod interactiv (For invatare)
   python3 smtp_client.py --host 127.0.0.1 --port 1025 --interactive
 
+  # Trimitere in masa (seanduni refolosite, PIPELINING/BDAT daca sunt anuntate)
+  python3 smtp_client.py --port 1025 --bulk 10000 --sessions 4
+
+  # Benchmark mesaje/secunda contra serverului local (threaded and --async)
+  python3 smtp_client.py --benchmark --count 10000
+
   # Cu debugging verbose
   python3 smtp_client.py --host 127.0.0.1 --port 1025 \\
       --from a@b --to c@d --subject "Test" --body "Test" -v
@@ -320,10 +728,38 @@ Revolvix&Hypotheticalandrei
                         help='Mod interactiv (comenzi manuale)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Output verbose')
+    parser.add_argument('--bulk', type=int, metavar='N',
+                        help='Trimite N mesaje de test pe seanduni refolosite')
+    parser.add_argument('--sessions', type=int, default=4,
+                        help='Seanduni SMTP paralele For --bulk/--benchmark (default: 4)')
+    parser.add_argument('--no-pipelining', action='store_true',
+                        help='Nu folosi PIPELINING chiar daca serverul il anunta')
+    parser.add_argument('--no-chunking', action='store_true',
+                        help='Nu folosi BDAT chiar daca serverul anunta CHUNKING')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Benchmark bulk contra unui server local pornit automat')
+    parser.add_argument('--count', type=int, default=10000,
+                        help='Numar de mesaje For --benchmark (default: 10000)')
     
     args = parser.parse_args()
     
-    if args.interactive:
+    if args.benchmark:
+        run_bulk_benchmark(args.count, args.sessions)
+    elif args.bulk:
+        stats = bulk_send(
+            args.host, args.port,
+            generate_test_messages(args.bulk, args.sender, args.recipient),
+            sessions=args.sessions,
+            use_pipelining=not args.no_pipelining,
+            use_chunking=not args.no_chunking
+        )
+        print(f"[OK] {stats['sent']} trimise, {stats['failed']} esuate in "
+              f"{stats['elapsed_s']:.2f}s ({stats['msgs_per_sec']:.0f} msg/s, "
+              f"pipelining={stats['pipelining']}, bdat={stats['chunking']})")
+        for error in stats["errors"][:5]:
+            print(f"[ERR] {error}")
+        sys.exit(0 if stats["failed"] == 0 else 1)
+    elif args.interactive:
         interactive_mode(args.host, args.port)
     else:
         success = send_email(
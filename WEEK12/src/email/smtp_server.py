@@ -7,6 +7,9 @@ demonstrand conceptele fundamentale ale protocolului de transfer email.
 
 Utilizare:
     python3 smtp_server.py --port 1025 --spool ./spool
+    python3 smtp_server.py --port 1025 --spool ./spool --async
+    python3 smtp_server.py --port 1025 --spool ./spool --workers 64 --max-per-ip 32
+    python3 smtp_server.py --load-test 5000
     python3 smtp_server.py --selftest
 
 Scopul educational:
@@ -19,13 +22,16 @@ Revolvix&Hypotheticalandrei
 """
 
 import argparse
+import asyncio
 import datetime
 import logging
 import os
+import queue
 import re
 import socket
 import sys
 import threading
+import time
 import uuid
 from dataclasses import dataclass, field
 from enum import Enum, auto
@@ -33,7 +39,7 @@ from pathlib import Path
 from typing import Optional, Tuple
 
 # Configurare logging
-logging.baandcConfig(
+logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [%(levelname)s] %(message)s',
     datefmt='%H:%M:%S'
@@ -95,8 +101,13 @@ class SMTPHandler:
         'CMD_NOT_IMPL': '502',   # Command not implemented
         'BAD_SEQUENCE': '503',   # Bad sequence of commands
         'TEMP_FAIL': '451',      # Temporary failure
+        'NOT_AVAILABLE': '421',  # Service not available, closing channel
+        'SIZE_EXCEEDED': '552',  # Exceeded storage allocation
     }
     
+    # Inactivitate maxima (RFC 5321 4.5.3.2 recomanda minim 5 minute)
+    IDLE_TIMEOUT = 300
+    
     def __init__(self, client_socket: socket.socket, client_addr: Tuple[str, int],
                  spool_dir: Path, server_hostname: str = "smtp.local"):
         self.socket = client_socket
@@ -107,6 +118,7 @@ class SMTPHandler:
         self.state = SMTPState.INIT
         self.envelope = SMTPEnvelope()
         self.client_hostname = ""
+        self._rbuf = b""
         
     def handle(self):
         """Gestioneaza conexiunea SMTP."""
@@ -122,17 +134,7 @@ class SMTPHandler:
                     
                 logger.debug(f"[{self.addr[0]}] C: {line}")
                 
-                # Parandng comanda
-                parts = line.split(' ', 1)
-                command = parts[0].upper()
-                argument = parts[1] if len(parts) > 1 else ""
-                
-                # Dispatch catre handler-ul comenzii
-                handler_name = f"_cmd_{command.lower()}"
-                if hasattr(self, handler_name):
-                    response = getattr(self, handler_name)(argument)
-                else:
-                    response = f"{self.CODES['CMD_NOT_IMPL']} Command not implemented"
+                response = self._dispatch(line)
                 
                 if response:
                     self._send(response)
@@ -140,12 +142,30 @@ class SMTPHandler:
                 if self.state == SMTPState.QUIT:
                     break
                     
+        except socket.timeout:
+            # Un client inactiv nu trebuie sa tina ocupat un worker din pool
+            logger.info(f"[{self.addr[0]}:{self.addr[1]}] Timeout inactivitate")
+            try:
+                self._send(f"{self.CODES['NOT_AVAILABLE']} {self.hostname} Idle timeout, closing connection")
+            except OSError:
+                pass
         except Exception as e:
             logger.error(f"[{self.addr[0]}] Error: {e}")
         finally:
             self.socket.close()
             logger.info(f"[{self.addr[0]}:{self.addr[1]}] Conexiune inchisa")
     
+    def _dispatch(self, line: str) -> Optional[str]:
+        """Parseaza o linie de comanda and apeleaza handler-ul _cmd_<comanda>."""
+        parts = line.split(' ', 1)
+        command = parts[0].upper()
+        argument = parts[1] if len(parts) > 1 else ""
+        
+        handler_name = f"_cmd_{command.lower()}"
+        if hasattr(self, handler_name):
+            return getattr(self, handler_name)(argument)
+        return f"{self.CODES['CMD_NOT_IMPL']} Command not implemented"
+    
     def _send(self, message: str):
         """Sends un raspuns catre client."""
         full_message = message + "\r\n"
@@ -154,13 +174,15 @@ class SMTPHandler:
     
     def _recv(self) -> Optional[str]:
         """Receive o linie de la client."""
-        data = b""
-        while not data.endswith(b"\r\n"):
-            chunk = self.socket.recv(1024)
+        # Un recv poate aduce mai multe linii (ex: tot corpul DATA trimis de
+        # smtplib intr-un singur sendall); restul ramane in buffer
+        while b"\r\n" not in self._rbuf:
+            chunk = self.socket.recv(4096)
             if not chunk:
                 return None
-            data += chunk
-        return data.decode('utf-8').strip()
+            self._rbuf += chunk
+        line, _, self._rbuf = self._rbuf.partition(b"\r\n")
+        return line.decode('utf-8').strip()
     
     def _recv_data(self) -> str:
         """Receive corpul mesajului pana la <CRLF>.<CRLF>."""
@@ -370,77 +392,755 @@ class SMTPHandler:
         3. Linie goala
         4. Corpul mesajului
         """
-        # Generare ID unic For Message
+        filepath = self.spool_dir / self._spool_filename()
+        
+        # Salvare
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(self._spool_header())
+            f.write(self.envelope.data)
+        
+        logger.info(f"[{self.addr[0]}] Salvat: {filepath}")
+    
+    def _spool_filename(self) -> str:
+        """Numele fisierului .eml: <timestamp>_<id>.eml."""
         msg_id = str(uuid.uuid4())[:8]
         timestamp = self.envelope.received_timestamp.strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{msg_id}.eml"
-        filepath = self.spool_dir / filename
-        
-        # Construire antet Received
+        return f"{timestamp}_{msg_id}.eml"
+    
+    def _spool_header(self) -> str:
+        """Antetul Received + informatiile de envelope scrise inaintea mesajului."""
         received_header = (
             f"Received: from {self.client_hostname} ([{self.addr[0]}])\r\n"
             f"        by {self.hostname} (S12 SMTP Server)\r\n"
             f"        for <{', '.join(self.envelope.rcpt_to)}>;\r\n"
             f"        {self.envelope.received_timestamp.strftime('%a, %d %b %Y %H:%M:%S %z')}\r\n"
         )
-        
-        # Salvare
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(received_header)
-            f.write(f"X-Envelope-From: {self.envelope.mail_from}\r\n")
-            f.write(f"X-Envelope-To: {', '.join(self.envelope.rcpt_to)}\r\n")
-            f.write("\r\n")  # Separator intre envelope info and Message original
-            f.write(self.envelope.data)
-        
-        logger.info(f"[{self.addr[0]}] Salvat: {filepath}")
+        return (
+            received_header
+            + f"X-Envelope-From: {self.envelope.mail_from}\r\n"
+            + f"X-Envelope-To: {', '.join(self.envelope.rcpt_to)}\r\n"
+            + "\r\n"  # Separator intre envelope info and Message original
+        )
 
 
 class SMTPServer:
     """
-    SMTP Server multi-threaded.
+    SMTP Server multi-threaded cu pool limitat de workeri.
     
-    Fiecare conexiune client este gestionata intr-un thread separat.
+    Thread-ul principal doar accepta conexiuni si le pune intr-o coada
+    limitata; un numar fix de workeri le preia si ruleaza SMTPHandler.
+    Cand coada e plina sau un IP are prea multe conexiuni deschise,
+    clientul primeste imediat 421 in loc sa astepte sau sa fie refuzat
+    de kernel, iar numarul de thread-uri ramane constant.
+    
+    Cu workers=0 se revine la un thread nou per conexiune (fara limite).
     """
     
     def __init__(self, listen_addr: str = "0.0.0.0", port: int = 1025,
-                 spool_dir: str = "./spool", hostname: str = "smtp.local"):
+                 spool_dir: str = "./spool", hostname: str = "smtp.local",
+                 workers: int = 64, backlog: int = 1024, queue_size: int = 256,
+                 max_per_ip: int = 32, idle_timeout: float = SMTPHandler.IDLE_TIMEOUT):
         self.listen_addr = listen_addr
         self.port = port
         self.spool_dir = Path(spool_dir)
         self.hostname = hostname
+        self.workers = workers
+        self.backlog = backlog
+        self.max_per_ip = max_per_ip
+        self.idle_timeout = idle_timeout
         
         self.spool_dir.mkdir(parents=True, exist_ok=True)
         
         self.server_socket = None
         self.running = False
+        
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._per_ip = {}                  # IP -> conexiuni in coada + active
+        self._per_ip_lock = threading.Lock()
+        self.stats = {"accepted": 0, "rejected_busy": 0, "rejected_ip": 0}
     
     def start(self):
         """Porneste serverul SMTP."""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.listen_addr, self.port))
-        self.server_socket.listen(5)
+        # Backlog-ul real e plafonat de net.core.somaxconn
+        self.server_socket.listen(self.backlog)
+        
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"smtp-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
         
         self.running = True
         logger.info(f"SMTP Server pornit pe {self.listen_addr}:{self.port}")
         logger.info(f"Spool directory: {self.spool_dir.absolute()}")
+        if self.workers:
+            logger.info(f"Workeri: {self.workers}, coada: {self._queue.maxsize}, "
+                        f"max/IP: {self.max_per_ip}, backlog: {self.backlog}")
         
         try:
             while self.running:
                 client_socket, client_addr = self.server_socket.accept()
-                handler = SMTPHandler(client_socket, client_addr, self.spool_dir, self.hostname)
-                thread = threading.Thread(target=handler.handle, daemon=True)
-                thread.start()
+                self._dispatch_client(client_socket, client_addr)
         except KeyboardInterrupt:
             logger.info("Oprire server...")
+        except OSError:
+            if self.running:
+                raise
         finally:
             self.stop()
     
+    def _dispatch_client(self, client_socket: socket.socket, client_addr: Tuple[str, int]):
+        """Trimite conexiunea la un worker sau o refuza devreme cu 421."""
+        client_socket.settimeout(self.idle_timeout)
+        
+        if not self.workers:
+            handler = SMTPHandler(client_socket, client_addr, self.spool_dir, self.hostname)
+            threading.Thread(target=handler.handle, daemon=True).start()
+            self.stats["accepted"] += 1
+            return
+        
+        ip = client_addr[0]
+        with self._per_ip_lock:
+            if self.max_per_ip and self._per_ip.get(ip, 0) >= self.max_per_ip:
+                self.stats["rejected_ip"] += 1
+                reason = "Too many connections from your address"
+            else:
+                try:
+                    self._queue.put_nowait((client_socket, client_addr))
+                except queue.Full:
+                    self.stats["rejected_busy"] += 1
+                    reason = "Server busy, try again later"
+                else:
+                    self._per_ip[ip] = self._per_ip.get(ip, 0) + 1
+                    self.stats["accepted"] += 1
+                    return
+        
+        self._reject(client_socket, reason)
+    
+    def _reject(self, client_socket: socket.socket, reason: str):
+        """Raspunde 421 fara a citi nimic si inchide (RFC 5321 3.8)."""
+        try:
+            client_socket.setblocking(False)
+            client_socket.send(f"{SMTPHandler.CODES['NOT_AVAILABLE']} {self.hostname} "
+                               f"{reason}\r\n".encode('utf-8'))
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+    
+    def _worker(self):
+        """Preia conexiuni din coada si le deserveste pe rand."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            client_socket, client_addr = item
+            try:
+                handler = SMTPHandler(client_socket, client_addr, self.spool_dir, self.hostname)
+                handler.handle()
+            finally:
+                ip = client_addr[0]
+                with self._per_ip_lock:
+                    remaining = self._per_ip.get(ip, 1) - 1
+                    if remaining:
+                        self._per_ip[ip] = remaining
+                    else:
+                        self._per_ip.pop(ip, None)
+    
     def stop(self):
         """Opreste serverul."""
+        was_running = self.running
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        if was_running:
+            # Conexiunile inca in coada sunt refuzate, workerii se opresc
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    self._reject(item[0], "Server shutting down")
+            for _ in self._threads:
+                self._queue.put(None)
+
+
+# =============================================================================
+# Module asyncio: o singura bucla de evenimente, DATA scris direct in spool
+# =============================================================================
+
+class AsyncSMTPSession(SMTPHandler):
+    """
+    Seandune SMTP For AsyncSMTPServer.
+    
+    Refoloseste masina de stari din SMTPHandler (HELO, RCPT, RSET, QUIT...)
+    and schimba doar I/O-ul:
+    - comenzile sunt citite dintr-un buffer propriu; toate liniile complete
+      primite intr-un read sunt procesate, iar raspunsurile pleaca intr-un
+      singur write (PIPELINING, RFC 2920)
+    - corpul DATA este scris incremental intr-un fisier temporar din spool
+      (dot-unstuffing linie cu linie) and redenumit atomic in .eml, deci
+      memoria ramane constanta indiferent de dimensiunea mesajului
+    - SIZE (RFC 1870): limita este anuntata in EHLO, verificata la MAIL FROM
+      and din nou in timpul DATA
+    - CHUNKING (RFC 3030): BDAT <n> [LAST] transfera corpul in bucati de
+      lungime cunoscuta, fara dot-stuffing and fara a astepta 354
+    """
+    
+    READ_SIZE = 65536
+    MAX_COMMAND_LINE = 4096     # RFC 5321 cere minim 512
+    IDLE_TIMEOUT = 300.0        # RFC 5321 §4.5.3.2: 5 minute
+    
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 spool_dir: Path, server_hostname: str = "smtp.local",
+                 max_message_size: int = 10485760):
+        peer = writer.get_extra_info('peername') or ("?", 0)
+        super().__init__(None, peer[:2], spool_dir, server_hostname)
+        self.reader = reader
+        self.writer = writer
+        self.max_message_size = max_message_size
+        self.declared_size = 0
+        self._buffer = bytearray()
+        self._out = []
+        self._bdat_pending = None   # (octeti, LAST, raspuns de eroare sau None)
+        self._bdat_file = None
+        self._bdat_tmp = None
+        self._bdat_size = 0
+        self._loop = None
+        self._last_activity = 0.0
+        self._idle_handle = None
+    
+    async def handle(self):
+        """Bucla principala a seandunii."""
+        logger.info(f"[{self.addr[0]}:{self.addr[1]}] Conexiune noua (async)")
+        self._loop = asyncio.get_running_loop()
+        self._last_activity = self._loop.time()
+        self._idle_handle = self._loop.call_later(self.IDLE_TIMEOUT, self._check_idle)
+        self._send(f"{self.CODES['READY']} {self.hostname} SMTP Ready")
+        try:
+            while self.state != SMTPState.QUIT:
+                line = self._next_line()
+                if line is None:
+                    # Nu mai avem comenzi complete: trimitem raspunsurile adunate
+                    await self._flush()
+                    if len(self._buffer) > self.MAX_COMMAND_LINE:
+                        self._buffer.clear()
+                        self._send(f"{self.CODES['SYNTAX_ERROR']} Line too long")
+                        continue
+                    if not await self._fill():
+                        break
+                    continue
+                
+                logger.debug(f"[{self.addr[0]}] C: {line}")
+                response = self._dispatch(line)
+                if response:
+                    self._send(response)
+                
+                if self.state == SMTPState.DATA:
+                    await self._flush()
+                    response = await self._receive_data()
+                    if response is None:
+                        break
+                    self._send(response)
+                elif self._bdat_pending is not None:
+                    response = await self._receive_bdat()
+                    if response is None:
+                        break
+                    self._send(response)
+            await self._flush()
+        except (ConnectionError, OSError) as e:
+            logger.error(f"[{self.addr[0]}] Error: {e}")
+        finally:
+            self._idle_handle.cancel()
+            self._discard_bdat()
+            self.writer.close()
+            logger.info(f"[{self.addr[0]}:{self.addr[1]}] Conexiune inchisa")
+    
+    # -------------------------------------------------------------------------
+    # I/O
+    # -------------------------------------------------------------------------
+    
+    def _send(self, message: str):
+        """Adauga un raspuns in coada; plecarea efectiva se face in _flush()."""
+        self._out.append(message.encode('utf-8') + b"\r\n")
+        logger.debug(f"[{self.addr[0]}] S: {message}")
+    
+    async def _flush(self):
+        if self._out:
+            self.writer.write(b"".join(self._out))
+            self._out.clear()
+            await self.writer.drain()
+    
+    async def _fill(self) -> bool:
+        """Citeste urmatorul bloc de date in buffer. False la EOF."""
+        chunk = await self.reader.read(self.READ_SIZE)
+        if not chunk:
+            return False
+        self._buffer += chunk
+        self._last_activity = self._loop.time()
+        return True
+    
+    def _check_idle(self):
+        """
+        Timer de inactivitate (un singur call_later per seandune, rearmat la
+        nevoie; mai ieftin decat asyncio.wait_for la fiecare read).
+        """
+        idle = self._loop.time() - self._last_activity
+        if idle < self.IDLE_TIMEOUT:
+            self._idle_handle = self._loop.call_later(self.IDLE_TIMEOUT - idle, self._check_idle)
+            return
+        logger.info(f"[{self.addr[0]}] Timeout de inactivitate")
+        self.writer.write(f"{self.CODES['NOT_AVAILABLE']} {self.hostname} idle timeout\r\n".encode())
+        self.writer.close()
+    
+    def _next_line(self) -> Optional[str]:
+        """Extrage o linie de comanda completa din buffer (None daca lipseste CRLF)."""
+        end = self._buffer.find(b"\n")
+        if end < 0:
+            return None
+        line = bytes(self._buffer[:end + 1])
+        del self._buffer[:end + 1]
+        return line.decode('utf-8', errors='replace').strip()
+    
+    # -------------------------------------------------------------------------
+    # Comenzi suprascrise
+    # -------------------------------------------------------------------------
+    
+    def _cmd_ehlo(self, argument: str) -> str:
+        """EHLO cu extenandile implementate de modul asyncio."""
+        response = super()._cmd_ehlo(argument)
+        if not response.startswith(self.CODES['OK']):
+            return response
+        return "\r\n".join([
+            f"{self.CODES['OK']}-{self.hostname} Hello {argument}",
+            f"{self.CODES['OK']}-SIZE {self.max_message_size}",
+            f"{self.CODES['OK']}-8BITMIME",
+            f"{self.CODES['OK']}-PIPELINING",
+            f"{self.CODES['OK']}-CHUNKING",
+            f"{self.CODES['OK']} HELP",
+        ])
+    
+    def _cmd_mail(self, argument: str) -> str:
+        """MAIL FROM:<address> [SIZE=<octeti>] - respinge din start mesajele prea mari."""
+        match = re.search(r'\sSIZE=(\d+)', argument, re.IGNORECASE)
+        declared = int(match.group(1)) if match else 0
+        if declared > self.max_message_size:
+            return (f"{self.CODES['SIZE_EXCEEDED']} Message size exceeds fixed maximum "
+                    f"message size ({self.max_message_size})")
+        self._discard_bdat()
+        response = super()._cmd_mail(argument)
+        if self.state == SMTPState.MAIL_FROM:
+            self.declared_size = declared
+        return response
+    
+    def _cmd_data(self, argument: str) -> str:
+        """DATA - corpul este citit de handle() prin _receive_data()."""
+        if self.state != SMTPState.RCPT_TO:
+            return f"{self.CODES['BAD_SEQUENCE']} Use RCPT TO first"
+        if self._bdat_file is not None:
+            return f"{self.CODES['BAD_SEQUENCE']} DATA not allowed after BDAT"
+        self.state = SMTPState.DATA
+        return f"{self.CODES['DATA_START']} Start mail input; end with <CRLF>.<CRLF>"
+    
+    def _cmd_rset(self, argument: str) -> str:
+        """RSET - renunta and la un transfer BDAT inceput."""
+        self._discard_bdat()
+        return super()._cmd_rset(argument)
+    
+    def _cmd_bdat(self, argument: str) -> Optional[str]:
+        """
+        BDAT - transfer de corp in bucati (CHUNKING, RFC 3030).
+        
+        Format: BDAT <octeti> [LAST]
+        Raspuns: 250 dupa fiecare bucata; la LAST mesajul este salvat.
+        
+        Bucata este consumata de handle() prin _receive_bdat() chiar and
+        cand comanda este respinsa, altfel octetii ei ar fi interpretati
+        drept comenzi.
+        """
+        match = re.fullmatch(r'\s*(\d+)(\s+LAST)?\s*', argument, re.IGNORECASE)
+        if not match:
+            return f"{self.CODES['PARAM_ERROR']} Syntax: BDAT <size> [LAST]"
+        
+        error = None
+        if self.state != SMTPState.RCPT_TO:
+            error = f"{self.CODES['BAD_SEQUENCE']} Use RCPT TO first"
+        self._bdat_pending = (int(match.group(1)), bool(match.group(2)), error)
+        return None
+    
+    def _discard_bdat(self):
+        """Inchide and sterge fisierul temporar al unui transfer BDAT neterminat."""
+        if self._bdat_file is not None:
+            self._bdat_file.close()
+            try:
+                os.unlink(self._bdat_tmp)
+            except FileNotFoundError:
+                pass
+        self._bdat_file = None
+        self._bdat_tmp = None
+        self._bdat_size = 0
+    
+    async def _receive_bdat(self) -> Optional[str]:
+        """Copiaza exact <octeti> din flux in spool (fara dot-unstuffing)."""
+        remaining, last, error = self._bdat_pending
+        self._bdat_pending = None
+        
+        if error is None and self._bdat_size + remaining > self.max_message_size:
+            # Tranzactia esueaza complet: un BDAT LAST ulterior nu trebuie
+            # sa livreze un mesaj trunchiat
+            self._discard_bdat()
+            self.envelope.reset()
+            self.state = SMTPState.GREETED
+            error = (f"{self.CODES['SIZE_EXCEEDED']} Message size exceeds fixed maximum "
+                     f"message size ({self.max_message_size})")
+        if error is None and self._bdat_file is None:
+            self._bdat_tmp, self._bdat_file = await self._open_spool_file()
+        
+        chunk_size = remaining
+        buf = self._buffer
+        while remaining:
+            if not buf and not await self._fill():
+                return None
+            take = min(remaining, len(buf))
+            if error is None:
+                with memoryview(buf) as view:
+                    self._bdat_file.write(view[:take])
+            del buf[:take]
+            remaining -= take
+        
+        if error is not None:
+            return error
+        
+        self._bdat_size += chunk_size
+        if not last:
+            return f"{self.CODES['OK']} {chunk_size} octets received"
+        
+        filepath = await self._close_spool_file(self._bdat_file, self._bdat_tmp, keep=True)
+        logger.info(f"[{self.addr[0]}] Salvat: {filepath} ({self._bdat_size} octeti, BDAT)")
+        self._bdat_file = None
+        self._bdat_tmp = None
+        self._bdat_size = 0
+        self.envelope.reset()
+        self.state = SMTPState.GREETED
+        return f"{self.CODES['OK']} Message accepted for delivery"
+    
+    # -------------------------------------------------------------------------
+    # Fisiere spool
+    # -------------------------------------------------------------------------
+    
+    async def _open_spool_file(self):
+        """
+        Creeaza fisierul temporar .<nume>.eml.tmp and scrie antetul de envelope.
+        
+        Crearea/redenumirea fisierelor poate bloca (metadate pe disc), asa ca
+        ruleaza in executor; scrierile de date raman in bucla (page cache).
+        """
+        self.envelope.received_timestamp = datetime.datetime.now()
+        tmp_path = self.spool_dir / f".{self._spool_filename()}.tmp"
+        header = self._spool_header().encode('utf-8')
+        
+        def _open():
+            f = open(tmp_path, 'wb')
+            f.write(header)
+            return f
+        
+        return tmp_path, await self._loop.run_in_executor(None, _open)
+    
+    async def _close_spool_file(self, f, tmp_path: Path, keep: bool) -> Optional[Path]:
+        """Inchide fisierul temporar and il redenumeste atomic in .eml (sau il sterge)."""
+        filepath = tmp_path.with_name(tmp_path.name[1:-len(".tmp")])
+        
+        def _close():
+            f.close()
+            if keep:
+                os.replace(tmp_path, filepath)  # Atomic: cititorii nu vad fisiere partiale
+            else:
+                os.unlink(tmp_path)
+        
+        await self._loop.run_in_executor(None, _close)
+        return filepath if keep else None
+    
+    # -------------------------------------------------------------------------
+    # DATA in flux
+    # -------------------------------------------------------------------------
+    
+    async def _receive_data(self) -> Optional[str]:
+        """
+        Scrie corpul mesajului direct in spool pana la <CRLF>.<CRLF>.
+        
+        Returns:
+            Raspunsul SMTP final sau None daca clientul a inchis conexiunea.
+        """
+        buf = self._buffer
+        size = 0
+        oversize = False
+        at_line_start = True
+        complete = False
+        
+        tmp_path, f = await self._open_spool_file()
+        try:
+            def emit(data):
+                nonlocal size, oversize
+                size += len(data)
+                if size > self.max_message_size:
+                    oversize = True
+                elif not oversize:
+                    f.write(data)
+            
+            while not complete:
+                # Procesam doar liniile complete; doar liniile care incep cu
+                # "." cer atentie (terminator sau dot-stuffing), restul se
+                # copiaza in blocuri mari
+                limit = buf.rfind(b"\n") + 1
+                pos = 0
+                with memoryview(buf) as view:
+                    while pos < limit:
+                        if at_line_start and buf[pos] == 0x2E:  # "."
+                            eol = buf.find(b"\n", pos) + 1
+                            if view[pos:eol] in (b".\r\n", b".\n"):
+                                pos = eol
+                                complete = True
+                                break
+                            pos += 1  # Dot-unstuffing
+                        nxt = buf.find(b"\n.", pos, limit)
+                        stop = limit if nxt < 0 else nxt + 1
+                        emit(view[pos:stop])
+                        pos = stop
+                        at_line_start = True
+                    
+                    if not complete and len(buf) - pos > self.READ_SIZE:
+                        # Linie foarte lunga fara CRLF: o scriem partial, pastrand
+                        # ultimul octet (poate fi '\r' dintr-un CRLF inca neprimit)
+                        if at_line_start and buf[pos] == 0x2E:
+                            pos += 1
+                        emit(view[pos:len(buf) - 1])
+                        pos = len(buf) - 1
+                        at_line_start = False
+                
+                del buf[:pos]
+                if not complete:
+                    try:
+                        more = await self._fill()
+                    except Exception:
+                        more = False
+                    if not more:
+                        break
+        except BaseException:
+            await self._close_spool_file(f, tmp_path, keep=False)
+            raise
+        
+        if not complete or oversize:
+            await self._close_spool_file(f, tmp_path, keep=False)
+            self.envelope.reset()
+            self.state = SMTPState.GREETED
+            if not complete:
+                logger.info(f"[{self.addr[0]}] Conexiune pierduta in DATA, mesaj abandonat")
+                return None
+            return (f"{self.CODES['SIZE_EXCEEDED']} Message size exceeds fixed maximum "
+                    f"message size ({self.max_message_size})")
+        
+        filepath = await self._close_spool_file(f, tmp_path, keep=True)
+        logger.info(f"[{self.addr[0]}] Salvat: {filepath} ({size} octeti)")
+        self.envelope.reset()
+        self.state = SMTPState.GREETED
+        return f"{self.CODES['OK']} Message accepted for delivery"
+
+
+class AsyncSMTPServer:
+    """
+    SMTP Server bazat pe asyncio (o bucla de evenimente, fara thread per conexiune).
+    
+    Aceeasi interfata ca SMTPServer: start() blocheaza, stop() poate fi
+    apelat din alt thread.
+    """
+    
+    def __init__(self, listen_addr: str = "0.0.0.0", port: int = 1025,
+                 spool_dir: str = "./spool", hostname: str = "smtp.local",
+                 max_message_size: int = 10485760):
+        self.listen_addr = listen_addr
+        self.port = port
+        self.spool_dir = Path(spool_dir)
+        self.hostname = hostname
+        self.max_message_size = max_message_size
+        
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.running = False
+        self._loop = None
+        self._stop_event = None
+    
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = AsyncSMTPSession(reader, writer, self.spool_dir, self.hostname,
+                                   self.max_message_size)
+        await session.handle()
+    
+    async def serve(self):
+        """Corutina serverului: ruleaza pana la stop()."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        server = await asyncio.start_server(self._on_client, self.listen_addr, self.port,
+                                            reuse_address=True)
+        self.running = True
+        logger.info(f"SMTP Server (asyncio) pornit pe {self.listen_addr}:{self.port}")
+        logger.info(f"Spool directory: {self.spool_dir.absolute()}")
+        async with server:
+            await self._stop_event.wait()
+        self.running = False
+    
+    def start(self):
+        """Porneste serverul SMTP (blocant)."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logger.info("Oprire server...")
+        finally:
+            self.running = False
+    
+    def stop(self):
+        """Opreste serverul (thread-safe)."""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+
+# =============================================================================
+# Test de incarcare: mii de seandune SMTP simultane
+# =============================================================================
+
+def _serve_for_load_test(config: dict, spool: str, port: int, ready, done, results):
+    """Proces separat For serverul testat (nu imparte GIL-ul cu clientii)."""
+    logging.getLogger().setLevel(logging.WARNING)
+    server = SMTPServer(listen_addr="0.0.0.0", port=port, spool_dir=spool, **config)
+    threading.Thread(target=server.start, daemon=True).start()
+    while not server.running:
+        time.sleep(0.01)
+    ready.set()
+    done.wait()
+    results.put({**server.stats, "threads": threading.active_count()})
+    server.stop()
+
+
+async def _load_session(ip: str, port: int, hold: float, timeout: float) -> Tuple[str, float]:
+    """O seandune SMTP completa; returneaza (rezultat, durata)."""
+    start = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(ip, port, local_addr=(ip, 0)), timeout)
+        
+        async def reply() -> bytes:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if not line:
+                    raise ConnectionError("conexiune inchisa")
+                if line[3:4] != b"-":
+                    return line
+        
+        banner = await reply()
+        if banner.startswith(b"421"):
+            kind = "421 per IP" if b"address" in banner else "421 ocupat"
+            return kind, time.perf_counter() - start
+        if hold:
+            await asyncio.sleep(hold)
+        for command in (b"EHLO load.test\r\n", b"MAIL FROM:<load@test.local>\r\n",
+                        b"RCPT TO:<sink@test.local>\r\n", b"DATA\r\n",
+                        b"Subject: load\r\n\r\nbody\r\n.\r\n", b"QUIT\r\n"):
+            writer.write(command)
+            code = (await reply())[:1]
+            if code not in (b"2", b"3"):
+                return "respins", time.perf_counter() - start
+        return "livrat", time.perf_counter() - start
+    except (asyncio.TimeoutError, socket.timeout):
+        return "timeout", time.perf_counter() - start
+    except OSError as e:
+        # ConnectionRefused/Reset: backlog-ul kernel-ului plin
+        return type(e).__name__, time.perf_counter() - start
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _run_load(sessions: int, port: int, source_ips: int, hold: float,
+                    timeout: float) -> list:
+    ips = [f"127.0.0.{2 + i % min(source_ips, 250)}" for i in range(sessions)]
+    return await asyncio.gather(*(_load_session(ip, port, hold, timeout) for ip in ips))
+
+
+def run_load_test(sessions: int = 5000, port: int = 10527, source_ips: int = 64,
+                  hold: float = 0.0, timeout: float = 15.0, configs: list = None) -> list:
+    """
+    Deschide `sessions` seandune SMTP simultan contra SMTPServer.
+    
+    Clientii pleaca de pe mai multe adrese 127.0.0.x ca limita per IP
+    sa nu fie singurul efect vizibil. Se compara pool-ul limitat cu
+    modul vechi (thread per conexiune, listen(5)).
+    """
+    import multiprocessing
+    import shutil
+    import tempfile
+    
+    if configs is None:
+        configs = [
+            ("pool 64 workeri, coada 256", {}),
+            ("thread/conexiune, listen(5)", {"workers": 0, "backlog": 5}),
+        ]
+    
+    print("=" * 96)
+    print(f"TEST DE INCARCARE SMTP: {sessions} seandune simultane de pe {source_ips} adrese"
+          + (f", {hold}s pauza/seandune" if hold else ""))
+    print("=" * 96)
+    
+    rows = []
+    for label, config in configs:
+        spool = tempfile.mkdtemp(prefix="s12_load_")
+        ready, done = multiprocessing.Event(), multiprocessing.Event()
+        results = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_serve_for_load_test,
+                                       args=(config, spool, port, ready, done, results),
+                                       daemon=True)
+        proc.start()
+        try:
+            ready.wait(10)
+            start = time.perf_counter()
+            outcomes = asyncio.run(_run_load(sessions, port, source_ips, hold, timeout))
+            elapsed = time.perf_counter() - start
+            done.set()
+            server_stats = results.get(timeout=10)
+        finally:
+            done.set()
+            proc.join(5)
+            if proc.is_alive():
+                proc.terminate()
+            shutil.rmtree(spool, ignore_errors=True)
+        
+        counts = {}
+        durations = {}
+        for kind, duration in outcomes:
+            counts[kind] = counts.get(kind, 0) + 1
+            durations.setdefault(kind, []).append(duration)
+        
+        def pct(kind, q):
+            values = sorted(durations.get(kind, []))
+            return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+        
+        row = {"config": label, "elapsed_s": elapsed, "outcomes": counts,
+               "delivered_p50_ms": pct("livrat", 0.50), "delivered_p99_ms": pct("livrat", 0.99),
+               "rejected_p99_ms": max(pct("421 ocupat", 0.99), pct("421 per IP", 0.99)),
+               "server": server_stats}
+        rows.append(row)
+        
+        print(f"\n{label}  ({elapsed:.1f}s, thread-uri server la final: {server_stats['threads']})")
+        for kind in sorted(counts):
+            print(f"  {kind:<24} {counts[kind]:>6}   p50 {pct(kind, 0.5):>8.1f} ms"
+                  f"   p99 {pct(kind, 0.99):>8.1f} ms")
+    
+    print("\n" + "-" * 96)
+    print("421 vine imediat dupa accept(); fara pool, clientii raman blocati in backlog")
+    print("(SYN retransmis la 1s, 3s, 7s...) sau pierd conexiunea prin timeout/reset.")
+    return rows
 
 
 def run_selftest():
@@ -517,6 +1217,147 @@ def run_selftest():
     # Oprire server
     server.stop()
     
+    # Test 4: Module asyncio cu PIPELINING, dot-unstuffing and SIZE
+    print("\n[Test 4] Server asyncio: PIPELINING + DATA in flux + BDAT...")
+    spool = Path("/tmp/smtp_test_spool_async")
+    if spool.exists():
+        for old in spool.iterdir():
+            old.unlink()
+    async_server = AsyncSMTPServer(port=10026, spool_dir=str(spool), max_message_size=4096)
+    threading.Thread(target=async_server.start, daemon=True).start()
+    time.sleep(0.5)
+    
+    try:
+        client = socket.create_connection(("127.0.0.1", 10026), timeout=2)
+        rfile = client.makefile('rb')
+        rfile.readline()  # banner
+        
+        client.sendall(b"EHLO Test.local\r\n")
+        ehlo = []
+        while True:
+            line = rfile.readline().decode()
+            ehlo.append(line)
+            if line[3:4] == " ":
+                break
+        if not any("PIPELINING" in l for l in ehlo) or not any("SIZE 4096" in l for l in ehlo):
+            print(f"  ✗ Extenandi lipsa in EHLO: {ehlo}")
+            return False
+        print("  ✓ EHLO anunta PIPELINING and SIZE")
+        
+        # Toate comenzile tranzactiei intr-un singur send
+        client.sendall(b"MAIL FROM:<a@test.local> SIZE=100\r\n"
+                       b"RCPT TO:<b@test.local>\r\n"
+                       b"RCPT TO:<c@test.local>\r\n"
+                       b"DATA\r\n")
+        codes = [rfile.readline()[:3] for _ in range(4)]
+        if codes != [b"250", b"250", b"250", b"354"]:
+            print(f"  ✗ Raspunsuri pipelined incorecte: {codes}")
+            return False
+        client.sendall(b"Subject: async\r\n\r\n..leading dot\r\nbody\r\n.\r\n")
+        if not rfile.readline().startswith(b"250"):
+            print("  ✗ DATA respins")
+            return False
+        files = list(spool.glob("*.eml"))
+        content = files[0].read_bytes() if len(files) == 1 else b""
+        if b"\r\n.leading dot\r\nbody\r\n" not in content or b"<b@test.local, c@test.local>" not in content:
+            print(f"  ✗ Mesaj salvat incorect: {content!r}")
+            return False
+        if list(spool.glob(".*.tmp")):
+            print("  ✗ Fisier temporar ramas in spool")
+            return False
+        print(f"  ✓ Mesaj salvat atomic cu dot-unstuffing: {files[0].name}")
+        
+        client.sendall(b"MAIL FROM:<a@test.local> SIZE=999999\r\n")
+        if not rfile.readline().startswith(b"552"):
+            print("  ✗ SIZE declarat prea mare nu a fost respins")
+            return False
+        client.sendall(b"MAIL FROM:<a@test.local>\r\nRCPT TO:<b@test.local>\r\nDATA\r\n"
+                       + b"x" * 100 + b"\r\n" + (b"y" * 998 + b"\r\n") * 10 + b".\r\n")
+        codes = [rfile.readline()[:3] for _ in range(4)]
+        if codes != [b"250", b"250", b"354", b"552"] or len(list(spool.glob("*.eml"))) != 1:
+            print(f"  ✗ Mesajul prea mare nu a fost respins: {codes}")
+            return False
+        print("  ✓ SIZE: 552 la MAIL FROM and in timpul DATA")
+        
+        client.sendall(b"MAIL FROM:<a@test.local>\r\nRCPT TO:<b@test.local>\r\n"
+                       b"BDAT 12\r\nSubject: x\r\n"
+                       b"BDAT 9 LAST\r\n\r\n.body\r\n")
+        codes = [rfile.readline()[:3] for _ in range(4)]
+        files = sorted(spool.glob("*.eml"), key=lambda p: p.stat().st_mtime)
+        if codes != [b"250"] * 4 or len(files) != 2 or not files[-1].read_bytes().endswith(
+                b"\r\n\r\nSubject: x\r\n\r\n.body\r\n"):
+            print(f"  ✗ BDAT esuat: {codes}")
+            return False
+        client.sendall(b"BDAT 5 LAST\r\nhelloNOOP\r\n")
+        codes = [rfile.readline()[:3] for _ in range(2)]
+        if codes != [b"503", b"250"]:
+            print(f"  ✗ BDAT fara tranzactie trebuia respins and consumat: {codes}")
+            return False
+        print("  ✓ CHUNKING: BDAT in doua bucati, BDAT respins isi consuma datele")
+        
+        client.sendall(b"MAIL FROM:<a@test.local>\r\nRCPT TO:<b@test.local>\r\n"
+                       b"BDAT 12\r\nSubject: y\r\n"
+                       b"BDAT 5000\r\n" + b"z" * 5000
+                       + b"BDAT 6 LAST\r\n\r\ntail")
+        codes = [rfile.readline()[:3] for _ in range(5)]
+        if codes != [b"250", b"250", b"250", b"552", b"503"] or len(list(spool.glob("*.eml"))) != 2:
+            print(f"  ✗ Dupa 552 la BDAT tranzactia trebuia anulata: {codes}")
+            return False
+        print("  ✓ BDAT peste SIZE: 552 anuleaza tranzactia, nimic livrat")
+        
+        client.sendall(b"QUIT\r\n")
+        if not rfile.readline().startswith(b"221"):
+            print("  ✗ QUIT respins")
+            return False
+        client.close()
+    except Exception as e:
+        print(f"  ✗ Error server asyncio: {e}")
+        return False
+    finally:
+        async_server.stop()
+    
+    # Test 5: Pool limitat de workeri, 421 la coada plina and per IP
+    print("\n[Test 5] Pool limitat: 421 la saturare...")
+    pool_server = SMTPServer(listen_addr="0.0.0.0", port=10027, spool_dir="/tmp/smtp_test_spool",
+                             workers=1, queue_size=1, max_per_ip=2)
+    threading.Thread(target=pool_server.start, daemon=True).start()
+    time.sleep(0.3)
+    
+    def connect(source_ip):
+        sock = socket.create_connection(("127.0.0.1", 10027), timeout=2,
+                                        source_address=(source_ip, 0))
+        sock.settimeout(0.5)
+        try:
+            return sock, sock.recv(1024)[:3]
+        except socket.timeout:
+            return sock, b""
+    
+    try:
+        first, code1 = connect("127.0.0.1")   # preluat de singurul worker
+        second, code2 = connect("127.0.0.1")  # in coada, inca fara banner
+        third, code3 = connect("127.0.0.1")   # peste max_per_ip
+        fourth, code4 = connect("127.0.0.2")  # alt IP, coada plina
+        if (code1, code2, code3, code4) != (b"220", b"", b"421", b"421"):
+            print(f"  ✗ Coduri neasteptate: {(code1, code2, code3, code4)}")
+            return False
+        print("  ✓ 220, in coada, 421 per IP, 421 coada plina")
+        
+        first.sendall(b"QUIT\r\n")
+        first.recv(1024)
+        first.close()
+        second.settimeout(2)
+        if not second.recv(1024).startswith(b"220"):
+            print("  ✗ Conexiunea din coada nu a fost preluata")
+            return False
+        print("  ✓ Conexiunea din coada preluata cand worker-ul s-a eliberat")
+        for sock in (second, third, fourth):
+            sock.close()
+    except Exception as e:
+        print(f"  ✗ Error pool: {e}")
+        return False
+    finally:
+        pool_server.stop()
+    
     print("\n" + "=" * 60)
     print("SELFTEST: TOATE TESTELE AU TRECUT ✓")
     print("=" * 60)
@@ -530,6 +1371,7 @@ def main():
         epilog="""
 Exemple de usefulizare:
   python3 smtp_server.py --port 1025 --spool ./spool
+  python3 smtp_server.py --port 1025 --spool ./spool --async --max-size 52428800
   python3 smtp_server.py --selftest
 
 Revolvix&Hypotheticalandrei
@@ -544,8 +1386,24 @@ Revolvix&Hypotheticalandrei
                         help='Directory For stocarea mesajelor')
     parser.add_argument('--hostname', default='smtp.local',
                         help='Hostname-ul serverului')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Module asyncio (PIPELINING, CHUNKING, DATA scris in flux in spool)')
+    parser.add_argument('--max-size', type=int, default=10485760,
+                        help='Dimensiunea maxima a mesajului, anuntata prin SIZE (--async)')
+    parser.add_argument('--workers', type=int, default=64,
+                        help='Workeri in pool (0 = un thread per conexiune, fara limite)')
+    parser.add_argument('--backlog', type=int, default=1024,
+                        help='Backlog-ul listen() (plafonat de net.core.somaxconn)')
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help='Conexiuni acceptate care asteapta un worker; peste -> 421')
+    parser.add_argument('--max-per-ip', type=int, default=32,
+                        help='Conexiuni simultane per adresa IP; peste -> 421 (0 = nelimitat)')
     parser.add_argument('--selftest', action='store_true',
                         help='Ruleaza auto-teste')
+    parser.add_argument('--load-test', type=int, metavar='N', default=0,
+                        help='Test de incarcare: N seandune simultane (ex: 5000)')
+    parser.add_argument('--hold', type=float, default=0.0,
+                        help='Pauza per seandune in --load-test (clienti lenti)')
     parser.add_argument('--demo', action='store_true',
                         help='Module demo: oprire automata dupa 30s')
     parser.add_argument('-v', '--verbose', action='store_true',
@@ -560,12 +1418,34 @@ Revolvix&Hypotheticalandrei
         success = run_selftest()
         sys.exit(0 if success else 1)
     
-    server = SMTPServer(
-        listen_addr=args.listen,
-        port=args.port,
-        spool_dir=args.spool,
-        hostname=args.hostname
-    )
+    if args.load_test:
+        pool = {"workers": args.workers, "backlog": args.backlog,
+                "queue_size": args.queue_size, "max_per_ip": args.max_per_ip}
+        run_load_test(args.load_test, hold=args.hold, configs=[
+            (f"pool {args.workers} workeri, coada {args.queue_size}, max/IP {args.max_per_ip}", pool),
+            ("thread/conexiune, listen(5)", {"workers": 0, "backlog": 5}),
+        ])
+        return
+    
+    if args.use_async:
+        server = AsyncSMTPServer(
+            listen_addr=args.listen,
+            port=args.port,
+            spool_dir=args.spool,
+            hostname=args.hostname,
+            max_message_size=args.max_size
+        )
+    else:
+        server = SMTPServer(
+            listen_addr=args.listen,
+            port=args.port,
+            spool_dir=args.spool,
+            hostname=args.hostname,
+            workers=args.workers,
+            backlog=args.backlog,
+            queue_size=args.queue_size,
+            max_per_ip=args.max_per_ip
+        )
     
     if args.demo:
         import threading
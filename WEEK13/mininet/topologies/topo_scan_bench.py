@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Week 13 - Port scanner benchmark on the segmented topology.
+
+Runs python/exercises/ex_01_port_scanner.py from the attacker host with the
+threaded engine and with the asyncio engine, over both zones of
+topo_segmented.py, and compares duration and results.
+
+What the scanner sees
+---------------------
+- IoT zone 10.0.1.0/24 (same switch): a few live hosts with listeners,
+  every other address unanswered (ARP fails, probes time out)
+- management zone 10.0.2.0/24 (through r1): the firewall drops everything
+  except MQTT to the broker, so almost every probe is "filtered"
+
+Timeouts dominate both zones. This is where the threaded engine (host by
+host, one thread per probe in flight) is slowest.
+
+Usage
+-----
+Run (requires sudo):
+  sudo python3 mininet/topologies/topo_scan_bench.py
+  sudo python3 mininet/topologies/topo_scan_bench.py --ports 1-1024 --delay 5ms --loss 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+from mininet.log import info, setLogLevel
+from mininet.net import Mininet
+from mininet.node import Controller, OVSSwitch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from topo_segmented import SegmentedTopo, configure_router_firewall  # noqa: E402
+
+SCANNER = os.path.join(HERE, "..", "..", "python", "exercises", "ex_01_port_scanner.py")
+
+# Listeners started on the lab hosts (host name -> ports)
+SERVICES = {
+    "sensor1": [22, 80],
+    "sensor2": [22, 8080],
+    "broker": [22, 80, 1883, 8883],
+    "controller": [22, 80, 443],
+}
+
+LISTENER = ("import socket,time;"
+            "s=[socket.create_server(('',p),backlog=128) for p in {ports}];"
+            "time.sleep(1e9)")
+
+
+def start_services(net: Mininet) -> None:
+    for name, ports in SERVICES.items():
+        net.get(name).cmd(f"{sys.executable} -c \"{LISTENER.format(ports=ports)}\" >/dev/null 2>&1 &")
+    time.sleep(1.0)
+
+
+def run_scan(net: Mininet, engine: str, target: str, ports: str, timeout: float,
+             extra: List[str]) -> Tuple[float, dict]:
+    out = f"/tmp/scan_bench_{engine}.json"
+    cmd = [sys.executable, SCANNER, "--target", target, "--ports", ports, "--engine", engine,
+           "--timeout", str(timeout), "--no-banner", "--quiet", "--json-out", out] + extra
+    start = time.perf_counter()
+    net.get("attacker").cmd(" ".join(cmd) + " >/dev/null 2>&1")
+    duration = time.perf_counter() - start
+    with open(out, encoding="utf-8") as f:
+        return duration, json.load(f)["scan_report"]
+
+
+def summarise(report: dict) -> Tuple[Set[Tuple[str, int]], int, int]:
+    open_ports = {(h["target"], p["port"]) for h in report["hosts"] for p in h["open_ports"]}
+    closed = sum(h["statistics"]["closed"] for h in report["hosts"])
+    filtered = sum(h["statistics"]["filtered"] for h in report["hosts"])
+    return open_ports, closed, filtered
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Threaded vs asyncio scanner on the Mininet lab")
+    parser.add_argument("--targets", default="10.0.1.0/24,10.0.2.0/24",
+                        help="Comma-separated targets, one scanner run each")
+    parser.add_argument("--ports", default="1-100,1883,8883")
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=100, help="Threads of the threaded engine")
+    parser.add_argument("--max-inflight", type=int, default=500)
+    parser.add_argument("--max-rate", type=float, default=20000.0)
+    parser.add_argument("--delay", default=None, help="Extra delay on the attacker link, e.g. 5ms")
+    parser.add_argument("--loss", type=float, default=None, help="Loss %% on the attacker link")
+    args = parser.parse_args()
+
+    net = Mininet(topo=SegmentedTopo(), controller=Controller, switch=OVSSwitch,
+                  autoSetMacs=True, autoStaticArp=True)
+    info("*** Starting Mininet\n")
+    net.start()
+    try:
+        configure_router_firewall(net.get("r1"))
+        if args.delay or args.loss:
+            for intf in net.get("attacker").intfList():
+                if intf.name != "lo":
+                    intf.config(delay=args.delay, loss=args.loss)
+        start_services(net)
+
+        engines: Dict[str, List[str]] = {
+            "threads": ["--workers", str(args.workers)],
+            "async": ["--max-inflight", str(args.max_inflight), "--max-rate", str(args.max_rate)],
+        }
+        results: Dict[str, Tuple[float, Set[Tuple[str, int]], int, int]] = {}
+        for engine, extra in engines.items():
+            total, found, closed, filtered = 0.0, set(), 0, 0
+            for target in args.targets.split(","):
+                info(f"*** {engine}: scanning {target} ports {args.ports}\n")
+                duration, report = run_scan(net, engine, target, args.ports, args.timeout, extra)
+                o, c, f = summarise(report)
+                total += duration
+                found |= o
+                closed += c
+                filtered += f
+            results[engine] = (total, found, closed, filtered)
+
+        print()
+        print(f"{'engine':<10} {'seconds':>9} {'open':>6} {'closed':>8} {'filtered':>9}")
+        for engine, (total, found, closed, filtered) in results.items():
+            print(f"{engine:<10} {total:>9.1f} {len(found):>6} {closed:>8} {filtered:>9}")
+        t_threads, t_async = results["threads"][0], results["async"][0]
+        same = results["threads"][1] == results["async"][1]
+        print(f"\nSpeed-up: {t_threads / t_async:.1f}x | same open ports: {'yes' if same else 'NO'}")
+        if not same:
+            print(f"  only threads: {sorted(results['threads'][1] - results['async'][1])}")
+            print(f"  only async:   {sorted(results['async'][1] - results['threads'][1])}")
+        return 0 if same else 1
+    finally:
+        info("\n*** Stopping Mininet\n")
+        net.stop()
+
+
+if __name__ == "__main__":
+    setLogLevel("info")
+    raise SystemExit(main())
@@ -10,6 +10,8 @@ PEDAGOGICAL OBJECTIVES:
 2. Differentiating between ports open/closed/filtered
 3. Implementing concurrent scanning with ThreadPoolExecutor
 4. Exporting results in structured JSON format
+5. Scanning large segments with asyncio: RTT-based timeouts, adaptive rate
+6. Storing results as they arrive: resuming scans, comparing runs
 
 ETHICAL WARNING:
 - This tool is intended EXCLUSIVELY for the controlled laboratory
@@ -28,21 +30,37 @@ USAGE:
     
     # Scan with high parallelism
     python3 ex_01_port_scanner.py --target 10.0.13.11 --ports 1-65535 --workers 200 --timeout 0.1
+
+    # Large segment with the asyncio engine (no thread per port)
+    python3 ex_01_port_scanner.py --target 10.0.0.0/16 --ports 1-1000 --engine async --quiet --json-out scan.json
+
+    # Record into a store; after Ctrl+C, continue where it stopped
+    python3 ex_01_port_scanner.py --target 10.0.13.0/24 --ports 1-1024 --store scans.sqlite3
+    python3 ex_01_port_scanner.py --store scans.sqlite3 --resume
+    python3 ../utils/scan_store.py diff scans.sqlite3 1 2
 ================================================================================
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import errno
 import ipaddress
 import json
+import os
 import socket
 import sys
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from scan_store import ScanStore  # noqa: E402
+from service_probes import banner_text, probe_for  # noqa: E402
 
 # ==============================================================================
 # CONSTANTS AND CONFIGURATION
@@ -74,6 +92,9 @@ KNOWN_PORTS = {
     27017: "MongoDB",
 }
 
+# Ports probed by host discovery (a host is alive if any of them is open)
+DISCOVERY_PORTS = [22, 80, 443, 445, 3389, 8080]
+
 # ANSI colours for output
 class Colors:
     RED = "\033[91m"
@@ -177,16 +198,24 @@ def tcp_connect_scan(
             result.service = KNOWN_PORTS.get(port, "unknown")
             
             # Optional: read service banner
-            if grab_banner:
+            probe = probe_for(port)
+            if grab_banner and not probe.tls:
                 try:
                     sock.settimeout(0.5)
-                    # Send newline to stimulate response
-                    sock.sendall(b"\r\n")
-                    banner = sock.recv(1024).decode("utf-8", errors="replace").strip()
+                    # Send what the service expects (HTTP GET, MQTT CONNECT,
+                    # nothing for FTP/SSH which speak first, else a newline)
+                    stimulus = probe.render(host) or probe.stimulus
+                    if stimulus:
+                        sock.sendall(stimulus)
+                    banner = banner_text(probe, sock.recv(1024))
                     if banner:
                         result.banner = banner[:100]  # Limit length
                 except Exception:
                     pass  # Banner grab failed - not critical
+        elif error_code in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT):
+            # With a socket timeout, connect_ex() reports the timeout as
+            # EAGAIN instead of raising socket.timeout - port filtered
+            result.state = "filtered"
         else:
             # Connection refused - port closed
             result.state = "closed"
@@ -302,12 +331,14 @@ def scan_host(
     timeout: float = 0.5,
     max_workers: int = 100,
     grab_banner: bool = True,
-    verbose: bool = True
+    verbose: bool = True,
+    on_result: Optional[Callable[[ScanResult], None]] = None
 ) -> HostScanResult:
     """
     Scans all specified ports on a host.
     
-    Uses ThreadPoolExecutor for efficient parallelism.
+    Uses ThreadPoolExecutor for efficient parallelism. on_result, if
+    given, receives every ScanResult as it completes (e.g. to store it).
     """
     start_time = time.perf_counter()
     scan_timestamp = datetime.now().isoformat()
@@ -329,6 +360,8 @@ def scan_host(
         
         for future in as_completed(futures):
             result = future.result()
+            if on_result:
+                on_result(result)
             
             if result.state == "open":
                 open_ports.append(result)
@@ -373,7 +406,6 @@ def discover_hosts(
     """
     Discovers activee hosts by checking common ports.
     """
-    DISCOVERY_PORTS = [22, 80, 443, 445, 3389, 8080]
     alive_hosts: List[str] = []
     
     print(f"\n{Colors.BOLD}[*] Host discovery in network...{Colors.RESET}")
@@ -399,10 +431,538 @@ def discover_hosts(
     return alive_hosts
 
 
+# ==============================================================================
+# ASYNCIO ENGINE
+# ==============================================================================
+#
+# The threaded engine above needs one thread per probe in flight, and it
+# scans hosts one after another. The asyncio engine keeps up to
+# --max-inflight non-blocking connects open across all hosts. It adapts
+# two things while it runs:
+#   - timeout: per host, from the measured connect RTT (the same estimator
+#     TCP uses for retransmissions), between --min-timeout and --timeout
+#   - rate: probes/second, roughly doubled every second until the first
+#     loss, then +5%/second. A probe that timed out but is answered on retry
+#     means a SYN or its answer was lost, so the rate is halved.
+
+# Errors that mean "this machine is out of sockets or ports", not a port state
+LOCAL_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EADDRNOTAVAIL}
+
+
+class RttEstimator:
+    """Smoothed RTT and its deviation (RFC 6298), giving a connect timeout."""
+
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self) -> None:
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+
+    def sample(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, low: float, high: float) -> float:
+        """srtt + 4 * rttvar, within [low, high]; high until the first sample."""
+        if self.srtt is None:
+            return high
+        return min(high, max(low, self.srtt + 4 * self.rttvar))
+
+
+class RateController:
+    """
+    Paces probe starts at `rate` per second (AIMD).
+
+    Each answered probe adds 1 probe/s (slow start) or 0.05 probe/s after
+    the first loss. A loss halves the rate, unless the lost probe was sent
+    before the last cut: losses are seen a timeout late, and all those of
+    one episode should count once (as in TCP fast recovery).
+    """
+
+    def __init__(self, rate: float = 1000.0, min_rate: float = 10.0, max_rate: float = 20000.0,
+                 burst: float = 0.01) -> None:
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.ssthresh = max_rate
+        self.burst = burst  # seconds of probes that may start back to back
+        self.losses = 0
+        self._next = 0.0
+        self._last_cut = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _take(self, now: float) -> None:
+        self._next = max(self._next, now - self.burst) + 1.0 / self.rate
+
+    async def wait(self) -> None:
+        """Return when the next probe may start."""
+        now = self.now()
+        if not self._waiters and self._next <= now:
+            self._take(now)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_at(self._next, self._release)
+        await waiter
+
+    def _release(self) -> None:
+        # Waiters are spaced at the rate of the moment they are released,
+        # not when they queued, so a cut takes effect at once
+        self._timer = None
+        now = self.now()
+        while self._waiters and self._next <= now:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._take(now)
+        if self._waiters:
+            self._timer = asyncio.get_running_loop().call_at(self._next, self._release)
+
+    def on_answer(self) -> None:
+        step = 1.0 if self.rate < self.ssthresh else 0.05
+        self.rate = min(self.max_rate, self.rate + step)
+
+    def on_loss(self, sent: float) -> None:
+        """A probe sent at loop time `sent` was lost."""
+        if sent <= self._last_cut:
+            return
+        self._last_cut = self.now()
+        self.losses += 1
+        self.ssthresh = self.rate = max(self.min_rate, self.rate / 2)
+
+
+class _HostProgress:
+    """Counters of one host while its ports are being scanned."""
+
+    __slots__ = ("target", "addr", "scan_time", "started", "open_ports", "closed", "filtered", "done")
+
+    def __init__(self, target: str, addr: str) -> None:
+        self.target = target
+        self.addr = addr
+        self.scan_time = datetime.now().isoformat()
+        self.started = time.perf_counter()
+        self.open_ports: List[ScanResult] = []
+        self.closed = self.filtered = self.done = 0
+
+    def add(self, result: ScanResult) -> None:
+        self.done += 1
+        if result.state == "open":
+            self.open_ports.append(result)
+        elif result.state == "closed":
+            self.closed += 1
+        elif result.state == "filtered":
+            self.filtered += 1
+
+    def finish(self, total_ports: int) -> HostScanResult:
+        self.open_ports.sort(key=lambda x: x.port)
+        return HostScanResult(
+            target=self.target,
+            scan_time=self.scan_time,
+            total_ports=total_ports,
+            open_ports=self.open_ports,
+            closed_ports=self.closed,
+            filtered_ports=self.filtered,
+            duration_seconds=round(time.perf_counter() - self.started, 2)
+        )
+
+
+def _wake(waiter: asyncio.Future, answered: bool) -> None:
+    if not waiter.done():
+        waiter.set_result(answered)
+
+
+def _inflight_limit(wanted: int) -> int:
+    """Cap in-flight sockets below the open-file limit (raising it if allowed)."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < wanted + 64:
+            new = wanted + 64 if hard == resource.RLIM_INFINITY else min(hard, wanted + 64)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new, hard))
+            soft = new
+    except (ImportError, ValueError, OSError):
+        return wanted
+    return max(1, min(wanted, soft - 64)) if soft != resource.RLIM_INFINITY else wanted
+
+
+def _is_ipv4(target: str) -> bool:
+    try:
+        ipaddress.IPv4Address(target)
+        return True
+    except ValueError:
+        return False
+
+
+async def _resolve_all(targets: List[str]) -> Dict[str, Union[str, OSError]]:
+    """
+    IPv4 address of every target name, or the lookup error. Names go through
+    loop.getaddrinfo (a thread), so a slow DNS server does not stall the
+    probes; IPv4 literals are not looked up and are left out of the result.
+    """
+    loop = asyncio.get_running_loop()
+    names = [t for t in dict.fromkeys(targets) if not _is_ipv4(t)]
+    found = await asyncio.gather(
+        *(loop.getaddrinfo(n, None, family=socket.AF_INET, type=socket.SOCK_STREAM) for n in names),
+        return_exceptions=True)
+    resolved: Dict[str, Union[str, OSError]] = {}
+    for name, info in zip(names, found):
+        if isinstance(info, BaseException) and not isinstance(info, OSError):
+            raise info
+        resolved[name] = info if isinstance(info, OSError) else info[0][4][0]
+    return resolved
+
+
+class AsyncScanner:
+    """
+    TCP connect scanner on asyncio (non-blocking connect, no threads).
+
+    timeout is the largest connect timeout; each host gets
+    srtt + 4 * rttvar once it has answered. A probe that times out is
+    retried `retries` times with a doubled timeout before it is "filtered".
+    Hosts are scanned `host_group` at a time, port by port across the
+    group, so no single host receives the whole in-flight window.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 0.5,
+        min_timeout: float = 0.05,
+        max_inflight: int = 500,
+        rate: float = 1000.0,
+        max_rate: float = 20000.0,
+        retries: int = 1,
+        grab_banner: bool = True,
+        host_group: int = 256
+    ) -> None:
+        self.timeout = timeout
+        self.min_timeout = min(min_timeout, timeout)
+        self.max_inflight = _inflight_limit(max_inflight)
+        self.rate = RateController(rate, max_rate=max_rate)
+        self.retries = retries
+        self.grab_banner = grab_banner
+        self.host_group = host_group
+        self.rtt: Dict[str, RttEstimator] = {}
+        self.global_rtt = RttEstimator()
+        self.probes = 0
+        self.retried = 0
+
+    def _timeout_for(self, addr: str) -> float:
+        est = self.rtt.get(addr)
+        if est is None or est.srtt is None:
+            est = self.global_rtt
+        return est.timeout(self.min_timeout, self.timeout)
+
+    def _sample(self, addr: str, rtt: float) -> None:
+        est = self.rtt.get(addr)
+        if est is None:
+            est = self.rtt[addr] = RttEstimator()
+        est.sample(rtt)
+        self.global_rtt.sample(rtt)
+
+    async def _connect(self, addr: str, port: int,
+                       timeout: float) -> Tuple[str, Optional[float], Optional[socket.socket]]:
+        """
+        One non-blocking connect: (state, rtt or None, socket if open).
+        The socket becoming writable means the handshake finished (SO_ERROR 0)
+        or failed (SO_ERROR = errno); a timer resolves the wait first if the
+        SYN gets no answer at all.
+        """
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        start = time.perf_counter()
+        try:
+            err = sock.connect_ex((addr, port))
+            if err == errno.EINPROGRESS:
+                fd = sock.fileno()
+                waiter = loop.create_future()
+                loop.add_writer(fd, _wake, waiter, True)
+                timer = loop.call_later(timeout, _wake, waiter, False)
+                try:
+                    answered = await waiter
+                finally:
+                    loop.remove_writer(fd)
+                    timer.cancel()
+                if not answered:
+                    sock.close()
+                    return "filtered", None, None
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except BaseException:
+            sock.close()
+            raise
+        rtt = time.perf_counter() - start
+        if err == 0:
+            return "open", rtt, sock
+        sock.close()
+        if err == errno.ECONNREFUSED:
+            return "closed", rtt, None
+        if err in LOCAL_ERRNOS:
+            return "local", None, None
+        return f"error:{OSError(err, os.strerror(err)).__class__.__name__}", None, None
+
+    async def _read_banner(self, sock: socket.socket, addr: str, port: int) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        probe = probe_for(port)
+        if probe.tls:
+            return None
+        try:
+            # Per-port stimulus, as tcp_connect_scan does
+            stimulus = probe.render(addr) or probe.stimulus
+            if stimulus:
+                await loop.sock_sendall(sock, stimulus)
+            data = await asyncio.wait_for(loop.sock_recv(sock, 1024), 0.5)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        banner = banner_text(probe, data)
+        return banner[:100] if banner else None
+
+    async def probe(self, addr: str, port: int, grab_banner: Optional[bool] = None) -> ScanResult:
+        """Scan one port, with retries; same result as tcp_connect_scan()."""
+        start_time = time.perf_counter()
+        result = ScanResult(port=port, state="filtered")
+        timeout = self._timeout_for(addr)
+        attempt = local_errors = 0
+        sent = 0.0
+        while attempt <= self.retries:
+            await self.rate.wait()
+            if not attempt:
+                sent = self.rate.now()
+            state, rtt, sock = await self._connect(addr, port, timeout)
+            self.probes += 1
+            if state == "local":
+                # Out of sockets or ports: slow down and try again
+                local_errors += 1
+                if local_errors > 10:
+                    raise OSError("out of sockets or local ports: lower --max-inflight")
+                self.rate.on_loss(sent)
+                await asyncio.sleep(timeout)
+                continue
+            if state == "filtered":
+                attempt += 1
+                if attempt <= self.retries:
+                    self.retried += 1
+                    timeout = min(self.timeout, timeout * 2)
+                continue
+            if rtt is not None:
+                self._sample(addr, rtt)
+                self.rate.on_answer()
+                if attempt:
+                    # Answered only on retry: the first SYN (or its answer) was lost
+                    self.rate.on_loss(sent)
+            result.state = state
+            if sock is not None:
+                result.service = KNOWN_PORTS.get(port, "unknown")
+                if self.grab_banner if grab_banner is None else grab_banner:
+                    result.banner = await self._read_banner(sock, addr, port)
+                sock.close()
+            break
+        result.response_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        return result
+
+    async def run(self, jobs: Iterable[Tuple[object, str, int]],
+                  on_result: Callable[[object, ScanResult], None], grab_banner: Optional[bool] = None) -> None:
+        """
+        Probe every (key, addr, port) of `jobs` with max_inflight coroutines
+        and hand each ScanResult to on_result(key, result) as it completes.
+        `jobs` is consumed lazily, so it can be a generator over a /16.
+        """
+        it = iter(jobs)
+
+        async def worker() -> None:
+            for key, addr, port in it:
+                on_result(key, await self.probe(addr, port, grab_banner))
+
+        await asyncio.gather(*(worker() for _ in range(self.max_inflight)))
+
+    async def scan(self, targets: List[str], ports: List[int],
+                   on_open: Optional[Callable[[str, ScanResult], None]] = None,
+                   on_result: Optional[Callable[[str, ScanResult], None]] = None,
+                   remaining: Optional[Callable[[str], Set[int]]] = None) -> AsyncIterator[HostScanResult]:
+        """
+        Yield a HostScanResult per target as soon as all its ports are done.
+        on_result receives every ScanResult; remaining(target), if given,
+        limits a target to those ports (targets with none are skipped).
+        """
+        done: asyncio.Queue = asyncio.Queue()
+        todo: Dict[str, Set[int]] = {}
+        resolved = await _resolve_all(targets)
+
+        def jobs() -> Iterator[Tuple[_HostProgress, str, int]]:
+            for i in range(0, len(targets), self.host_group):
+                group = []
+                for t in targets[i:i + self.host_group]:
+                    todo[t] = set(ports) if remaining is None else remaining(t)
+                    if not todo[t]:
+                        continue
+                    addr = resolved.get(t, t)
+                    if isinstance(addr, OSError):
+                        # Unknown name: every port gets the error, as in tcp_connect_scan()
+                        host = _HostProgress(t, t)
+                        for port in sorted(todo[t]):
+                            collect(host, ScanResult(port=port, state=f"error:{addr.__class__.__name__}"))
+                        continue
+                    group.append(_HostProgress(t, addr))
+                for port in ports:
+                    for host in group:
+                        if port in todo[host.target]:
+                            yield host, host.addr, port
+
+        def collect(host: _HostProgress, result: ScanResult) -> None:
+            host.add(result)
+            if on_result:
+                on_result(host.target, result)
+            if result.state == "open" and on_open:
+                on_open(host.target, result)
+            if host.done == len(todo[host.target]):
+                self.rtt.pop(host.addr, None)
+                del todo[host.target]
+                done.put_nowait(host.finish(host.done))
+
+        runner = asyncio.ensure_future(self.run(jobs(), collect))
+        runner.add_done_callback(lambda _: done.put_nowait(None))
+        while True:
+            item = await done.get()
+            if item is None:
+                break
+            yield item
+        await runner  # re-raise a failure of the probes
+
+    async def discover(self, targets: List[str], ports: List[int] = DISCOVERY_PORTS,
+                       on_alive: Optional[Callable[[str], None]] = None) -> List[str]:
+        """Hosts with at least one of `ports` open; stops probing a host once found."""
+        alive: Dict[str, None] = {}
+        resolved = await _resolve_all(targets)
+
+        def jobs() -> Iterator[Tuple[str, str, int]]:
+            for i in range(0, len(targets), self.host_group):
+                group = [(t, resolved.get(t, t)) for t in targets[i:i + self.host_group]]
+                group = [(t, addr) for t, addr in group if not isinstance(addr, OSError)]
+                for port in ports:
+                    for target, addr in group:
+                        if target not in alive:
+                            yield target, addr, port
+
+        def on_result(target: str, result: ScanResult) -> None:
+            if result.state == "open" and target not in alive:
+                alive[target] = None
+                if on_alive:
+                    on_alive(target)
+
+        await self.run(jobs(), on_result, grab_banner=False)
+        return list(alive)
+
+
+def scan_hosts_async(
+    targets: List[str],
+    ports: List[int],
+    timeout: float = 0.5,
+    grab_banner: bool = True,
+    verbose: bool = True,
+    on_result: Optional[Callable[[str, ScanResult], None]] = None,
+    on_host: Optional[Callable[[HostScanResult], None]] = None,
+    remaining: Optional[Callable[[str], Set[int]]] = None,
+    **engine
+) -> List[HostScanResult]:
+    """
+    Scans all ports of all targets with AsyncScanner; same results as
+    calling scan_host() for every target. `engine` goes to AsyncScanner
+    (max_inflight, rate, max_rate, min_timeout, retries); on_result,
+    on_host and remaining are passed on to AsyncScanner.scan().
+    """
+    scanner = AsyncScanner(timeout=timeout, grab_banner=grab_banner, **engine)
+    start_time = time.perf_counter()
+
+    if verbose:
+        print(f"\n{Colors.BOLD}[*] Scanning {len(targets)} host(s) - {len(ports)} ports (asyncio){Colors.RESET}")
+        print(f"    Timeout: {scanner.min_timeout}-{timeout}s (from RTT) | In flight: {scanner.max_inflight}"
+              f" | Rate: {scanner.rate.rate:.0f}-{scanner.rate.max_rate:.0f}/s")
+
+    def on_open(target: str, result: ScanResult) -> None:
+        banner_info = f" | {result.banner[:50]}" if result.banner else ""
+        print(f"    {Colors.GREEN}[OPEN]{Colors.RESET} {target:15s} {result.port:5d}/tcp"
+              f"  {result.service or 'unknown':15s}{banner_info}")
+
+    async def collect() -> List[HostScanResult]:
+        results = []
+        async for result in scanner.scan(targets, ports, on_open if verbose else None,
+                                         on_result, remaining):
+            results.append(result)
+            if on_host:
+                on_host(result)
+            if verbose and len(targets) > 1 and result.open_ports:
+                print(f"    {Colors.BOLD}[+] {result.target}:{Colors.RESET} open {len(result.open_ports)} | "
+                      f"closed {result.closed_ports} | filtered {result.filtered_ports} "
+                      f"({result.duration_seconds:.2f}s)")
+        return results
+
+    results = asyncio.run(collect())
+    duration = time.perf_counter() - start_time
+    # Same order as the threaded engine
+    order = {t: i for i, t in enumerate(targets)}
+    results.sort(key=lambda r: order[r.target])
+
+    if verbose:
+        print(f"\n{Colors.BOLD}[+] Results:{Colors.RESET}")
+        print(f"    Open: {Colors.GREEN}{sum(len(r.open_ports) for r in results)}{Colors.RESET} | "
+              f"Closed: {sum(r.closed_ports for r in results)} | "
+              f"Filtered: {sum(r.filtered_ports for r in results)}")
+        print(f"    Probes: {scanner.probes} ({scanner.retried} retries, {scanner.rate.losses} rate cuts)"
+              f" | final rate {scanner.rate.rate:.0f}/s | srtt "
+              f"{(scanner.global_rtt.srtt or 0) * 1000:.2f} ms")
+        print(f"    Duration: {duration:.2f}s ({scanner.probes / max(duration, 1e-9):.0f} probes/s)")
+
+    return results
+
+
+def discover_hosts_async(targets: List[str], timeout: float = 0.5, **engine) -> List[str]:
+    """discover_hosts() on AsyncScanner: all hosts probed concurrently."""
+    scanner = AsyncScanner(timeout=timeout, grab_banner=False, **engine)
+
+    print(f"\n{Colors.BOLD}[*] Host discovery in network (asyncio)...{Colors.RESET}")
+    print(f"    Targets: {len(targets)} | Test ports: {DISCOVERY_PORTS}")
+
+    def on_alive(host: str) -> None:
+        print(f"    {Colors.GREEN}[ALIVE]{Colors.RESET} {host}")
+
+    alive_hosts = asyncio.run(scanner.discover(targets, on_alive=on_alive))
+
+    print(f"\n{Colors.BOLD}[+] Activee hosts: {len(alive_hosts)}/{len(targets)}{Colors.RESET}")
+    return alive_hosts
+
+
 # ==============================================================================
 # EXPORT AND REPORTING
 # ==============================================================================
 
+def results_from_store(store: ScanStore, scan_id: int) -> List[HostScanResult]:
+    """HostScanResults of a stored scan (including hosts of earlier, resumed runs)."""
+    open_by_host: Dict[str, List[ScanResult]] = {}
+    for row in store.open_ports(scan_id):
+        open_by_host.setdefault(row["host"], []).append(ScanResult(
+            port=row["port"], state="open", service=row["service"], banner=row["banner"],
+            response_time_ms=row["response_ms"]))
+    return [
+        HostScanResult(
+            target=h["host"],
+            scan_time=h["scan_time"] or "",
+            total_ports=h["open"] + h["closed"] + h["filtered"] + h["other"],
+            open_ports=open_by_host.get(h["host"], []),
+            closed_ports=h["closed"],
+            filtered_ports=h["filtered"],
+            duration_seconds=round(h["duration"], 2)
+        )
+        for h in store.host_summaries(scan_id)
+    ]
+
+
 def export_json(results: List[HostScanResult], output_path: str) -> None:
     """Exports results in JSON format."""
     data = {
@@ -455,10 +1015,13 @@ Examples:
   %(prog)s --target 10.0.13.11 --ports 1-1024
   %(prog)s --target 10.0.13.1-15 --mode discovery
   %(prog)s --target 10.0.13.11 --ports 22,80,443 --json-out scan.json
+  %(prog)s --target 10.0.0.0/16 --ports 1-1000 --engine async --quiet --json-out scan.json
+  %(prog)s --target 10.0.13.0/24 --store scans.sqlite3      (Ctrl+C, then:)
+  %(prog)s --store scans.sqlite3 --resume
         """
     )
     
-    parser.add_argument("--target", required=True,
+    parser.add_argument("--target",
                         help="Target: IP, range (192.168.1.1-10), or CIDR (/24)")
     parser.add_argument("--ports", default="1-1024",
                         help="Ports: 80, 1-1024, or 22,80,443")
@@ -474,8 +1037,32 @@ Examples:
                         help="Export results to JSON file")
     parser.add_argument("--quiet", action="store_true",
                         help="Minimal output")
+    parser.add_argument("--store", metavar="DB",
+                        help="Record every result in a SQLite store as it arrives (scan mode)")
+    parser.add_argument("--resume", type=int, nargs="?", const=0, metavar="SCAN_ID",
+                        help="Continue a stored scan (default: the latest unfinished), "
+                             "skipping host/port pairs already recorded")
+    parser.add_argument("--engine", choices=["threads", "async"], default="threads",
+                        help="threads: one thread per probe, host by host; "
+                             "async: asyncio, all hosts at once (default: threads)")
+
+    engine = parser.add_argument_group("asyncio engine (--engine async)")
+    engine.add_argument("--max-inflight", type=int, default=500,
+                        help="Connects in flight at once (default: 500)")
+    engine.add_argument("--rate", type=float, default=1000.0,
+                        help="Initial probes/second (default: 1000)")
+    engine.add_argument("--max-rate", type=float, default=20000.0,
+                        help="Upper bound for the adaptive rate (default: 20000)")
+    engine.add_argument("--min-timeout", type=float, default=0.05,
+                        help="Lower bound for the RTT-based timeout; --timeout is the upper (default: 0.05)")
+    engine.add_argument("--retries", type=int, default=1,
+                        help="Retries of a probe that timed out (default: 1)")
     
     args = parser.parse_args()
+    if args.resume is not None and not args.store:
+        parser.error("--resume needs --store")
+    if not args.target and args.resume is None:
+        parser.error("--target is required (unless resuming)")
     
     # Banner
     if not args.quiet:
@@ -484,12 +1071,16 @@ Examples:
         print("  WARNING: For controlled environment only!")
         print(f"{'='*60}{Colors.RESET}")
     
-    # Parse targets
-    targets = parse_targets(args.target)
+    engine_opts = dict(max_inflight=args.max_inflight, rate=args.rate, max_rate=args.max_rate,
+                       min_timeout=args.min_timeout, retries=args.retries)
     
     if args.mode == "discovery":
         # Host discovery mode
-        alive_hosts = discover_hosts(targets, args.timeout, args.workers)
+        targets = parse_targets(args.target)
+        if args.engine == "async":
+            alive_hosts = discover_hosts_async(targets, args.timeout, **engine_opts)
+        else:
+            alive_hosts = discover_hosts(targets, args.timeout, args.workers)
         
         if args.json_out:
             with open(args.json_out, "w") as f:
@@ -497,19 +1088,80 @@ Examples:
     
     else:
         # Port scanning mode
-        ports = parse_ports(args.ports)
+        store = ScanStore(args.store) if args.store else None
+        scan_id = None
+        remaining = None
+        target_spec, ports_spec = args.target, args.ports
+        
+        if args.resume is not None:
+            scan_id = args.resume or store.latest_unfinished()
+            scan = store.scan(scan_id) if scan_id else None
+            if scan is None:
+                parser.error("no scan to resume in the store")
+            target_spec, ports_spec = scan["targets"], scan["ports"]
+            started = {h["host"]: h["done"] for h in store.host_summaries(scan_id)}
+            all_ports = set(parse_ports(ports_spec))
+            
+            def remaining(target: str) -> Set[int]:
+                if target not in started:
+                    return set(all_ports)
+                if started[target]:
+                    return set()
+                return all_ports - store.scanned_ports(scan_id, target)
+            
+            if not args.quiet:
+                print(f"[*] Resuming scan {scan_id}: {scan['hosts_done']} host(s) already done")
+        elif store:
+            scan_id = store.new_scan(target_spec, ports_spec, args.engine)
+        
+        targets = parse_targets(target_spec)
+        ports = parse_ports(ports_spec)
         results: List[HostScanResult] = []
         
-        for target in targets:
-            result = scan_host(
-                target=target,
-                ports=ports,
-                timeout=args.timeout,
-                max_workers=args.workers,
-                grab_banner=not args.no_banner,
-                verbose=not args.quiet
-            )
-            results.append(result)
+        try:
+            if args.engine == "async":
+                results = scan_hosts_async(
+                    targets=targets,
+                    ports=ports,
+                    timeout=args.timeout,
+                    grab_banner=not args.no_banner,
+                    verbose=not args.quiet,
+                    on_result=(lambda t, r: store.add(scan_id, t, r)) if store else None,
+                    on_host=(lambda r: store.host_done(scan_id, r)) if store else None,
+                    remaining=remaining,
+                    **engine_opts
+                )
+            else:
+                for target in targets:
+                    todo = ports if remaining is None else sorted(remaining(target))
+                    if not todo:
+                        continue
+                    result = scan_host(
+                        target=target,
+                        ports=todo,
+                        timeout=args.timeout,
+                        max_workers=args.workers,
+                        grab_banner=not args.no_banner,
+                        verbose=not args.quiet,
+                        on_result=(lambda r, t=target: store.add(scan_id, t, r)) if store else None
+                    )
+                    if store:
+                        store.host_done(scan_id, result)
+                    results.append(result)
+        except KeyboardInterrupt:
+            if store:
+                store.close()
+                print(f"\n{Colors.YELLOW}[!] Interrupted. Results so far are in {args.store}; "
+                      f"continue with: --store {args.store} --resume {scan_id}{Colors.RESET}")
+            raise SystemExit(130)
+        
+        if store:
+            store.finish(scan_id)
+            # Includes hosts finished by earlier runs of a resumed scan
+            results = results_from_store(store, scan_id)
+            store.close()
+            if not args.quiet:
+                print(f"\n{Colors.GREEN}[✓] Scan {scan_id} stored: {args.store}{Colors.RESET}")
         
         # JSON export if requested
         if args.json_out:
@@ -6,10 +6,23 @@ This script captures traffic for the Week 13 lab and prints a compact summary of
 - basic service identification via ports (HTTP, FTP, MQTT)
 - payload snippets for plaintext MQTT when possible
 
+Engines
+-------
+- scapy:     Scapy sniff() with one Python callback and one printed line per
+             packet. Easy to follow, but drops traffic above a few thousand
+             packets/s.
+- afpacket:  Linux only, no Scapy needed (utils/live_capture.py). The BPF
+             filter runs in the kernel, packets are read in batches from a
+             raw socket or a PACKET_MMAP ring (--ring), pcap output goes to
+             rotating files from a writer thread, and per-flow totals are
+             printed every --interval seconds.
+
 Important
 ---------
 Packet capture typically requires elevated privileges. On Linux, run with sudo:
   sudo python3 python/exercises/ex_03_packet_sniffer.py --iface any --timeout 20
+  sudo python3 python/exercises/ex_03_packet_sniffer.py --engine afpacket --ring --interval 5 \
+      --pcap-out artifacts/sniff.pcap --rotate-mb 50 --rotate-files 4
 
 This tool is intended for local lab use only.
 """
@@ -19,16 +32,20 @@ from __future__ import annotations
 import argparse
 import datetime as _dt
 import binascii
+import os
+import sys
 from typing import Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+from live_capture import print_interval, run_capture  # noqa: E402
+
+# Scapy is only needed by the scapy engine
 try:
     from scapy.all import sniff, wrpcap  # type: ignore
     from scapy.layers.inet import IP, TCP, UDP  # type: ignore
+    SCAPY_ERROR = None
 except Exception as exc:  # pragma: no cover
-    raise SystemExit(
-        "Scapy is required for this exercise. Install via: make setup\n"
-        f"Import error: {exc}"
-    )
+    SCAPY_ERROR = exc
 
 
 PORT_LABELS = {
@@ -114,6 +131,55 @@ def handle_packet(pkt) -> None:
     print(f"[{now_ts()}] {proto} {src}:{sp} -> {dst}:{dp}{tag} len={len(pkt)}{extra}")
 
 
+def run_scapy(args: argparse.Namespace) -> int:
+    if SCAPY_ERROR is not None:
+        raise SystemExit(
+            "Scapy is required for the scapy engine. Install via: make setup\n"
+            f"Import error: {SCAPY_ERROR}"
+        )
+    packets = sniff(
+        iface=args.iface,
+        filter=args.bpf,
+        prn=handle_packet,
+        timeout=args.timeout,
+        count=args.count if args.count > 0 else 0,
+        store=bool(args.pcap_out),
+    )
+
+    if args.pcap_out:
+        wrpcap(args.pcap_out, packets)
+        print(f"\nPCAP written to: {args.pcap_out}")
+    return 0
+
+
+def run_afpacket(args: argparse.Namespace) -> int:
+    def on_interval(summary, seconds, totals) -> None:
+        print_interval(summary, seconds, totals, top=args.top, labels=PORT_LABELS)
+
+    try:
+        totals = run_capture(
+            iface=args.iface,
+            bpf=args.bpf,
+            duration=args.timeout,
+            count=args.count,
+            ring=args.ring,
+            pcap_out=args.pcap_out,
+            rotate_bytes=int(args.rotate_mb * 1e6),
+            rotate_files=args.rotate_files,
+            interval=args.interval,
+            on_interval=on_interval,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"[ERROR] {exc}")
+        return 1
+
+    print(f"\nPackets: {totals['packets']} captured, {totals['kernel_drops']} dropped by the kernel")
+    if args.pcap_out:
+        print(f"PCAP: {totals['written']} packets written under {args.pcap_out}"
+              f" ({totals['writer_drops']} dropped by the writer)")
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Week 13 - Packet sniffer (educational)")
     parser.add_argument("--iface", default="any", help="Interface name (default: any)")
@@ -125,11 +191,22 @@ def main() -> int:
         help="BPF filter (default targets Week 13 lab ports)",
     )
     parser.add_argument("--pcap-out", default=None, help="Optional PCAP output path")
+    parser.add_argument("--engine", choices=["scapy", "afpacket"], default="scapy",
+                        help="scapy: one line per packet; afpacket: kernel BPF and interval flow summaries")
+    parser.add_argument("--ring", action="store_true", help="afpacket: read from a PACKET_MMAP ring")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="afpacket: seconds between flow summaries (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="afpacket: flows per summary (default: 10)")
+    parser.add_argument("--rotate-mb", type=float, default=0.0,
+                        help="afpacket: start a new PCAP file every N MB (0 = single file)")
+    parser.add_argument("--rotate-files", type=int, default=0,
+                        help="afpacket: keep at most N PCAP files, overwriting the oldest (0 = no limit)")
     args = parser.parse_args()
 
     print("=" * 72)
     print("Week 13 - Packet sniffer (educational)")
     print("=" * 72)
+    print(f"Engine: {args.engine}{' (PACKET_MMAP ring)' if args.engine == 'afpacket' and args.ring else ''}")
     print(f"Interface: {args.iface}")
     print(f"Timeout: {args.timeout}s")
     print(f"Count: {args.count}")
@@ -138,21 +215,10 @@ def main() -> int:
         print(f"PCAP output: {args.pcap_out}")
     print()
 
-    packets = sniff(
-        iface=args.iface,
-        filter=args.bpf,
-        prn=handle_packet,
-        timeout=args.timeout,
-        count=args.count if args.count > 0 else 0,
-        store=bool(args.pcap_out),
-    )
-
-    if args.pcap_out:
-        wrpcap(args.pcap_out, packets)
-        print(f"\nPCAP written to: {args.pcap_out}")
+    rc = run_afpacket(args) if args.engine == "afpacket" else run_scapy(args)
 
     print("\nDone.")
-    return 0
+    return rc
 
 
 if __name__ == "__main__":
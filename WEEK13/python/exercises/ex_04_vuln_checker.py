@@ -11,7 +11,13 @@ It does NOT exploit vulnerabilities and it does NOT attempt privilege escalation
 Supported services:
 - http   (simple GET /, header inspection and basic DVWA fingerprint)
 - ftp    (banner inspection)
-- mqtt   (broker reachability via TCP connect only)
+- mqtt   (MQTT CONNECT without credentials: is anonymous access allowed?)
+- auto   (default: pick the check from the port; other ports get a banner
+          check)
+
+Several targets and ports are checked concurrently (see
+python/utils/service_probes.py for the probes and the engine):
+  python3 ex_04_vuln_checker.py --target 127.0.0.1 --ports 8080,2121,1883,8883
 
 Exit codes:
   0 - checks completed and a report was produced
@@ -22,11 +28,16 @@ from __future__ import annotations
 
 import argparse
 import json
-import socket
+import os
 import sys
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+
+from net_utils import parse_ports  # noqa: E402
+from service_probes import CONNACK_CODES, ProbeResult, parse_connack, parse_http, probe_for, probe_many  # noqa: E402
 
 
 @dataclass
@@ -49,163 +60,190 @@ class Report:
 
 
 def tcp_banner(host: str, port: int, timeout: float = 2.0) -> Optional[str]:
-    try:
-        with socket.create_connection((host, port), timeout=timeout) as s:
-            s.settimeout(timeout)
-            # Stimulus for some services
-            try:
-                s.sendall(b"\r\n")
-            except Exception:
-                pass
-            data = s.recv(1024)
-        text = data.decode(errors="replace").strip()
-        return text or None
-    except Exception:
-        return None
+    """Banner of host:port, using the probe the port's service expects."""
+    result = probe_many([(host, port)], concurrency=1, connect_timeout=timeout, read_timeout=timeout)[0]
+    return result.banner
 
 
 def http_probe(host: str, port: int, timeout: float = 3.0) -> Tuple[bool, Optional[str], Dict[str, str], Optional[str]]:
     """Return (reachable, status_line, headers, body_snippet)."""
-    req = (
-        f"GET / HTTP/1.1\r\n"
-        f"Host: {host}\r\n"
-        f"User-Agent: week13-vuln-checker\r\n"
-        f"Connection: close\r\n\r\n"
-    ).encode()
-
-    try:
-        with socket.create_connection((host, port), timeout=timeout) as s:
-            s.sendall(req)
-            s.settimeout(timeout)
-            raw = b""
-            while len(raw) < 65536:
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                raw += chunk
-    except Exception:
+    result = probe_many([(host, port)], service="http", concurrency=1,
+                        connect_timeout=timeout, read_timeout=timeout)[0]
+    if not result.reachable:
         return False, None, {}, None
+    status_line, headers, body = parse_http(result.data)
+    return True, status_line, headers, body[:500].strip() or None
 
-    text = raw.decode(errors="replace")
-    head, _, body = text.partition("\r\n\r\n")
-    lines = head.split("\r\n")
-    status_line = lines[0].strip() if lines else None
 
-    headers: Dict[str, str] = {}
-    for line in lines[1:]:
-        if ":" in line:
-            k, v = line.split(":", 1)
-            headers[k.strip()] = v.strip()
+# Each check turns one probe result into (reachable, banner, http_headers, findings)
+CheckResult = Tuple[bool, Optional[str], Optional[Dict[str, str]], List[Finding]]
 
-    snippet = body[:500].strip() or None
-    return True, status_line, headers, snippet
 
+def _tls_findings(r: ProbeResult) -> List[Finding]:
+    if not r.tls:
+        return []
+    return [Finding(title="TLS in use", severity="informational", evidence=r.tls)]
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Week 13 - Vulnerability checker (defensive)")
-    parser.add_argument("--target", required=True, help="Target host, eg 127.0.0.1")
-    parser.add_argument("--port", type=int, required=True, help="Target port")
-    parser.add_argument("--service", choices=["http", "ftp", "mqtt"], required=True, help="Service type")
-    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
-    args = parser.parse_args()
 
+def check_http(r: ProbeResult) -> CheckResult:
     findings: list[Finding] = []
-    banner = None
-    headers: Optional[Dict[str, str]] = None
-    reachable = False
-
-    if args.service == "http":
-        reachable, status_line, http_headers, body_snippet = http_probe(args.target, args.port)
-        headers = http_headers
-        banner = status_line
-
-        if reachable:
-            server = http_headers.get("Server")
-            if server:
-                findings.append(Finding(
-                    title="HTTP Server header observed",
-                    severity="informational",
-                    evidence=f"Server: {server}",
-                ))
-
-            # DVWA fingerprint (best effort)
-            if body_snippet and "Damn Vulnerable Web Application" in body_snippet:
-                findings.append(Finding(
-                    title="DVWA detected (intentionally vulnerable lab target)",
-                    severity="informational",
-                    evidence="Page contains 'Damn Vulnerable Web Application'",
-                ))
-            elif body_snippet and "DVWA" in body_snippet:
-                findings.append(Finding(
-                    title="Possible DVWA instance detected (heuristic)",
-                    severity="low",
-                    evidence="Body snippet contains 'DVWA'",
-                ))
-        else:
+    if not r.reachable:
+        findings.append(Finding(
+            title="HTTP service not reachable",
+            severity="high",
+            evidence=f"Could not connect to {r.target}:{r.port}",
+        ))
+        return False, None, {}, findings
+
+    status_line, headers, body = parse_http(r.data)
+    body_snippet = body[:500].strip() or None
+    findings.extend(_tls_findings(r))
+    server = headers.get("Server")
+    if server:
+        findings.append(Finding(
+            title="HTTP Server header observed",
+            severity="informational",
+            evidence=f"Server: {server}",
+        ))
+
+    # DVWA fingerprint (best effort)
+    if body_snippet and "Damn Vulnerable Web Application" in body_snippet:
+        findings.append(Finding(
+            title="DVWA detected (intentionally vulnerable lab target)",
+            severity="informational",
+            evidence="Page contains 'Damn Vulnerable Web Application'",
+        ))
+    elif body_snippet and "DVWA" in body_snippet:
+        findings.append(Finding(
+            title="Possible DVWA instance detected (heuristic)",
+            severity="low",
+            evidence="Body snippet contains 'DVWA'",
+        ))
+    return True, status_line, headers, findings
+
+
+def check_ftp(r: ProbeResult) -> CheckResult:
+    findings: list[Finding] = []
+    banner = r.banner
+    if banner:
+        findings.append(Finding(
+            title="FTP banner observed",
+            severity="informational",
+            evidence=banner,
+        ))
+        if "vsftpd" in banner.lower() and "2.3.4" in banner:
             findings.append(Finding(
-                title="HTTP service not reachable",
+                title="vsftpd 2.3.4 detected",
                 severity="high",
-                evidence=f"Could not connect to {args.target}:{args.port}",
-            ))
-
-    elif args.service == "ftp":
-        banner = tcp_banner(args.target, args.port)
-        reachable = banner is not None
-        if reachable and banner:
-            findings.append(Finding(
-                title="FTP banner observed",
-                severity="informational",
-                evidence=banner,
+                evidence="This version is associated with CVE-2011-2523 in some distributions.",
             ))
-            if "vsftpd" in banner.lower() and "2.3.4" in banner:
-                findings.append(Finding(
-                    title="vsftpd 2.3.4 detected",
-                    severity="high",
-                    evidence="This version is associated with CVE-2011-2523 in some distributions.",
-                ))
-        else:
-            findings.append(Finding(
-                title="FTP service not reachable or no banner received",
-                severity="medium",
-                evidence=f"Could not read banner from {args.target}:{args.port}",
-            ))
-
-    elif args.service == "mqtt":
-        # Defensive reachability check only: TCP connect
-        try:
-            with socket.create_connection((args.target, args.port), timeout=2.0):
-                reachable = True
-        except Exception:
-            reachable = False
+    else:
+        findings.append(Finding(
+            title="FTP service not reachable or no banner received",
+            severity="medium",
+            evidence=f"Could not read banner from {r.target}:{r.port}",
+        ))
+    return banner is not None, banner, None, findings
 
-        if reachable:
-            findings.append(Finding(
-                title="MQTT broker reachable (TCP connect)",
-                severity="informational",
-                evidence=f"Connected to {args.target}:{args.port}",
-            ))
-        else:
-            findings.append(Finding(
-                title="MQTT broker not reachable",
-                severity="high",
-                evidence=f"Could not connect to {args.target}:{args.port}",
-            ))
 
-    report = Report(
-        target=args.target,
-        port=args.port,
-        service=args.service,
-        timestamp_utc=datetime.utcnow().isoformat(timespec="seconds") + "Z",
+def check_mqtt(r: ProbeResult) -> CheckResult:
+    findings: list[Finding] = []
+    if not r.reachable:
+        findings.append(Finding(
+            title="MQTT broker not reachable",
+            severity="high",
+            evidence=f"Could not connect to {r.target}:{r.port}",
+        ))
+        return False, None, None, findings
+
+    findings.append(Finding(
+        title="MQTT broker reachable (TCP connect)",
+        severity="informational",
+        evidence=f"Connected to {r.target}:{r.port}",
+    ))
+    findings.extend(_tls_findings(r))
+    rc = parse_connack(r.data)
+    if rc == 0:
+        findings.append(Finding(
+            title="MQTT broker accepts anonymous clients",
+            severity="medium",
+            evidence="CONNACK return code 0 for a CONNECT without user name or password",
+        ))
+    elif rc in (4, 5):
+        findings.append(Finding(
+            title="MQTT broker requires authentication",
+            severity="informational",
+            evidence=f"CONNACK return code {rc} ({CONNACK_CODES[rc]})",
+        ))
+    elif rc is not None:
+        findings.append(Finding(
+            title="MQTT broker refused the connection",
+            severity="informational",
+            evidence=f"CONNACK return code {rc} ({CONNACK_CODES.get(rc, 'reserved')})",
+        ))
+    return True, r.banner, None, findings
+
+
+def check_banner(r: ProbeResult) -> CheckResult:
+    """Any other service: report what it announces."""
+    findings: list[Finding] = []
+    banner = r.banner
+    if not r.reachable:
+        findings.append(Finding(
+            title="Service not reachable",
+            severity="informational",
+            evidence=f"Could not connect to {r.target}:{r.port}",
+        ))
+    elif banner:
+        findings.extend(_tls_findings(r))
+        findings.append(Finding(
+            title=f"{r.probe.upper()} banner observed" if r.probe != "generic" else "Service banner observed",
+            severity="informational",
+            evidence=banner,
+        ))
+    return r.reachable, banner, None, findings
+
+
+CHECKS: Dict[str, Callable[[ProbeResult], CheckResult]] = {
+    "http": check_http,
+    "https": check_http,
+    "ftp": check_ftp,
+    "mqtt": check_mqtt,
+    "mqtt-tls": check_mqtt,
+}
+
+
+def build_report(r: ProbeResult, service: str, timestamp_utc: str) -> Report:
+    reachable, banner, headers, findings = CHECKS.get(service, check_banner)(r)
+    return Report(
+        target=r.target,
+        port=r.port,
+        service=service,
+        timestamp_utc=timestamp_utc,
         reachable=reachable,
         banner=banner,
         http_headers=headers,
         findings=findings,
     )
 
-    # Human-readable output
-    print("=" * 72)
-    print("Week 13 - Vulnerability checker (defensive)")
-    print("=" * 72)
+
+def check_services(targets: List[str], ports: List[int], service: str = "auto",
+                   concurrency: int = 50, timeout: float = 3.0) -> List[Report]:
+    """Probe every target/port pair concurrently and build one Report each."""
+    forced = None if service == "auto" else service
+    results = probe_many(((t, p) for t in targets for p in ports), service=forced,
+                         concurrency=concurrency, connect_timeout=timeout, read_timeout=timeout)
+    timestamp_utc = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    return [build_report(r, forced or probe_for(r.port).name, timestamp_utc) for r in results]
+
+
+def report_to_dict(report: Report) -> dict:
+    out = asdict(report)
+    out["findings"] = [asdict(x) for x in report.findings]
+    return out
+
+
+def print_report(report: Report) -> None:
     print(f"Target:  {report.target}")
     print(f"Service: {report.service}")
     print(f"Port:    {report.port}")
@@ -224,9 +262,47 @@ def main() -> int:
             print(f"  - [{f.severity}] {f.title}")
             print(f"    Evidence: {f.evidence}")
 
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Week 13 - Vulnerability checker (defensive)")
+    parser.add_argument("--target", required=True, help="Target host(s), comma-separated, eg 127.0.0.1")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--port", type=int, help="Target port")
+    group.add_argument("--ports", help="Comma-separated ports and ranges, e.g. 8080,2121,1883")
+    parser.add_argument("--service", choices=["auto", "http", "ftp", "mqtt"], default="auto",
+                        help="Service type (default: auto, from the port)")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="Maximum concurrent connections (default: 50)")
+    parser.add_argument("--timeout", type=float, default=3.0,
+                        help="Connect and read timeout in seconds (default: 3.0)")
+    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.target.split(",") if t.strip()]
+    ports = [args.port] if args.port is not None else parse_ports(args.ports)
+    if not targets or not ports:
+        print("No targets or ports given", file=sys.stderr)
+        return 1
+
+    reports = check_services(targets, ports, args.service, args.concurrency, args.timeout)
+
+    # Human-readable output
+    print("=" * 72)
+    print("Week 13 - Vulnerability checker (defensive)")
+    print("=" * 72)
+    for i, report in enumerate(reports):
+        if i:
+            print("-" * 72)
+        print_report(report)
+
     if args.json_out:
-        out = asdict(report)
-        out["findings"] = [asdict(x) for x in report.findings]
+        if len(reports) == 1:
+            out = report_to_dict(reports[0])
+        else:
+            out = {
+                "timestamp_utc": reports[0].timestamp_utc,
+                "reports": [report_to_dict(r) for r in reports],
+            }
         with open(args.json_out, "w", encoding="utf-8") as fp:
             json.dump(out, fp, indent=2)
         print(f"\nJSON report written to: {args.json_out}")
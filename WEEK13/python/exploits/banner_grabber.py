@@ -3,8 +3,12 @@
 
 This script performs *light-weight* service enumeration by:
 - connecting to a TCP port
+- sending the probe the port's service expects (HTTP GET, MQTT CONNECT,
+  nothing for FTP/SMTP/SSH which speak first; see python/utils/service_probes.py)
 - reading the initial banner (when present)
-- optionally sending a minimal HTTP request for HTTP services
+
+All ports (and targets) are probed concurrently, with at most --concurrency
+connections open at once.
 
 It is intended for defensive learning (fingerprinting and exposure analysis).
 It does NOT exploit vulnerabilities.
@@ -17,7 +21,10 @@ Single port:
 Multiple ports:
   python3 python/exploits/banner_grabber.py --target 127.0.0.1 --ports 21,80,1883,8883,2121
 
-HTTP probe:
+Multiple targets:
+  python3 python/exploits/banner_grabber.py --target 10.0.13.11,10.0.13.12,10.0.13.100 --ports 21,80,1883
+
+Force the HTTP probe on every port:
   python3 python/exploits/banner_grabber.py --target 127.0.0.1 --port 8080 --http
 """
 
@@ -25,12 +32,16 @@ from __future__ import annotations
 
 import argparse
 import json
-import socket
+import os
 import sys
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from typing import List, Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+
+from service_probes import ProbeResult, probe_many  # noqa: E402
+
 
 @dataclass
 class BannerResult:
@@ -39,6 +50,7 @@ class BannerResult:
     success: bool
     banner: Optional[str] = None
     error: Optional[str] = None
+    service: Optional[str] = None
 
 
 def parse_ports(spec: str) -> List[int]:
@@ -62,64 +74,60 @@ def parse_ports(spec: str) -> List[int]:
     return out
 
 
+def _to_banner_result(r: ProbeResult) -> BannerResult:
+    if not r.reachable:
+        return BannerResult(target=r.target, port=r.port, success=False, error=r.error, service=r.probe)
+    return BannerResult(target=r.target, port=r.port, success=True, banner=r.banner, service=r.probe)
+
+
+def grab_banners(targets: List[str], ports: List[int], timeout: float = 2.0, http: bool = False,
+                 concurrency: int = 50) -> List[BannerResult]:
+    """Grab the banner of every target/port pair concurrently."""
+    results = probe_many(((t, p) for t in targets for p in ports), service="http" if http else None,
+                         concurrency=concurrency, connect_timeout=timeout, read_timeout=timeout)
+    return [_to_banner_result(r) for r in results]
+
+
 def grab_banner(host: str, port: int, timeout: float = 2.0, http: bool = False) -> BannerResult:
-    try:
-        with socket.create_connection((host, port), timeout=timeout) as s:
-            s.settimeout(timeout)
-            if http:
-                req = (
-                    f"GET / HTTP/1.0\r\n"
-                    f"Host: {host}\r\n"
-                    f"User-Agent: week13-banner-grabber\r\n"
-                    f"Connection: close\r\n\r\n"
-                ).encode()
-                s.sendall(req)
-
-            data = b""
-            while len(data) < 4096:
-                chunk = s.recv(1024)
-                if not chunk:
-                    break
-                data += chunk
-                if b"\n" in data:
-                    break
-
-        banner = data.decode(errors="replace").strip() or None
-        return BannerResult(target=host, port=port, success=True, banner=banner)
-    except Exception as exc:
-        return BannerResult(target=host, port=port, success=False, error=str(exc))
+    return grab_banners([host], [port], timeout=timeout, http=http, concurrency=1)[0]
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Week 13 - Banner grabber (educational)")
-    parser.add_argument("--target", required=True, help="Target host, eg 127.0.0.1")
+    parser.add_argument("--target", required=True, help="Target host(s), comma-separated, eg 127.0.0.1")
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--port", type=int, help="Single TCP port")
     group.add_argument("--ports", help="Comma-separated ports and ranges, e.g. 21,80,1883-1884")
     parser.add_argument("--timeout", type=float, default=2.0, help="Socket timeout in seconds (default: 2.0)")
-    parser.add_argument("--http", action="store_true", help="Send a minimal HTTP request (useful for web services)")
+    parser.add_argument("--http", action="store_true",
+                        help="Send a minimal HTTP request on every port (default: probe chosen by port)")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="Maximum concurrent connections (default: 50)")
     parser.add_argument("--json-out", default=None, help="Optional JSON output path")
     args = parser.parse_args()
 
+    targets = [t.strip() for t in args.target.split(",") if t.strip()]
     ports = [args.port] if args.port is not None else parse_ports(args.ports)
 
-    results = [grab_banner(args.target, p, timeout=args.timeout, http=args.http) for p in ports]
+    results = grab_banners(targets, ports, timeout=args.timeout, http=args.http,
+                           concurrency=args.concurrency)
 
     print("=" * 72)
     print("Week 13 - Banner grabber (educational)")
     print("=" * 72)
     print(f"Target: {args.target}")
     print(f"Ports: {', '.join(str(p) for p in ports)}")
-    print(f"HTTP probe: {args.http}")
+    print(f"HTTP probe: {'all ports' if args.http else 'by port'}")
     print(f"Timeout: {args.timeout}s")
     print()
 
     for r in results:
+        where = f"{r.target}:{r.port}" if len(targets) > 1 else str(r.port)
         if r.success:
             b = r.banner if r.banner else "(no banner)"
-            print(f"[{r.port}] OK  {b}")
+            print(f"[{where}] OK  {b}")
         else:
-            print(f"[{r.port}] ERR {r.error}")
+            print(f"[{where}] ERR {r.error}")
 
     if args.json_out:
         payload = {
@@ -5,6 +5,8 @@ This utility reads artefacts produced by the kit and generates a small Markdown
 summary report.
 
 Inputs (best effort):
+- artifacts/scan_results.sqlite3 (scan store; preferred, adds changes since
+  the previous scan of the same targets)
 - artifacts/scan_results.json
 - artifacts/validation.txt
 
@@ -15,13 +17,18 @@ Output:
 from __future__ import annotations
 
 import json
+import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from scan_store import ScanStore  # noqa: E402
+
 
 ARTIFACTS_DIR = Path(__file__).resolve().parents[2] / "artifacts"
 SCAN_JSON = ARTIFACTS_DIR / "scan_results.json"
+SCAN_DB = ARTIFACTS_DIR / "scan_results.sqlite3"
 VALIDATION_TXT = ARTIFACTS_DIR / "validation.txt"
 REPORT_MD = ARTIFACTS_DIR / "report.md"
 
@@ -43,13 +50,46 @@ def summarise_scan(scan: Dict[str, Any]) -> str:
     hosts = scan.get("hosts", [])
     lines: List[str] = []
     for h in hosts:
-        ip = h.get("ip") or h.get("host") or "unknown"
-        ports = h.get("open_ports", [])
+        ip = h.get("target") or h.get("ip") or h.get("host") or "unknown"
+        ports = [p["port"] if isinstance(p, dict) else p for p in h.get("open_ports", [])]
         ports_str = ", ".join(str(p) for p in ports) if ports else "(none)"
         lines.append(f"- **{ip}** open ports: {ports_str}")
     return "\n".join(lines) if lines else "_No hosts in scan output._"
 
 
+def summarise_store(path: Path) -> Optional[str]:
+    """Open ports of the latest stored scan, and what changed since the previous one.
+
+    Reads only the open rows of the store, however many closed ports it holds.
+    """
+    with ScanStore(str(path)) as store:
+        scans = store.scans()
+        if not scans:
+            return None
+        latest = scans[-1]
+        by_host: Dict[str, List[int]] = {}
+        for row in store.open_ports(latest["id"]):
+            by_host.setdefault(row["host"], []).append(row["port"])
+        status = "complete" if latest["finished"] else "interrupted"
+        lines = [f"Scan {latest['id']} ({status}) of {latest['targets']}, ports {latest['ports']}: "
+                 f"{latest['hosts_done']} host(s), {latest['open']} open, {latest['closed']} closed, "
+                 f"{latest['filtered']} filtered.", ""]
+        lines += [f"- **{host}** open ports: {', '.join(str(p) for p in ports)}"
+                  for host, ports in by_host.items()] or ["_No open ports._"]
+
+        previous = [s for s in scans[:-1]
+                    if s["targets"] == latest["targets"] and s["ports"] == latest["ports"]]
+        if previous:
+            changes = store.diff(previous[-1]["id"], latest["id"])
+            lines += ["", f"Changes since scan {previous[-1]['id']}:", ""]
+            lines += [f"- opened: **{c['host']}** {c['port']}" for c in changes["opened"]]
+            lines += [f"- closed: **{c['host']}** {c['port']} ({c['state_after'] or 'not scanned'})"
+                      for c in changes["closed"]]
+            if not changes["opened"] and not changes["closed"]:
+                lines.append("_No changes in open ports._")
+    return "\n".join(lines)
+
+
 def main() -> int:
     ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -69,7 +109,10 @@ def main() -> int:
     md.append("")
     md.append("## Port scan summary")
     md.append("")
-    if scan:
+    stored = summarise_store(SCAN_DB) if SCAN_DB.exists() else None
+    if stored:
+        md.append(stored)
+    elif scan:
         md.append(summarise_scan(scan))
     else:
         md.append("_No scan_results.json found._")
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Week 13 - Scan result store (SQLite, append-only).
+
+The port scanner writes every probed host/port pair here as results
+arrive, so an interrupted scan keeps what it found and can be resumed, and
+two scans can be compared.
+
+Tables
+------
+- scans:      one row per run: targets, ports, engine, start/finish time and
+              running totals per state (listing never counts result rows)
+- hosts:      host name -> integer id (shared by all scans)
+- scan_hosts: per scan and host: state counts, scan time, duration, done
+- results:    one row per (scan, host, port): state, service, banner, RTT.
+              state is 0/1/2 for open/closed/filtered, or the text of any
+              other state (e.g. "error:OSError"). A partial index covers
+              the open rows; listing open ports and diffing read only that
+              index (INDEXED BY: the planner would otherwise walk the whole
+              scan by primary key), even with millions of closed ports.
+
+Writes are buffered and committed every `batch` rows or `flush_interval`
+seconds (WAL mode), so a crash loses at most that much. Not thread-safe:
+use one ScanStore per thread.
+
+Usage
+-----
+  python3 scan_store.py list  artifacts/scan_results.sqlite3
+  python3 scan_store.py show  artifacts/scan_results.sqlite3 [SCAN] [--host IP] [--limit N]
+  python3 scan_store.py diff  artifacts/scan_results.sqlite3 OLD NEW
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+STATES = ("open", "closed", "filtered")
+_STATE_CODE = {name: code for code, name in enumerate(STATES)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    finished TEXT,
+    targets TEXT NOT NULL,
+    ports TEXT NOT NULL,
+    engine TEXT,
+    open INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0,
+    filtered INTEGER NOT NULL DEFAULT 0,
+    other INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS scan_hosts (
+    scan_id INTEGER NOT NULL,
+    host_id INTEGER NOT NULL,
+    scan_time TEXT,
+    duration REAL NOT NULL DEFAULT 0,
+    open INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0,
+    filtered INTEGER NOT NULL DEFAULT 0,
+    other INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scan_id, host_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS results (
+    scan_id INTEGER NOT NULL,
+    host_id INTEGER NOT NULL,
+    port INTEGER NOT NULL,
+    state,
+    service TEXT,
+    banner TEXT,
+    response_ms REAL,
+    PRIMARY KEY (scan_id, host_id, port)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_open ON results (scan_id, host_id, port) WHERE state = 0;
+"""
+
+def state_name(value: Any) -> str:
+    return STATES[value] if isinstance(value, int) else str(value)
+
+
+class ScanStore:
+    """Append-only SQLite store of port scan results."""
+
+    def __init__(self, path: str, batch: int = 2000, flush_interval: float = 1.0) -> None:
+        self.path = str(path)
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._host_ids: Dict[str, int] = {}
+        self._rows: List[tuple] = []
+        self._finished_hosts: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def new_scan(self, targets: str, ports: str, engine: Optional[str] = None) -> int:
+        cur = self._db.execute(
+            "INSERT INTO scans (started, targets, ports, engine) VALUES (?, ?, ?, ?)",
+            (datetime.now().isoformat(timespec="seconds"), targets, ports, engine))
+        self._db.commit()
+        return cur.lastrowid
+
+    def host_id(self, name: str) -> int:
+        host_id = self._host_ids.get(name)
+        if host_id is None:
+            self._db.execute("INSERT OR IGNORE INTO hosts (name) VALUES (?)", (name,))
+            host_id = self._db.execute("SELECT id FROM hosts WHERE name = ?", (name,)).fetchone()[0]
+            self._host_ids[name] = host_id
+        return host_id
+
+    def _find_host(self, name: str) -> Optional[int]:
+        """Id of a known host, or None (reading never creates hosts)."""
+        host_id = self._host_ids.get(name)
+        if host_id is None:
+            row = self._db.execute("SELECT id FROM hosts WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            host_id = self._host_ids[name] = row[0]
+        return host_id
+
+    def add(self, scan_id: int, host: str, result: Any) -> None:
+        """Record one ScanResult (anything with port/state/service/banner/response_time_ms)."""
+        host_id = self.host_id(host)
+        code = _STATE_CODE.get(result.state, result.state)
+        self._rows.append((scan_id, host_id, result.port, code, result.service, result.banner,
+                           result.response_time_ms))
+        if len(self._rows) >= self.batch or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def host_done(self, scan_id: int, result: Any) -> None:
+        """Record that a host finished (a HostScanResult): scan time and duration."""
+        self._finished_hosts.append((scan_id, self.host_id(result.target), result.scan_time,
+                                     result.duration_seconds))
+
+    def flush(self) -> None:
+        """Commit buffered rows and update the per-host and per-scan counters.
+
+        Rows go in one by one so that a duplicate (scan, host, port), e.g.
+        re-probed after a resume, is skipped by INSERT OR IGNORE and left out
+        of the counters.
+        """
+        db = self._db
+        if self._rows:
+            insert = db.execute
+            counts_by_host: Dict[Tuple[int, int], List[int]] = {}
+            for row in self._rows:
+                if insert("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", row).rowcount != 1:
+                    continue
+                counts = counts_by_host.get(row[:2])
+                if counts is None:
+                    counts = counts_by_host[row[:2]] = [0, 0, 0, 0]
+                counts[row[3] if isinstance(row[3], int) else 3] += 1
+            totals: Dict[int, List[int]] = {}
+            for (scan_id, host_id), counts in counts_by_host.items():
+                db.execute(
+                    "INSERT INTO scan_hosts (scan_id, host_id, open, closed, filtered, other) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (scan_id, host_id) DO UPDATE SET "
+                    "open = open + excluded.open, closed = closed + excluded.closed, "
+                    "filtered = filtered + excluded.filtered, other = other + excluded.other",
+                    (scan_id, host_id, *counts))
+                total = totals.setdefault(scan_id, [0, 0, 0, 0])
+                for i, n in enumerate(counts):
+                    total[i] += n
+            for scan_id, t in totals.items():
+                db.execute("UPDATE scans SET open = open + ?, closed = closed + ?, "
+                           "filtered = filtered + ?, other = other + ? WHERE id = ?", (*t, scan_id))
+        for scan_id, host_id, scan_time, duration in self._finished_hosts:
+            db.execute(
+                "INSERT INTO scan_hosts (scan_id, host_id, scan_time, duration, done) VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (scan_id, host_id) DO UPDATE SET "
+                "scan_time = coalesce(scan_time, excluded.scan_time), "
+                "duration = duration + excluded.duration, done = 1",
+                (scan_id, host_id, scan_time, duration))
+        db.commit()
+        self._rows.clear()
+        self._finished_hosts.clear()
+        self._last_flush = time.monotonic()
+
+    def finish(self, scan_id: int) -> None:
+        self.flush()
+        self._db.execute("UPDATE scans SET finished = ? WHERE id = ?",
+                         (datetime.now().isoformat(timespec="seconds"), scan_id))
+        self._db.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def __enter__(self) -> "ScanStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def scans(self) -> List[Dict[str, Any]]:
+        cur = self._db.execute(
+            "SELECT s.id, s.started, s.finished, s.targets, s.ports, s.engine, s.open, s.closed, "
+            "s.filtered, s.other, (SELECT COUNT(*) FROM scan_hosts h WHERE h.scan_id = s.id AND h.done) "
+            "FROM scans s ORDER BY s.id")
+        keys = ("id", "started", "finished", "targets", "ports", "engine", "open", "closed",
+                "filtered", "other", "hosts_done")
+        return [dict(zip(keys, row)) for row in cur]
+
+    def scan(self, scan_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """One scan by id, or the latest one."""
+        rows = self.scans()
+        if scan_id is None:
+            return rows[-1] if rows else None
+        return next((s for s in rows if s["id"] == scan_id), None)
+
+    def latest_unfinished(self) -> Optional[int]:
+        row = self._db.execute("SELECT max(id) FROM scans WHERE finished IS NULL").fetchone()
+        return row[0]
+
+    def scanned_ports(self, scan_id: int, host: str) -> set:
+        """Ports of `host` already recorded in scan `scan_id` (to resume)."""
+        self.flush()
+        host_id = self._find_host(host)
+        if host_id is None:
+            return set()
+        return {port for (port,) in self._db.execute(
+            "SELECT port FROM results WHERE scan_id = ? AND host_id = ?", (scan_id, host_id))}
+
+    def finished_hosts(self, scan_id: int) -> set:
+        self.flush()
+        return {name for (name,) in self._db.execute(
+            "SELECT h.name FROM scan_hosts s JOIN hosts h ON h.id = s.host_id "
+            "WHERE s.scan_id = ? AND s.done", (scan_id,))}
+
+    def open_ports(self, scan_id: int, host: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Open ports ordered by host id and port (reads the partial index only)."""
+        self.flush()
+        sql = ("SELECT h.name, r.port, r.service, r.banner, r.response_ms FROM results r INDEXED BY results_open "
+               "JOIN hosts h ON h.id = r.host_id WHERE r.scan_id = ? AND r.state = 0")
+        params: tuple = (scan_id,)
+        if host is not None:
+            host_id = self._find_host(host)
+            if host_id is None:
+                return
+            sql += " AND r.host_id = ?"
+            params += (host_id,)
+        sql += " ORDER BY r.host_id, r.port"
+        keys = ("host", "port", "service", "banner", "response_ms")
+        for row in self._db.execute(sql, params):
+            yield dict(zip(keys, row))
+
+    def host_summaries(self, scan_id: int) -> List[Dict[str, Any]]:
+        """Per-host counts, scan time and duration, in first-seen order."""
+        self.flush()
+        cur = self._db.execute(
+            "SELECT h.name, s.scan_time, s.duration, s.open, s.closed, s.filtered, s.other, s.done "
+            "FROM scan_hosts s JOIN hosts h ON h.id = s.host_id WHERE s.scan_id = ? ORDER BY s.host_id",
+            (scan_id,))
+        keys = ("host", "scan_time", "duration", "open", "closed", "filtered", "other", "done")
+        return [dict(zip(keys, row)) for row in cur]
+
+    def diff(self, old: int, new: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Ports whose open state changed between two scans.
+
+        opened: open in `new`, not open in `old` (state_before is None if
+                `old` never probed the pair)
+        closed: open in `old`, not open in `new` (state_after is None if
+                `new` never probed the pair, e.g. an interrupted scan)
+        """
+        self.flush()
+        sql = ("SELECT h.name, a.port, b.state FROM results a INDEXED BY results_open "
+               "JOIN hosts h ON h.id = a.host_id "
+               "LEFT JOIN results b ON b.scan_id = ? AND b.host_id = a.host_id AND b.port = a.port "
+               "WHERE a.scan_id = ? AND a.state = 0 AND (b.state IS NULL OR b.state != 0) "
+               "ORDER BY a.host_id, a.port")
+        opened = [{"host": h, "port": p, "state_before": None if s is None else state_name(s)}
+                  for h, p, s in self._db.execute(sql, (old, new))]
+        closed = [{"host": h, "port": p, "state_after": None if s is None else state_name(s)}
+                  for h, p, s in self._db.execute(sql, (new, old))]
+        return {"opened": opened, "closed": closed}
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def _print_scans(store: ScanStore) -> None:
+    print(f"{'id':>4}  {'started':<19}  {'status':<8} {'hosts':>7} {'open':>7} {'closed':>10} "
+          f"{'filtered':>9}  targets / ports")
+    for s in store.scans():
+        status = "done" if s["finished"] else "partial"
+        print(f"{s['id']:>4}  {s['started']:<19}  {status:<8} {s['hosts_done']:>7} {s['open']:>7} "
+              f"{s['closed']:>10} {s['filtered']:>9}  {s['targets']} / {s['ports']}")
+
+
+def _print_open(store: ScanStore, scan_id: int, host: Optional[str], limit: Optional[int]) -> None:
+    shown = 0
+    for row in store.open_ports(scan_id, host):
+        if limit is not None and shown >= limit:
+            print("  ...")
+            break
+        banner = f"  {row['banner'][:50]}" if row["banner"] else ""
+        print(f"  {row['host']:<15} {row['port']:>5}/tcp  {row['service'] or 'unknown':<15}{banner}")
+        shown += 1
+
+
+def _print_diff(changes: Dict[str, List[Dict[str, Any]]], old: int, new: int) -> None:
+    print(f"Changes from scan {old} to scan {new}:")
+    for row in changes["opened"]:
+        before = row["state_before"] or "not scanned"
+        print(f"  + {row['host']:<15} {row['port']:>5}/tcp  opened (was {before})")
+    for row in changes["closed"]:
+        after = row["state_after"] or "not scanned"
+        print(f"  - {row['host']:<15} {row['port']:>5}/tcp  no longer open (now {after})")
+    if not changes["opened"] and not changes["closed"]:
+        print("  (no changes in open ports)")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and compare stored port scans")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("list", help="List scans with their totals")
+    p.add_argument("store")
+    p = sub.add_parser("show", help="Open ports of a scan (default: latest)")
+    p.add_argument("store")
+    p.add_argument("scan", type=int, nargs="?")
+    p.add_argument("--host")
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("diff", help="Ports opened or closed between two scans")
+    p.add_argument("store")
+    p.add_argument("old", type=int)
+    p.add_argument("new", type=int)
+    args = parser.parse_args(argv)
+
+    with ScanStore(args.store) as store:
+        if args.cmd == "list":
+            _print_scans(store)
+        elif args.cmd == "show":
+            scan = store.scan(args.scan)
+            if scan is None:
+                print("No such scan.")
+                return 1
+            print(f"Scan {scan['id']} ({scan['targets']} / {scan['ports']}): {scan['open']} open, "
+                  f"{scan['closed']} closed, {scan['filtered']} filtered")
+            _print_open(store, scan["id"], args.host, args.limit)
+        else:
+            _print_diff(store.diff(args.old, args.new), args.old, args.new)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ Features:
 Usage:
   python3 ex_14_03.py --challenge echo      # Challenge: extended echo protocol
   python3 ex_14_03.py --challenge analyze   # Challenge: pcap analysis
+  python3 ex_14_03.py --challenge analyze --pcap artifacts/demo.pcap  # Reference analyser
   python3 ex_14_03.py --challenge benchmark # Challenge: HTTP benchmark
 """
 
@@ -24,6 +25,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
+# Local utility import
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from python.utils.pcap_reader import format_tcp_flags, read_flows  # noqa: E402
+
 # ============================================================================
 # CHALLENGE 1: Extended Echo Protocol
 # ============================================================================
@@ -120,10 +128,98 @@ Bonus:
 # CHALLENGE 2: PCAP Analysis
 # ============================================================================
 
-def challenge_analyze_pcap():
+# A source that sends SYN-only flows to this many ports of one host is a likely port scan
+PORT_SCAN_MIN_PORTS = 20
+
+
+def analyze_pcap(filepath: str) -> Dict[str, Any]:
+    """
+    Analyses a pcap/pcapng file and returns statistics.
+
+    Reference solution: the capture is streamed through the flow table of
+    python/utils/pcap_reader.py (mmap, fixed header offsets, no per-packet
+    objects), and every statistic below is derived from the flows.
+    """
+    table = read_flows(filepath)
+
+    # SYN but never an ACK from the client side: the handshake never completed
+    syn_only: Dict[Tuple[bytes, bytes], set] = {}
+    for (proto, src, _sport, dst, dport), f in table.flows.items():
+        if proto == 6 and f[4] & 0x12 == 0x02:
+            syn_only.setdefault((src, dst), set()).add(dport)
+    scans = [{"src": _ip(src), "dst": _ip(dst), "ports": len(ports)}
+             for (src, dst), ports in syn_only.items() if len(ports) >= PORT_SCAN_MIN_PORTS]
+
+    return {
+        "packets": table.packets,
+        "bytes": table.bytes,
+        "duration_s": round(table.duration, 6),
+        "protocols": table.protocol_counts(),
+        "src_ips": table.top_sources(5),
+        "dst_ports": table.top_dst_ports(5),
+        "tcp_conversations": table.tcp_conversations(),
+        "flows": len(table.flows),
+        "top_flows": [f._asdict() for f in table.top_flows(5)],
+        "possible_port_scans": sorted(scans, key=lambda s: -s["ports"]),
+        "truncated": table.truncated,
+    }
+
+
+def _ip(raw: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+def _endpoint(ip: str, port: int) -> str:
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+
+
+def print_pcap_report(filepath: str, stats: Dict[str, Any], elapsed: float) -> None:
+    print("\n" + "=" * 60)
+    print(f"  PCAP Analysis: {filepath}")
+    print("=" * 60)
+    print(f"  Packets:   {stats['packets']}")
+    print(f"  Bytes:     {stats['bytes']}")
+    print(f"  Duration:  {stats['duration_s']:.3f} s")
+    print(f"  Flows:     {stats['flows']} (TCP conversations: {stats['tcp_conversations']})")
+    print("\n  Packets per protocol:")
+    for name, count in stats["protocols"].items():
+        print(f"    {name:<10} {count:>10}")
+    print("\n  Top 5 source IP addresses:")
+    for ip, count in stats["src_ips"]:
+        print(f"    {ip:<40} {count:>10}")
+    print("\n  Top 5 destination ports:")
+    for port, count in stats["dst_ports"]:
+        print(f"    {port:<12} {count:>10}")
+    print("\n  Top 5 flows by bytes:")
+    for f in stats["top_flows"]:
+        flags = format_tcp_flags(f["tcp_flags"]) if f["proto"] == "TCP" else ""
+        print(f"    {f['proto']:<5} {_endpoint(f['src'], f['sport'])} -> {_endpoint(f['dst'], f['dport'])}  "
+              f"{f['packets']} pkts, {f['bytes']} B, {f['last'] - f['first']:.3f} s {flags}")
+    if stats["possible_port_scans"]:
+        print("\n  Possible port scans (SYN-only flows):")
+        for scan in stats["possible_port_scans"]:
+            print(f"    {scan['src']} -> {scan['dst']}: {scan['ports']} ports")
+    print(f"\n  Analysed in {elapsed:.2f} s ({stats['packets'] / max(elapsed, 1e-9):,.0f} packets/s)")
+
+
+def challenge_analyze_pcap(pcap: Optional[str] = None):
     """
     Challenge: Implement a simple pcap analyser.
+
+    With a pcap file, runs the reference analyser (analyze_pcap) on it.
     """
+    if pcap:
+        if not Path(pcap).is_file():
+            print(f"PCAP missing: {pcap}")
+            return 1
+        start = time.perf_counter()
+        try:
+            stats = analyze_pcap(pcap)
+        except ValueError as e:
+            print(f"Cannot analyse {pcap}: {e}")
+            return 1
+        print_pcap_report(pcap, stats, time.perf_counter() - start)
+        return 0
     
     print("\n" + "=" * 60)
     print("  Challenge: PCAP Analysis")
@@ -398,7 +494,7 @@ def main() -> int:
     if args.challenge == "echo":
         return challenge_echo_protocol()
     elif args.challenge == "analyze":
-        return challenge_analyze_pcap()
+        return challenge_analyze_pcap(args.pcap)
     elif args.challenge == "benchmark":
         return challenge_benchmark()
     else:
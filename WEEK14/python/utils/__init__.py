@@ -5,6 +5,7 @@ Computer Networks — CSIE/ASE
 
 Available modules:
   - net_utils: helper functions for networking
+  - pcap_reader: streaming pcap/pcapng reader with a 5-tuple flow table
 """
 
 from .net_utils import (
@@ -38,6 +39,13 @@ from .net_utils import (
     # Logging
     setup_logging,
 )
+from .pcap_reader import (
+    Flow,
+    FlowTable,
+    format_tcp_flags,
+    iter_records,
+    read_flows,
+)
 
 __version__ = "1.0.0"
 __all__ = [
@@ -62,4 +70,9 @@ __all__ = [
     "get_timestamp",
     "get_timestamp_filename",
     "setup_logging",
+    "Flow",
+    "FlowTable",
+    "format_tcp_flags",
+    "iter_records",
+    "read_flows",
 ]
@@ -16,12 +16,28 @@ INTERACTIVE USAGE:
   < COUNT_RESP: 1
   > keys
   < KEYS_RESP: ['name']
+  > mset a 1 b 2
+  < MSET_RESP: 2
+  > mget a b zz
+  < MGET_RESP: ['1', '2', None]
+  > mdel a zz
+  < MDEL_RESP: 1
+  > scan 1000
+  < SCAN_RESP: ['b', 'name']
   > quit
 
 SCRIPTED USAGE:
 -----------------------
   python3 binary_proto_client.py --host localhost --port 5401 \\
       --command "put name Alice" --command "get name"
+
+PIPELINING:
+-----------
+  BinaryClient.pipeline() tine pana to `window` cereri in zbor and
+  potriveste raspunsurile dupa seq:
+
+    client.put_many([("k1", "v1"), ("k2", "v2")], window=64)
+    client.get_many(["k1", "k2"], window=64)
 """
 from __future__ import annotations
 
@@ -29,22 +45,33 @@ import argparse
 import socket
 import struct
 import sys
+from collections import deque
+from typing import Iterable, Iterator
 
 # Add utils directory to path
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0] + '/utils')
-from io_utils import recv_exact
 from proto_common import (
-    BIN_HEADER_LEN,
     TYPE_ECHO_REQ, TYPE_ECHO_RESP,
     TYPE_PUT_REQ, TYPE_PUT_RESP,
     TYPE_GET_REQ, TYPE_GET_RESP,
     TYPE_COUNT_REQ, TYPE_COUNT_RESP,
     TYPE_KEYS_REQ, TYPE_KEYS_RESP,
+    TYPE_MSET_REQ, TYPE_MSET_RESP,
+    TYPE_MGET_REQ, TYPE_MGET_RESP,
+    TYPE_MDEL_REQ, TYPE_MDEL_RESP,
+    TYPE_SCAN_REQ, TYPE_SCAN_RESP,
     TYPE_ERR,
-    unpack_bin_header, pack_bin_message, validate_bin_message,
-    encode_kv, encode_key
+    pack_bin_message, validate_bin_message, split_bin_frames,
+    encode_kv, encode_key, encode_keys, encode_kvs, decode_values,
+    encode_scan_req, decode_scan_resp
 )
 
+RECV_SIZE = 65536
+# Limita of bytes of cereri neconfirmate: peste ea clientul asteapta
+# raspunsuri inainte sa trimita, ca niciun capat sa nu ramana blocat in
+# sendall cu bufferele TCP pline
+MAX_INFLIGHT_BYTES = 64 * 1024
+
 
 class BinaryClient:
     """Client for protocolul binar."""
@@ -54,6 +81,8 @@ class BinaryClient:
         self.port = port
         self.conn: socket.socket | None = None
         self.seq = 0
+        self._rbuf = bytearray()
+        self._ready: deque = deque()
     
     def connect(self) -> None:
         """Stabileste conexiunea."""
@@ -68,12 +97,39 @@ class BinaryClient:
             except Exception:
                 pass
             self.conn = None
+        self._rbuf.clear()
+        self._ready.clear()
     
     def _next_seq(self) -> int:
         """Returns urmatorul sequence number."""
-        self.seq += 1
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
         return self.seq
     
+    def _recv_frame(self) -> tuple[int, int, bytes]:
+        """
+        Returns urmatorul raspuns (seq, type, payload).
+        
+        Citim in blocuri of RECV_SIZE: un singur recv poate aduce mai multe
+        raspunsuri, care asteapta in self._ready.
+        """
+        while not self._ready:
+            frames, consumed = split_bin_frames(self._rbuf)
+            del self._rbuf[:consumed]
+            self._ready.extend(frames)
+            if frames:
+                break
+            chunk = self.conn.recv(RECV_SIZE)
+            if not chunk:
+                raise ConnectionError("peer closed connection")
+            self._rbuf += chunk
+        
+        header, payload = self._ready.popleft()
+        if not header.is_valid_protocol():
+            raise ValueError("Response protocol mismatch")
+        if not validate_bin_message(header, payload):
+            raise ValueError("Response CRC mismatch")
+        return header.seq, header.mtype, payload
+    
     def _send_recv(self, mtype: int, payload: bytes) -> tuple[int, bytes]:
         """
         Send a message and primeste raspunsul.
@@ -89,22 +145,89 @@ class BinaryClient:
         msg = pack_bin_message(mtype, payload, seq)
         self.conn.sendall(msg)
         
-        # Receive header response
-        header_bytes = recv_exact(self.conn, BIN_HEADER_LEN)
-        header = unpack_bin_header(header_bytes)
+        # Receive raspunsul (header + payload, CRC verificat)
+        resp_seq, rtype, resp_payload = self._recv_frame()
         
-        # Receive payload
-        resp_payload = recv_exact(self.conn, header.payload_len)
+        # Verifym seq (optional)
+        if resp_seq != seq:
+            print(f"Warning: seq mismatch (expected {seq}, got {resp_seq})")
         
-        # Verifym CRC
-        if not validate_bin_message(header, resp_payload):
-            raise ValueError("Response CRC mismatch")
+        return rtype, resp_payload
+    
+    def pipeline(
+        self,
+        requests: Iterable[tuple[int, bytes]],
+        window: int = 32
+    ) -> list[tuple[int, bytes]]:
+        """
+        Send cererile fara sa astepte fiecare raspuns.
         
-        # Verifym seq (optional)
-        if header.seq != seq:
-            print(f"Warning: seq mismatch (expected {seq}, got {header.seq})")
+        Tine pana to `window` cereri neconfirmate (and cel mult
+        MAX_INFLIGHT_BYTES), trimite cererile noi grupate intr-un singur
+        sendall and potriveste raspunsurile dupa seq. window=1 este
+        echivalent cu _send_recv in bucla.
+        
+        Returns:
+            Lista of (response_type, response_payload), in ordinea cererilor
+        """
+        if not self.conn:
+            raise ConnectionError("Not connected")
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        
+        results: list[tuple[int, bytes] | None] = []
+        pending: dict[int, tuple[int, int]] = {}  # seq -> (index, size)
+        inflight = 0
+        todo = iter(requests)
+        exhausted = False
         
-        return header.mtype, resp_payload
+        while True:
+            batch = []
+            while not exhausted and len(pending) < window and (not pending or inflight < MAX_INFLIGHT_BYTES):
+                try:
+                    mtype, payload = next(todo)
+                except StopIteration:
+                    exhausted = True
+                    break
+                seq = self._next_seq()
+                msg = pack_bin_message(mtype, payload, seq)
+                pending[seq] = (len(results), len(msg))
+                inflight += len(msg)
+                results.append(None)
+                batch.append(msg)
+            
+            if batch:
+                self.conn.sendall(b"".join(batch))
+            if not pending:
+                break
+            
+            resp_seq, rtype, resp_payload = self._recv_frame()
+            try:
+                index, size = pending.pop(resp_seq)
+            except KeyError:
+                raise ValueError(f"Unexpected response seq {resp_seq}") from None
+            inflight -= size
+            results[index] = (rtype, resp_payload)
+        
+        return results
+    
+    def put_many(self, items: Iterable[tuple[str, str]], window: int = 32) -> int:
+        """Stocheaza perechile pipelined. Returns number of PUT-uri reusite."""
+        requests = ((TYPE_PUT_REQ, encode_kv(k, v)) for k, v in items)
+        return sum(1 for rtype, _ in self.pipeline(requests, window) if rtype == TYPE_PUT_RESP)
+    
+    def get_many(self, keys: Iterable[str], window: int = 32) -> list[str | None]:
+        """Returns valorile cheilor (None daca nu exista), pipelined."""
+        requests = ((TYPE_GET_REQ, encode_key(k)) for k in keys)
+        values = []
+        for rtype, resp in self.pipeline(requests, window):
+            if rtype == TYPE_GET_RESP:
+                values.append(resp.decode("utf-8"))
+            elif rtype == TYPE_ERR and b"not_found" in resp:
+                values.append(None)
+            else:
+                raise RuntimeError(f"Server error: {resp.decode()}")
+        return values
     
     def echo(self, data: bytes) -> bytes:
         """Send ECHO and returns raspunsul."""
@@ -162,11 +285,72 @@ class BinaryClient:
             offset += klen
         
         return keys
+    
+    def _expect(self, mtype: int, payload: bytes, resp_type: int) -> bytes:
+        """_send_recv + verificarea tipului raspunsului."""
+        rtype, resp = self._send_recv(mtype, payload)
+        if rtype == TYPE_ERR:
+            raise RuntimeError(f"Server error: {resp.decode()}")
+        if rtype != resp_type:
+            raise RuntimeError(f"Unexpected response type {rtype}")
+        return resp
+    
+    def mset(self, items: Iterable[tuple[str, str]]) -> int:
+        """Stocheaza mai multe perechi intr-un singur mesaj. Returns cate."""
+        resp = self._expect(TYPE_MSET_REQ, encode_kvs(items), TYPE_MSET_RESP)
+        return struct.unpack("!I", resp)[0]
+    
+    def mget(self, keys: list[str]) -> list[str | None]:
+        """Valorile cheilor intr-un singur mesaj (None daca lipseste)."""
+        return decode_values(self._expect(TYPE_MGET_REQ, encode_keys(keys), TYPE_MGET_RESP))
+    
+    def mdel(self, keys: list[str]) -> int:
+        """Sterge mai multe chei. Returns cate existau."""
+        resp = self._expect(TYPE_MDEL_REQ, encode_keys(keys), TYPE_MDEL_RESP)
+        return struct.unpack("!I", resp)[0]
+    
+    def scan(self, cursor: bytes = b"", count: int = 1000) -> tuple[list[str], bytes]:
+        """
+        O pagina of chei sortate. Returns (chei, cursor urmator); cursorul
+        gol inseamna ca nu mai sunt chei.
+        """
+        resp = self._expect(TYPE_SCAN_REQ, encode_scan_req(count, cursor), TYPE_SCAN_RESP)
+        next_cursor, keys = decode_scan_resp(resp)
+        return keys, next_cursor
+    
+    def iter_keys(self, count: int = 1000) -> Iterator[str]:
+        """Toate cheile, pagina cu pagina (merge si peste 65535 of chei)."""
+        cursor = b""
+        while True:
+            keys, cursor = self.scan(cursor, count)
+            yield from keys
+            if not cursor:
+                return
+
+
+MULTI_COMMANDS = ("mset", "mget", "mdel", "scan")
+
+
+def run_multi_command(client: BinaryClient, parts: list[str]):
+    """mset/mget/mdel/scan; parts = linia impartita dupa spatii."""
+    cmd, args = parts[0].lower(), parts[1:]
+    if cmd == "mset":
+        if not args or len(args) % 2:
+            raise ValueError("Usage: mset <key> <value> [<key> <value>...]")
+        return client.mset(zip(args[0::2], args[1::2]))
+    if cmd in ("mget", "mdel") and not args:
+        raise ValueError(f"Usage: {cmd} <key> [<key>...]")
+    if cmd == "mget":
+        return client.mget(args)
+    if cmd == "mdel":
+        return client.mdel(args)
+    return list(client.iter_keys(int(args[0]) if args else 1000))
 
 
 def interactive_mode(client: BinaryClient) -> None:
     """Mod interactiv."""
-    print("Connected! Commands: echo <data>, put <key> <value>, get <key>, count, keys, quit")
+    print("Connected! Commands: echo <data>, put <key> <value>, get <key>, count, keys,")
+    print("          mset <k> <v> [<k> <v>...], mget <k>..., mdel <k>..., scan [<page>], quit")
     print()
     
     while True:
@@ -219,6 +403,9 @@ def interactive_mode(client: BinaryClient) -> None:
                 ks = client.keys()
                 print(f"< KEYS_RESP: {ks}")
             
+            elif cmd in MULTI_COMMANDS:
+                print(f"< {cmd.upper()}_RESP: {run_multi_command(client, line.split())}")
+            
             else:
                 print(f"Unknown command: {cmd}")
                 
@@ -268,6 +455,9 @@ def command_mode(client: BinaryClient, commands: list[str], verbose: bool) -> in
             elif cmd == "keys":
                 print(client.keys())
             
+            elif cmd in MULTI_COMMANDS:
+                print(run_multi_command(client, cmd_line.split()))
+            
             else:
                 print(f"Unknown: {cmd}")
                 errors += 1
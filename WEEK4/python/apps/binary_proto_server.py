@@ -4,7 +4,7 @@ Server TCP with protocol binar (header fix + CRC32).
 
 PROTOCOL:
 ---------
-Header (14 bytes):
+Header v1 (14 bytes):
   +--------+--------+--------+--------+--------+--------+
   | magic  |version | type   |payload_len| seq  | crc32  |
   | 2B     | 1B     | 1B     | 2B       | 4B   | 4B     |
@@ -17,12 +17,17 @@ Header (14 bytes):
   seq: sequence number for corelatie request-response
   crc32: checksum peste header (fara crc) + payload
 
+Header v2 (16 bytes): identic, dar payload_len are 4 bytes (payload > 64 KiB).
+Serverul raspunde cu v1 ori of cate ori raspunsul incape in 64 KiB.
+
 Payload (variabil):
   - For PUT: key_len(1B) + key(N) + value(M)
   - For GET: key_len(1B) + key(N)
   - For ECHO: orice bytes
   - For COUNT: gol
   - For KEYS: gol
+  - For MSET/MGET/MDEL/SCAN: vezi proto_common (count + elemente cu prefix
+    of lungime)
 
 TIPURI DE MESAJE:
 -----------------
@@ -31,6 +36,10 @@ TIPURI DE MESAJE:
   GET_REQ(5)    → GET_RESP(6): returns valoarea
   COUNT_REQ(9)  → COUNT_RESP(10): number of of keys
   KEYS_REQ(7)   → KEYS_RESP(8): lista cheilor
+  MSET_REQ(11)  → MSET_RESP(12): stocheaza mai multe perechi
+  MGET_REQ(13)  → MGET_RESP(14): valorile mai multor chei
+  MDEL_REQ(15)  → MDEL_RESP(16): sterge mai multe chei
+  SCAN_REQ(17)  → SCAN_RESP(18): o pagina of chei + cursor for urmatoarea
   ERROR(255)    → eroare
 
 DE CE ACEST DESIGN:
@@ -39,6 +48,8 @@ DE CE ACEST DESIGN:
 - Overhead mai mic decat text for volume mari
 - CRC32 detects transmission errors
 - Big-endian (network byte order) for interoperabilitate
+- Campul seq permite pipelining: clientul trimite mai multe cereri fara
+  sa astepte, serverul raspunde in ordine and clientul le potriveste dupa seq
 
 UTILIZARE:
 ----------
@@ -51,93 +62,106 @@ import socket
 import threading
 import struct
 import sys
-from typing import Dict, Tuple
+from typing import Tuple
 
 # Add utils directory to path
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0] + '/utils')
-from io_utils import recv_exact
 from proto_common import (
-    BIN_HEADER_LEN, BIN_MAGIC, BIN_VERSION,
+    bin_header_len,
     TYPE_ECHO_REQ, TYPE_ECHO_RESP,
     TYPE_PUT_REQ, TYPE_PUT_RESP,
     TYPE_GET_REQ, TYPE_GET_RESP,
     TYPE_COUNT_REQ, TYPE_COUNT_RESP,
     TYPE_KEYS_REQ, TYPE_KEYS_RESP,
+    TYPE_MSET_REQ, TYPE_MSET_RESP,
+    TYPE_MGET_REQ, TYPE_MGET_RESP,
+    TYPE_MDEL_REQ, TYPE_MDEL_RESP,
+    TYPE_SCAN_REQ, TYPE_SCAN_RESP,
     TYPE_ERR,
     unpack_bin_header, pack_bin_message, validate_bin_message,
-    decode_kv, decode_key
+    split_bin_frames, decode_kv, decode_key,
+    decode_keys, decode_kvs, encode_values,
+    decode_scan_req, encode_scan_resp
 )
+from kv_store import DEFAULT_SHARDS, ShardedStore
+
+
+RECV_SIZE = 65536
 
 
 def handle_client(
     conn: socket.socket,
     addr: Tuple[str, int],
-    state: Dict[str, str],
-    lock: threading.Lock,
+    store: ShardedStore,
     verbose: bool
 ) -> None:
     """
     Handle comunicarea with un singur client.
     
-    Loop of procesare mesaje:
-    1. Citim header (14 bytes)
-    2. Validam magic and version
-    3. Citim payload (payload_len bytes)
-    4. Verifym CRC
-    5. Process comanda
-    6. Sendm response
+    Loop of procesare mesaje (pipelining):
+    1. Citim tot ce a sosit (pana to RECV_SIZE bytes) in buffer
+    2. Extragem toate mesajele complete (split_bin_frames)
+    3. Validam magic/version and CRC for fiecare
+    4. Process comenzile in ordine
+    5. Sendm toate raspunsurile cu un singur sendall
+    6. Pastram restul incomplet for urmatorul recv
+    
+    Un client care asteapta fiecare raspuns primeste exact ca inainte;
+    un client care trimite N cereri fara sa astepte primeste raspunsurile
+    grupate, cu un singur syscall of send per citire.
     """
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     with conn:
         if verbose:
             print(f"[BIN] + connected {addr[0]}:{addr[1]}")
         
+        buf = bytearray()
         try:
             while True:
-                # 1. Citim header
-                try:
-                    header_bytes = recv_exact(conn, BIN_HEADER_LEN)
-                except ConnectionError:
+                # 1. Citim ce a sosit
+                chunk = conn.recv(RECV_SIZE)
+                if not chunk:
                     break
+                buf += chunk
                 
-                # 2. Parsam header
-                try:
-                    header = unpack_bin_header(header_bytes)
-                except Exception as e:
-                    if verbose:
-                        print(f"[BIN] ! invalid header from {addr}: {e}")
-                    break
+                # 2. Extragem mesajele complete
+                frames, consumed = split_bin_frames(buf)
+                del buf[:consumed]
                 
-                # 3. Validam protocol
-                if not header.is_valid_protocol():
+                responses = []
+                closing = False
+                for header, payload in frames:
+                    # 3. Validam protocol
+                    if not header.is_valid_protocol():
+                        if verbose:
+                            print(f"[BIN] ! protocol mismatch from {addr}")
+                        responses.append(pack_bin_message(TYPE_ERR, b"bad_protocol", header.seq))
+                        closing = True
+                        break
+                    
+                    # Verifym CRC
+                    if not validate_bin_message(header, payload):
+                        if verbose:
+                            print(f"[BIN] ! CRC mismatch from {addr}")
+                        responses.append(pack_bin_message(TYPE_ERR, b"crc_mismatch", header.seq))
+                        continue
+                    
                     if verbose:
-                        print(f"[BIN] ! protocol mismatch from {addr}")
-                    resp = pack_bin_message(TYPE_ERR, b"bad_protocol", header.seq)
-                    conn.sendall(resp)
-                    break
-                
-                # 4. Citim payload
-                payload = recv_exact(conn, header.payload_len)
-                
-                # 5. Verifym CRC
-                if not validate_bin_message(header, payload):
+                        print(f"[BIN] < {addr[0]}:{addr[1]}: type={header.type_name} seq={header.seq} len={header.payload_len}")
+                    
+                    # 4. Process comanda
+                    resp = process_request(header.mtype, header.seq, payload, store)
+                    responses.append(resp)
+                    
                     if verbose:
-                        print(f"[BIN] ! CRC mismatch from {addr}")
-                    resp = pack_bin_message(TYPE_ERR, b"crc_mismatch", header.seq)
-                    conn.sendall(resp)
-                    continue
-                
-                if verbose:
-                    print(f"[BIN] < {addr[0]}:{addr[1]}: type={header.type_name} seq={header.seq} len={header.payload_len}")
-                
-                # 6. Process comanda
-                resp = process_request(header.mtype, header.seq, payload, state, lock)
-                
-                # 7. Sendm response
-                conn.sendall(resp)
+                        resp_header = unpack_bin_header(resp[:bin_header_len(resp[2])])
+                        print(f"[BIN] > {addr[0]}:{addr[1]}: type={resp_header.type_name} seq={resp_header.seq}")
                 
-                if verbose:
-                    resp_header = unpack_bin_header(resp[:BIN_HEADER_LEN])
-                    print(f"[BIN] > {addr[0]}:{addr[1]}: type={resp_header.type_name} seq={resp_header.seq}")
+                # 5. Sendm toate raspunsurile odata
+                if responses:
+                    conn.sendall(b"".join(responses))
+                if closing:
+                    break
                     
         except Exception as e:
             if verbose:
@@ -151,11 +175,13 @@ def process_request(
     mtype: int,
     seq: int,
     payload: bytes,
-    state: Dict[str, str],
-    lock: threading.Lock
+    store: ShardedStore
 ) -> bytes:
     """
     Process un request and returns raspunsul impachetat.
+    
+    Store-ul isi face singur sincronizarea (lock per shard), deci nu
+    mai exista un lock global in jurul fiecarei cereri.
     """
     # ECHO - returns payload-ul primit
     if mtype == TYPE_ECHO_REQ:
@@ -168,8 +194,7 @@ def process_request(
         except Exception as e:
             return pack_bin_message(TYPE_ERR, f"bad_put_payload: {e}".encode(), seq)
         
-        with lock:
-            state[key] = value
+        store.put(key, value)
         
         return pack_bin_message(TYPE_PUT_RESP, b"OK", seq)
     
@@ -180,38 +205,105 @@ def process_request(
         except Exception as e:
             return pack_bin_message(TYPE_ERR, f"bad_get_payload: {e}".encode(), seq)
         
-        with lock:
-            value = state.get(key, "")
+        value = store.get(key)
         
-        if not value and key not in state:
+        if value is None:
             return pack_bin_message(TYPE_ERR, b"not_found", seq)
         
         return pack_bin_message(TYPE_GET_RESP, value.encode("utf-8"), seq)
     
     # COUNT - number of of keys
     if mtype == TYPE_COUNT_REQ:
-        with lock:
-            count = len(state)
+        count = store.count()
         # Returnam count-ul ca unsigned int (4 bytes, big-endian)
         return pack_bin_message(TYPE_COUNT_RESP, struct.pack("!I", count), seq)
     
     # KEYS - lista cheilor
     if mtype == TYPE_KEYS_REQ:
-        with lock:
-            keys = list(state.keys())
+        # Indexul store-ului este deja sortat
+        keys = store.keys()
+        if len(keys) > 0xFFFF:
+            # num_keys are 2 bytes; for keyspace-uri mari exista SCAN
+            return pack_bin_message(TYPE_ERR, b"too_many_keys: use SCAN", seq)
         
         # Encodem lista: num_keys(2B) + [key_len(1B) + key(N)]...
         parts = [struct.pack("!H", len(keys))]
-        for key in sorted(keys):
+        for key in keys:
             kb = key.encode("utf-8")
             parts.append(struct.pack("!B", len(kb)) + kb)
         
-        return pack_bin_message(TYPE_KEYS_RESP, b"".join(parts), seq)
+        return pack_large_response(TYPE_KEYS_RESP, b"".join(parts), seq)
+    
+    # MSET - mai multe perechi, un lock per shard
+    if mtype == TYPE_MSET_REQ:
+        try:
+            items = decode_kvs(payload)
+        except Exception as e:
+            return pack_bin_message(TYPE_ERR, f"bad_mset_payload: {e}".encode(), seq)
+        store.put_many(items)
+        return pack_bin_message(TYPE_MSET_RESP, struct.pack("!I", len(items)), seq)
+    
+    # MGET - valorile mai multor chei (lipsa = val_len 0xFFFFFFFF)
+    if mtype == TYPE_MGET_REQ:
+        try:
+            keys = decode_keys(payload)
+        except Exception as e:
+            return pack_bin_message(TYPE_ERR, f"bad_mget_payload: {e}".encode(), seq)
+        return pack_large_response(TYPE_MGET_RESP, encode_values(store.get_many(keys)), seq)
+    
+    # MDEL - sterge mai multe chei, returns cate existau
+    if mtype == TYPE_MDEL_REQ:
+        try:
+            keys = decode_keys(payload)
+        except Exception as e:
+            return pack_bin_message(TYPE_ERR, f"bad_mdel_payload: {e}".encode(), seq)
+        removed = store.delete_many(keys)
+        return pack_bin_message(TYPE_MDEL_RESP, struct.pack("!I", removed), seq)
+    
+    # SCAN - o pagina of chei sortate dupa cursor
+    if mtype == TYPE_SCAN_REQ:
+        try:
+            limit, cursor = decode_scan_req(payload)
+            after = decode_scan_cursor(cursor)
+        except Exception as e:
+            return pack_bin_message(TYPE_ERR, f"bad_scan_payload: {e}".encode(), seq)
+        keys, more = store.scan(after, max(1, min(limit, SCAN_MAX_LIMIT)))
+        next_cursor = encode_scan_cursor(keys[-1]) if more and keys else b""
+        return pack_large_response(TYPE_SCAN_RESP, encode_scan_resp(next_cursor, keys), seq)
     
     # Tip necunoscut
     return pack_bin_message(TYPE_ERR, f"unknown_type: {mtype}".encode(), seq)
 
 
+SCAN_MAX_LIMIT = 10000
+
+
+def encode_scan_cursor(last_key: str) -> bytes:
+    """
+    Cursorul SCAN este opac for client: "K" + ultima cheie trimisa.
+    Pagina urmatoare incepe strict dupa ea, deci cheile adaugate or sterse
+    intre pagini nu fac scanarea sa repete or sa sara chei existente.
+    """
+    return b"K" + last_key.encode("utf-8")
+
+
+def decode_scan_cursor(cursor: bytes) -> str | None:
+    """Cheia of dupa care continua SCAN (None = of to inceput)."""
+    if not cursor:
+        return None
+    if cursor[:1] != b"K":
+        raise ValueError("invalid cursor")
+    return cursor[1:].decode("utf-8")
+
+
+def pack_large_response(mtype: int, payload: bytes, seq: int) -> bytes:
+    """Raspuns of dimensiune variabila; daca nu incape nici in v2, returns ERROR."""
+    try:
+        return pack_bin_message(mtype, payload, seq)
+    except ValueError:
+        return pack_bin_message(TYPE_ERR, b"response_too_large", seq)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Server TCP with protocol binar (header fix + CRC32)",
@@ -220,11 +312,14 @@ def main() -> int:
     parser.add_argument("--host", default="0.0.0.0", help="Adresa of bind (default: 0.0.0.0)")
     parser.add_argument("--port", type=int, default=5401, help="Portul of ascultare (default: 5401 - WEEK4 standard)")
     parser.add_argument("--verbose", "-v", action="store_true", help="Afiseaza mesajele procesate")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help=f"Numar of shard-uri ale store-ului (default: {DEFAULT_SHARDS})")
+    parser.add_argument("--snapshot", metavar="PATH", help="Snapshot JSON: incarcat to start, scris to oprire")
+    parser.add_argument("--aof", metavar="PATH", help="Append-only log of PUT-uri, reluat to start")
+    parser.add_argument("--fsync", action="store_true", help="fsync dupa fiecare inregistrare AOF")
     
     args = parser.parse_args()
     
-    state: Dict[str, str] = {}
-    lock = threading.Lock()
+    store = ShardedStore(args.shards, args.snapshot, args.aof, args.fsync)
     
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -241,7 +336,7 @@ def main() -> int:
             conn, addr = srv.accept()
             t = threading.Thread(
                 target=handle_client,
-                args=(conn, addr, state, lock, args.verbose),
+                args=(conn, addr, store, args.verbose),
                 daemon=True
             )
             t.start()
@@ -257,6 +352,7 @@ def main() -> int:
             srv.close()
         except Exception:
             pass
+        store.close()
 
 
 if __name__ == "__main__":
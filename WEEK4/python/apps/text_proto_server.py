@@ -42,11 +42,10 @@ import argparse
 import socket
 import threading
 import sys
-from typing import Dict
-
 # Add utils directory to path
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0] + '/utils')
 from io_utils import recv_until, recv_exact
+from kv_store import DEFAULT_SHARDS, ShardedStore
 
 
 def recv_framed(conn: socket.socket) -> str:
@@ -86,11 +85,12 @@ def send_framed(conn: socket.socket, payload: str) -> None:
     conn.sendall(header + payload_bytes)
 
 
-def process_command(state: Dict[str, str], line: str) -> str:
+def process_command(store: ShardedStore, line: str) -> str:
     """
     Process a command and return the response.
     
-    State is the shared dictionary (thread-safe via external lock).
+    The store is shared by all client threads and locks internally
+    (one lock per shard), so no global lock is held here.
     """
     parts = line.strip().split()
     if not parts:
@@ -108,7 +108,7 @@ def process_command(state: Dict[str, str], line: str) -> str:
             return "ERR usage: SET <key> <value>"
         key = parts[1]
         value = " ".join(parts[2:])  # value may contain spaces
-        state[key] = value
+        store.put(key, value)
         return f"OK stored {key}"
     
     # GET <key> - read a value
@@ -116,28 +116,29 @@ def process_command(state: Dict[str, str], line: str) -> str:
         if len(parts) != 2:
             return "ERR usage: GET <key>"
         key = parts[1]
-        if key not in state:
+        value = store.get(key)
+        if value is None:
             return "ERR not_found"
-        return f"OK {key} {state[key]}"
+        return f"OK {key} {value}"
     
     # DEL <key> - delete a key
     if cmd == "DEL":
         if len(parts) != 2:
             return "ERR usage: DEL <key>"
         key = parts[1]
-        existed = key in state
-        state.pop(key, None)
+        existed = store.delete(key)
         return "OK deleted" if existed else "OK no_such_key"
     
     # COUNT - number of keys
     if cmd == "COUNT":
-        return f"OK {len(state)} keys"
+        return f"OK {store.count()} keys"
     
     # KEYS - list of keys
     if cmd == "KEYS":
-        if not state:
+        keys = store.keys()  # already sorted
+        if not keys:
             return "OK"
-        return "OK " + " ".join(sorted(state.keys()))
+        return "OK " + " ".join(keys)
     
     # QUIT - close connection
     if cmd == "QUIT":
@@ -149,8 +150,7 @@ def process_command(state: Dict[str, str], line: str) -> str:
 def handle_client(
     conn: socket.socket,
     addr: tuple,
-    state: Dict[str, str],
-    lock: threading.Lock,
+    store: ShardedStore,
     verbose: bool
 ) -> None:
     """
@@ -158,7 +158,7 @@ def handle_client(
     
     Processing loop:
     1. Receive framed message
-    2. Process command (with lock on state)
+    2. Process command (the store locks per shard)
     3. Send response
     4. Repeat until QUIT or error
     """
@@ -179,9 +179,8 @@ def handle_client(
                 if verbose:
                     print(f"[TEXT] < {addr[0]}:{addr[1]}: {line}")
                 
-                # 2. Process command (thread-safe)
-                with lock:
-                    response = process_command(state, line)
+                # 2. Process command (thread-safe store)
+                response = process_command(store, line)
                 
                 # 3. Send response
                 send_framed(conn, response)
@@ -225,12 +224,27 @@ Testing with client:
         "--verbose", "-v", action="store_true",
         help="Display processed messages"
     )
+    parser.add_argument(
+        "--shards", type=int, default=DEFAULT_SHARDS,
+        help=f"Number of store shards (default: {DEFAULT_SHARDS})"
+    )
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="JSON snapshot: loaded at start, written on shutdown"
+    )
+    parser.add_argument(
+        "--aof", metavar="PATH",
+        help="Append-only log of SET/DEL, replayed at start"
+    )
+    parser.add_argument(
+        "--fsync", action="store_true",
+        help="fsync after every AOF record"
+    )
     
     args = parser.parse_args()
     
-    # State shared between threads
-    state: Dict[str, str] = {}
-    lock = threading.Lock()
+    # Store shared between threads
+    store = ShardedStore(args.shards, args.snapshot, args.aof, args.fsync)
     
     # Create server socket
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -249,7 +263,7 @@ Testing with client:
             conn, addr = srv.accept()
             t = threading.Thread(
                 target=handle_client,
-                args=(conn, addr, state, lock, args.verbose),
+                args=(conn, addr, store, args.verbose),
                 daemon=True
             )
             t.start()
@@ -265,6 +279,7 @@ Testing with client:
             srv.close()
         except Exception:
             pass
+        store.close()
 
 
 if __name__ == "__main__":
@@ -19,10 +19,16 @@ UTILIZARE:
   # Simulare pachet corupt (for testare detectie erori)
   python3 udp_sensor_client.py --host localhost --port 5402 \\
       --sensor-id 1 --temp 20.0 --location "Lab1" --corrupt
+  
+  # Generator of incarcare: 50000 datagrame/s timp of 5 s, 4 procese,
+  # senzorii 1..100 (fiecare proces are alt port sursa)
+  python3 udp_sensor_client.py --port 5402 --rate 50000 --duration 5 \\
+      --senders 4 --sensors 100
 """
 from __future__ import annotations
 
 import argparse
+import multiprocessing as mp
 import socket
 import random
 import time
@@ -68,6 +74,72 @@ def random_temp(base: float = 22.0, variance: float = 5.0) -> float:
     return base + random.uniform(-variance, variance)
 
 
+def generate_load(
+    addr: tuple[str, int],
+    rate: float,
+    duration: float,
+    sensors: int = 100,
+    first_sensor: int = 1,
+    location: str = "Load",
+    seed: int | None = None
+) -> int:
+    """
+    Send citiri with send_reading() to un debit constant of `rate` datagrame/s,
+    timp of `duration` secunde, pe un socket propriu. Senzorii se aleg
+    aleatoriu din first_sensor..first_sensor+sensors-1.
+    
+    Returns:
+        int: Numarul of datagrame trimise (mai mic decat rate*duration daca
+        procesul nu poate tine ritmul)
+    """
+    rng = random.Random(seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= duration:
+                break
+            due = min(int(rate * elapsed) + 1, int(rate * duration))
+            if sent >= due:
+                time.sleep(min(0.001, (sent + 1) / rate - elapsed))
+                continue
+            # Trimitem ce este scadent (cel mult 64 odata, apoi verificam timpul)
+            for _ in range(min(due - sent, 64)):
+                sensor_id = first_sensor + rng.randrange(sensors)
+                send_reading(sock, addr, sensor_id, rng.gauss(22.0, 3.0), location)
+                sent += 1
+    finally:
+        sock.close()
+    return sent
+
+
+def _load_process(addr, rate, duration, sensors, first_sensor, seed, results) -> None:
+    results.put(generate_load(addr, rate, duration, sensors, first_sensor, seed=seed))
+
+
+def run_load(addr: tuple[str, int], rate: float, duration: float, senders: int = 1,
+             sensors: int = 100, first_sensor: int = 1) -> int:
+    """
+    generate_load() in `senders` procese (rate impartit egal intre ele).
+    Fiecare proces are alt port sursa, deci la un server with SO_REUSEPORT
+    datagramele se impart intre worker-i. Returneaza totalul trimis.
+    """
+    if senders <= 1:
+        return generate_load(addr, rate, duration, sensors, first_sensor)
+    results: mp.Queue = mp.Queue()
+    procs = [mp.Process(target=_load_process,
+                        args=(addr, rate / senders, duration, sensors, first_sensor, i, results))
+             for i in range(senders)]
+    for p in procs:
+        p.start()
+    sent = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return sent
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Simulator of senzori UDP"
@@ -83,10 +155,16 @@ def main() -> int:
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--continuous", action="store_true", help="Mod continuu")
     group.add_argument("--burst", type=int, metavar="N", help="Send N pachete rapid")
+    group.add_argument("--rate", type=float, metavar="R",
+                       help="Generator of incarcare: R datagrame/s timp of --duration secunde")
     
     parser.add_argument("--interval", type=float, default=1.0, help="Interval intre pachete in mod continuu (secunde)")
     parser.add_argument("--corrupt", action="store_true", help="Corupte pachetele (for testare)")
     parser.add_argument("--corrupt-rate", type=float, default=0.0, help="Rata of corupere (0.0-1.0)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durata in mod --rate (secunde)")
+    parser.add_argument("--senders", type=int, default=1, help="Procese emitatoare in mod --rate")
+    parser.add_argument("--sensors", type=int, default=100,
+                        help="Senzori simulati in mod --rate (ID-uri of to --sensor-id)")
     
     args = parser.parse_args()
     
@@ -95,7 +173,15 @@ def main() -> int:
     addr = (args.host, args.port)
     
     try:
-        if args.continuous:
+        if args.rate:
+            print(f"[UDP] Load mode: {args.rate:,.0f} datagrams/s for {args.duration}s "
+                  f"to {addr[0]}:{addr[1]} ({args.senders} senders, {args.sensors} sensors)")
+            start = time.perf_counter()
+            sent = run_load(addr, args.rate, args.duration, args.senders, args.sensors, args.sensor_id)
+            elapsed = time.perf_counter() - start
+            print(f"[UDP] Sent {sent:,} packets in {elapsed:.2f}s ({sent / elapsed:,.0f}/s)")
+            
+        elif args.continuous:
             # Mod continuu
             print(f"[UDP] Continuous mode: sending every {args.interval}s to {addr[0]}:{addr[1]}")
             print(f"[UDP] Press Ctrl+C to stop")
@@ -21,24 +21,53 @@ COMPORTAMENT:
 - Verify CRC and valideaza format
 - Logheaza citirile valide
 - Ignora pachetele corupte (with log warning)
-- Calculate statistici (medie, min, max)
+- Calculate statistici (medie, abatere standard, min, max, p50/p95/p99)
+  in memorie constanta per senzor
+- Optional: rollup-uri pe ferestre of 1m/5m/1h exportate in JSON
+- Optional (--workers N): mod of debit mare, N procese with SO_REUSEPORT
+  care citesc datagramele in loturi and isi trimit statisticile periodic
+- Optional (--store DIR): salveaza fiecare citire intr-un store columnar
+  pe disc (utils/ts_store.py), with interogari pe intervale of timp
 
 UTILIZARE:
 ----------
   python3 udp_sensor_server.py --port 5402 --verbose
+  python3 udp_sensor_server.py --rollup-json /tmp/sensor_rollups.json
+  python3 udp_sensor_server.py --workers 4 --batch 256 --stats-interval 0
+  python3 udp_sensor_server.py --store /tmp/sensor_db
 """
 from __future__ import annotations
 
 import argparse
+import multiprocessing as mp
+import os
+import queue
+import select
+import signal
 import socket
 import sys
+import time
 from datetime import datetime
 from collections import defaultdict
-from typing import Dict, List, NamedTuple
+from typing import Dict, NamedTuple, Optional
 
 # Add utils directory to path
 sys.path.insert(0, str(__file__).rsplit('/', 2)[0] + '/utils')
-from proto_common import unpack_udp_sensor, UDP_LEN, format_sensor_reading
+from proto_common import (unpack_udp_sensor, decode_udp_batch, UDP_LEN, UDP_SLOT,
+                          format_sensor_reading)
+from sensor_stats import RollupWindows, SensorAggregate, merge_aggregates
+from ts_store import TimeSeriesStore
+
+# Cat of des verificam ferestrele of rollup cand nu vin datagrame (secunde)
+TICK_INTERVAL = 1.0
+
+# Mod of debit mare
+DEFAULT_BATCH = 256               # datagrame citite and decodate odata
+DEFAULT_FLUSH_INTERVAL = 1.0      # secunde intre doua trimiteri of statistici
+DEFAULT_RCVBUF = 4 * 1024 * 1024  # SO_RCVBUF cerut (limitat of net.core.rmem_max)
+
+# Store pe disc: chunk-urile incomplete se scriu cel tarziu dupa atatea secunde
+STORE_FLUSH_INTERVAL = 60.0
 
 
 class SensorReading(NamedTuple):
@@ -49,34 +78,248 @@ class SensorReading(NamedTuple):
     location: str
 
 
-class SensorStats:
-    """Statistici for un senzor."""
-    
-    def __init__(self):
-        self.readings: List[float] = []
-        self.last_location: str = ""
-        self.last_reading: datetime | None = None
-    
-    def add(self, temp: float, location: str) -> None:
-        self.readings.append(temp)
-        self.last_location = location
-        self.last_reading = datetime.now()
-    
-    @property
-    def count(self) -> int:
-        return len(self.readings)
-    
+class SensorStats(SensorAggregate):
+    """
+    Statistici for un senzor, in memorie constanta.
+
+    Nu mai pastram fiecare citire: media/varianta (Welford), min/max and
+    un sketch of cuantile (DDSketch) se actualizeaza in O(1) per citire.
+    """
+
+    __slots__ = ()
+
     @property
     def avg(self) -> float:
-        return sum(self.readings) / len(self.readings) if self.readings else 0.0
-    
+        return self.stats.mean
+
     @property
     def min_temp(self) -> float:
-        return min(self.readings) if self.readings else 0.0
-    
+        return self.stats.min if self.count else 0.0
+
     @property
     def max_temp(self) -> float:
-        return max(self.readings) if self.readings else 0.0
+        return self.stats.max if self.count else 0.0
+
+    @property
+    def last_location(self) -> str:
+        return self.location
+
+    @property
+    def last_reading(self) -> datetime | None:
+        return datetime.fromtimestamp(self.last_seen) if self.last_seen is not None else None
+
+# ==============================================================================
+# Mod of debit mare: loturi of datagrame, procese with SO_REUSEPORT
+# ==============================================================================
+
+def open_udp_socket(host: str, port: int, reuse_port: bool = False, rcvbuf: int = 0) -> socket.socket:
+    """
+    Socket UDP legat to (host, port). With reuse_port, mai multe procese pot
+    lega acelasi port and kernel-ul imparte datagramele intre ele (dupa
+    hash-ul adresei sursa, deci un emitator ajunge mereu to acelasi proces).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((host, port))
+    return sock
+
+
+def drain_batch(sock: socket.socket, view: memoryview, lengths: list, poller, timeout_ms: int) -> int:
+    """
+    Citeste pana to len(lengths) datagrame in sloturile of UDP_SLOT bytes ale
+    lui view (socket non-blocking). Asteapta doar pentru prima datagrama (max
+    timeout_ms), apoi ia doar ce este deja in coada socket-ului.
+    
+    recv_into() scrie direct in buffer-ul prealocat: fara obiect bytes and
+    fara tuplu of adresa per datagrama, ca recvfrom().
+    """
+    batch = len(lengths)
+    recv_into = sock.recv_into
+    n = 0
+    while n < batch:
+        off = n * UDP_SLOT
+        try:
+            lengths[n] = recv_into(view[off:off + UDP_SLOT], UDP_SLOT)
+        except BlockingIOError:
+            if n or not poller.poll(timeout_ms):
+                break
+            continue
+        n += 1
+    return n
+
+
+def ingest_worker(
+    host: str,
+    port: int,
+    batch: int,
+    flush_interval: float,
+    out: "mp.Queue",
+    stop: "mp.synchronize.Event",
+    rcvbuf: int = DEFAULT_RCVBUF,
+    store_dir: Optional[str] = None,
+    segment: str = "worker"
+) -> None:
+    """
+    Proces worker: citeste loturi, le decodeaza with decode_udp_batch() and
+    agrega per senzor. La fiecare flush_interval trimite pe `out`
+    (pid, received, valid, invalid, {sensor_id: SensorAggregate}) with ce a
+    vazut since ultima trimitere. La `stop` goleste coada socket-ului,
+    trimite ultimul lot of statistici and se opreste.
+    
+    With store_dir, citirile se scriu and in store-ul columnar, in segmentul
+    propriu al worker-ului (un singur scriitor per segment).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C il trateaza parintele
+    sock = open_udp_socket(host, port, reuse_port=True, rcvbuf=rcvbuf)
+    sock.setblocking(False)
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    buf = bytearray(batch * UDP_SLOT)
+    view = memoryview(buf)
+    lengths = [0] * batch
+    store = TimeSeriesStore(store_dir, segment) if store_dir else None
+
+    aggs: Dict[int, SensorAggregate] = {}
+    received = valid = invalid = 0
+    next_flush = time.monotonic() + flush_interval
+    next_store_flush = time.monotonic() + STORE_FLUSH_INTERVAL
+    try:
+        while True:
+            stopping = stop.is_set()
+            n = drain_batch(sock, view, lengths, poller, 0 if stopping else 100)
+            if n:
+                groups, bad = decode_udp_batch(buf, lengths if n == batch else lengths[:n])
+                now = time.time()
+                for sensor_id, (location, temps) in groups.items():
+                    agg = aggs.get(sensor_id)
+                    if agg is None:
+                        agg = aggs[sensor_id] = SensorAggregate()
+                    try:
+                        agg.add_many(temps, location, now)
+                    except (ValueError, OverflowError):
+                        # O citire pe care decodorul a lasat-o sa treaca nu
+                        # trebuie sa opreasca worker-ul: lotul senzorului e invalid
+                        bad += len(temps)
+                        continue
+                    if store is not None:
+                        store.append_many(sensor_id, [now] * len(temps), temps)
+                received += n
+                invalid += bad
+                valid += n - bad
+            done = stopping and n == 0
+            if done or time.monotonic() >= next_flush:
+                if received or done:
+                    out.put((os.getpid(), received, valid, invalid, aggs))
+                    aggs = {}
+                    received = valid = invalid = 0
+                next_flush = time.monotonic() + flush_interval
+            if store is not None and time.monotonic() >= next_store_flush:
+                store.flush()
+                next_store_flush = time.monotonic() + STORE_FLUSH_INTERVAL
+            if done:
+                break
+    finally:
+        sock.close()
+        if store is not None:
+            store.close()
+
+
+def start_workers(host: str, port: int, workers: int, batch: int = DEFAULT_BATCH,
+                  flush_interval: float = DEFAULT_FLUSH_INTERVAL, rcvbuf: int = DEFAULT_RCVBUF,
+                  store_dir: Optional[str] = None):
+    """
+    Porneste worker-ii. Returneaza (procese, coada of statistici, event of stop,
+    spawn), unde spawn(i) porneste din nou worker-ul i (acelasi segment).
+    """
+    out: mp.Queue = mp.Queue()
+    stop = mp.Event()
+
+    def spawn(i: int) -> mp.Process:
+        p = mp.Process(target=ingest_worker,
+                       args=(host, port, batch, flush_interval, out, stop, rcvbuf, store_dir, f"worker-{i}"),
+                       daemon=True)
+        p.start()
+        return p
+
+    procs = [spawn(i) for i in range(workers)]
+    return procs, out, stop, spawn
+
+
+def run_high_rate(args, stats: Dict[int, "SensorStats"], rollups: Optional[RollupWindows]) -> int:
+    """Bucla parintelui in modul --workers: combina (merge) statisticile primite."""
+    procs, out, stop, spawn = start_workers(args.host, args.port, args.workers, args.batch,
+                                            args.flush_interval, args.rcvbuf, args.store)
+    received = valid = invalid = 0
+    printed = 0
+    restarts = 0
+    next_check = time.monotonic() + TICK_INTERVAL
+
+    def check_workers() -> None:
+        """Un worker mort nu mai citeste nimic din portul comun: il raportam and il repornim."""
+        nonlocal restarts
+        for i, p in enumerate(procs):
+            if p.is_alive():
+                continue
+            p.join()
+            restarts += 1
+            print(f"[UDP] ! worker-{i} (pid {p.pid}) exited with code {p.exitcode}, restarting")
+            procs[i] = spawn(i)
+
+    def merge(msg) -> None:
+        nonlocal received, valid, invalid
+        _pid, r, v, i, aggs = msg
+        received, valid, invalid = received + r, valid + v, invalid + i
+        now = time.time()
+        for sensor_id, agg in aggs.items():
+            stats[sensor_id].merge(agg)
+            if rollups is not None:
+                rollups.merge(sensor_id, agg, now)
+
+    print(f"[UDP] Sensor server listening on {args.host}:{args.port} "
+          f"({args.workers} workers, SO_REUSEPORT, batch {args.batch})")
+    print(f"[UDP] Expected datagram size: {UDP_LEN} bytes")
+    if rollups is not None:
+        print(f"[UDP] Rollups (1m/5m/1h) -> {args.rollup_json}")
+    if args.store:
+        print(f"[UDP] Readings stored in {args.store} (one segment per worker)")
+    print(f"[UDP] Press Ctrl+C to stop and see statistics")
+    print()
+    try:
+        while True:
+            if time.monotonic() >= next_check:
+                check_workers()
+                next_check = time.monotonic() + TICK_INTERVAL
+            try:
+                merge(out.get(timeout=TICK_INTERVAL))
+            except queue.Empty:
+                if rollups is not None:
+                    rollups.tick()
+                continue
+            if args.stats_interval > 0 and valid // args.stats_interval > printed:
+                printed = valid // args.stats_interval
+                print_stats(stats, received, valid, invalid)
+    except KeyboardInterrupt:
+        stop.set()
+        # Ultimele statistici ale fiecarui worker, apoi asteptam oprirea lor
+        while any(p.is_alive() for p in procs) or not out.empty():
+            try:
+                merge(out.get(timeout=0.2))
+            except queue.Empty:
+                pass
+        for p in procs:
+            p.join()
+        print("\n")
+        print_stats(stats, received, valid, invalid)
+        if restarts:
+            print(f"[UDP] Worker restarts: {restarts}")
+        if rollups is not None:
+            rollups.export_json(args.rollup_json)
+        print("\n[UDP] Server stopped")
+        return 0
 
 
 def main() -> int:
@@ -87,14 +330,31 @@ def main() -> int:
     parser.add_argument("--port", type=int, default=5402, help="Portul UDP")
     parser.add_argument("--verbose", "-v", action="store_true", help="Afiseaza fiecare citire")
     parser.add_argument("--stats-interval", type=int, default=10, help="Afiseaza statistici to fiecare N citiri")
+    parser.add_argument("--rollup-json", metavar="PATH",
+                        help="Scrie rollup-urile 1m/5m/1h in acest fisier JSON (la fiecare fereastra inchisa)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Mod of debit mare: N procese with SO_REUSEPORT (0 = o datagrama pe apel, default)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Datagrame per lot in modul --workers")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Secunde intre doua trimiteri of statistici of to worker-i")
+    parser.add_argument("--rcvbuf", type=int, default=DEFAULT_RCVBUF, help="SO_RCVBUF in modul --workers (bytes)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="Salveaza citirile in store-ul columnar din DIR (utils/ts_store.py)")
     
     args = parser.parse_args()
     
-    # Statistici per senzor
+    # Statistici per senzor (since pornire)
     stats: Dict[int, SensorStats] = defaultdict(SensorStats)
+    rollups: Optional[RollupWindows] = None
+    if args.rollup_json:
+        rollups = RollupWindows(on_close=lambda name, bucket: rollups.export_json(args.rollup_json))
+    if args.workers > 0:
+        return run_high_rate(args, stats, rollups)
     total_received = 0
     total_valid = 0
     total_invalid = 0
+    store = TimeSeriesStore(args.store, segment="main") if args.store else None
+    next_store_flush = time.monotonic() + STORE_FLUSH_INTERVAL
     
     # Creare socket UDP
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -105,12 +365,26 @@ def main() -> int:
         
         print(f"[UDP] Sensor server listening on {args.host}:{args.port}")
         print(f"[UDP] Expected datagram size: {UDP_LEN} bytes")
+        if rollups is not None:
+            print(f"[UDP] Rollups (1m/5m/1h) -> {args.rollup_json}")
+        if store is not None:
+            print(f"[UDP] Readings stored in {args.store}")
+        if rollups is not None or store is not None:
+            sock.settimeout(TICK_INTERVAL)
         print(f"[UDP] Press Ctrl+C to stop and see statistics")
         print()
         
         while True:
             try:
-                data, addr = sock.recvfrom(1024)  # Buffer generos
+                if store is not None and time.monotonic() >= next_store_flush:
+                    store.flush()
+                    next_store_flush = time.monotonic() + STORE_FLUSH_INTERVAL
+                try:
+                    data, addr = sock.recvfrom(1024)  # Buffer generos
+                except socket.timeout:
+                    if rollups is not None:
+                        rollups.tick()  # inchide ferestrele chiar and fara trafic
+                    continue
                 total_received += 1
                 
                 # Validare dimensiune
@@ -131,7 +405,12 @@ def main() -> int:
                 
                 # Citire valida
                 total_valid += 1
-                stats[sensor_id].add(temp_c, location)
+                now = time.time()
+                stats[sensor_id].add(temp_c, location, now)
+                if rollups is not None:
+                    rollups.add(sensor_id, temp_c, location, now)
+                if store is not None:
+                    store.append(sensor_id, now, temp_c)
                 
                 if args.verbose:
                     reading = format_sensor_reading(sensor_id, temp_c, location)
@@ -147,10 +426,14 @@ def main() -> int:
     except KeyboardInterrupt:
         print("\n")
         print_stats(stats, total_received, total_valid, total_invalid)
+        if rollups is not None:
+            rollups.export_json(args.rollup_json)
         print("\n[UDP] Server stopped")
         return 0
     finally:
         sock.close()
+        if store is not None:
+            store.close()
 
 
 def print_stats(stats: Dict[int, SensorStats], received: int, valid: int, invalid: int) -> None:
@@ -165,9 +448,16 @@ def print_stats(stats: Dict[int, SensorStats], received: int, valid: int, invali
     else:
         for sensor_id in sorted(stats.keys()):
             s = stats[sensor_id]
+            p50, p95, p99 = (s.sketch.quantile(q) for q in (0.5, 0.95, 0.99))
             print(f"  Sensor {sensor_id:04d} ({s.last_location:10s}): "
-                  f"{s.count} readings, avg={s.avg:+.1f}°C, "
-                  f"min={s.min_temp:+.1f}°C, max={s.max_temp:+.1f}°C")
+                  f"{s.count} readings, avg={s.avg:+.1f}°C, sd={s.stats.stddev:.2f}, "
+                  f"min={s.min_temp:+.1f}°C, max={s.max_temp:+.1f}°C, "
+                  f"p50={p50:+.1f} p95={p95:+.1f} p99={p99:+.1f}")
+        if len(stats) > 1:
+            total = merge_aggregates(stats.values())
+            print("-" * 60)
+            print(f"  All sensors: avg={total.stats.mean:+.1f}°C, sd={total.stats.stddev:.2f}, "
+                  f"p95={total.sketch.quantile(0.95):+.1f}°C")
     
     print("=" * 60)
     print()
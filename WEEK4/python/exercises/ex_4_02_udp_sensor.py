@@ -7,7 +7,8 @@ Obiectiv: Implementati a server UDP care colecteaza and agrega date of to senzor
 
 Specificatii:
 - Server UDP care primeste datagrame of to senzori
-- Agregare: medie, min, max, numar citiri per senzor
+- Agregare: medie, abatere standard, min, max, numar citiri per senzor
+  in memorie constanta (nu se pastreaza lista of citiri)
 - Raport periodic (to fiecare N citiri)
 - Export statistici in format JSON
 
@@ -29,6 +30,7 @@ Autor: Revolvix&Hypotheticalandrei
 Week 4 - Exercitiu practic UDP
 """
 
+import math
 import socket
 import struct
 import zlib
@@ -50,11 +52,16 @@ REPORT_INTERVAL = 5  # secunde
 class SensorStats:
     """
     Statistici for un senzor.
+    
+    Media and varianta se actualizeaza incremental (algoritmul Welford):
+    `mean` este media curenta, `m2` suma patratelor abaterilor fata of medie.
+    Memoria ramane constanta oricate citiri ar sosi.
     """
     sensor_id: int
     location: str
     count: int = 0
-    total: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
     min_temp: float = float('inf')
     max_temp: float = float('-inf')
     last_reading: float = 0.0
@@ -63,7 +70,12 @@ class SensorStats:
     @property
     def average(self) -> float:
         """Calculate media temperaturilor."""
-        return self.total / self.count if self.count > 0 else 0.0
+        return self.mean if self.count > 0 else 0.0
+    
+    @property
+    def stddev(self) -> float:
+        """Abaterea standard of selectie (0 sub 2 citiri)."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
     
     def to_dict(self) -> dict:
         """Converteste to dictionar for JSON."""
@@ -72,6 +84,7 @@ class SensorStats:
             'location': self.location,
             'readings_count': self.count,
             'average_temp': round(self.average, 2),
+            'stddev_temp': round(self.stddev, 2),
             'min_temp': round(self.min_temp, 2) if self.min_temp != float('inf') else None,
             'max_temp': round(self.max_temp, 2) if self.max_temp != float('-inf') else None,
             'last_reading': round(self.last_reading, 2),
@@ -169,7 +182,8 @@ def update_statistics(stats: Dict[int, SensorStats],
     TODO: Implementati aceasta function
     Hints:
     - Daca sensor_id nu exists in stats, creati o noua intrare SensorStats
-    - Actualizati: count, total, min_temp, max_temp, last_reading, last_timestamp
+    - Actualizati: count, mean, m2, min_temp, max_temp, last_reading, last_timestamp
+    - Welford: delta = x - mean; mean += delta / count; m2 += delta * (x - mean)
     - Folositi datetime.now().isoformat() for timestamp
     """
     # TODO: Implementare
@@ -179,7 +193,9 @@ def update_statistics(stats: Dict[int, SensorStats],
     # 
     # sensor = stats[sensor_id]
     # sensor.count += 1
-    # sensor.total += temperature
+    # delta = temperature - sensor.mean
+    # sensor.mean += delta / sensor.count
+    # sensor.m2 += delta * (temperature - sensor.mean)
     # sensor.min_temp = min(sensor.min_temp, temperature)
     # sensor.max_temp = max(sensor.max_temp, temperature)
     # sensor.last_reading = temperature
@@ -204,13 +220,14 @@ def generate_report(stats: Dict[int, SensorStats]) -> dict:
     # TODO: Implementare
     # 
     # total_readings = sum(s.count for s in stats.values())
-    # all_temps = [s.last_reading for s in stats.values() if s.count > 0]
+    # # Media globala ponderata with numarul of citiri al fiecarui senzor
+    # weighted = sum(s.mean * s.count for s in stats.values())
     # 
     # report = {
     #     'timestamp': datetime.now().isoformat(),
     #     'total_sensors': len(stats),
     #     'total_readings': total_readings,
-    #     'global_average': round(sum(all_temps) / len(all_temps), 2) if all_temps else None,
+    #     'global_average': round(weighted / total_readings, 2) if total_readings else None,
     #     'sensors': [s.to_dict() for s in stats.values()]
     # }
     # 
@@ -244,7 +261,7 @@ def print_report(stats: Dict[int, SensorStats]) -> None:
     for sensor in report.get('sensors', []):
         print(f"  Senzor {sensor['sensor_id']} @ {sensor['location']}:")
         print(f"    Citiri: {sensor['readings_count']}")
-        print(f"    Medie: {sensor['average_temp']}°C")
+        print(f"    Medie: {sensor['average_temp']}°C (sd {sensor.get('stddev_temp', 0)})")
         print(f"    Min/Max: {sensor['min_temp']}°C / {sensor['max_temp']}°C")
         print(f"    Ultima: {sensor['last_reading']}°C @ {sensor['last_timestamp']}")
     
@@ -300,6 +317,9 @@ def run_aggregator(host: str = '0.0.0.0',
     - Folositi recvfrom() for a primi datagrame
     - Apelati parse_sensor_datagram() and update_statistics()
     - Optional: porniti thread for raportare periodica
+    - Optional: salvati fiecare citire pe disc with TimeSeriesStore din
+      python/utils/ts_store.py (store.append(sensor_id, time.time(), temp)
+      and store.close() la oprire); vezi sol_run_aggregator in solutions
     """
     # Statistici globale
     stats: Dict[int, SensorStats] = {}
@@ -0,0 +1,905 @@
+#!/usr/bin/env python3
+"""
+Exercise 4.03: Binary protocol benchmarks
+=========================================
+
+Measures the BINARY protocol server (python/apps/binary_proto_server.py)
+from a client process, with the server running in its own process so that
+client and server do not share the GIL.
+
+Benchmarks:
+1. pipeline - ops/sec for a PUT/GET mix with 1..256 requests in flight
+2. threads  - PUT/GET throughput of 1..64 client threads against a single
+              global lock (1 shard) and the sharded store, plus KEYS cost
+3. batch    - reading N keys: one GET per key, pipelined GETs, MGET batches,
+              and listing them with SCAN pages
+4. codec    - in-process msgs/sec of the proto_common encoders/decoders,
+              against the original format-string versions
+5. stats    - UDP sensor statistics: a list of every reading per sensor vs
+              the constant-memory aggregates in utils/sensor_stats.py
+              (ingest rate, memory, time to build one report)
+6. udp      - UDP sensor ingest: decode+aggregate cost per datagram, then
+              the highest offered rate received without loss by the
+              original one-recvfrom-per-datagram loop and by batched
+              SO_REUSEPORT workers (load from udp_sensor_client.run_load)
+7. tsdb     - utils/ts_store.py: ingest of 100M readings (readings/sec,
+              bytes on disk per reading), then a 24-hour range query and
+              24-hour downsampling for one sensor and for all sensors
+
+Usage:
+python3 ex_4_03_proto_benchmark.py pipeline
+python3 ex_4_03_proto_benchmark.py pipeline --ops 50000 --windows 1,8,64 --json
+python3 ex_4_03_proto_benchmark.py threads --shards 1,16
+python3 ex_4_03_proto_benchmark.py batch --keys 20000
+python3 ex_4_03_proto_benchmark.py codec
+python3 ex_4_03_proto_benchmark.py stats --readings 10000,100000,1000000
+python3 ex_4_03_proto_benchmark.py udp --rates 10000,20000,40000 --workers 1,2
+python3 ex_4_03_proto_benchmark.py tsdb --readings 10000000
+
+Week 4 - Custom protocols over TCP
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PYTHON_DIR / "apps"))
+sys.path.insert(0, str(PYTHON_DIR / "utils"))
+
+from binary_proto_client import BinaryClient  # noqa: E402
+from binary_proto_server import handle_client  # noqa: E402
+from kv_store import DEFAULT_SHARDS, ShardedStore  # noqa: E402
+from proto_common import (BIN_HEADER_FMT, BIN_HEADER_LEN, BIN_MAGIC,  # noqa: E402
+                          BIN_VERSION, TYPE_ECHO_REQ, TYPE_GET_REQ, TYPE_GET_RESP,
+                          TYPE_PUT_REQ, TYPE_PUT_RESP, UDP_FMT, UDP_FMT_WO_CRC,
+                          UDP_LEN, UDP_VER, decode_udp_batch, encode_key,
+                          encode_kv, np, pack_bin_message, pack_udp_sensor,
+                          split_bin_frames, unpack_udp_sensor, validate_bin_message)
+from sensor_stats import SensorAggregate  # noqa: E402
+from ts_store import DEFAULT_CHUNK_SIZE, TimeSeriesStore  # noqa: E402
+from udp_sensor_client import run_load  # noqa: E402
+from udp_sensor_server import start_workers  # noqa: E402
+
+DEFAULT_PORT = 5491
+DEFAULT_WINDOWS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+DEFAULT_THREADS = (1, 2, 4, 8, 16, 32, 64)
+
+
+# =============================================================================
+# Server process
+# =============================================================================
+
+def _serve(port: int, shards: int, ready) -> None:
+    """Accept loop of binary_proto_server.main, without the console output."""
+    store = ShardedStore(shards)
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", port))
+    srv.listen(128)
+    ready.set()
+    while True:
+        conn, addr = srv.accept()
+        threading.Thread(target=handle_client, args=(conn, addr, store, False),
+                         daemon=True).start()
+
+
+class ServerProcess:
+    """Binary protocol server in a child process (context manager)."""
+
+    def __init__(self, port: int = DEFAULT_PORT, shards: int = DEFAULT_SHARDS):
+        self.port = port
+        self.shards = shards
+        self.proc: Optional[mp.Process] = None
+
+    def __enter__(self) -> int:
+        ready = mp.Event()
+        self.proc = mp.Process(target=_serve, args=(self.port, self.shards, ready), daemon=True)
+        self.proc.start()
+        if not ready.wait(10):
+            raise RuntimeError("server did not start")
+        return self.port
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None:
+            self.proc.terminate()
+            self.proc.join(5)
+
+
+def _client(port: int) -> BinaryClient:
+    client = BinaryClient("127.0.0.1", port)
+    client.connect()
+    return client
+
+
+# =============================================================================
+# Pipelining
+# =============================================================================
+
+def _requests(ops: int, keys: int) -> List[tuple]:
+    """Alternating PUT k / GET k over a fixed key space."""
+    reqs = []
+    for i in range(ops):
+        key = f"key{(i // 2) % keys:05d}"
+        if i % 2 == 0:
+            reqs.append((TYPE_PUT_REQ, encode_kv(key, f"value-{i}")))
+        else:
+            reqs.append((TYPE_GET_REQ, encode_key(key)))
+    return reqs
+
+
+def run_pipeline_benchmark(ops: int = 20000, windows=DEFAULT_WINDOWS, keys: int = 1000,
+                           port: int = DEFAULT_PORT, quiet: bool = False) -> List[dict]:
+    """ops/sec of one connection for each window size."""
+    say = (lambda *a: None) if quiet else print
+    say("=" * 64)
+    say(f"PIPELINE: {ops} ops (PUT/GET alternating), one connection")
+    say("=" * 64)
+    say(f"{'window':>8} {'ops/s':>12} {'us/op':>10} {'speedup':>10}")
+    say("-" * 64)
+
+    reqs = _requests(ops, keys)
+    expected = [TYPE_PUT_RESP if mtype == TYPE_PUT_REQ else TYPE_GET_RESP for mtype, _ in reqs]
+    rows = []
+    with ServerProcess(port) as server_port:
+        client = _client(server_port)
+        try:
+            client.pipeline(reqs[:2 * keys], 64)  # warm-up, fills the key space
+            base = None
+            for window in windows:
+                start = time.perf_counter()
+                results = client.pipeline(reqs, window)
+                elapsed = time.perf_counter() - start
+                if [rtype for rtype, _ in results] != expected:
+                    raise RuntimeError(f"unexpected responses with window {window}")
+                rate = ops / elapsed
+                base = base or rate
+                rows.append({"window": window, "ops_per_s": rate,
+                             "us_per_op": elapsed / ops * 1e6, "speedup": rate / base})
+                say(f"{window:>8} {rate:>12,.0f} {elapsed / ops * 1e6:>10.1f} {rate / base:>9.1f}x")
+        finally:
+            client.close()
+    say("-" * 64)
+    return rows
+
+
+# =============================================================================
+# Concurrent clients and the shared store
+# =============================================================================
+
+def _thread_worker(port: int, ops: int, keys: int, seed: int, barrier, errors: list) -> None:
+    """One connection, one request at a time (window 1), 50/50 PUT/GET."""
+    rng = random.Random(seed)
+    client = _client(port)
+    try:
+        barrier.wait()
+        for i in range(ops):
+            key = f"key{rng.randrange(keys):05d}"
+            if i % 2 == 0:
+                client.put(key, f"value-{i}")
+            else:
+                client.get(key)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        client.close()
+
+
+def _keys_cost(keys: int, shards: int, reps: int = 20) -> tuple:
+    """ms per KEYS: sorted(dict) as before vs the store's ordered index."""
+    state = {f"key{i:07d}": "v" for i in random.Random(1).sample(range(10 * keys), keys)}
+    store = ShardedStore(shards)
+    for key, value in state.items():
+        store.put(key, value)
+    start = time.perf_counter()
+    for _ in range(reps):
+        sorted(state.keys())
+    before = (time.perf_counter() - start) / reps * 1000
+    start = time.perf_counter()
+    for _ in range(reps):
+        store.keys()
+    after = (time.perf_counter() - start) / reps * 1000
+    return before, after
+
+
+def run_threads_benchmark(total_ops: int = 20000, threads=DEFAULT_THREADS, shards=(1, DEFAULT_SHARDS),
+                          keys: int = 10000, port: int = DEFAULT_PORT, quiet: bool = False) -> dict:
+    """Aggregate ops/sec of N client threads for each shard count."""
+    say = (lambda *a: None) if quiet else print
+    say("=" * 64)
+    say(f"THREADS: {total_ops} PUT/GET ops split over N connections")
+    say("=" * 64)
+    say(f"{'threads':>8} " + " ".join(f"{f'{n} shard(s)':>14}" for n in shards) + "   (ops/s)")
+    say("-" * 64)
+
+    table = {n: {} for n in shards}
+    for n_shards in shards:
+        with ServerProcess(port, n_shards) as server_port:
+            for n_threads in threads:
+                barrier = threading.Barrier(n_threads + 1)
+                errors: list = []
+                workers = [threading.Thread(target=_thread_worker,
+                                            args=(server_port, total_ops // n_threads, keys, i,
+                                                  barrier, errors))
+                           for i in range(n_threads)]
+                for w in workers:
+                    w.start()
+                barrier.wait()
+                start = time.perf_counter()
+                for w in workers:
+                    w.join()
+                elapsed = time.perf_counter() - start
+                if errors:
+                    raise RuntimeError(f"{len(errors)} client errors: {errors[0]}")
+                table[n_shards][n_threads] = (total_ops // n_threads) * n_threads / elapsed
+        port += 1
+
+    for n_threads in threads:
+        say(f"{n_threads:>8} " + " ".join(f"{table[n][n_threads]:>14,.0f}" for n in shards))
+    say("-" * 64)
+
+    before, after = _keys_cost(keys, max(shards))
+    say(f"KEYS over {keys} keys: sorted(dict) {before:.2f} ms, ordered index {after:.2f} ms")
+    return {"ops_per_s": {str(n): {str(t): r for t, r in row.items()} for n, row in table.items()},
+            "keys_ms": {"sorted_dict": before, "ordered_index": after}}
+
+
+# =============================================================================
+# Multi-key opcodes
+# =============================================================================
+
+def run_batch_benchmark(keys: int = 20000, batches=(10, 100, 1000), port: int = DEFAULT_PORT,
+                        quiet: bool = False) -> List[dict]:
+    """keys/sec for reading (and listing) the same key set in different ways."""
+    say = (lambda *a: None) if quiet else print
+    say("=" * 64)
+    say(f"BATCH: reading {keys} keys over one connection")
+    say("=" * 64)
+    say(f"{'method':<32} {'keys/s':>14} {'ms':>10}")
+    say("-" * 64)
+
+    names = [f"key{i:07d}" for i in range(keys)]
+    rows = []
+
+    def add(method: str, fn) -> None:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        rows.append({"method": method, "keys_per_s": keys / elapsed, "ms": elapsed * 1000})
+        say(f"{method:<32} {keys / elapsed:>14,.0f} {elapsed * 1000:>10.1f}")
+
+    with ServerProcess(port) as server_port:
+        client = _client(server_port)
+        try:
+            for i in range(0, keys, 1000):
+                client.mset((k, f"value-{k}") for k in names[i:i + 1000])
+
+            add("GET, one at a time", lambda: [client.get(k) for k in names])
+            add("GET, pipelined (window 64)", lambda: client.get_many(names, 64))
+            for size in batches:
+                add(f"MGET, {size} keys per message",
+                    lambda size=size: [client.mget(names[i:i + size]) for i in range(0, keys, size)])
+            for size in batches:
+                add(f"SCAN, {size} keys per page", lambda size=size: list(client.iter_keys(size)))
+        finally:
+            client.close()
+    say("-" * 64)
+    return rows
+
+
+# =============================================================================
+# Codec microbenchmarks
+# =============================================================================
+# The _legacy_* functions are the original proto_common code (format strings
+# parsed on every call, CRC over a concatenated copy, header re-packed to
+# validate), kept here as the baseline.
+
+@dataclass(frozen=True)
+class _LegacyHeader:
+    magic: bytes
+    version: int
+    mtype: int
+    payload_len: int
+    seq: int
+    crc: int
+
+
+def _legacy_pack_bin_message(mtype: int, payload: bytes, seq: int) -> bytes:
+    header_wo_crc = struct.pack("!2sBBHI", BIN_MAGIC, BIN_VERSION, mtype, len(payload), seq)
+    msg_crc = zlib.crc32(header_wo_crc + payload) & 0xFFFFFFFF
+    header = struct.pack(BIN_HEADER_FMT, BIN_MAGIC, BIN_VERSION, mtype, len(payload), seq, msg_crc)
+    return header + payload
+
+
+def _legacy_decode_all(buf: bytes) -> int:
+    """Slice, unpack, re-pack and CRC every message; returns how many."""
+    offset = n = 0
+    while offset < len(buf):
+        magic, ver, mtype, plen, seq, crc = struct.unpack(BIN_HEADER_FMT, buf[offset:offset + BIN_HEADER_LEN])
+        header = _LegacyHeader(magic, ver, mtype, plen, seq, crc)
+        payload = buf[offset + BIN_HEADER_LEN:offset + BIN_HEADER_LEN + plen]
+        header_wo_crc = struct.pack("!2sBBHI", header.magic, header.version, header.mtype,
+                                    header.payload_len, header.seq)
+        if zlib.crc32(header_wo_crc + payload) & 0xFFFFFFFF != header.crc:
+            raise ValueError("CRC mismatch")
+        offset += BIN_HEADER_LEN + plen
+        n += 1
+    return n
+
+
+def _decode_all(buf: bytes) -> int:
+    frames, _ = split_bin_frames(buf)
+    for header, payload in frames:
+        if not validate_bin_message(header, payload):
+            raise ValueError("CRC mismatch")
+    return len(frames)
+
+
+_HDR_WO_CRC = struct.Struct("!2sBBHI")
+_CRC = struct.Struct("!I")
+
+
+def _pack_into_reused(buf: bytearray, mtype: int, payloads: list) -> memoryview:
+    """All messages written with pack_into into one preallocated buffer."""
+    view = memoryview(buf)
+    offset = 0
+    for seq, payload in enumerate(payloads):
+        plen = len(payload)
+        _HDR_WO_CRC.pack_into(buf, offset, BIN_MAGIC, BIN_VERSION, mtype, plen, seq)
+        view[offset + BIN_HEADER_LEN:offset + BIN_HEADER_LEN + plen] = payload
+        crc = zlib.crc32(payload, zlib.crc32(view[offset:offset + BIN_HEADER_LEN - 4]))
+        _CRC.pack_into(buf, offset + BIN_HEADER_LEN - 4, crc)
+        offset += BIN_HEADER_LEN + plen
+    return view[:offset]
+
+
+def _legacy_pack_udp(sensor_id: int, temp_c: float, location: str) -> bytes:
+    loc_b = location.encode("utf-8")[:10].ljust(10, b"\x00")
+    base = struct.pack(UDP_FMT_WO_CRC, UDP_VER, sensor_id, temp_c, loc_b)
+    return struct.pack(UDP_FMT, UDP_VER, sensor_id, temp_c, loc_b, zlib.crc32(base) & 0xFFFFFFFF)
+
+
+def _legacy_unpack_udp(data: bytes) -> tuple:
+    ver, sensor_id, temp_c, loc_b, received_crc = struct.unpack(UDP_FMT, data)
+    base = struct.pack(UDP_FMT_WO_CRC, ver, sensor_id, temp_c, loc_b)
+    if zlib.crc32(base) & 0xFFFFFFFF != received_crc:
+        raise ValueError("CRC mismatch")
+    return ver, sensor_id, temp_c, loc_b.decode("utf-8", errors="replace").rstrip("\x00")
+
+
+def _rate(fn, msgs_per_call: int, min_time: float) -> float:
+    """msgs/sec of fn(), repeated for at least min_time seconds."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls * msgs_per_call / elapsed
+
+
+def run_codec_benchmark(sizes=(16, 1024, 65535), batch: int = 256, min_time: float = 0.2,
+                        rounds: int = 5, quiet: bool = False) -> List[dict]:
+    """
+    Before/after msgs/sec for each encoder and decoder. The two versions
+    alternate for `rounds` rounds and the best round of each is kept, so a
+    burst of load on the machine does not favour either side.
+    """
+    say = (lambda *a: None) if quiet else print
+    say("=" * 72)
+    say("CODEC: proto_common encoders/decoders (msgs/sec, one thread)")
+    say("=" * 72)
+    say(f"{'operation':<34} {'before':>11} {'after':>11} {'speedup':>9}")
+    say("-" * 72)
+
+    rows = []
+
+    def add(name: str, before, after, msgs: int = 1) -> None:
+        b = a = 0.0
+        for _ in range(rounds):
+            b = max(b, _rate(before, msgs, min_time))
+            a = max(a, _rate(after, msgs, min_time))
+        rows.append({"operation": name, "before": b, "after": a, "speedup": a / b})
+        say(f"{name:<34} {b:>11,.0f} {a:>11,.0f} {a / b:>8.2f}x")
+
+    for size in sizes:
+        payload = bytes(size)
+        if _legacy_pack_bin_message(TYPE_ECHO_REQ, payload, 7) != pack_bin_message(TYPE_ECHO_REQ, payload, 7):
+            raise RuntimeError("encoders disagree")
+        add(f"pack_bin_message {size} B",
+            lambda: _legacy_pack_bin_message(TYPE_ECHO_REQ, payload, 7),
+            lambda: pack_bin_message(TYPE_ECHO_REQ, payload, 7))
+
+    for size in sizes[:2]:
+        payloads = [bytes(size)] * batch
+        reused = bytearray(batch * (BIN_HEADER_LEN + size))
+        joined = b"".join(pack_bin_message(TYPE_ECHO_REQ, p, i) for i, p in enumerate(payloads))
+        if bytes(_pack_into_reused(reused, TYPE_ECHO_REQ, payloads)) != joined:
+            raise RuntimeError("pack_into variant disagrees")
+        add(f"{batch} x {size} B: join vs pack_into",
+            lambda: b"".join([pack_bin_message(TYPE_ECHO_REQ, p, i) for i, p in enumerate(payloads)]),
+            lambda: _pack_into_reused(reused, TYPE_ECHO_REQ, payloads), batch)
+        add(f"decode+CRC {batch} x {size} B",
+            lambda: _legacy_decode_all(joined), lambda: _decode_all(joined), batch)
+
+    datagram = pack_udp_sensor(42, 21.5, "Lab1")
+    if _legacy_pack_udp(42, 21.5, "Lab1") != datagram:
+        raise RuntimeError("UDP encoders disagree")
+    add("pack_udp_sensor", lambda: _legacy_pack_udp(42, 21.5, "Lab1"),
+        lambda: pack_udp_sensor(42, 21.5, "Lab1"))
+    add("unpack_udp_sensor", lambda: _legacy_unpack_udp(datagram),
+        lambda: unpack_udp_sensor(datagram))
+    say("-" * 72)
+    say("(join vs pack_into: 'before' is b''.join of pack_bin_message results,")
+    say(" 'after' writes the same bytes with pack_into into one reused buffer)")
+    return rows
+
+
+# =============================================================================
+# Sensor statistics
+# =============================================================================
+
+class _ListSensorStats:
+    """The original udp_sensor_server.SensorStats: keeps every reading."""
+
+    def __init__(self):
+        self.readings: List[float] = []
+        self.last_location = ""
+
+    def add(self, temp: float, location: str, ts: float = 0.0) -> None:
+        self.readings.append(temp)
+        self.last_location = location
+
+    def summary(self) -> tuple:
+        r = self.readings
+        return len(r), sum(r) / len(r), min(r), max(r)
+
+
+def _aggregate_summary(agg: SensorAggregate) -> tuple:
+    s = agg.stats
+    return (s.count, s.mean, s.stddev, s.min, s.max,
+            agg.sketch.quantile(0.5), agg.sketch.quantile(0.95), agg.sketch.quantile(0.99))
+
+
+def _ingest(factory, readings: List[tuple]) -> dict:
+    stats = {}
+    for sensor_id, temp in readings:
+        s = stats.get(sensor_id)
+        if s is None:
+            s = stats[sensor_id] = factory()
+        s.add(temp, "Lab", 0.0)
+    return stats
+
+
+def run_stats_benchmark(counts=(10000, 100000, 1000000), sensors: int = 100,
+                        quiet: bool = False) -> List[dict]:
+    """
+    For N readings spread over `sensors` sensors: readings/sec to ingest,
+    memory held after ingest (tracemalloc, separate pass) and the time to
+    build one report (what print_stats does every --stats-interval readings).
+    """
+    say = (lambda *a: None) if quiet else print
+    say("=" * 78)
+    say(f"STATS: per-sensor statistics, {sensors} sensors")
+    say("=" * 78)
+    say(f"{'readings':>10} {'design':<10} {'ingest/s':>11} {'memory':>11} {'report ms':>10}  p95 / exact")
+    say("-" * 78)
+
+    rng = random.Random(4)
+    rows = []
+    for n in counts:
+        readings = [(rng.randrange(sensors), rng.gauss(22.0, 5.0)) for _ in range(n)]
+        exact = sorted(t for sid, t in readings if sid == 0)
+        exact_p95 = exact[int(0.95 * (len(exact) - 1))]
+        for name, factory, summary in (("list", _ListSensorStats, _ListSensorStats.summary),
+                                       ("streaming", SensorAggregate, _aggregate_summary)):
+            start = time.perf_counter()
+            stats = _ingest(factory, readings)
+            ingest = n / (time.perf_counter() - start)
+            start = time.perf_counter()
+            report = [summary(stats[sid]) for sid in sorted(stats)]
+            report_ms = (time.perf_counter() - start) * 1000
+            del stats
+
+            tracemalloc.start()
+            stats = _ingest(factory, readings)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            p95 = stats[0].sketch.quantile(0.95) if name == "streaming" else exact_p95
+            del stats
+
+            rows.append({"readings": n, "design": name, "ingest_per_sec": ingest,
+                         "memory_bytes": memory, "report_ms": report_ms, "p95": p95,
+                         "exact_p95": exact_p95, "sensors": len(report)})
+            say(f"{n:>10,} {name:<10} {ingest:>11,.0f} {memory / 1024:>9,.0f} K "
+                f"{report_ms:>10.2f}  {p95:.2f} / {exact_p95:.2f}")
+    say("-" * 78)
+    say("(list: avg/min/max only; streaming adds stddev and p50/p95/p99 from DDSketch)")
+    return rows
+
+
+# =============================================================================
+# UDP sensor ingest
+# =============================================================================
+
+DEFAULT_UDP_PORT = 5492
+DEFAULT_RATES = (10000, 20000, 40000, 80000, 160000)
+
+
+def _per_datagram_receiver(port: int, out, stop) -> None:
+    """The original server loop: recvfrom() + unpack_udp_sensor() + add()."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", port))
+    sock.settimeout(0.1)
+    stats = {}
+    received = 0
+    while True:
+        try:
+            data, _addr = sock.recvfrom(1024)
+        except socket.timeout:
+            if stop.is_set():
+                break
+            continue
+        received += 1
+        if len(data) != UDP_LEN:
+            continue
+        try:
+            _ver, sensor_id, temp_c, location = unpack_udp_sensor(data)
+        except ValueError:
+            continue
+        agg = stats.get(sensor_id)
+        if agg is None:
+            agg = stats[sensor_id] = SensorAggregate()
+        agg.add(temp_c, location)
+    sock.close()
+    out.put(received)
+
+
+def _offered_load(mode: str, workers: int, rate: int, duration: float, senders: int,
+                  sensors: int, port: int, batch: int) -> dict:
+    """One run: start the receiver(s), send at `rate`, count what arrived."""
+    if mode == "per-datagram":
+        out, stop = mp.Queue(), mp.Event()
+        procs = [mp.Process(target=_per_datagram_receiver, args=(port, out, stop), daemon=True)]
+        procs[0].start()
+    else:
+        procs, out, stop, _spawn = start_workers("127.0.0.1", port, workers, batch, flush_interval=0.5)
+    time.sleep(0.5)  # let every receiver bind before the first datagram
+
+    start = time.perf_counter()
+    sent = run_load(("127.0.0.1", port), rate, duration, senders, sensors)
+    send_rate = sent / (time.perf_counter() - start)
+    time.sleep(0.5)  # whatever is still queued in the socket buffers
+    stop.set()
+
+    received = 0
+    while any(p.is_alive() for p in procs) or not out.empty():
+        try:
+            msg = out.get(timeout=0.2)
+        except Exception:
+            continue
+        received += msg if mode == "per-datagram" else msg[1]
+    for p in procs:
+        p.join()
+    loss = 1 - received / sent if sent else 0.0
+    return {"mode": mode, "workers": workers, "offered": rate, "sent_per_sec": send_rate,
+            "sent": sent, "received": received, "loss": max(loss, 0.0)}
+
+
+def _decode_cost(batch: int, sensors: int, min_time: float) -> List[dict]:
+    """In-process microseconds per datagram to decode and aggregate."""
+    rng = random.Random(42)
+    datagrams = [pack_udp_sensor(rng.randrange(sensors), rng.gauss(22.0, 3.0), "Load")
+                 for _ in range(batch)]
+    buf = bytearray(b"".join(d + b"\x00" for d in datagrams))
+    lengths = [UDP_LEN] * batch
+
+    # Aggregates persist across calls, as in a running server
+    def per_datagram(stats={}) -> None:
+        for data in datagrams:
+            _ver, sensor_id, temp_c, location = unpack_udp_sensor(data)
+            agg = stats.get(sensor_id)
+            if agg is None:
+                agg = stats[sensor_id] = SensorAggregate()
+            agg.add(temp_c, location)
+
+    def batched(use_numpy: bool):
+        stats = {}
+
+        def run() -> None:
+            groups, _bad = decode_udp_batch(buf, lengths, use_numpy)
+            now = time.time()
+            for sensor_id, (location, temps) in groups.items():
+                agg = stats.get(sensor_id)
+                if agg is None:
+                    agg = stats[sensor_id] = SensorAggregate()
+                agg.add_many(temps, location, now)
+        return run
+
+    variants = [("per-datagram unpack + add", per_datagram),
+                ("decode_udp_batch (struct) + add_many", batched(False))]
+    if np is not None:
+        variants.append(("decode_udp_batch (NumPy) + add_many", batched(True)))
+    return [{"variant": name, "us_per_datagram": 1e6 / _rate(fn, batch, min_time)}
+            for name, fn in variants]
+
+
+def run_udp_benchmark(rates=DEFAULT_RATES, workers=(1, 2), duration: float = 2.0, senders: int = 4,
+                      sensors: int = 100, batch: int = 256, max_loss: float = 0.001,
+                      port: int = DEFAULT_UDP_PORT, quiet: bool = False) -> dict:
+    """
+    Decode cost per datagram, then for each receiver configuration the
+    offered rates in increasing order until loss exceeds max_loss. The
+    sustained rate is the highest offered rate with loss <= max_loss.
+    Senders run on the same machine, so they compete with the receivers
+    for CPU.
+    """
+    say = (lambda *a: None) if quiet else print
+    say("=" * 78)
+    say(f"UDP INGEST: {sensors} sensors, batch {batch}, {senders} sender processes")
+    say("=" * 78)
+    decode = _decode_cost(batch, sensors, 0.3)
+    for row in decode:
+        say(f"  {row['variant']:<40} {row['us_per_datagram']:>6.2f} us/datagram")
+    say("-" * 78)
+    say(f"{'receiver':<22} {'offered/s':>10} {'sent/s':>10} {'received':>10} {'loss':>8}")
+    say("-" * 78)
+
+    configs = [("per-datagram", 1)] + [("batched", w) for w in workers]
+    runs, sustained = [], {}
+    for mode, nworkers in configs:
+        label = "per-datagram" if mode == "per-datagram" else f"batched x{nworkers}"
+        sustained[label] = 0
+        for rate in rates:
+            row = _offered_load(mode, nworkers, rate, duration, senders, sensors, port, batch)
+            runs.append(row)
+            say(f"{label:<22} {rate:>10,} {row['sent_per_sec']:>10,.0f} {row['received']:>10,} "
+                f"{row['loss'] * 100:>7.2f}%")
+            if row["loss"] > max_loss:
+                break
+            sustained[label] = rate
+    say("-" * 78)
+    for label, rate in sustained.items():
+        say(f"  sustained without loss (<= {max_loss * 100:g}%): {label:<14} {rate:>10,} datagrams/s")
+    return {"decode": decode, "runs": runs, "sustained": sustained}
+
+
+# =============================================================================
+# Time-series store
+# =============================================================================
+
+def _random_walk(n: int, seed: int = 43) -> List[float]:
+    """Temperatures that drift by 0.1 °C steps, like a real sensor."""
+    rng = random.Random(seed)
+    x, out = 21.0, []
+    for _ in range(n):
+        x = min(max(x + rng.choice((-0.1, 0.0, 0.0, 0.1)), -20.0), 45.0)
+        out.append(round(x, 1))
+    return out
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run_tsdb_benchmark(readings: int = 100_000_000, sensors: int = 100, interval: float = 1.0,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, path: Optional[str] = None,
+                       quiet: bool = False) -> dict:
+    """
+    Ingest `readings` readings spread evenly over `sensors` sensors, one
+    every `interval` seconds per sensor, in time order (every sensor gets
+    a block, then the next block of time). Ingest rate counts only the
+    time spent in the store, not generating the data. Queries then run on
+    a fresh read-only instance: the last 24 hours of one sensor and of all
+    sensors, as raw readings and downsampled to 1-hour buckets.
+    """
+    say = (lambda *a: None) if quiet else print
+    tmp = path or tempfile.mkdtemp(prefix="ts_store_")
+    per_sensor = readings // sensors
+    block = 65536
+    walk = _random_walk(1 << 20)
+    t0 = 1_700_000_000.0
+    result = {"readings": per_sensor * sensors, "sensors": sensors, "chunk_size": chunk_size}
+
+    say("=" * 72)
+    say(f"TSDB: {per_sensor * sensors:,} readings, {sensors} sensors, one every {interval:g}s, "
+        f"chunks of {chunk_size}")
+    say("=" * 72)
+    try:
+        store = TimeSeriesStore(tmp, segment="bench", chunk_size=chunk_size)
+        spent = 0.0
+        wall = time.perf_counter()
+        for start in range(0, per_sensor, block):
+            n = min(block, per_sensor - start)
+            times = [t0 + i * interval for i in range(start, start + n)]
+            for sensor_id in range(sensors):
+                off = (sensor_id * 7919 + start) % len(walk)
+                temps = (walk[off:off + n] + walk[:max(0, off + n - len(walk))])
+                began = time.perf_counter()
+                store.append_many(sensor_id, times, temps)
+                spent += time.perf_counter() - began
+        began = time.perf_counter()
+        store.close()
+        spent += time.perf_counter() - began
+        wall = time.perf_counter() - wall
+        disk = TimeSeriesStore(tmp, segment=None).disk_usage()
+        total = per_sensor * sensors
+        result.update(ingest_seconds=spent, ingest_per_sec=total / spent, wall_seconds=wall,
+                      disk_bytes=disk, bytes_per_reading=disk / total)
+        say(f"  ingest             {total / spent:>12,.0f} readings/s  ({spent:.1f} s in the store, "
+            f"{wall:.1f} s with data generation)")
+        say(f"  on disk            {disk / 2**20:>12,.1f} MiB  = {disk / total:.3f} B/reading "
+            f"(raw 12 B: {12 * total / disk:.1f}x smaller)")
+        say("-" * 72)
+
+        end = t0 + per_sensor * interval
+        day = (end - 86400, end)
+        reader, opened = _timed(TimeSeriesStore, tmp, None)
+        say(f"  open + load index  {opened * 1000:>12.1f} ms  ({sum(len(c) for c in reader._chunks.values()):,} chunks)")
+        queries = [
+            ("24h raw, 1 sensor", lambda: len(reader.query(0, *day)[0])),
+            ("24h raw, 1 sensor (again)", lambda: len(reader.query(0, *day)[0])),
+            ("24h 1h buckets, 1 sensor", lambda: len(reader.downsample(0, *day, 3600))),
+            ("all history 1d buckets, 1 sensor", lambda: len(reader.downsample(0, t0, end, 86400))),
+            (f"24h raw, {sensors} sensors",
+             lambda: sum(len(reader.query(s, *day)[0]) for s in range(sensors))),
+            (f"24h 1h buckets, {sensors} sensors",
+             lambda: sum(len(reader.downsample(s, *day, 3600)) for s in range(sensors))),
+        ]
+        rows = []
+        for name, fn in queries:
+            count, seconds = _timed(fn)
+            rows.append({"query": name, "seconds": seconds, "rows": count})
+            say(f"  {name:<34} {seconds * 1000:>10.1f} ms  {count:>10,} rows")
+        reader.close()
+        result["queries"] = rows
+        say("-" * 72)
+        say("(raw queries decode only the chunks that overlap the range; 1d buckets")
+        say(" use the per-chunk min/max/sum from the index for whole chunks)")
+    finally:
+        if path is None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return result
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def _int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Binary protocol benchmarks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s pipeline
+  %(prog)s pipeline --ops 50000 --windows 1,16,256 --json
+  %(prog)s threads --threads 1,8,64 --shards 1,16
+  %(prog)s batch --keys 20000 --batches 10,100,1000
+  %(prog)s codec --sizes 16,1024 --json
+  %(prog)s stats --readings 10000,100000 --sensors 1000
+  %(prog)s udp --rates 10000,40000 --workers 1,2,4 --duration 3
+  %(prog)s tsdb --readings 10000000 --sensors 100
+        """
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    pipe = sub.add_parser("pipeline", help="ops/sec vs number of requests in flight")
+    pipe.add_argument("--ops", type=int, default=20000)
+    pipe.add_argument("--keys", type=int, default=1000)
+    pipe.add_argument("--windows", type=_int_list, default=list(DEFAULT_WINDOWS),
+                      help="Comma-separated window sizes (default: 1..256)")
+    pipe.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    thr = sub.add_parser("threads", help="PUT/GET ops/sec vs client threads and store shards")
+    thr.add_argument("--ops", type=int, default=20000, help="Total ops, split over the threads")
+    thr.add_argument("--keys", type=int, default=10000)
+    thr.add_argument("--threads", type=_int_list, default=list(DEFAULT_THREADS),
+                     help="Comma-separated thread counts (default: 1..64)")
+    thr.add_argument("--shards", type=_int_list, default=[1, DEFAULT_SHARDS],
+                     help=f"Comma-separated shard counts (default: 1,{DEFAULT_SHARDS})")
+    thr.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    bat = sub.add_parser("batch", help="GET vs pipelined GET vs MGET, SCAN page sizes")
+    bat.add_argument("--keys", type=int, default=20000)
+    bat.add_argument("--batches", type=_int_list, default=[10, 100, 1000],
+                     help="Comma-separated MGET/SCAN sizes (default: 10,100,1000)")
+    bat.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    cod = sub.add_parser("codec", help="msgs/sec of pack/unpack, before vs after")
+    cod.add_argument("--sizes", type=_int_list, default=[16, 1024, 65535],
+                     help="Comma-separated payload sizes (default: 16,1024,65535)")
+    cod.add_argument("--batch", type=int, default=256, help="Messages per decode buffer")
+    cod.add_argument("--min-time", type=float, default=0.2, help="Seconds per measurement")
+    cod.add_argument("--rounds", type=int, default=5, help="Alternating rounds, best kept")
+    cod.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    sta = sub.add_parser("stats", help="UDP sensor stats: list of readings vs streaming aggregates")
+    sta.add_argument("--readings", type=_int_list, default=[10000, 100000, 1000000],
+                     help="Comma-separated reading counts (default: 10000,100000,1000000)")
+    sta.add_argument("--sensors", type=int, default=100)
+    sta.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    udp = sub.add_parser("udp", help="UDP sensor ingest: datagrams/sec received without loss")
+    udp.add_argument("--rates", type=_int_list, default=list(DEFAULT_RATES),
+                     help="Comma-separated offered rates, datagrams/sec (default: 10000..160000)")
+    udp.add_argument("--workers", type=_int_list, default=[1, 2],
+                     help="Comma-separated SO_REUSEPORT worker counts (default: 1,2)")
+    udp.add_argument("--duration", type=float, default=2.0, help="Seconds per offered rate")
+    udp.add_argument("--senders", type=int, default=4, help="Load generator processes")
+    udp.add_argument("--sensors", type=int, default=100)
+    udp.add_argument("--batch", type=int, default=256, help="Datagrams per receive batch")
+    udp.add_argument("--udp-port", type=int, default=DEFAULT_UDP_PORT)
+    udp.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    tsd = sub.add_parser("tsdb", help="time-series store: ingest rate, size, 24h range queries")
+    tsd.add_argument("--readings", type=int, default=100_000_000)
+    tsd.add_argument("--sensors", type=int, default=100)
+    tsd.add_argument("--interval", type=float, default=1.0, help="Seconds between readings of a sensor")
+    tsd.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    tsd.add_argument("--dir", help="Keep the store in DIR (default: temporary, removed)")
+    tsd.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.bench == "pipeline":
+        rows = run_pipeline_benchmark(args.ops, args.windows, args.keys, args.port,
+                                      quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+    elif args.bench == "threads":
+        result = run_threads_benchmark(args.ops, args.threads, args.shards, args.keys, args.port,
+                                       quiet=args.json)
+        if args.json:
+            print(json.dumps(result, indent=2))
+    elif args.bench == "codec":
+        rows = run_codec_benchmark(args.sizes, args.batch, args.min_time, args.rounds,
+                                   quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+    elif args.bench == "stats":
+        rows = run_stats_benchmark(args.readings, args.sensors, quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+    elif args.bench == "udp":
+        result = run_udp_benchmark(args.rates, args.workers, args.duration, args.senders,
+                                   args.sensors, args.batch, port=args.udp_port, quiet=args.json)
+        if args.json:
+            print(json.dumps(result, indent=2))
+    elif args.bench == "tsdb":
+        result = run_tsdb_benchmark(args.readings, args.sensors, args.interval, args.chunk_size,
+                                    args.dir, quiet=args.json)
+        if args.json:
+            print(json.dumps(result, indent=2))
+    elif args.bench == "batch":
+        rows = run_batch_benchmark(args.keys, args.batches, args.port, quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
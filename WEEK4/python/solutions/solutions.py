@@ -13,15 +13,22 @@ Autor: Revolvix&Hypotheticalandrei
 # SOLUTIE EXERCITIUL 4.01: Protocol TCP Custom
 # =============================================================================
 
+import math
 import socket
 import struct
+import sys
 import zlib
 import json
 import threading
 import time
 from datetime import datetime
 from typing import Dict, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+# Add utils directory to path (sketch of cuantile comun with serverul UDP)
+sys.path.insert(0, str(__file__).rsplit('/', 2)[0] + '/utils')
+from sensor_stats import DDSketch
+from ts_store import TimeSeriesStore
 
 # Constante protocol TCP
 VALID_COMMANDS = {'ECHO', 'UPPER', 'LOWER', 'REVERSE', 'COUNT'}
@@ -157,19 +164,35 @@ REPORT_INTERVAL = 5
 
 @dataclass
 class SensorStatsSolution:
-    """Statistici for un senzor."""
+    """
+    Statistici for un senzor, in memorie constanta.
+    
+    mean/m2 se actualizeaza with Welford; sketch-ul DDSketch da cuantile
+    (p50/p95/p99) with eroare relativa of 1% and se poate combina (merge)
+    intre senzori for statistici globale.
+    """
     sensor_id: int
     location: str
     count: int = 0
-    total: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
     min_temp: float = float('inf')
     max_temp: float = float('-inf')
     last_reading: float = 0.0
     last_timestamp: str = ""
+    sketch: DDSketch = field(default_factory=DDSketch, repr=False)
     
     @property
     def average(self) -> float:
-        return self.total / self.count if self.count > 0 else 0.0
+        return self.mean if self.count > 0 else 0.0
+    
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+    
+    def quantile(self, q: float) -> Optional[float]:
+        value = self.sketch.quantile(q)
+        return round(value, 2) if value is not None else None
     
     def to_dict(self) -> dict:
         return {
@@ -177,8 +200,12 @@ class SensorStatsSolution:
             'location': self.location,
             'readings_count': self.count,
             'average_temp': round(self.average, 2),
+            'stddev_temp': round(self.stddev, 2),
             'min_temp': round(self.min_temp, 2) if self.min_temp != float('inf') else None,
             'max_temp': round(self.max_temp, 2) if self.max_temp != float('-inf') else None,
+            'p50_temp': self.quantile(0.5),
+            'p95_temp': self.quantile(0.95),
+            'p99_temp': self.quantile(0.99),
             'last_reading': round(self.last_reading, 2),
             'last_timestamp': self.last_timestamp
         }
@@ -233,7 +260,10 @@ def sol_update_statistics(stats: Dict[int, SensorStatsSolution],
     
     sensor = stats[sensor_id]
     sensor.count += 1
-    sensor.total += temperature
+    delta = temperature - sensor.mean
+    sensor.mean += delta / sensor.count
+    sensor.m2 += delta * (temperature - sensor.mean)
+    sensor.sketch.add(temperature)
     sensor.min_temp = min(sensor.min_temp, temperature)
     sensor.max_temp = max(sensor.max_temp, temperature)
     sensor.last_reading = temperature
@@ -246,13 +276,19 @@ def sol_generate_report(stats: Dict[int, SensorStatsSolution]) -> dict:
     SOLUTIE: Genereaza un raport JSON with toate statisticile.
     """
     total_readings = sum(s.count for s in stats.values())
-    all_temps = [s.last_reading for s in stats.values() if s.count > 0]
+    # Media globala ponderata with numarul of citiri; p95 global din sketch-uri combinate
+    weighted = sum(s.mean * s.count for s in stats.values())
+    merged = DDSketch()
+    for s in stats.values():
+        merged.merge(s.sketch)
+    p95 = merged.quantile(0.95)
     
     report = {
         'timestamp': datetime.now().isoformat(),
         'total_sensors': len(stats),
         'total_readings': total_readings,
-        'global_average': round(sum(all_temps) / len(all_temps), 2) if all_temps else None,
+        'global_average': round(weighted / total_readings, 2) if total_readings else None,
+        'global_p95': round(p95, 2) if p95 is not None else None,
         'sensors': [s.to_dict() for s in stats.values()]
     }
     
@@ -270,7 +306,7 @@ def sol_print_report(stats: Dict[int, SensorStatsSolution]) -> None:
     print(f"Total citiri: {report['total_readings']}")
     
     if report['global_average']:
-        print(f"Medie globala: {report['global_average']}°C")
+        print(f"Medie globala: {report['global_average']}°C (p95 {report['global_p95']}°C)")
     
     print("\nDetalii per senzor:")
     print("-"*60)
@@ -278,8 +314,9 @@ def sol_print_report(stats: Dict[int, SensorStatsSolution]) -> None:
     for sensor in report['sensors']:
         print(f"  Senzor {sensor['sensor_id']} @ {sensor['location']}:")
         print(f"    Citiri: {sensor['readings_count']}")
-        print(f"    Medie: {sensor['average_temp']}°C")
+        print(f"    Medie: {sensor['average_temp']}°C (sd {sensor['stddev_temp']})")
         print(f"    Min/Max: {sensor['min_temp']}°C / {sensor['max_temp']}°C")
+        print(f"    p50/p95/p99: {sensor['p50_temp']} / {sensor['p95_temp']} / {sensor['p99_temp']}°C")
         print(f"    Ultima: {sensor['last_reading']}°C")
     
     print("="*60 + "\n")
@@ -297,11 +334,16 @@ def sol_periodic_reporter(stats: Dict[int, SensorStatsSolution],
 
 def sol_run_aggregator(host: str = '0.0.0.0',
                        port: int = UDP_DEFAULT_PORT,
-                       report_interval: int = REPORT_INTERVAL) -> None:
+                       report_interval: int = REPORT_INTERVAL,
+                       store_dir: Optional[str] = None) -> None:
     """
     SOLUTIE: Ruleaza serverul agregator UDP.
+    
+    With store_dir, fiecare citire se salveaza and pe disc (TimeSeriesStore),
+    deci poate fi interogata dupa interval of timp and dupa oprire.
     """
     stats: Dict[int, SensorStatsSolution] = {}
+    store = TimeSeriesStore(store_dir) if store_dir else None
     
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind((host, port))
@@ -328,6 +370,8 @@ def sol_run_aggregator(host: str = '0.0.0.0',
                 if result:
                     sensor_id, temperature, location = result
                     sol_update_statistics(stats, sensor_id, temperature, location)
+                    if store is not None:
+                        store.append(sensor_id, time.time(), temperature)
                     print(f"[+] Senzor {sensor_id} @ {location}: {temperature:.1f}°C")
                 else:
                     print(f"[-] Datagrama invalida of to {addr}")
@@ -344,6 +388,8 @@ def sol_run_aggregator(host: str = '0.0.0.0',
             
     finally:
         sock.close()
+        if store is not None:
+            store.close()
         print("[*] Agregator oprit")
 
 
@@ -396,13 +442,14 @@ Acest fisier contine solutiile complete for:
 Utilizare:
   python3 solutions.py tcp     # Porneste serverul TCP (ex 4.01)
   python3 solutions.py udp     # Porneste agregatorul UDP (ex 4.02)
+  python3 solutions.py udp DIR # ... and salveaza citirile in store-ul din DIR
 """)
     
     if len(sys.argv) > 1:
         if sys.argv[1] == 'tcp':
             sol_start_tcp_server()
         elif sys.argv[1] == 'udp':
-            sol_run_aggregator()
+            sol_run_aggregator(store_dir=sys.argv[2] if len(sys.argv) > 2 else None)
         else:
             print(f"Optiune necunoscuta: {sys.argv[1]}")
     else:
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Concurrent key-value store shared by the Week 4 TCP servers.
+
+The TEXT and BINARY servers keep one store for all client threads. This
+module replaces the original "one dict + one lock" with:
+
+1. Lock striping: keys are spread over N shards (dict + lock each), so
+   writers to different shards do not wait for each other
+2. Ordered index: a sorted list of keys maintained with bisect on insert and
+   delete, so KEYS returns a copy instead of sorting on every call and SCAN
+   pages through it by position
+3. Batch operations (get_many/put_many/delete_many) that take each shard
+   lock once per batch instead of once per key
+4. Optional persistence:
+   - snapshot: the whole store as JSON, written atomically (tmp + rename)
+   - append-only file (AOF): one JSON line per PUT/DEL, replayed at start-up
+     after the snapshot; a snapshot truncates the AOF
+
+Lock order is always shard lock(s) -> index lock -> AOF lock, so the index
+and the AOF see changes to one key in the same order as the shard.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_SHARDS = 16
+
+
+class ShardedStore:
+    """
+    Thread-safe str -> str store with lock striping and a sorted key index.
+
+    Example:
+        store = ShardedStore(shards=16, aof_path="kv.aof")
+        store.put("name", "Alice")
+        store.get("name")      # "Alice"
+        store.keys()           # ["name"]
+    """
+
+    def __init__(
+        self,
+        shards: int = DEFAULT_SHARDS,
+        snapshot_path: Optional[str] = None,
+        aof_path: Optional[str] = None,
+        fsync: bool = False
+    ):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self._shards: List[Dict[str, str]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._index: List[str] = []
+        self._index_lock = threading.Lock()
+
+        self.snapshot_path = snapshot_path
+        self.aof_path = aof_path
+        self.fsync = fsync
+        self._aof = None
+        self._aof_lock = threading.Lock()
+
+        self._load()
+        if aof_path:
+            self._aof = open(aof_path, "a", encoding="utf-8")
+
+    # ------------------------------------------------------------------
+    # Key-value operations
+    # ------------------------------------------------------------------
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def get(self, key: str) -> Optional[str]:
+        """Value of key, or None if it does not exist."""
+        i = self._shard(key)
+        with self._locks[i]:
+            return self._shards[i].get(key)
+
+    def put(self, key: str, value: str) -> bool:
+        """Store key = value. Returns True if the key is new."""
+        i = self._shard(key)
+        with self._locks[i]:
+            shard = self._shards[i]
+            is_new = key not in shard
+            shard[key] = value
+            if is_new:
+                with self._index_lock:
+                    insort(self._index, key)
+            self._log(("P", key, value))
+        return is_new
+
+    def delete(self, key: str) -> bool:
+        """Remove key. Returns True if it existed."""
+        i = self._shard(key)
+        with self._locks[i]:
+            if self._shards[i].pop(key, None) is None:
+                return False
+            with self._index_lock:
+                pos = bisect_left(self._index, key)
+                del self._index[pos]
+            self._log(("D", key))
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._index_lock:
+            return len(self._index)
+
+    def count(self) -> int:
+        """Number of keys."""
+        return len(self)
+
+    def keys(self) -> List[str]:
+        """All keys in sorted order (a copy of the index, no sort)."""
+        with self._index_lock:
+            return list(self._index)
+
+    def scan(self, after: Optional[str] = None, limit: int = 1000) -> Tuple[List[str], bool]:
+        """
+        Up to limit sorted keys strictly after `after` (from the start if
+        None). Returns (keys, more). Keys added or removed between pages
+        never make a scan repeat or skip a key that exists throughout.
+        """
+        with self._index_lock:
+            pos = 0 if after is None else bisect_right(self._index, after)
+            page = self._index[pos:pos + limit]
+            return page, pos + len(page) < len(self._index)
+
+    # ------------------------------------------------------------------
+    # Batch operations
+    # ------------------------------------------------------------------
+
+    def _by_shard(self, keys: Sequence[str]) -> Dict[int, List[int]]:
+        """Positions of keys grouped by shard, in request order."""
+        groups: Dict[int, List[int]] = {}
+        for pos, key in enumerate(keys):
+            groups.setdefault(self._shard(key), []).append(pos)
+        return groups
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Values of keys (None where missing), one lock per shard."""
+        values: List[Optional[str]] = [None] * len(keys)
+        for i, positions in self._by_shard(keys).items():
+            shard = self._shards[i]
+            with self._locks[i]:
+                for pos in positions:
+                    values[pos] = shard.get(keys[pos])
+        return values
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> int:
+        """Store all pairs (later duplicates win). Returns new key count."""
+        items = list(items)
+        added = 0
+        for i, positions in self._by_shard([k for k, _ in items]).items():
+            shard = self._shards[i]
+            with self._locks[i]:
+                new_keys = []
+                for pos in positions:
+                    key, value = items[pos]
+                    if key not in shard:
+                        new_keys.append(key)
+                    shard[key] = value
+                    self._log(("P", key, value))
+                if new_keys:
+                    with self._index_lock:
+                        for key in new_keys:
+                            insort(self._index, key)
+                added += len(new_keys)
+        return added
+
+    def delete_many(self, keys: Sequence[str]) -> int:
+        """Remove keys. Returns how many existed."""
+        removed = 0
+        for i, positions in self._by_shard(keys).items():
+            shard = self._shards[i]
+            with self._locks[i]:
+                gone = []
+                for pos in positions:
+                    key = keys[pos]
+                    if shard.pop(key, None) is not None:
+                        gone.append(key)
+                        self._log(("D", key))
+                if gone:
+                    with self._index_lock:
+                        for key in gone:
+                            del self._index[bisect_left(self._index, key)]
+                removed += len(gone)
+        return removed
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Consistent (key, value) pairs, sorted by key."""
+        self._lock_all()
+        try:
+            merged: Dict[str, str] = {}
+            for shard in self._shards:
+                merged.update(shard)
+            return sorted(merged.items())
+        finally:
+            self._unlock_all()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _lock_all(self) -> None:
+        for lock in self._locks:
+            lock.acquire()
+
+    def _unlock_all(self) -> None:
+        for lock in reversed(self._locks):
+            lock.release()
+
+    def _log(self, record: tuple) -> None:
+        """Append one record to the AOF (caller holds the shard lock)."""
+        if self._aof is None:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._aof_lock:
+            self._aof.write(line)
+            self._aof.flush()
+            if self.fsync:
+                os.fsync(self._aof.fileno())
+
+    def _load(self) -> None:
+        """Snapshot first, then replay the AOF on top of it."""
+        data: Dict[str, str] = {}
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                data.update(json.load(f))
+        if self.aof_path and os.path.exists(self.aof_path):
+            good = 0  # end of the last complete record
+            with open(self.aof_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn last line after a crash
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record[0] == "P":
+                        data[record[1]] = record[2]
+                    elif record[0] == "D":
+                        data.pop(record[1], None)
+                    good += len(line)
+            # Cut the torn tail, or the next append would be glued onto it
+            # and lost at the following start-up
+            if good < os.path.getsize(self.aof_path):
+                os.truncate(self.aof_path, good)
+        for key, value in data.items():
+            self._shards[self._shard(key)][key] = value
+        self._index = sorted(data)
+
+    def snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Write the whole store to path (default: snapshot_path) and truncate
+        the AOF. Writers are blocked for the duration. Returns the key count.
+        """
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("no snapshot path")
+        self._lock_all()
+        try:
+            merged: Dict[str, str] = {}
+            for shard in self._shards:
+                merged.update(shard)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            if self._aof is not None and path == self.snapshot_path:
+                with self._aof_lock:
+                    self._aof.truncate(0)
+                    self._aof.seek(0)
+            return len(merged)
+        finally:
+            self._unlock_all()
+
+    def close(self) -> None:
+        """Write a final snapshot (if configured) and close the AOF."""
+        if self.snapshot_path:
+            self.snapshot()
+        if self._aof is not None:
+            with self._aof_lock:
+                self._aof.close()
+                self._aof = None
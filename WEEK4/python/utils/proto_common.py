@@ -12,12 +12,18 @@ Key concepts illustrated:
 - Serialisation: representing structured data in bytes
 - Error detection: CRC32 for integrity verification
 - Endianness: byte order in multi-byte representations (Big-Endian in network)
+
+Performance notes: every wire format has a precompiled struct.Struct (the
+format string is parsed once, not on every call), CRCs are computed
+incrementally with zlib.crc32(payload, crc32(header)) instead of over a
+concatenated copy, and decoders read straight from the receive buffer
+with unpack_from() instead of slicing and re-packing.
 """
 from __future__ import annotations
+import math
 import struct
 import zlib
-from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
 
 # ==============================================================================
@@ -30,15 +36,37 @@ from typing import Tuple
 #   payload_len(2)- payload length in bytes
 #   seq(4)        - sequence number for request-response correlation
 #   crc32(4)      - checksum for header + payload
+#
+# Version 2 (16 bytes) is identical except payload_len is 4 bytes, for
+# payloads above 64 KiB. pack_bin_message() uses version 1 whenever the
+# payload fits, so version-1 peers only ever see version-1 frames for
+# messages they could already exchange.
 # ==============================================================================
 
 BIN_MAGIC = b"NP"
 BIN_VERSION = 1
+BIN_VERSION_2 = 2
 
 # Struct format: ! = network byte order (big-endian)
 # 2s = 2 bytes string, B = unsigned byte, H = unsigned short, I = unsigned int
 BIN_HEADER_FMT = "!2sBBHII"
 BIN_HEADER_LEN = struct.calcsize(BIN_HEADER_FMT)  # = 14 bytes
+BIN_HEADER_V2_FMT = "!2sBBIII"
+BIN_HEADER_V2_LEN = struct.calcsize(BIN_HEADER_V2_FMT)  # = 16 bytes
+
+# Precompiled codecs: full header and header without the trailing CRC field
+BIN_HEADER_STRUCT = struct.Struct(BIN_HEADER_FMT)
+BIN_HEADER_V2_STRUCT = struct.Struct(BIN_HEADER_V2_FMT)
+_BIN_V1_WO_CRC = struct.Struct(BIN_HEADER_FMT[:-1])
+_BIN_V2_WO_CRC = struct.Struct(BIN_HEADER_V2_FMT[:-1])
+_U8 = struct.Struct("!B")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+
+BIN_V1_MAX_PAYLOAD = 0xFFFF
+# Upper bound for version-2 payloads: payload_len comes from the peer and
+# decides how much we buffer before the CRC can be checked
+BIN_MAX_PAYLOAD = 16 * 1024 * 1024
 
 # Message types
 TYPE_ECHO_REQ = 1
@@ -51,6 +79,14 @@ TYPE_KEYS_REQ = 7
 TYPE_KEYS_RESP = 8
 TYPE_COUNT_REQ = 9
 TYPE_COUNT_RESP = 10
+TYPE_MSET_REQ = 11
+TYPE_MSET_RESP = 12
+TYPE_MGET_REQ = 13
+TYPE_MGET_RESP = 14
+TYPE_MDEL_REQ = 15
+TYPE_MDEL_RESP = 16
+TYPE_SCAN_REQ = 17
+TYPE_SCAN_RESP = 18
 TYPE_ERR = 255
 
 TYPE_NAMES = {
@@ -64,6 +100,14 @@ TYPE_NAMES = {
     TYPE_KEYS_RESP: "KEYS_RESP",
     TYPE_COUNT_REQ: "COUNT_REQ",
     TYPE_COUNT_RESP: "COUNT_RESP",
+    TYPE_MSET_REQ: "MSET_REQ",
+    TYPE_MSET_RESP: "MSET_RESP",
+    TYPE_MGET_REQ: "MGET_REQ",
+    TYPE_MGET_RESP: "MGET_RESP",
+    TYPE_MDEL_REQ: "MDEL_REQ",
+    TYPE_MDEL_RESP: "MDEL_RESP",
+    TYPE_SCAN_REQ: "SCAN_REQ",
+    TYPE_SCAN_RESP: "SCAN_RESP",
     TYPE_ERR: "ERROR",
 }
 
@@ -80,12 +124,12 @@ def crc32(data: bytes) -> int:
     return zlib.crc32(data) & 0xFFFFFFFF
 
 
-@dataclass(frozen=True)
-class BinHeader:
+class BinHeader(NamedTuple):
     """
     Decoded binary message header.
     
-    frozen=True makes instances immutable (best practice for data).
+    A NamedTuple is immutable like a frozen dataclass but several times
+    cheaper to build, which matters at one header per message.
     """
     magic: bytes
     version: int
@@ -95,8 +139,15 @@ class BinHeader:
     crc: int
     
     def is_valid_protocol(self) -> bool:
-        """Check if magic and version match our protocol."""
-        return self.magic == BIN_MAGIC and self.version == BIN_VERSION
+        """Check magic, version (1 or 2) and the payload size limit."""
+        return (self.magic == BIN_MAGIC
+                and self.version in (BIN_VERSION, BIN_VERSION_2)
+                and self.payload_len <= BIN_MAX_PAYLOAD)
+    
+    @property
+    def header_len(self) -> int:
+        """Length of this header on the wire (14 or 16 bytes)."""
+        return bin_header_len(self.version)
     
     @property
     def type_name(self) -> str:
@@ -104,48 +155,62 @@ class BinHeader:
         return TYPE_NAMES.get(self.mtype, f"UNKNOWN({self.mtype})")
 
 
-def pack_bin_message(mtype: int, payload: bytes, seq: int) -> bytes:
+def bin_header_len(version: int) -> int:
+    """Header length for a protocol version (the byte at offset 2)."""
+    return BIN_HEADER_V2_LEN if version == BIN_VERSION_2 else BIN_HEADER_LEN
+
+
+def pack_bin_message(mtype: int, payload: bytes, seq: int, version: Optional[int] = None) -> bytes:
     """
     Build a complete binary message (header + payload).
     
     Steps:
-    1. Validate payload
-    2. Build header without CRC
-    3. Calculate CRC over header + payload
-    4. Rebuild header with CRC
-    5. Concatenate header + payload
+    1. Validate payload and pick the header version
+    2. Build header without CRC (precompiled Struct)
+    3. Calculate CRC over header, then continue it over payload
+    4. Append CRC and payload to the header
     
     Args:
         mtype: Message type (TYPE_*)
-        payload: Useful data (max 65535 bytes)
+        payload: Useful data (max 65535 bytes in version 1,
+                 BIN_MAX_PAYLOAD in version 2)
         seq: Sequence number
+        version: BIN_VERSION, BIN_VERSION_2 or None (version 1 if the
+                 payload fits, version 2 otherwise)
         
     Returns:
         bytes: Complete message, ready to send
     """
-    if not isinstance(payload, (bytes, bytearray)):
-        raise TypeError(f"payload must be bytes, got {type(payload)}")
-    if len(payload) > 65535:
-        raise ValueError(f"payload too large: {len(payload)} > 65535")
-    
-    # Partial header (without CRC) for CRC calculation
-    header_wo_crc = struct.pack("!2sBBHI", BIN_MAGIC, BIN_VERSION, mtype, len(payload), seq)
+    plen = len(payload)
     
-    # CRC is calculated over header (without CRC field) + payload
-    msg_crc = crc32(header_wo_crc + payload)
+    # Header without CRC; the CRC field is its last 4 bytes on the wire.
+    # Version 1 is the common case and is checked first.
+    if (version is None and plen <= BIN_V1_MAX_PAYLOAD) or version == BIN_VERSION:
+        if plen > BIN_V1_MAX_PAYLOAD:
+            raise ValueError(f"payload too large: {plen} > {BIN_V1_MAX_PAYLOAD}")
+        header_wo_crc = _BIN_V1_WO_CRC.pack(BIN_MAGIC, BIN_VERSION, mtype, plen, seq)
+    else:
+        if plen > BIN_MAX_PAYLOAD:
+            raise ValueError(f"payload too large: {plen} > {BIN_MAX_PAYLOAD}")
+        header_wo_crc = _BIN_V2_WO_CRC.pack(BIN_MAGIC, BIN_VERSION_2, mtype, plen, seq)
     
-    # Complete header with CRC
-    header = struct.pack(BIN_HEADER_FMT, BIN_MAGIC, BIN_VERSION, mtype, len(payload), seq, msg_crc)
+    # CRC over header (without CRC field) + payload, without concatenating;
+    # zlib.crc32 also rejects non-bytes payloads with TypeError
+    msg_crc = zlib.crc32(payload, zlib.crc32(header_wo_crc))
     
-    return header + payload
+    return header_wo_crc + _U32.pack(msg_crc) + payload
 
 
 def unpack_bin_header(header_bytes: bytes) -> BinHeader:
     """
-    Decoof a binary message header.
+    Decoof a binary message header (version 1 or 2).
+    
+    The version byte (offset 2) selects the layout: version 2 has a 4-byte
+    payload_len. Any other version is decoded with the version-1 layout
+    so that is_valid_protocol() can report the mismatch.
     
     Args:
-        header_bytes: Exactly BIN_HEADER_LEN bytes
+        header_bytes: Exactly bin_header_len(version) bytes
         
     Returns:
         BinHeader: Decoded structure
@@ -153,11 +218,25 @@ def unpack_bin_header(header_bytes: bytes) -> BinHeader:
     Raises:
         ValueError: If length does not match
     """
-    if len(header_bytes) != BIN_HEADER_LEN:
-        raise ValueError(f"invalid header length: {len(header_bytes)} != {BIN_HEADER_LEN}")
+    if len(header_bytes) < 3:
+        raise ValueError(f"invalid header length: {len(header_bytes)}")
+    version = header_bytes[2]
+    expected = bin_header_len(version)
+    if len(header_bytes) != expected:
+        raise ValueError(f"invalid header length: {len(header_bytes)} != {expected}")
+    
+    return unpack_bin_header_from(header_bytes)
+
+
+def unpack_bin_header_from(buf: bytes | bytearray | memoryview, offset: int = 0) -> BinHeader:
+    """
+    Decode the header starting at buf[offset] without copying it out.
     
-    magic, ver, mtype, plen, seq, crc = struct.unpack(BIN_HEADER_FMT, header_bytes)
-    return BinHeader(magic=magic, version=ver, mtype=mtype, payload_len=plen, seq=seq, crc=crc)
+    The caller must have checked that bin_header_len(buf[offset + 2])
+    bytes are available.
+    """
+    codec = BIN_HEADER_V2_STRUCT if buf[offset + 2] == BIN_VERSION_2 else BIN_HEADER_STRUCT
+    return BinHeader._make(codec.unpack_from(buf, offset))
 
 
 def validate_bin_message(header: BinHeader, payload: bytes) -> bool:
@@ -166,9 +245,47 @@ def validate_bin_message(header: BinHeader, payload: bytes) -> bool:
     
     Recalculates CRC and compares with the one in header.
     """
-    header_wo_crc = struct.pack("!2sBBHI", header.magic, header.version, header.mtype, header.payload_len, header.seq)
-    computed_crc = crc32(header_wo_crc + payload)
-    return computed_crc == header.crc
+    wo_crc = _BIN_V2_WO_CRC if header.version == BIN_VERSION_2 else _BIN_V1_WO_CRC
+    header_wo_crc = wo_crc.pack(header.magic, header.version, header.mtype, header.payload_len, header.seq)
+    return zlib.crc32(payload, zlib.crc32(header_wo_crc)) == header.crc
+
+
+def split_bin_frames(buf: bytes | bytearray) -> Tuple[List[Tuple[BinHeader, bytes]], int]:
+    """
+    Decode every complete message at the start of a receive buffer.
+    
+    With pipelining one recv() may hold several messages plus the start of
+    the next one. The caller keeps the unconsumed tail for the next read.
+    A header with a wrong magic/version or an oversized payload_len ends
+    the list (its payload is b""), because its payload_len cannot be trusted.
+    Version-1 and version-2 frames may be mixed.
+    
+    Returns:
+        Tuple of ([(header, payload), ...], number of bytes consumed)
+    """
+    frames: List[Tuple[BinHeader, bytes]] = []
+    offset = 0
+    end = len(buf)
+    
+    # One view for the whole loop: headers are decoded in place and each
+    # payload is copied exactly once (a bytearray slice would copy twice)
+    with memoryview(buf) as view:
+        while end - offset >= BIN_HEADER_LEN:
+            header_len = bin_header_len(view[offset + 2])
+            if end - offset < header_len:
+                break
+            header = unpack_bin_header_from(view, offset)
+            if not header.is_valid_protocol():
+                frames.append((header, b""))
+                return frames, end
+            
+            frame_end = offset + header_len + header.payload_len
+            if frame_end > end:
+                break
+            frames.append((header, view[offset + header_len:frame_end].tobytes()))
+            offset = frame_end
+    
+    return frames, offset
 
 
 # ==============================================================================
@@ -184,7 +301,7 @@ def encode_kv(key: str, value: str) -> bytes:
     vb = value.encode("utf-8")
     if len(kb) > 255:
         raise ValueError(f"key too long: {len(kb)} > 255")
-    return struct.pack("!B", len(kb)) + kb + vb
+    return b"".join((_U8.pack(len(kb)), kb, vb))
 
 
 def decode_kv(payload: bytes) -> Tuple[str, str]:
@@ -204,7 +321,7 @@ def encode_key(key: str) -> bytes:
     kb = key.encode("utf-8")
     if len(kb) > 255:
         raise ValueError(f"key too long: {len(kb)} > 255")
-    return struct.pack("!B", len(kb)) + kb
+    return _U8.pack(len(kb)) + kb
 
 
 def decode_key(payload: bytes) -> str:
@@ -217,6 +334,157 @@ def decode_key(payload: bytes) -> str:
     return payload[1:1+klen].decode("utf-8", errors="replace")
 
 
+# ==============================================================================
+# PAYLOAD ENCODING FOR MULTI-KEY OPERATIONS AND SCAN
+# ==============================================================================
+# Counts and value lengths are 4 bytes, keys keep the 1-byte length prefix:
+#   MSET_REQ:  count(4) + [key_len(1) + key + val_len(4) + value]...
+#   MGET_REQ:  count(4) + [key_len(1) + key]...          (MDEL_REQ: same)
+#   MGET_RESP: count(4) + [val_len(4) + value]...        (val_len 0xFFFFFFFF
+#                                                         = key not found)
+#   MSET_RESP / MDEL_RESP: n(4) - keys stored / keys deleted
+#   SCAN_REQ:  limit(2) + cursor_len(2) + cursor         (empty = start)
+#   SCAN_RESP: cursor_len(2) + cursor + count(4) + [key_len(1) + key]...
+#              (empty cursor = no more keys)
+# ==============================================================================
+
+MISSING_VALUE_LEN = 0xFFFFFFFF
+
+
+def _key_bytes(key: str) -> bytes:
+    kb = key.encode("utf-8")
+    if len(kb) > 255:
+        raise ValueError(f"key too long: {len(kb)} > 255")
+    return kb
+
+
+def _read_key(payload: bytes, offset: int) -> Tuple[str, int]:
+    """Decode key_len(1) + key at offset. Returns (key, next offset)."""
+    if offset >= len(payload):
+        raise ValueError("truncated payload: missing key length")
+    end = offset + 1 + payload[offset]
+    if end > len(payload):
+        raise ValueError(f"truncated payload: need {end}, got {len(payload)}")
+    return payload[offset + 1:end].decode("utf-8", errors="replace"), end
+
+
+def _read_count(payload: bytes, offset: int, codec: struct.Struct = _U32) -> Tuple[int, int]:
+    end = offset + codec.size
+    if end > len(payload):
+        raise ValueError("truncated payload: missing count")
+    return codec.unpack_from(payload, offset)[0], end
+
+
+def encode_keys(keys: Sequence[str]) -> bytes:
+    """Encode a key list (MGET/MDEL requests)."""
+    parts = [_U32.pack(len(keys))]
+    for key in keys:
+        kb = _key_bytes(key)
+        parts += (_U8.pack(len(kb)), kb)
+    return b"".join(parts)
+
+
+def decode_keys(payload: bytes) -> List[str]:
+    """Decode a key list (MGET/MDEL requests)."""
+    count, offset = _read_count(payload, 0)
+    keys = []
+    for _ in range(count):
+        key, offset = _read_key(payload, offset)
+        keys.append(key)
+    return keys
+
+
+def encode_kvs(items: Iterable[Tuple[str, str]]) -> bytes:
+    """Encode key-value pairs for MSET."""
+    items = list(items)
+    parts = [_U32.pack(len(items))]
+    for key, value in items:
+        kb = _key_bytes(key)
+        vb = value.encode("utf-8")
+        parts += (_U8.pack(len(kb)), kb, _U32.pack(len(vb)), vb)
+    return b"".join(parts)
+
+
+def decode_kvs(payload: bytes) -> List[Tuple[str, str]]:
+    """Decode key-value pairs from an MSET payload."""
+    count, offset = _read_count(payload, 0)
+    items = []
+    for _ in range(count):
+        key, offset = _read_key(payload, offset)
+        vlen, offset = _read_count(payload, offset)
+        if offset + vlen > len(payload):
+            raise ValueError(f"truncated payload: need {offset + vlen}, got {len(payload)}")
+        items.append((key, payload[offset:offset + vlen].decode("utf-8", errors="replace")))
+        offset += vlen
+    return items
+
+
+def encode_values(values: Sequence[Optional[str]]) -> bytes:
+    """Encode MGET results; None marks a missing key."""
+    missing = _U32.pack(MISSING_VALUE_LEN)
+    parts = [_U32.pack(len(values))]
+    for value in values:
+        if value is None:
+            parts.append(missing)
+        else:
+            vb = value.encode("utf-8")
+            parts += (_U32.pack(len(vb)), vb)
+    return b"".join(parts)
+
+
+def decode_values(payload: bytes) -> List[Optional[str]]:
+    """Decode MGET results; missing keys become None."""
+    count, offset = _read_count(payload, 0)
+    values: List[Optional[str]] = []
+    for _ in range(count):
+        vlen, offset = _read_count(payload, offset)
+        if vlen == MISSING_VALUE_LEN:
+            values.append(None)
+            continue
+        if offset + vlen > len(payload):
+            raise ValueError(f"truncated payload: need {offset + vlen}, got {len(payload)}")
+        values.append(payload[offset:offset + vlen].decode("utf-8", errors="replace"))
+        offset += vlen
+    return values
+
+
+def encode_scan_req(limit: int, cursor: bytes = b"") -> bytes:
+    """SCAN request: at most limit keys after the (opaque) cursor."""
+    return _U16.pack(limit) + _U16.pack(len(cursor)) + cursor
+
+
+def decode_scan_req(payload: bytes) -> Tuple[int, bytes]:
+    """Returns (limit, cursor)."""
+    limit, offset = _read_count(payload, 0, _U16)
+    clen, offset = _read_count(payload, offset, _U16)
+    if offset + clen > len(payload):
+        raise ValueError("truncated payload: cursor")
+    return limit, payload[offset:offset + clen]
+
+
+def encode_scan_resp(cursor: bytes, keys: Sequence[str]) -> bytes:
+    """SCAN response: next cursor (empty when done) and the keys."""
+    parts = [_U16.pack(len(cursor)), cursor, _U32.pack(len(keys))]
+    for key in keys:
+        kb = _key_bytes(key)
+        parts += (_U8.pack(len(kb)), kb)
+    return b"".join(parts)
+
+
+def decode_scan_resp(payload: bytes) -> Tuple[bytes, List[str]]:
+    """Returns (next cursor, keys)."""
+    clen, offset = _read_count(payload, 0, _U16)
+    if offset + clen > len(payload):
+        raise ValueError("truncated payload: cursor")
+    cursor = payload[offset:offset + clen]
+    count, offset = _read_count(payload, offset + clen)
+    keys = []
+    for _ in range(count):
+        key, offset = _read_key(payload, offset)
+        keys.append(key)
+    return cursor, keys
+
+
 # ==============================================================================
 # UDP SENSOR PROTOCOL
 # ==============================================================================
@@ -232,6 +500,9 @@ UDP_VER = 1
 UDP_FMT_WO_CRC = "!BIf10s"  # without CRC, for calculation
 UDP_FMT = "!BIf10sI"        # complete format
 UDP_LEN = struct.calcsize(UDP_FMT)  # = 23 bytes
+UDP_STRUCT = struct.Struct(UDP_FMT)
+_UDP_WO_CRC = struct.Struct(UDP_FMT_WO_CRC)
+_UDP_CRC_OFFSET = _UDP_WO_CRC.size  # = 19
 
 
 def pack_udp_sensor(sensor_id: int, temp_c: float, location: str) -> bytes:
@@ -246,18 +517,14 @@ def pack_udp_sensor(sensor_id: int, temp_c: float, location: str) -> bytes:
     Returns:
         bytes: Datagram of exactly UDP_LEN bytes
     """
-    # Truncate and pad location to exactly 10 bytes
+    # Truncate location to 10 bytes ("10s" pads with \0)
     loc_b = location.encode("utf-8")[:10]
-    loc_b = loc_b.ljust(10, b"\x00")
     
     # Build payload without CRC
-    base = struct.pack(UDP_FMT_WO_CRC, UDP_VER, sensor_id, temp_c, loc_b)
+    base = _UDP_WO_CRC.pack(UDP_VER, sensor_id, temp_c, loc_b)
     
-    # Calculate CRC
-    c = crc32(base)
-    
-    # Complete message
-    return struct.pack(UDP_FMT, UDP_VER, sensor_id, temp_c, loc_b, c)
+    # Complete message: the CRC is appended, so no second pack is needed
+    return base + _U32.pack(zlib.crc32(base))
 
 
 def unpack_udp_sensor(data: bytes) -> Tuple[int, int, float, str]:
@@ -271,26 +538,127 @@ def unpack_udp_sensor(data: bytes) -> Tuple[int, int, float, str]:
         Tuple of (version, sensor_id, temperature, location)
         
     Raises:
-        ValueError: If length is wrong or CRC does not match
+        ValueError: If length is wrong, CRC does not match or the
+            temperature is NaN or infinite
     """
     if len(data) != UDP_LEN:
         raise ValueError(f"invalid datagram length: {len(data)} != {UDP_LEN}")
     
-    ver, sensor_id, temp_c, loc_b, received_crc = struct.unpack(UDP_FMT, data)
+    ver, sensor_id, temp_c, loc_b, received_crc = UDP_STRUCT.unpack(data)
     
-    # Recalculate CRC for verification
-    base = struct.pack(UDP_FMT_WO_CRC, ver, sensor_id, temp_c, loc_b)
-    computed_crc = crc32(base)
+    # Recalculate CRC over the received bytes (no re-pack)
+    computed_crc = zlib.crc32(data[:_UDP_CRC_OFFSET])
     
     if computed_crc != received_crc:
         raise ValueError(f"CRC mismatch: computed {computed_crc:08x}, received {received_crc:08x}")
+    if not math.isfinite(temp_c):
+        raise ValueError(f"non-finite temperature: {temp_c}")
     
     # Decoof location and remove padding
-    loc = loc_b.decode("utf-8", errors="replace").rstrip("\x00")
+    loc = loc_b.rstrip(b"\x00").decode("utf-8", errors="replace")
     
     return ver, sensor_id, temp_c, loc
 
 
+# Batched decoding: a receiver stores datagram i at offset i * UDP_SLOT of
+# one preallocated buffer. A slot is one byte longer than a valid datagram,
+# so an oversized datagram shows up as a length of UDP_SLOT. The records are
+# then decoded in one pass instead of one unpack_udp_sensor() call each.
+UDP_SLOT = UDP_LEN + 1
+UDP_SLOT_STRUCT = struct.Struct(UDP_FMT + "x")
+
+try:
+    import numpy as np
+except ImportError:  # optional, decode_udp_batch() falls back to struct
+    np = None
+
+# The CRCs are computed one by one either way, so NumPy only pays off for
+# large batches (measured: slower below ~256 datagrams, up to 1.4x faster
+# at 1024 with few sensors)
+NUMPY_MIN_BATCH = 512
+
+UDP_SLOT_DTYPE = None if np is None else np.dtype([
+    ("version", "u1"), ("sensor_id", ">u4"), ("temp", ">f4"),
+    ("location", "S10"), ("crc", ">u4"), ("pad", "V1"),
+])
+
+
+def decode_udp_batch(
+    buf: bytearray | memoryview,
+    lengths: Sequence[int],
+    use_numpy: Optional[bool] = None
+) -> Tuple[Dict[int, list], int]:
+    """
+    Decode len(lengths) datagrams stored in UDP_SLOT-sized slots of buf.
+    
+    Args:
+        buf: Receive buffer, datagram i at offset i * UDP_SLOT
+        lengths: Size of each datagram as returned by recv_into()
+        use_numpy: Force (True) or disable (False) the NumPy path;
+            default: use it when NumPy is installed and the batch has at
+            least NUMPY_MIN_BATCH datagrams
+        
+    Returns:
+        ({sensor_id: [location, [temperatures]]}, number of invalid datagrams).
+        Readings keep their arrival order within a sensor; the location is
+        the one of the sensor's last datagram. Length, CRC and a finite
+        temperature are checked as in unpack_udp_sensor().
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and len(lengths) >= NUMPY_MIN_BATCH
+    if use_numpy:
+        return _decode_udp_batch_np(buf, lengths)
+
+    view = memoryview(buf)
+    crc32 = zlib.crc32
+    isfinite = math.isfinite
+    groups: Dict[int, list] = {}
+    locations: Dict[bytes, str] = {}
+    invalid = 0
+    off = 0
+    records = UDP_SLOT_STRUCT.iter_unpack(view[:len(lengths) * UDP_SLOT])
+    for length, (_ver, sensor_id, temp_c, loc_b, received_crc) in zip(lengths, records):
+        if (length != UDP_LEN or crc32(view[off:off + _UDP_CRC_OFFSET]) != received_crc
+                or not isfinite(temp_c)):
+            invalid += 1
+        else:
+            loc = locations.get(loc_b)
+            if loc is None:
+                loc = locations[loc_b] = loc_b.rstrip(b"\x00").decode("utf-8", errors="replace")
+            group = groups.get(sensor_id)
+            if group is None:
+                groups[sensor_id] = [loc, [temp_c]]
+            else:
+                group[0] = loc
+                group[1].append(temp_c)
+        off += UDP_SLOT
+    return groups, invalid
+
+
+def _decode_udp_batch_np(buf: bytearray | memoryview, lengths: Sequence[int]) -> Tuple[Dict[int, list], int]:
+    """decode_udp_batch() with a structured dtype: fields and grouping are
+    vectorised, only the CRCs are still computed one by one by zlib."""
+    n = len(lengths)
+    records = np.frombuffer(buf, dtype=UDP_SLOT_DTYPE, count=n)
+    view = memoryview(buf)
+    crc32 = zlib.crc32
+    computed = np.fromiter((crc32(view[off:off + _UDP_CRC_OFFSET])
+                            for off in range(0, n * UDP_SLOT, UDP_SLOT)), dtype=np.uint32, count=n)
+    ok = (np.asarray(lengths) == UDP_LEN) & (computed == records["crc"]) & np.isfinite(records["temp"])
+    good = records[ok]
+    order = np.argsort(good["sensor_id"], kind="stable")
+    ids = good["sensor_id"][order]
+    temps = good["temp"][order].astype(np.float64)
+    locs = good["location"][order]
+    uniq, starts = np.unique(ids, return_index=True)
+    ends = np.append(starts[1:], len(ids))
+    groups: Dict[int, list] = {}
+    for sensor_id, start, end in zip(uniq.tolist(), starts.tolist(), ends.tolist()):
+        loc = locs[end - 1].decode("utf-8", errors="replace")
+        groups[sensor_id] = [loc, temps[start:end].tolist()]
+    return groups, n - int(ok.sum())
+
+
 def format_sensor_reading(sensor_id: int, temp_c: float, location: str) -> str:
     """Format a sensor reading for display."""
     return f"[Sensor {sensor_id:04d}] {location}: {temp_c:+.1f}°C"
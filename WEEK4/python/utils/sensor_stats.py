@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Constant-memory statistics for the UDP sensor aggregator.
+
+Keeping every reading in a list makes memory grow without bound and makes
+each report cost O(readings). The classes here keep O(1) state per sensor
+and can be merged, so partial results (per time window, per worker
+process) combine into exact counts/means/variances and accurate quantiles:
+
+1. RunningStats - count, mean and variance (Welford), min, max
+2. DDSketch     - quantiles with a relative-error guarantee (alpha = 1%)
+                  in log-spaced buckets; merging is adding bucket counts
+3. SensorAggregate - the two above plus last value/location/time
+4. RollupWindows   - tumbling 1m/5m/1h windows; readings update only the
+                     1-minute bucket and closed minutes are merged into the
+                     5-minute and 1-hour buckets, exported as JSON
+
+Reference: Masson, Rim, Lee (2019). DDSketch: A fast and fully-mergeable
+quantile sketch with relative-error guarantees. VLDB.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+
+# ==============================================================================
+# Running mean / variance / min / max
+# ==============================================================================
+
+class RunningStats:
+    """
+    Welford's online algorithm: one pass, O(1) memory, numerically stable
+    (no sum of squares that loses precision for large counts).
+    """
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def add_many(self, values) -> None:
+        """add() for a batch, with the state kept in locals during the loop."""
+        if not len(values):
+            return
+        count, mean, m2 = self.count, self.mean, self.m2
+        for x in values:
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        self.count, self.mean, self.m2 = count, mean, m2
+        lo, hi = min(values), max(values)
+        if lo < self.min:
+            self.min = lo
+        if hi > self.max:
+            self.max = hi
+
+    def merge(self, other: "RunningStats") -> None:
+        """Combine with another partial result (Chan et al.)."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two readings)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+# ==============================================================================
+# DDSketch
+# ==============================================================================
+
+class DDSketch:
+    """
+    Quantile sketch: a value x > 0 goes to bucket ceil(log_gamma(x)), with
+    gamma = (1 + alpha) / (1 - alpha). Any quantile is returned within a
+    relative error alpha of a real reading. Negative values use a mirrored
+    store, values closer to zero than min_value are counted as zero.
+
+    Each store keeps at most max_buckets buckets; beyond that the buckets
+    closest to zero are collapsed, which only affects values of tiny
+    magnitude. Memory is O(max_buckets) whatever the number of readings.
+    NaN and infinities have no bucket: add() raises ValueError for them
+    before changing anything.
+    """
+
+    __slots__ = ("alpha", "gamma", "_log_gamma", "min_value", "max_buckets",
+                 "pos", "neg", "zero", "count")
+
+    def __init__(self, alpha: float = 0.01, min_value: float = 1e-9, max_buckets: int = 2048):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be in (0, 1)")
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        """Representative value of a bucket (relative error <= alpha)."""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, x: float, n: int = 1) -> None:
+        if not math.isfinite(x):
+            raise ValueError(f"non-finite value: {x}")
+        self.count += n
+        if x > self.min_value:
+            store = self.pos
+        elif x < -self.min_value:
+            store, x = self.neg, -x
+        else:
+            self.zero += n
+            return
+        i = self._index(x)
+        store[i] = store.get(i, 0) + n
+        if len(store) > self.max_buckets:
+            self._collapse(store)
+
+    def add_many(self, values) -> None:
+        """add() for a batch, with the lookups hoisted out of the loop."""
+        if not all(map(math.isfinite, values)):
+            raise ValueError("non-finite value in batch")
+        log, ceil, log_gamma, min_value = math.log, math.ceil, self._log_gamma, self.min_value
+        pos, neg = self.pos, self.neg
+        for x in values:
+            if x > min_value:
+                i = ceil(log(x) / log_gamma)
+                pos[i] = pos.get(i, 0) + 1
+            elif x < -min_value:
+                i = ceil(log(-x) / log_gamma)
+                neg[i] = neg.get(i, 0) + 1
+            else:
+                self.zero += 1
+        self.count += len(values)
+        for store in (pos, neg):
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+    def _collapse(self, store: Dict[int, int]) -> None:
+        """Fold the lowest-magnitude buckets into the lowest one kept."""
+        keys = sorted(store)
+        excess = len(keys) - self.max_buckets
+        folded = sum(store.pop(k) for k in keys[:excess])
+        store[keys[excess]] += folded
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different alpha")
+        for mine, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for i, n in theirs.items():
+                mine[i] = mine.get(i, 0) + n
+            if len(mine) > self.max_buckets:
+                self._collapse(mine)
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q in [0, 1], or None if empty."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending order: large negative magnitudes first, then zero, then
+        # positive buckets from small to large
+        for i in sorted(self.neg, reverse=True):
+            seen += self.neg[i]
+            if seen > rank:
+                return -self._value(i)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for i in sorted(self.pos):
+            seen += self.pos[i]
+            if seen > rank:
+                return self._value(i)
+        return self._value(max(self.pos)) if self.pos else 0.0
+
+    def to_dict(self) -> dict:
+        """JSON-friendly form; from_dict() restores it for merging later."""
+        return {"alpha": self.alpha, "zero": self.zero,
+                "pos": {str(i): n for i, n in sorted(self.pos.items())},
+                "neg": {str(i): n for i, n in sorted(self.neg.items())}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DDSketch":
+        sketch = cls(alpha=data["alpha"])
+        sketch.pos = {int(i): n for i, n in data["pos"].items()}
+        sketch.neg = {int(i): n for i, n in data["neg"].items()}
+        sketch.zero = data["zero"]
+        sketch.count = sketch.zero + sum(sketch.pos.values()) + sum(sketch.neg.values())
+        return sketch
+
+
+# ==============================================================================
+# Per-sensor aggregate
+# ==============================================================================
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class SensorAggregate:
+    """Everything reported for one sensor, in O(1) memory."""
+
+    __slots__ = ("stats", "sketch", "location", "last_value", "last_seen")
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = DDSketch()
+        self.location = ""
+        self.last_value: Optional[float] = None
+        self.last_seen: Optional[float] = None
+
+    def add(self, value: float, location: str = "", ts: Optional[float] = None) -> None:
+        # Checked first: a NaN or infinity would poison the mean and variance
+        if not math.isfinite(value):
+            raise ValueError(f"non-finite reading: {value}")
+        self.stats.add(value)
+        self.sketch.add(value)
+        self.location = location or self.location
+        self.last_value = value
+        self.last_seen = time.time() if ts is None else ts
+
+    def add_many(self, values, location: str = "", ts: Optional[float] = None) -> None:
+        """Add a batch of readings from one sensor (same location and time)."""
+        if not len(values):
+            return
+        if not all(map(math.isfinite, values)):
+            raise ValueError("non-finite reading in batch")
+        self.stats.add_many(values)
+        self.sketch.add_many(values)
+        self.location = location or self.location
+        self.last_value = values[-1]
+        self.last_seen = time.time() if ts is None else ts
+
+    def merge(self, other: "SensorAggregate") -> None:
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        if other.last_seen is not None and (self.last_seen is None or other.last_seen >= self.last_seen):
+            self.location = other.location or self.location
+            self.last_value = other.last_value
+            self.last_seen = other.last_seen
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    def to_dict(self, include_sketch: bool = False) -> dict:
+        s = self.stats
+        out = {
+            "location": self.location,
+            "count": s.count,
+            "mean": round(s.mean, 3),
+            "stddev": round(s.stddev, 3),
+            "min": round(s.min, 3) if s.count else None,
+            "max": round(s.max, 3) if s.count else None,
+        }
+        for q in QUANTILES:
+            value = self.sketch.quantile(q)
+            out[f"p{int(q * 100)}"] = None if value is None else round(value, 3)
+        out["last"] = self.last_value
+        out["last_seen"] = _iso(self.last_seen) if self.last_seen is not None else None
+        if include_sketch:
+            out["sketch"] = self.sketch.to_dict()
+        return out
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+# ==============================================================================
+# Time-windowed rollups
+# ==============================================================================
+
+DEFAULT_WINDOWS: Tuple[Tuple[str, int], ...] = (("1m", 60), ("5m", 300), ("1h", 3600))
+
+
+class RollupWindows:
+    """
+    Tumbling windows aligned to the epoch (e.g. 12:05:00-12:10:00).
+
+    Only the finest window is updated per reading. When one of its buckets
+    closes it is merged into the open bucket of every coarser window, which
+    is exact because the sketches and Welford states are mergeable. Closed
+    buckets are kept (last `history` per window) as plain dicts ready for
+    JSON, and on_close(name, bucket) is called for each one.
+
+    Buckets close when tick() (or add()) sees a time past their end, so a
+    server with no traffic should call tick() periodically.
+    """
+
+    def __init__(
+        self,
+        windows: Iterable[Tuple[str, int]] = DEFAULT_WINDOWS,
+        history: int = 60,
+        clock: Callable[[], float] = time.time,
+        on_close: Optional[Callable[[str, dict], None]] = None
+    ):
+        self.windows = sorted(windows, key=lambda w: w[1])
+        finest = self.windows[0][1]
+        if any(width % finest for _, width in self.windows):
+            raise ValueError("window widths must be multiples of the finest one")
+        self.clock = clock
+        self.on_close = on_close
+        self.closed: Dict[str, Deque[dict]] = {name: deque(maxlen=history) for name, _ in self.windows}
+        now = clock()
+        # name -> (bucket start, {sensor_id: SensorAggregate})
+        self._open: Dict[str, Tuple[float, Dict[int, SensorAggregate]]] = {
+            name: (now // width * width, {}) for name, width in self.windows}
+
+    def add(self, sensor_id: int, value: float, location: str = "", ts: Optional[float] = None) -> None:
+        ts = self.clock() if ts is None else ts
+        self.tick(ts)
+        sensors = self._open[self.windows[0][0]][1]
+        agg = sensors.get(sensor_id)
+        if agg is None:
+            agg = sensors[sensor_id] = SensorAggregate()
+        agg.add(value, location, ts)
+
+    def merge(self, sensor_id: int, agg: SensorAggregate, ts: Optional[float] = None) -> None:
+        """
+        Add a partial aggregate (e.g. what a worker process saw since its
+        last flush) to the open finest bucket. Its readings are counted in
+        the bucket open at ts, so they may land one bucket late by at most
+        the flush interval.
+        """
+        ts = self.clock() if ts is None else ts
+        self.tick(ts)
+        sensors = self._open[self.windows[0][0]][1]
+        mine = sensors.get(sensor_id)
+        if mine is None:
+            mine = sensors[sensor_id] = SensorAggregate()
+        mine.merge(agg)
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """Close every bucket whose end is <= now."""
+        now = self.clock() if now is None else now
+        finest_name, finest_width = self.windows[0]
+        start, sensors = self._open[finest_name]
+        if now < start + finest_width:
+            return
+        self._close(finest_name, finest_width, start, sensors)
+        for name, width in self.windows[1:]:
+            self._fold(name, width, start, sensors)
+        self._open[finest_name] = (now // finest_width * finest_width, {})
+        for name, width in self.windows[1:]:
+            cstart, csensors = self._open[name]
+            if now >= cstart + width:
+                self._close(name, width, cstart, csensors)
+                self._open[name] = (now // width * width, {})
+
+    def _fold(self, name: str, width: int, fine_start: float, fine: Dict[int, SensorAggregate]) -> None:
+        """Merge a closed fine bucket into the coarse bucket containing it."""
+        target = fine_start // width * width
+        cstart, csensors = self._open[name]
+        if target != cstart:
+            self._close(name, width, cstart, csensors)
+            csensors = {}
+            self._open[name] = (target, csensors)
+        for sensor_id, agg in fine.items():
+            mine = csensors.get(sensor_id)
+            if mine is None:
+                mine = csensors[sensor_id] = SensorAggregate()
+            mine.merge(agg)
+
+    @staticmethod
+    def _bucket(name: str, width: int, start: float, sensors: Dict[int, SensorAggregate]) -> dict:
+        return {
+            "window": name,
+            "start": _iso(start),
+            "end": _iso(start + width),
+            "readings": sum(agg.count for agg in sensors.values()),
+            "sensors": {str(sid): agg.to_dict() for sid, agg in sorted(sensors.items())},
+        }
+
+    def _close(self, name: str, width: int, start: float, sensors: Dict[int, SensorAggregate]) -> None:
+        if not sensors:
+            return
+        bucket = self._bucket(name, width, start, sensors)
+        self.closed[name].append(bucket)
+        if self.on_close is not None:
+            self.on_close(name, bucket)
+
+    def _partial(self, name: str, width: int) -> Optional[dict]:
+        """The open bucket of a window so far (coarse ones + the open fine one)."""
+        start, sensors = self._open[name]
+        fine = self._open[self.windows[0][0]][1]
+        if name != self.windows[0][0] and fine:
+            combined: Dict[int, SensorAggregate] = {}
+            for part in (sensors, fine):
+                for sensor_id, agg in part.items():
+                    combined.setdefault(sensor_id, SensorAggregate()).merge(agg)
+            sensors = combined
+        if not sensors:
+            return None
+        bucket = self._bucket(name, width, start, sensors)
+        bucket["partial"] = True
+        return bucket
+
+    def snapshot(self, include_open: bool = True) -> dict:
+        """
+        All retained closed buckets, newest last, followed by the still open
+        bucket of each window (marked "partial": true) if include_open.
+        """
+        windows = {}
+        for name, width in self.windows:
+            buckets = list(self.closed[name])
+            partial = self._partial(name, width) if include_open else None
+            if partial is not None:
+                buckets.append(partial)
+            windows[name] = buckets
+        return {"generated": _iso(self.clock()), "windows": windows}
+
+    def export_json(self, path: str) -> None:
+        """Write snapshot() atomically (tmp file + rename)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+
+def merge_aggregates(aggregates: Iterable[SensorAggregate]) -> SensorAggregate:
+    """One aggregate for many (e.g. all sensors, or several workers)."""
+    total = SensorAggregate()
+    for agg in aggregates:
+        total.merge(agg)
+    return total
+
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Append-only columnar time-series store for sensor readings.
+
+Readings (sensor_id, timestamp, temperature) are buffered per sensor and
+written in chunks of up to chunk_size readings. Each chunk stores two
+compressed columns:
+
+1. time: milliseconds, first value + delta-of-delta (Gorilla), so readings
+   at a regular interval become a column of zeros
+2. temperature: float32 (the precision of the UDP datagram), each value
+   XORed with the previous one (Gorilla), so slowly changing readings
+   leave mostly zero bytes
+
+Both columns are byte-shuffled (byte 0 of every value, then byte 1, ...)
+and zlib-compressed, which turns those zero bytes into a few bytes per
+chunk. All of this runs on whole columns with array/bytes/int operations,
+with no per-bit Python loop.
+
+On disk a store is a directory of segments, one per writer process (e.g.
+one per udp_sensor_server --workers process):
+    <segment>.dat  chunk payloads, append-only
+    <segment>.idx  one fixed-size record per chunk: sensor, count, first
+                   and last time, offset, column sizes, min/max/sum
+A chunk's index record is written after its payload, so a crash can only
+lose the chunk being written; on reopen the writer truncates both files
+to the last complete record.
+
+Reads map the .dat files with mmap and decode only the chunks that overlap
+the requested range; downsample() uses the min/max/sum of the index for
+chunks that fall entirely inside one bucket, without decoding them.
+
+Not thread-safe: one writer per segment, readers in any process.
+"""
+from __future__ import annotations
+
+import glob
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+DEFAULT_CHUNK_SIZE = 4096
+COMPRESS_LEVEL = 6
+
+_DAT_MAGIC = b"TSDAT001"
+_IDX_MAGIC = b"TSIDX001"
+_INDEX = struct.Struct("<IIqqQIIddd")  # 64 bytes per chunk
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class ChunkInfo(NamedTuple):
+    """One index record (times in milliseconds)."""
+    sensor_id: int
+    count: int
+    t_first: int
+    t_last: int
+    offset: int
+    time_len: int
+    temp_len: int
+    min: float
+    max: float
+    sum: float
+    segment: str
+
+
+# ==============================================================================
+# Column codecs
+# ==============================================================================
+
+def _shuffle(raw: bytes, width: int) -> bytes:
+    return b"".join(raw[i::width] for i in range(width))
+
+
+def _unshuffle(data: bytes, width: int) -> bytearray:
+    n = len(data) // width
+    out = bytearray(len(data))
+    for i in range(width):
+        out[i::width] = data[i * n:(i + 1) * n]
+    return out
+
+
+def _to_le(values: array) -> bytes:
+    if _BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode: str, raw: bytes | bytearray) -> array:
+    values = array(typecode)
+    values.frombytes(raw)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def encode_times(times_ms: Sequence[int]) -> bytes:
+    """Delta-of-delta, 8-byte little-endian, shuffled, zlib."""
+    deltas = [b - a for a, b in zip(times_ms, times_ms[1:])]
+    dod = [times_ms[0]] + deltas[:1] + [b - a for a, b in zip(deltas, deltas[1:])]
+    return zlib.compress(_shuffle(_to_le(array("q", dod)), 8), COMPRESS_LEVEL)
+
+
+def decode_times(data: bytes) -> List[int]:
+    dod = _from_le("q", _unshuffle(zlib.decompress(data), 8))
+    if len(dod) < 2:
+        return dod.tolist()
+    deltas = accumulate(dod[1:])
+    return list(accumulate(deltas, initial=dod[0]))
+
+
+def encode_temps(temps: Sequence[float]) -> bytes:
+    """float32, XOR with the previous value, shuffled, zlib."""
+    raw = _to_le(array("f", temps))
+    # One big integer holds the whole column; value i occupies bytes
+    # 4i..4i+3, so x ^ (x << 32) XORs every value with the one before it
+    x = int.from_bytes(raw, "little")
+    x = (x ^ (x << 32)) & ((1 << (8 * len(raw))) - 1)
+    return zlib.compress(_shuffle(x.to_bytes(len(raw), "little"), 4), COMPRESS_LEVEL)
+
+
+def decode_temps(data: bytes) -> List[float]:
+    raw = _unshuffle(zlib.decompress(data), 4)
+    nbits = 8 * len(raw)
+    mask = (1 << nbits) - 1
+    x = int.from_bytes(raw, "little")
+    # Prefix XOR in log2(n) steps undoes the encoding
+    shift = 32
+    while shift < nbits:
+        x = (x ^ (x << shift)) & mask
+        shift *= 2
+    return _from_le("f", x.to_bytes(len(raw), "little")).tolist()
+
+
+# ==============================================================================
+# Store
+# ==============================================================================
+
+class TimeSeriesStore:
+    """
+    Example:
+        store = TimeSeriesStore("readings", segment="main")
+        store.append(7, time.time(), 21.5)
+        store.flush()
+        ts, temps = store.query(7, start=time.time() - 86400)
+        store.downsample(7, start, end, step=3600)  # hourly count/mean/min/max
+        store.close()
+
+    Timestamps are seconds (as from time.time()) in the API and
+    milliseconds on disk. Readings still in the write buffers are included
+    in queries made through the writing instance.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment: Optional[str] = "main",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        fsync: bool = False
+    ):
+        """segment=None opens the store read-only."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.path = path
+        self.segment = segment
+        self.chunk_size = chunk_size
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+        self._times: Dict[int, List[int]] = {}
+        self._temps: Dict[int, List[float]] = {}
+        self._chunks: Dict[int, List[ChunkInfo]] = {}
+        self._idx_pos: Dict[str, int] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._dat = self._idx = None
+
+        if segment is not None:
+            self._open_writer(segment)
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _open_writer(self, segment: str) -> None:
+        dat_path = os.path.join(self.path, f"{segment}.dat")
+        idx_path = os.path.join(self.path, f"{segment}.idx")
+        for p, magic in ((dat_path, _DAT_MAGIC), (idx_path, _IDX_MAGIC)):
+            if not os.path.exists(p) or os.path.getsize(p) < len(magic):
+                with open(p, "wb") as f:
+                    f.write(magic)
+        # Drop a torn index record and any payload without a record
+        idx_size = os.path.getsize(idx_path)
+        records = (idx_size - len(_IDX_MAGIC)) // _INDEX.size
+        data_end = len(_DAT_MAGIC)
+        with open(idx_path, "r+b") as f:
+            f.truncate(len(_IDX_MAGIC) + records * _INDEX.size)
+            if records:
+                f.seek(len(_IDX_MAGIC) + (records - 1) * _INDEX.size)
+                last = _INDEX.unpack(f.read(_INDEX.size))
+                data_end = last[4] + last[5] + last[6]
+        with open(dat_path, "r+b") as f:
+            f.truncate(data_end)
+        self._dat = open(dat_path, "ab")
+        self._idx = open(idx_path, "ab")
+
+    def append(self, sensor_id: int, ts: float, temp: float) -> None:
+        """Add one reading (ts in seconds)."""
+        times = self._times.get(sensor_id)
+        if times is None:
+            times = self._times[sensor_id] = []
+            self._temps[sensor_id] = []
+        times.append(round(ts * 1000))
+        self._temps[sensor_id].append(temp)
+        if len(times) >= self.chunk_size:
+            self._flush_sensor(sensor_id)
+
+    def append_many(self, sensor_id: int, timestamps: Iterable[float], temps: Iterable[float]) -> None:
+        """Add a batch of readings of one sensor (columns of equal length)."""
+        times = self._times.setdefault(sensor_id, [])
+        values = self._temps.setdefault(sensor_id, [])
+        times.extend([round(t * 1000) for t in timestamps])
+        values.extend(temps)
+        if len(times) != len(values):
+            raise ValueError("timestamps and temps differ in length")
+        if len(times) >= self.chunk_size:
+            self._flush_sensor(sensor_id)
+
+    def _flush_sensor(self, sensor_id: int, partial: bool = False) -> None:
+        """Write full chunks of one sensor's buffer (and the rest if partial)."""
+        times, temps = self._times[sensor_id], self._temps[sensor_id]
+        size = self.chunk_size
+        start = 0
+        while len(times) - start >= size or (partial and start < len(times)):
+            self._write_chunk(sensor_id, times[start:start + size], temps[start:start + size])
+            start += size
+        if start:
+            del times[:start], temps[:start]
+
+    def _write_chunk(self, sensor_id: int, times: List[int], temps: List[float]) -> None:
+        if self._dat is None:
+            raise ValueError("store is read-only")
+        time_col, temp_col = encode_times(times), encode_temps(temps)
+        offset = self._dat.tell()
+        self._dat.write(time_col)
+        self._dat.write(temp_col)
+        self._dat.flush()
+        if self.fsync:
+            os.fsync(self._dat.fileno())
+        # Summary of the stored (float32) values, so it matches what a query returns
+        stored = array("f", temps)
+        record = (sensor_id, len(times), min(times), max(times), offset,
+                  len(time_col), len(temp_col), min(stored), max(stored), sum(stored))
+        self._idx.write(_INDEX.pack(*record))
+        self._idx.flush()
+        if self.fsync:
+            os.fsync(self._idx.fileno())
+        insort(self._chunks.setdefault(sensor_id, []), ChunkInfo(*record, self.segment),
+               key=lambda c: c.t_first)
+        self._idx_pos[self.segment] += _INDEX.size
+
+    def flush(self) -> None:
+        """Write every buffered reading, as partial chunks if needed."""
+        for sensor_id in list(self._times):
+            self._flush_sensor(sensor_id, partial=True)
+
+    def close(self) -> None:
+        if self._dat is not None:
+            self.flush()
+            self._dat.close()
+            self._idx.close()
+            self._dat = self._idx = None
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
+
+    def __enter__(self) -> "TimeSeriesStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Load index records appended since the last call (all segments)."""
+        for idx_path in sorted(glob.glob(os.path.join(self.path, "*.idx"))):
+            segment = os.path.basename(idx_path)[:-4]
+            pos = self._idx_pos.get(segment, len(_IDX_MAGIC))
+            with open(idx_path, "rb") as f:
+                if f.read(len(_IDX_MAGIC)) != _IDX_MAGIC:
+                    continue
+                f.seek(pos)
+                data = f.read()
+            usable = len(data) - len(data) % _INDEX.size
+            for record in _INDEX.iter_unpack(data[:usable]):
+                self._chunks.setdefault(record[0], []).append(ChunkInfo(*record, segment))
+            self._idx_pos[segment] = pos + usable
+        for chunks in self._chunks.values():
+            chunks.sort(key=lambda c: c.t_first)
+
+    def _map(self, segment: str, end: int) -> mmap.mmap:
+        mm = self._maps.get(segment)
+        if mm is None or len(mm) < end:
+            if mm is not None:
+                mm.close()
+            with open(os.path.join(self.path, f"{segment}.dat"), "rb") as f:
+                mm = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mm
+
+    def _read_chunk(self, c: ChunkInfo) -> Tuple[List[int], List[float]]:
+        end = c.offset + c.time_len + c.temp_len
+        mm = self._map(c.segment, end)
+        split = c.offset + c.time_len
+        return decode_times(mm[c.offset:split]), decode_temps(mm[split:end])
+
+    def _overlapping(self, sensor_id: int, start_ms: int, end_ms: int) -> List[ChunkInfo]:
+        return [c for c in self._chunks.get(sensor_id, ())
+                if c.t_last >= start_ms and c.t_first < end_ms]
+
+    def _buffered(self, sensor_id: int) -> Tuple[List[int], List[float]]:
+        return self._times.get(sensor_id, []), self._temps.get(sensor_id, [])
+
+    @staticmethod
+    def _range_ms(start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        return (-2 ** 63 if start is None else round(start * 1000),
+                2 ** 63 - 1 if end is None else round(end * 1000))
+
+    def sensors(self) -> List[int]:
+        return sorted(set(self._chunks) | {s for s, t in self._times.items() if t})
+
+    def count(self, sensor_id: Optional[int] = None) -> int:
+        """Stored + buffered readings of one sensor (or all)."""
+        ids = self.sensors() if sensor_id is None else [sensor_id]
+        return sum(sum(c.count for c in self._chunks.get(s, ())) + len(self._times.get(s, ()))
+                   for s in ids)
+
+    def query(self, sensor_id: int, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[List[float], List[float]]:
+        """
+        Readings with start <= ts < end, as (timestamps in seconds, temps),
+        ordered by time. Only chunks that overlap the range are decoded.
+        """
+        start_ms, end_ms = self._range_ms(start, end)
+        times: List[int] = []
+        temps: List[float] = []
+        parts = [self._read_chunk(c) for c in self._overlapping(sensor_id, start_ms, end_ms)]
+        parts.append(self._buffered(sensor_id))
+        for t, v in parts:
+            if t and start_ms <= t[0] and t[-1] < end_ms and all(map(int.__le__, t, t[1:])):
+                times.extend(t)
+                temps.extend(v)
+            else:
+                for ti, vi in zip(t, v):
+                    if start_ms <= ti < end_ms:
+                        times.append(ti)
+                        temps.append(vi)
+        if not all(map(int.__le__, times, times[1:])):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            times = [times[i] for i in order]
+            temps = [temps[i] for i in order]
+        return [t / 1000 for t in times], temps
+
+    def downsample(self, sensor_id: int, start: float, end: float,
+                   step: float) -> List[Tuple[float, int, float, float, float]]:
+        """
+        Buckets of `step` seconds from start to end, as
+        (bucket start, count, mean, min, max); empty buckets are left out.
+        A chunk inside a single bucket is summarised from the index alone.
+        """
+        start_ms, end_ms = self._range_ms(start, end)
+        step_ms = round(step * 1000)
+        if step_ms < 1:
+            raise ValueError("step must be >= 1 ms")
+        buckets: Dict[int, list] = {}
+
+        def add(b: int, n: int, total: float, lo: float, hi: float) -> None:
+            acc = buckets.get(b)
+            if acc is None:
+                buckets[b] = [n, total, lo, hi]
+            else:
+                acc[0] += n
+                acc[1] += total
+                acc[2] = min(acc[2], lo)
+                acc[3] = max(acc[3], hi)
+
+        def add_points(times: Sequence[int], temps: Sequence[float]) -> None:
+            if not all(map(int.__le__, times, times[1:])):
+                for t, v in zip(times, temps):
+                    if start_ms <= t < end_ms:
+                        add((t - start_ms) // step_ms, 1, v, v, v)
+                return
+            # Sorted (the usual case): one slice per bucket
+            i, stop = bisect_left(times, start_ms), bisect_left(times, end_ms)
+            while i < stop:
+                b = (times[i] - start_ms) // step_ms
+                j = min(bisect_left(times, start_ms + (b + 1) * step_ms, i), stop)
+                part = temps[i:j]
+                add(b, j - i, sum(part), min(part), max(part))
+                i = j
+
+        for c in self._overlapping(sensor_id, start_ms, end_ms):
+            first = (c.t_first - start_ms) // step_ms
+            if c.t_first >= start_ms and c.t_last < end_ms and first == (c.t_last - start_ms) // step_ms:
+                add(first, c.count, c.sum, c.min, c.max)
+            else:
+                add_points(*self._read_chunk(c))
+        add_points(*self._buffered(sensor_id))
+
+        return [((start_ms + b * step_ms) / 1000, n, total / n, lo, hi)
+                for b, (n, total, lo, hi) in sorted(buckets.items())]
+
+    def disk_usage(self) -> int:
+        """Bytes used by all segments (.dat + .idx)."""
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, "*.dat")) +
+                   glob.glob(os.path.join(self.path, "*.idx")))
@@ -101,6 +101,14 @@ assert sensor_id == 1001
 assert abs(temp_c - 23.5) < 1e-6
 assert location == "Lab_A1"
 
+# A reading with a valid CRC but a non-finite temperature is invalid
+try:
+    unpack_udp_sensor(pack_udp_sensor(sensor_id=1001, temp_c=float("inf"), location="Lab_A1"))
+except ValueError:
+    pass
+else:
+    raise AssertionError("infinite temperature accepted")
+
 # Key-value encoding round-trip
 kv = encode_kv("name", "Alice")
 k, v = decode_kv(kv)
@@ -114,6 +122,34 @@ else
   bad "CRC32 or framing utilities failed"
 fi
 
+if python3 - <<'PY'
+import os
+import sys
+import tempfile
+sys.path.insert(0, "python/utils")
+from kv_store import ShardedStore
+
+# A torn last AOF line must not swallow the writes made after the restart
+aof = os.path.join(tempfile.mkdtemp(), "kv.aof")
+store = ShardedStore(aof_path=aof)
+for key in "abc":
+    store.put(key, key.upper())
+store._aof.close()
+with open(aof, "rb+") as f:
+    f.truncate(os.path.getsize(aof) - 4)
+store = ShardedStore(aof_path=aof)
+store.put("d", "D")
+store._aof.close()
+assert ShardedStore(aof_path=aof).keys() == ["a", "b", "d"]
+
+print("PASS")
+PY
+then
+  ok "Key-value AOF recovers from a torn last record"
+else
+  bad "Key-value AOF lost writes after a torn record"
+fi
+
 # ------------------------------------------------------------------------------
 # 4) Expected outputs reference
 # ------------------------------------------------------------------------------
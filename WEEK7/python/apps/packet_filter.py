@@ -3,18 +3,45 @@
 This is an educational tool:
 - it demonstrates interception in user space (application layer)
 - it can allow or reject connections based on source IP allow or block lists
+  (single addresses or CIDR networks, e.g. 10.0.7.0/24)
 
 It is not a replacement for iptables based filtering.
+
+Relay engines (--engine):
+- threads:  one thread per connection plus one per direction, blocking recv/sendall
+- selector: one thread, an event loop (epoll on Linux) and one reusable buffer per direction
+- splice:   like selector, but bytes move socket -> pipe -> socket with os.splice
+            and are never copied into Python (Linux only)
+- auto:     splice where available, otherwise selector (default)
+
+Log lines are queued and written by a background thread, so logging never
+blocks the relay.
 """
 
 from __future__ import annotations
 
 import argparse
+import errno
+import ipaddress
+import os
+import queue
+import selectors
 import socket
+import sys
 import threading
 import time
 from pathlib import Path
-from typing import Optional, Set
+from typing import List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+HAVE_SPLICE = hasattr(os, "splice") and fcntl is not None and sys.platform.startswith("linux")
+F_SETPIPE_SZ = 1031
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -23,31 +50,142 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--listen-port", type=int, default=8888, help="Proxy bind port (default: 8888)")
     p.add_argument("--upstream-host", required=True, help="Upstream server host")
     p.add_argument("--upstream-port", type=int, default=9090, help="Upstream server port (default: 9090)")
-    p.add_argument("--allow", default="", help="Comma separated allowed source IPs (empty means allow all)")
-    p.add_argument("--block", default="", help="Comma separated blocked source IPs (empty means block none)")
+    p.add_argument("--allow", default="", help="Comma separated allowed source IPs or CIDR networks (empty means allow all)")
+    p.add_argument("--block", default="", help="Comma separated blocked source IPs or CIDR networks (empty means block none)")
     p.add_argument("--log", default="", help="Optional log file path")
     p.add_argument("--timeout", type=float, default=5.0, help="Socket timeout in seconds (default: 5)")
+    p.add_argument("--engine", choices=["auto", "threads", "selector", "splice"], default="auto",
+                   help="Relay engine (default: auto = splice on Linux, otherwise selector)")
+    p.add_argument("--buffer-kb", type=int, default=256, help="Selector/splice relay buffer per direction in KB (default: 256)")
     return p
 
 
-def parse_ip_set(s: str) -> Set[str]:
-    out: Set[str] = set()
+class CidrTree:
+    """Binary radix tree of IP networks (IPv4 and IPv6).
+
+    A lookup walks at most 32 (or 128) bits, however many networks are
+    stored, and returns the most specific network containing the address.
+    """
+
+    def __init__(self, networks: Optional[List[IPNetwork]] = None) -> None:
+        # node = [child for bit 0, child for bit 1, network ending here]
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self.networks: List[IPNetwork] = []
+        for net in networks or []:
+            self.add(net)
+
+    def __bool__(self) -> bool:
+        return bool(self.networks)
+
+    def __len__(self) -> int:
+        return len(self.networks)
+
+    def add(self, net: IPNetwork) -> None:
+        node = self._roots[net.version]
+        value = int(net.network_address)
+        width = net.max_prefixlen
+        for i in range(net.prefixlen):
+            bit = (value >> (width - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            self.networks.append(net)
+        node[2] = net
+
+    def match(self, ip: str) -> Optional[IPNetwork]:
+        """Most specific network containing `ip`, or None (also for invalid addresses)."""
+        try:
+            addr = ipaddress.ip_address(ip.split("%", 1)[0])
+        except ValueError:
+            return None
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        node = self._roots[addr.version]
+        value = int(addr)
+        shift = addr.max_prefixlen - 1
+        found = node[2]
+        while node is not None and shift >= 0:
+            node = node[(value >> shift) & 1]
+            shift -= 1
+            if node is not None and node[2] is not None:
+                found = node[2]
+        return found
+
+
+def parse_cidr_list(s: str) -> CidrTree:
+    tree = CidrTree()
     for part in s.split(","):
         part = part.strip()
         if part:
-            out.add(part)
-    return out
+            tree.add(ipaddress.ip_network(part, strict=False))
+    return tree
+
+
+def check_source(ip: str, allow: CidrTree, block: CidrTree) -> Optional[str]:
+    """Reason to reject `ip`, or None if it may connect."""
+    hit = block.match(ip)
+    if hit is not None:
+        return f"block list {hit}"
+    if allow and allow.match(ip) is None:
+        return "not in allow list"
+    return None
+
 
+class AsyncLogger:
+    """Timestamped log lines to stdout and an optional file.
 
-def log_line(path: Optional[Path], line: str) -> None:
-    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    msg = f"[{stamp}] {line}"
-    print(msg, flush=True)
-    if path:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", encoding="utf-8") as f:
-            f.write(msg + "\n")
+    log() only queues the line. A background thread writes whatever has
+    accumulated in one go and flushes once per batch, and the file is
+    opened once instead of once per line.
+    """
 
+    def __init__(self, path: Optional[Path] = None, echo: bool = True) -> None:
+        self.echo = echo
+        self._file = None
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = path.open("a", encoding="utf-8")
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="logger", daemon=True)
+        self._thread.start()
+
+    def log(self, line: str) -> None:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put(f"[{stamp}] {line}\n")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._file:
+            self._file.close()
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in lines:
+                running = False
+                lines = lines[:lines.index(None)]
+            if not lines:
+                continue
+            text = "".join(lines)
+            if self.echo:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            if self._file:
+                self._file.write(text)
+                self._file.flush()
+
+
+# ----------------------------------------------------------------------------
+# Threaded relay
+# ----------------------------------------------------------------------------
 
 def pipe(src: socket.socket, dst: socket.socket, buf: int = 4096) -> None:
     try:
@@ -65,26 +203,27 @@ def pipe(src: socket.socket, dst: socket.socket, buf: int = 4096) -> None:
             pass
 
 
-def handle(conn: socket.socket, addr: tuple[str, int], upstream: tuple[str, int], allow: Set[str], block: Set[str], log_path: Optional[Path], timeout: float) -> None:
+def handle(conn: socket.socket, addr: tuple[str, int], upstream: tuple[str, int], allow: CidrTree, block: CidrTree, logger: AsyncLogger, timeout: float) -> None:
     src_ip = addr[0]
     conn.settimeout(timeout)
 
-    if src_ip in block or (allow and src_ip not in allow):
-        log_line(log_path, f"blocked connection from {src_ip}:{addr[1]}")
+    reason = check_source(src_ip, allow, block)
+    if reason:
+        logger.log(f"blocked connection from {src_ip}:{addr[1]} ({reason})")
         try:
             conn.close()
         except Exception:
             pass
         return
 
-    log_line(log_path, f"allowed connection from {src_ip}:{addr[1]} to upstream {upstream[0]}:{upstream[1]}")
+    logger.log(f"allowed connection from {src_ip}:{addr[1]} to upstream {upstream[0]}:{upstream[1]}")
 
     up = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     up.settimeout(timeout)
     try:
         up.connect(upstream)
     except Exception as exc:
-        log_line(log_path, f"upstream connect failed: {exc}")
+        logger.log(f"upstream connect failed: {exc}")
         try:
             conn.close()
         except Exception:
@@ -107,36 +246,341 @@ def handle(conn: socket.socket, addr: tuple[str, int], upstream: tuple[str, int]
     except Exception:
         pass
 
-    log_line(log_path, f"connection closed for {src_ip}:{addr[1]}")
+    logger.log(f"connection closed for {src_ip}:{addr[1]}")
+
+
+def serve_threads(srv: socket.socket, upstream: tuple[str, int], allow: CidrTree, block: CidrTree,
+                  logger: AsyncLogger, timeout: float) -> None:
+    while True:
+        conn, addr = srv.accept()
+        th = threading.Thread(target=handle, args=(conn, addr, upstream, allow, block, logger, timeout), daemon=True)
+        th.start()
+
+
+# ----------------------------------------------------------------------------
+# Event-driven relay
+# ----------------------------------------------------------------------------
+
+class _BufferFlow:
+    """One direction of a connection through a reusable buffer."""
+
+    def __init__(self, src: socket.socket, dst: socket.socket, size: int) -> None:
+        self.src = src
+        self.dst = dst
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.pending = 0
+        self.eof = False
+        self.shut = False
+
+    def read(self) -> None:
+        n = self.src.recv_into(self.buf)
+        if n == 0:
+            self.eof = True
+        self.start, self.pending = 0, n
+
+    def write(self) -> None:
+        sent = self.dst.send(self.view[self.start:self.start + self.pending])
+        self.start += sent
+        self.pending -= sent
+
+    def close(self) -> None:
+        self.view.release()
+
+
+class _SpliceFlow:
+    """One direction of a connection: socket -> pipe -> socket with os.splice."""
+
+    FLAGS = getattr(os, "SPLICE_F_MOVE", 1) | getattr(os, "SPLICE_F_NONBLOCK", 2)
+
+    def __init__(self, src: socket.socket, dst: socket.socket, size: int) -> None:
+        self.src = src
+        self.dst = dst
+        self.size = size
+        self.pipe: Optional[Tuple[int, int]] = None      # created on first data
+        self.pending = 0
+        self.eof = False
+        self.shut = False
+
+    def read(self) -> None:
+        if self.pipe is None:
+            r, w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+            self.pipe = (r, w)
+            try:
+                self.size = fcntl.fcntl(w, F_SETPIPE_SZ, self.size)
+            except OSError:
+                self.size = 65536                       # default pipe size
+        n = os.splice(self.src.fileno(), self.pipe[1], self.size, flags=self.FLAGS)
+        if n == 0:
+            self.eof = True
+        self.pending = n
+
+    def write(self) -> None:
+        self.pending -= os.splice(self.pipe[0], self.dst.fileno(), self.pending, flags=self.FLAGS)
+
+    def close(self) -> None:
+        if self.pipe:
+            os.close(self.pipe[0])
+            os.close(self.pipe[1])
+            self.pipe = None
+
+
+class _Relay:
+    """A client connection and its upstream connection, driven by SelectorProxy."""
+
+    def __init__(self, proxy: "SelectorProxy", conn: socket.socket, addr: tuple, up: socket.socket) -> None:
+        self.proxy = proxy
+        self.conn = conn
+        self.addr = addr
+        self.up = up
+        self.connecting = True
+        self.closed = False
+        self.flows: List = []
+        self.events = {conn: 0, up: 0}
+        self.deadline = time.monotonic() + proxy.timeout
+
+    def set_events(self, sock: socket.socket, events: int) -> None:
+        old = self.events[sock]
+        if events == old:
+            return
+        sel = self.proxy.sel
+        if not old:
+            sel.register(sock, events, self)
+        elif not events:
+            sel.unregister(sock)
+        else:
+            sel.modify(sock, events, self)
+        self.events[sock] = events
+
+    def update(self) -> None:
+        want = {self.conn: 0, self.up: 0}
+        for flow in self.flows:
+            if flow.pending:
+                want[flow.dst] |= selectors.EVENT_WRITE
+            elif not flow.eof:
+                want[flow.src] |= selectors.EVENT_READ
+        for sock, events in want.items():
+            self.set_events(sock, events)
+
+    def connected(self) -> None:
+        err = self.up.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self.proxy.logger.log(f"upstream connect failed: {os.strerror(err)}")
+            self.close(log=False)
+            return
+        self.connecting = False
+        flow = self.proxy.flow_class
+        size = self.proxy.buffer
+        self.flows = [flow(self.conn, self.up, size), flow(self.up, self.conn, size)]
+        self.update()
+
+    def on_event(self, sock: socket.socket, mask: int) -> None:
+        if self.closed:                                 # closed earlier in the same select() batch
+            return
+        self.deadline = time.monotonic() + self.proxy.timeout
+        if self.connecting:
+            self.connected()
+            return
+        try:
+            for flow in self.flows:
+                if mask & selectors.EVENT_READ and flow.src is sock and not flow.pending and not flow.eof:
+                    try:
+                        flow.read()
+                    except BlockingIOError:
+                        pass
+                if flow.pending and (flow.src is sock or mask & selectors.EVENT_WRITE and flow.dst is sock):
+                    try:
+                        flow.write()
+                    except BlockingIOError:
+                        pass
+                if flow.eof and not flow.pending and not flow.shut:
+                    flow.shut = True
+                    flow.dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            self.close()
+            return
+        if all(flow.shut for flow in self.flows):
+            self.close()
+        else:
+            self.update()
+
+    def close(self, log: bool = True) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for sock in (self.conn, self.up):
+            self.set_events(sock, 0)
+            try:
+                sock.close()
+            except OSError:
+                pass
+        for flow in self.flows:
+            flow.close()
+        self.proxy.relays.discard(self)
+        if log:
+            self.proxy.logger.log(f"connection closed for {self.addr[0]}:{self.addr[1]}")
+
+
+class _UpstreamResolver:
+    """Upstream address for the event loop, resolved off the loop.
+
+    getaddrinfo() blocks, so a host name is looked up by a background thread
+    every `ttl` seconds (every second while it fails) and the loop only reads
+    the last result. `addr` is None until a lookup succeeds; `error` holds
+    the last failure.
+    """
+
+    def __init__(self, host: str, port: int, ttl: float = 30.0) -> None:
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.addr: Optional[tuple] = None
+        self.error: Optional[OSError] = None
+        self._stop = threading.Event()
+        try:
+            self.addr = (str(ipaddress.IPv4Address(host)), port)
+            return                                      # literal address: nothing to refresh
+        except ValueError:
+            pass
+        self.resolve()
+        threading.Thread(target=self._run, name="resolver", daemon=True).start()
+
+    def resolve(self) -> None:
+        try:
+            self.addr = socket.getaddrinfo(self.host, self.port, socket.AF_INET, socket.SOCK_STREAM)[0][4]
+            self.error = None
+        except OSError as exc:                          # keep the last good address, if any
+            self.error = exc
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl if self.error is None else 1.0):
+            self.resolve()
+
+
+class SelectorProxy:
+    """Single-threaded proxy: non-blocking sockets and one selector (epoll on Linux)."""
+
+    def __init__(self, srv: socket.socket, upstream: tuple[str, int], allow: CidrTree, block: CidrTree,
+                 logger: AsyncLogger, timeout: float, buffer: int, splice: bool = False) -> None:
+        self.srv = srv
+        self.upstream = upstream
+        # connect_ex() on a host name would block the loop
+        self.resolver = _UpstreamResolver(upstream[0], upstream[1])
+        self.allow = allow
+        self.block = block
+        self.logger = logger
+        self.timeout = timeout
+        self.buffer = buffer
+        self.flow_class = _SpliceFlow if splice else _BufferFlow
+        self.sel = selectors.DefaultSelector()
+        self.relays: set = set()
+
+    def accept(self) -> None:
+        while True:
+            try:
+                conn, addr = self.srv.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:                      # e.g. EMFILE: keep serving
+                self.logger.log(f"accept failed: {exc}")
+                return
+            reason = check_source(addr[0], self.allow, self.block)
+            if reason:
+                self.logger.log(f"blocked connection from {addr[0]}:{addr[1]} ({reason})")
+                conn.close()
+                continue
+            self.logger.log(f"allowed connection from {addr[0]}:{addr[1]} to upstream {self.upstream[0]}:{self.upstream[1]}")
+            upstream_addr = self.resolver.addr
+            if upstream_addr is None:
+                self.logger.log(f"upstream connect failed: {self.resolver.error}")
+                conn.close()
+                continue
+            conn.setblocking(False)
+            up = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            up.setblocking(False)
+            relay = _Relay(self, conn, addr, up)
+            self.relays.add(relay)
+            err = up.connect_ex(upstream_addr)
+            if err == 0:
+                relay.connected()
+            elif err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                relay.set_events(up, selectors.EVENT_WRITE)
+            else:
+                self.logger.log(f"upstream connect failed: {os.strerror(err)}")
+                relay.close(log=False)
+
+    def expire(self, now: float) -> None:
+        for relay in [r for r in self.relays if r.deadline < now]:
+            if relay.connecting:
+                self.logger.log("upstream connect failed: timed out")
+                relay.close(log=False)
+            else:
+                relay.close()
+
+    def serve_forever(self) -> None:
+        self.srv.setblocking(False)
+        self.sel.register(self.srv, selectors.EVENT_READ, None)
+        next_sweep = time.monotonic() + 1.0
+        try:
+            while True:
+                for key, mask in self.sel.select(timeout=1.0):
+                    if key.data is None:
+                        self.accept()
+                    else:
+                        key.data.on_event(key.fileobj, mask)
+                now = time.monotonic()
+                if now >= next_sweep:
+                    self.expire(now)
+                    next_sweep = now + 1.0
+        finally:
+            for relay in list(self.relays):
+                relay.close(log=False)
+            self.sel.close()
+            self.resolver.close()
 
 
 def main() -> int:
-    args = build_parser().parse_args()
-    allow = parse_ip_set(args.allow)
-    block = parse_ip_set(args.block)
-    log_path = Path(args.log) if args.log else None
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        allow = parse_cidr_list(args.allow)
+        block = parse_cidr_list(args.block)
+    except ValueError as exc:
+        parser.error(str(exc))
+    engine = args.engine
+    if engine == "auto":
+        engine = "splice" if HAVE_SPLICE else "selector"
+    if engine == "splice" and not HAVE_SPLICE:
+        parser.error("the splice engine needs Linux and Python 3.10+")
+    buf = args.buffer_kb * 1024
+    logger = AsyncLogger(Path(args.log) if args.log else None)
 
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     srv.bind((args.listen_host, args.listen_port))
-    srv.listen(50)
+    srv.listen(128)
 
     upstream = (args.upstream_host, args.upstream_port)
-    log_line(log_path, f"proxy listening on {args.listen_host}:{args.listen_port} forwarding to {upstream[0]}:{upstream[1]}")
+    logger.log(f"proxy listening on {args.listen_host}:{args.listen_port} forwarding to {upstream[0]}:{upstream[1]} (engine: {engine})")
 
     try:
-        while True:
-            conn, addr = srv.accept()
-            th = threading.Thread(target=handle, args=(conn, addr, upstream, allow, block, log_path, args.timeout), daemon=True)
-            th.start()
+        if engine == "threads":
+            serve_threads(srv, upstream, allow, block, logger, args.timeout)
+        else:
+            SelectorProxy(srv, upstream, allow, block, logger, args.timeout, buf, splice=engine == "splice").serve_forever()
     except KeyboardInterrupt:
-        log_line(log_path, "interrupted")
+        logger.log("interrupted")
     finally:
         try:
             srv.close()
         except Exception:
             pass
-        log_line(log_path, "proxy stopped")
+        logger.log("proxy stopped")
+        logger.close()
     return 0
 
 
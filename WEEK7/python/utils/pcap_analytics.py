@@ -0,0 +1,475 @@
+"""Parallel pcap analytics with mergeable aggregates for Week 7.
+
+Large captures are cut into byte ranges (and directories into files), and a
+process pool reads the ranges in parallel with pcap_reader.py. Every range
+yields an Aggregate that can be merged with any other:
+- packets and bytes per protocol
+- per-port histograms: TCP/UDP packets and bytes per port, counting a packet
+  under both its source and destination port (so `tcp.port==9090` is a
+  lookup)
+- top-K talkers (bytes sent per source address): a count-min sketch plus
+  each range's local heavy hitters as candidates, so merging costs the
+  same however many addresses a capture holds
+- TCP/UDP conversations (both directions, first/last packet), as shown by
+  `tshark -z conv,tcp`
+
+The merged Aggregate answers the whole tshark-based summary of
+traffic_analysis.py in one pass over each file.
+
+Usage:
+- python3 python/utils/pcap_analytics.py artifacts/demo.pcap
+- python3 python/utils/pcap_analytics.py pcap/ --workers 4 --top 10 --port tcp/9090 --port udp/9091
+- python3 python/utils/pcap_analytics.py --selftest
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import math
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Add the Week 7 root to the path when run as a script
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from python.utils.pcap_reader import PROTO_NAMES, FlowTable, SplitError, read_flows  # noqa: E402
+
+CAPTURE_SUFFIXES = (".pcap", ".pcapng", ".cap")
+DEFAULT_CHUNK = 64 << 20
+
+# (proto, addr_a, port_a, addr_b, port_b), with (addr_a, port_a) <= (addr_b, port_b)
+ConvKey = Tuple[int, bytes, int, bytes, int]
+# Conversation counters: packets/bytes a->b, packets/bytes b->a, first a->b, first b->a, last
+_INF = float("inf")
+
+
+def _addr(raw: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+def _endpoint(raw: bytes, port: int) -> str:
+    ip = _addr(raw)
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+
+
+def _finite(ts: Optional[float]) -> Optional[float]:
+    return ts if ts is not None and math.isfinite(ts) else None
+
+
+class CountMinSketch:
+    """Count-min sketch: `depth` rows of `width` counters, mergeable by addition.
+
+    estimate(key) never under-counts; it over-counts by at most
+    e/width * total with probability 1 - e**-depth.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+        self._unpack = struct.Struct(f"<{depth}I").unpack
+
+    def _cells(self, key: bytes) -> Tuple[int, ...]:
+        return self._unpack(hashlib.blake2b(key, digest_size=4 * self.depth).digest())
+
+    def add(self, key: bytes, count: int = 1) -> None:
+        w = self.width
+        for row, h in zip(self.rows, self._cells(key)):
+            row[h % w] += count
+
+    def estimate(self, key: bytes) -> int:
+        w = self.width
+        return min(row[h % w] for row, h in zip(self.rows, self._cells(key)))
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge sketches of different sizes")
+        for row, orow in zip(self.rows, other.rows):
+            for i, v in enumerate(orow):
+                if v:
+                    row[i] += v
+        return self
+
+    def __getstate__(self):
+        return self.width, self.depth, [r.tobytes() for r in self.rows]
+
+    def __setstate__(self, state):
+        self.width, self.depth, rows = state
+        self.rows = [array("q", r) for r in rows]
+        self._unpack = struct.Struct(f"<{self.depth}I").unpack
+
+
+@dataclass
+class Aggregate:
+    """Mergeable summary of one or more captures (or byte ranges of them)."""
+    top_k: int = 10
+    files: int = 0
+    ranges: int = 0
+    packets: int = 0
+    bytes: int = 0
+    truncated: int = 0
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    protocols: Counter = field(default_factory=Counter)         # name -> packets
+    protocol_bytes: Counter = field(default_factory=Counter)    # name -> bytes
+    port_packets: Dict[str, Counter] = field(default_factory=lambda: {"tcp": Counter(), "udp": Counter()})
+    port_bytes: Dict[str, Counter] = field(default_factory=lambda: {"tcp": Counter(), "udp": Counter()})
+    talkers: CountMinSketch = field(default_factory=CountMinSketch)
+    talker_candidates: set = field(default_factory=set)          # raw source addresses
+    conversations: Dict[ConvKey, List] = field(default_factory=dict)
+
+    @classmethod
+    def from_flows(cls, table: FlowTable, top_k: int = 10) -> "Aggregate":
+        agg = cls(top_k=top_k, ranges=1, packets=table.packets, bytes=table.bytes,
+                  truncated=table.truncated, first_ts=_finite(table.first_ts), last_ts=_finite(table.last_ts))
+        sent: Counter = Counter()
+        convs = agg.conversations
+        for (proto, src, sport, dst, dport), (p, b, first, last, _flags) in table.flows.items():
+            name = PROTO_NAMES.get(proto, "IP_OTHER")
+            agg.protocols[name] += p
+            agg.protocol_bytes[name] += b
+            sent[src] += b
+            if proto != 6 and proto != 17:
+                continue
+            label = "tcp" if proto == 6 else "udp"
+            for port in {sport, dport}:
+                agg.port_packets[label][port] += p
+                agg.port_bytes[label][port] += b
+            if (src, sport) <= (dst, dport):
+                key, fwd = (proto, src, sport, dst, dport), True
+            else:
+                key, fwd = (proto, dst, dport, src, sport), False
+            c = convs.get(key)
+            if c is None:
+                c = convs[key] = [0, 0, 0, 0, _INF, _INF, last]
+            if fwd:
+                c[0] += p
+                c[1] += b
+                c[4] = min(c[4], first)
+            else:
+                c[2] += p
+                c[3] += b
+                c[5] = min(c[5], first)
+            c[6] = max(c[6], last)
+        if table.non_ip:
+            agg.protocols["NON_IP"] += sum(table.non_ip.values())
+        for src, b in sent.items():
+            agg.talkers.add(src, b)
+        # Local heavy hitters: a global top-K talker is in some range's local top-K*4
+        agg.talker_candidates = {src for src, _ in sent.most_common(4 * top_k)}
+        return agg
+
+    def merge(self, other: "Aggregate") -> "Aggregate":
+        self.files += other.files
+        self.ranges += other.ranges
+        self.packets += other.packets
+        self.bytes += other.bytes
+        self.truncated += other.truncated
+        for ts in (other.first_ts, other.last_ts):
+            if ts is not None:
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.protocols.update(other.protocols)
+        self.protocol_bytes.update(other.protocol_bytes)
+        for label in ("tcp", "udp"):
+            self.port_packets[label].update(other.port_packets[label])
+            self.port_bytes[label].update(other.port_bytes[label])
+        self.talkers.merge(other.talkers)
+        self.talker_candidates |= other.talker_candidates
+        if len(self.talker_candidates) > 16 * self.top_k:
+            self.talker_candidates = {a for a, _ in self._estimates(4 * self.top_k)}
+        convs = self.conversations
+        for key, o in other.conversations.items():
+            c = convs.get(key)
+            if c is None:
+                convs[key] = list(o)
+                continue
+            for i in range(4):
+                c[i] += o[i]
+            c[4] = min(c[4], o[4])
+            c[5] = min(c[5], o[5])
+            c[6] = max(c[6], o[6])
+        return self
+
+    # ---- queries
+
+    @property
+    def duration(self) -> float:
+        if self.first_ts is None or self.last_ts is None:
+            return 0.0
+        return self.last_ts - self.first_ts
+
+    def _estimates(self, n: int) -> List[Tuple[bytes, int]]:
+        return heapq.nlargest(n, ((a, self.talkers.estimate(a)) for a in self.talker_candidates),
+                              key=lambda x: x[1])
+
+    def top_talkers(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(source address, bytes sent) estimated by the count-min sketch."""
+        return [(_addr(a), est) for a, est in self._estimates(n or self.top_k)]
+
+    def port_count(self, proto: str, port: int) -> int:
+        """Packets with `port` as source or destination (tshark `tcp.port==N`)."""
+        return self.port_packets[proto][port]
+
+    def top_ports(self, proto: str, n: int = 10) -> List[Tuple[int, int, int]]:
+        """(port, packets, bytes) by packets."""
+        return [(port, p, self.port_bytes[proto][port]) for port, p in self.port_packets[proto].most_common(n)]
+
+    def conversation_rows(self, proto: int) -> List[Tuple[str, str, int, int, int, int, float, float]]:
+        """(A, B, frames B->A, bytes B->A, frames A->B, bytes A->B, rel. start, duration),
+        A being the side that sent first, sorted by total bytes like tshark."""
+        base = self.first_ts or 0.0
+        rows = []
+        for (p, lo, lport, hi, hport), (pf, bf, pr, br, ff, fr, last) in self.conversations.items():
+            if p != proto:
+                continue
+            if ff <= fr:
+                a, b, ab, ba, first = _endpoint(lo, lport), _endpoint(hi, hport), (pf, bf), (pr, br), ff
+            else:
+                a, b, ab, ba, first = _endpoint(hi, hport), _endpoint(lo, lport), (pr, br), (pf, bf), fr
+            rows.append((a, b, ba[0], ba[1], ab[0], ab[1], first - base, last - first))
+        rows.sort(key=lambda r: (-(r[3] + r[5]), r[0], r[1]))
+        return rows
+
+
+# ============================================================================
+# Planning and parallel execution
+# ============================================================================
+
+def find_captures(paths: Iterable[str]) -> List[Path]:
+    """Expand directories into the capture files they contain (sorted)."""
+    out: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            out.extend(sorted(f for f in p.rglob("*") if f.is_file() and f.suffix.lower() in CAPTURE_SUFFIXES))
+        else:
+            out.append(p)
+    return out
+
+
+def plan_ranges(files: Sequence[Path], chunk_size: int = DEFAULT_CHUNK) -> List[Tuple[str, int, Optional[int]]]:
+    """(path, start, end) jobs: one per `chunk_size` bytes of each file."""
+    jobs: List[Tuple[str, int, Optional[int]]] = []
+    for f in files:
+        size = f.stat().st_size
+        n = max(1, -(-size // chunk_size))
+        step = -(-size // n)
+        jobs.extend((str(f), i * step, None if i == n - 1 else (i + 1) * step) for i in range(n))
+    return jobs
+
+
+def analyse_range(job: Tuple[str, int, Optional[int]], top_k: int = 10) -> Aggregate:
+    path, start, end = job
+    agg = Aggregate.from_flows(read_flows(path, start=start, end=end), top_k)
+    agg.files = 1 if start == 0 else 0
+    return agg
+
+
+def _analyse_job(args: Tuple[Tuple[str, int, Optional[int]], int]):
+    job, top_k = args
+    try:
+        return job, analyse_range(job, top_k)
+    except SplitError:
+        return job, None
+
+
+def analyse_captures(paths: Iterable[str], workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK,
+                     top_k: int = 10) -> Aggregate:
+    """Read every capture in `paths` (files or directories) with a process
+    pool, one byte range per job, and merge the partial aggregates."""
+    files = find_captures(paths)
+    jobs = plan_ranges(files, chunk_size)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    total = Aggregate(top_k=top_k)
+    args = [(job, top_k) for job in jobs]
+    partial: Dict[str, List[Optional[Aggregate]]] = {}
+
+    if workers == 1:
+        results = map(_analyse_job, args)
+        for job, agg in results:
+            partial.setdefault(job[0], []).append(agg)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for job, agg in pool.map(_analyse_job, args, chunksize=1):
+                partial.setdefault(job[0], []).append(agg)
+
+    unsplittable = []
+    for path, aggs in partial.items():
+        if any(agg is None for agg in aggs):
+            unsplittable.append(path)
+            continue
+        for agg in aggs:
+            total.merge(agg)
+    # pcapng files whose interfaces are not all declared up front: read whole
+    for path in unsplittable:
+        total.merge(analyse_range((path, 0, None), top_k))
+    return total
+
+
+# ============================================================================
+# Report
+# ============================================================================
+
+def format_conversations(agg: Aggregate, proto: int) -> str:
+    title = "TCP" if proto == 6 else "UDP"
+    rows = agg.conversation_rows(proto)
+    if not rows:
+        return f"{title} Conversations: none"
+    lines = [
+        f"{title} Conversations",
+        f"{'':<47} {'<-':^17} {'->':^17} {'Total':^17} {'Relative':>10} {'Duration':>9}",
+        f"{'':<47} {'Frames':>7} {'Bytes':>9} {'Frames':>7} {'Bytes':>9} {'Frames':>7} {'Bytes':>9} "
+        f"{'Start':>10} {'':>9}",
+    ]
+    for a, b, f_in, b_in, f_out, b_out, start, dur in rows:
+        lines.append(f"{a:<21} <-> {b:<21} {f_in:>7} {b_in:>9} {f_out:>7} {b_out:>9} "
+                     f"{f_in + f_out:>7} {b_in + b_out:>9} {start:>10.6f} {dur:>9.4f}")
+    return "\n".join(lines)
+
+
+def format_summary(agg: Aggregate, sources: Sequence[str] = (),
+                   ports: Sequence[Tuple[str, int]] = (), top: int = 10) -> str:
+    lines = []
+    if sources:
+        lines.append(f"PCAP: {', '.join(map(str, sources))}")
+    lines.append(f"Files: {agg.files}  ranges: {agg.ranges}  packets: {agg.packets}  "
+                 f"bytes: {agg.bytes}  duration: {agg.duration:.3f} s")
+    if agg.truncated:
+        lines.append(f"Truncated headers: {agg.truncated}")
+    lines.append("")
+    lines.append("=== Protocols ===")
+    for name, p in agg.protocols.most_common():
+        lines.append(f"{name:<10} {p:>10} packets {agg.protocol_bytes.get(name, 0):>14} bytes")
+    lines.append("")
+    lines.append(f"=== Top {top} talkers (bytes sent, count-min estimate) ===")
+    for ip, b in agg.top_talkers(top):
+        lines.append(f"{ip:<40} {b:>14}")
+    for label in ("tcp", "udp"):
+        lines.append("")
+        lines.append(f"=== Top {top} {label.upper()} ports (source or destination) ===")
+        for port, p, b in agg.top_ports(label, top):
+            lines.append(f"{port:>5} {p:>10} packets {b:>14} bytes")
+    lines.append("")
+    lines.append("=== TCP conversations ===")
+    lines.append(format_conversations(agg, 6))
+    lines.append("")
+    lines.append("=== UDP conversations ===")
+    lines.append(format_conversations(agg, 17))
+    if ports:
+        lines.append("")
+        for label, port in ports:
+            lines.append(f"Packets matching {label}.port=={port}: {agg.port_count(label, port)}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# Self-test
+# ============================================================================
+
+def _write_test_pcap(path: Path) -> None:
+    """3000 packets one second apart: 1000 UDP, 1000 ARP, 1000 UDP. The clock
+    starts near the epoch, as on devices without an RTC, and the zeroed ARP
+    fields must not pass for record headers when resynchronising."""
+    eth = b"\x02\x00\x00\x00\x00\x02" + b"\x02\x00\x00\x00\x00\x01"
+    arp = b"\xff" * 6 + eth[6:] + b"\x08\x06" + bytes(28)
+    records = [struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)]
+    for i in range(3000):
+        if 1000 <= i < 2000:
+            frame = arp
+        else:
+            src = bytes((10, 0, 0, 1 + i % 3))
+            ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 36, i, 0, 64, 17, 0, src, bytes((10, 0, 0, 9)))
+            frame = eth + b"\x08\x00" + ip + struct.pack("!HHHH", 40000 + i % 3, 9091, 16, 0) + b"selftest"
+        records.append(struct.pack("<IIII", 1_000_000 + i, 0, len(frame), len(frame)) + frame)
+    path.write_bytes(b"".join(records))
+
+
+def selftest() -> int:
+    """Whole-file and byte-range reads must give the same Aggregate."""
+    print("[selftest] pcap_analytics")
+    with tempfile.TemporaryDirectory() as tmp:
+        pcap = Path(tmp) / "split.pcap"
+        _write_test_pcap(pcap)
+        whole = analyse_captures([str(pcap)], workers=1)
+        split = analyse_captures([str(pcap)], workers=1, chunk_size=20000)
+
+    checks = [
+        ("whole file: 3000 packets over 2999 s", whole.packets == 3000 and whole.duration == 2999.0),
+        ("split read covers several ranges", split.ranges > 1 and split.files == 1),
+        ("split duration matches (ranges with only ARP frames)", split.duration == whole.duration),
+        ("split counters match", (split.packets, split.bytes, split.protocols, split.port_packets)
+         == (whole.packets, whole.bytes, whole.protocols, whole.port_packets)),
+        ("split conversations match", split.conversation_rows(17) == whole.conversation_rows(17)),
+        ("split top talkers match", split.top_talkers() == whole.top_talkers()),
+    ]
+    failed = 0
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+        failed += not ok
+    if failed:
+        print(f"  whole: {whole.duration} s, split: {split.duration} s")
+        return 1
+    print("[selftest] OK")
+    return 0
+
+
+def _port_arg(value: str) -> Tuple[str, int]:
+    proto, _, port = value.partition("/")
+    if proto not in ("tcp", "udp") or not port.isdigit():
+        raise argparse.ArgumentTypeError("expected tcp/PORT or udp/PORT")
+    return proto, int(port)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Summarise pcap/pcapng files in parallel (Week 7).")
+    p.add_argument("paths", nargs="*", help="Capture files or directories of captures")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    p.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK >> 20, help="Bytes per job, in MiB (default: 64)")
+    p.add_argument("--top", type=int, default=10, help="Rows in the top-K tables (default: 10)")
+    p.add_argument("--port", dest="ports", type=_port_arg, action="append", default=[],
+                   help="Count packets on a port, e.g. tcp/9090 (repeatable)")
+    p.add_argument("--out", default=None, help="Write the summary to this file instead of stdout")
+    p.add_argument("--selftest", action="store_true", help="Check split reads against whole-file reads and exit")
+    return p
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.selftest:
+        return selftest()
+    if not args.paths:
+        parser.error("at least one capture file or directory is required")
+    start = time.perf_counter()
+    try:
+        agg = analyse_captures(args.paths, workers=args.workers, chunk_size=args.chunk_mb << 20, top_k=args.top)
+    except (OSError, ValueError) as e:
+        print(f"Cannot analyse: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    text = format_summary(agg, args.paths, args.ports, args.top)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    rate = agg.packets / elapsed if elapsed else 0.0
+    print(f"Analysed {agg.packets} packets in {elapsed:.2f} s ({rate:,.0f} packets/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""Streaming pcap/pcapng reader with a 5-tuple flow table for Week 7.
+
+The capture file is memory-mapped and walked record by record. Link,
+network and transport headers (Ethernet/802.1Q, Linux cooked, raw IP,
+IPv4, IPv6, TCP, UDP, ICMP) are decoded with precompiled struct.Struct
+objects at fixed offsets, and each packet only updates the counters of its
+flow. No per-packet objects are built, so memory depends on the number of
+flows, not on the size of the capture, and a 1 GB file is read at disk
+speed rather than at packet-object speed.
+
+A file can also be read in byte ranges (read_flows(path, start=..., end=...)),
+one range per process: each range owns the records whose header starts
+inside it, and a reader starting mid-file resynchronises on the next record
+boundary. See pcap_analytics.py.
+
+Example
+-------
+    from python.utils.pcap_reader import read_flows
+
+    table = read_flows("artifacts/demo.pcap")
+    print(table.packets, table.bytes, table.protocol_counts())
+    for flow in table.top_flows(5):
+        print(flow)
+"""
+
+from __future__ import annotations
+
+import mmap
+import socket
+import struct
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Largest record accepted when resynchronising mid-file
+MAX_RECORD = 0x40000
+# Consecutive well-formed records required to accept a resync point
+RESYNC_CHAIN = 8
+
+# Capture file formats
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),  # little-endian, microseconds
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),  # nanosecond variant
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+
+# Link types (http://www.tcpdump.org/linktypes.html)
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_RAW_ALT = 12
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+ETH_IPV4 = 0x0800
+ETH_IPV6 = 0x86DD
+ETH_VLAN = (0x8100, 0x88A8, 0x9100)
+
+PROTO_NAMES = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "ICMPv6"}
+TCP_FLAG_NAMES = ("FIN", "SYN", "RST", "PSH", "ACK", "URG", "ECE", "CWR")
+
+# IPv6 extension headers walked to reach the transport header
+_IPV6_EXT = (0, 43, 60)      # hop-by-hop, routing, destination options
+_IPV6_FRAG = 44
+_IPV6_AH = 51
+
+_U16 = struct.Struct("!H")
+_PORTS = struct.Struct("!HH")
+# version/IHL, flags/fragment offset, protocol, src, dst
+_IPV4 = struct.Struct("!B5xHxB2x4s4s")
+# payload length, next header, src, dst
+_IPV6 = struct.Struct("!4xHBx16s16s")
+
+
+class SplitError(ValueError):
+    """A pcapng range cannot be read on its own (a section or interface
+    block appears after the first packet); read the whole file instead."""
+
+FlowKey = Tuple[int, bytes, int, bytes, int]  # proto, src, sport, dst, dport
+
+
+class Flow(NamedTuple):
+    proto: str
+    src: str
+    sport: int
+    dst: str
+    dport: int
+    packets: int
+    bytes: int
+    first: float
+    last: float
+    tcp_flags: int
+
+    @property
+    def duration(self) -> float:
+        return self.last - self.first
+
+
+def format_tcp_flags(flags: int) -> str:
+    """0x12 -> "SYN,ACK"."""
+    return ",".join(name for bit, name in enumerate(TCP_FLAG_NAMES) if flags & (1 << bit)) or "-"
+
+
+def _addr(raw: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+# ============================================================================
+# Record walkers: (timestamp, offset, captured length, wire length, link type)
+# ============================================================================
+
+def _pcap_records(buf: mmap.mmap, size: int, start: int = 0,
+                  end: Optional[int] = None) -> Iterator[Tuple[float, int, int, int, int]]:
+    endian, unit = PCAP_MAGIC[buf[:4]]
+    snaplen, link = struct.unpack_from(endian + "II", buf, 16)
+    link &= 0x0FFFFFFF
+    rec = struct.Struct(endian + "IIII")
+    unpack = rec.unpack_from
+    off = 24 if start <= 24 else _pcap_resync(buf, size, start, rec, snaplen, unit)
+    end = size if end is None else min(end, size)
+    while off < end and off + 16 <= size:
+        sec, frac, caplen, wirelen = unpack(buf, off)
+        off += 16
+        if off + caplen > size:
+            break  # truncated final record
+        yield sec + frac * unit, off, caplen, wirelen, link
+        off += caplen
+
+
+def _pcap_resync(buf: mmap.mmap, size: int, off: int, rec: struct.Struct,
+                 snaplen: int, unit: float) -> int:
+    """First offset >= `off` that starts RESYNC_CHAIN plausible records."""
+    first_sec = rec.unpack_from(buf, 24)[0] if size >= 40 else 0
+    max_cap = min(snaplen or MAX_RECORD, MAX_RECORD)
+    max_frac = round(1 / unit)
+
+    def plausible(o: int) -> bool:
+        for _ in range(RESYNC_CHAIN):
+            if o == size:
+                return True
+            if o + 16 > size:
+                return False
+            sec, frac, caplen, wirelen = rec.unpack_from(buf, o)
+            # wirelen 0 rules out runs of zero padding, which otherwise chain
+            # as empty records when the capture clock is near the epoch
+            if (frac >= max_frac or caplen > max_cap or caplen > wirelen or not 0 < wirelen <= MAX_RECORD
+                    or abs(sec - first_sec) > 366 * 86400):
+                return False
+            o += 16 + caplen
+            if o > size:
+                return False
+        return True
+
+    while off < size and not plausible(off):
+        off += 1
+    return off
+
+
+def _pcapng_records(buf: mmap.mmap, size: int, start: int = 0,
+                    end: Optional[int] = None) -> Iterator[Tuple[float, int, int, int, int]]:
+    off = 0
+    endian = "<"
+    interfaces: List[Tuple[int, float, int]] = []  # link type, ts unit, snaplen
+    head = struct.Struct("<II")
+    epb = struct.Struct("<IIIII")
+    end = size if end is None else min(end, size)
+    resync = start > 0
+    jumped = False  # a range reader skipped blocks to reach `start`
+    while off + 12 <= size:
+        # The Section Header Block type reads the same in both byte orders
+        if buf[off:off + 4] == b"\x0a\x0d\x0d\x0a":
+            if jumped:
+                raise SplitError("pcapng section header after the first packet")
+            endian = "<" if buf[off + 8:off + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            head = struct.Struct(endian + "II")
+            epb = struct.Struct(endian + "IIIII")
+            interfaces = []
+        btype, blen = head.unpack_from(buf, off)
+        if blen < 12 or off + blen > size:
+            break
+        if resync and btype in (3, 6):
+            # Interfaces are known: jump to the first packet block of the range
+            off = _pcapng_resync(buf, size, max(off, start), head)
+            resync = False
+            jumped = True
+            continue
+        if off >= end:
+            break
+        body = off + 8
+        if btype == 6:  # Enhanced Packet Block
+            iface, ts_hi, ts_lo, caplen, wirelen = epb.unpack_from(buf, body)
+            if iface >= len(interfaces):
+                raise SplitError(f"pcapng interface {iface} is not described before the first packet")
+            link, unit, _ = interfaces[iface]
+            yield ((ts_hi << 32) | ts_lo) * unit, body + 20, caplen, wirelen, link
+        elif btype == 3:  # Simple Packet Block
+            link, unit, snaplen = interfaces[0]
+            wirelen = struct.unpack_from(endian + "I", buf, body)[0]
+            caplen = min(wirelen, snaplen or wirelen, blen - 16)
+            yield 0.0, body + 4, caplen, wirelen, link
+        elif btype == 1:  # Interface Description Block
+            if jumped:
+                raise SplitError("pcapng interface block after the first packet")
+            link, _, snaplen = struct.unpack_from(endian + "HHI", buf, body)
+            interfaces.append((link, _if_tsresol(buf, body + 8, off + blen - 4, endian), snaplen))
+        off += blen
+
+
+def _pcapng_resync(buf: mmap.mmap, size: int, off: int, head: struct.Struct) -> int:
+    """First offset >= `off` that starts RESYNC_CHAIN well-formed blocks
+    (the block length is repeated at the end of every block)."""
+    tail = struct.Struct(head.format[0] + "I")
+
+    def plausible(o: int) -> bool:
+        for _ in range(RESYNC_CHAIN):
+            if o == size:
+                return True
+            if o + 12 > size:
+                return False
+            btype, blen = head.unpack_from(buf, o)
+            if (blen < 12 or blen & 3 or o + blen > size or btype > 0x10
+                    or tail.unpack_from(buf, o + blen - 4)[0] != blen):
+                return False
+            o += blen
+        return True
+
+    off += -off & 3  # blocks are 32-bit aligned
+    while off < size and not plausible(off):
+        off += 4
+    return off
+
+
+def _if_tsresol(buf: mmap.mmap, off: int, end: int, endian: str) -> float:
+    """Timestamp unit of an interface (option if_tsresol, default 1e-6)."""
+    opt = struct.Struct(endian + "HH")
+    while off + 4 <= end:
+        code, length = opt.unpack_from(buf, off)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            v = buf[off + 4]
+            return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+        off += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+def iter_records(buf: mmap.mmap, start: int = 0,
+                 end: Optional[int] = None) -> Iterator[Tuple[float, int, int, int, int]]:
+    """Yield (ts, offset, caplen, wirelen, linktype) for every packet in `buf`
+    whose record starts in [start, end)."""
+    size = len(buf)
+    if size >= 24 and buf[:4] in PCAP_MAGIC:
+        return _pcap_records(buf, size, start, end)
+    if size >= 12 and buf[:4] == b"\x0a\x0d\x0d\x0a":
+        return _pcapng_records(buf, size, start, end)
+    raise ValueError("not a pcap or pcapng file")
+
+
+# ============================================================================
+# Flow table
+# ============================================================================
+
+@dataclass
+class FlowTable:
+    """Per 5-tuple counters: [packets, bytes, first_ts, last_ts, tcp_flags].
+
+    Flows are unidirectional (src -> dst), as in NetFlow. Packets that are
+    not IP are counted per EtherType in `non_ip`. Tables can be merged, so
+    several captures (or parts of one) can be read separately.
+    """
+    packets: int = 0
+    bytes: int = 0
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    truncated: int = 0
+    non_ip: Counter = field(default_factory=Counter)
+    flows: Dict[FlowKey, List] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        if self.first_ts is None or self.last_ts is None:
+            return 0.0
+        return self.last_ts - self.first_ts
+
+    def merge(self, other: "FlowTable") -> "FlowTable":
+        self.packets += other.packets
+        self.bytes += other.bytes
+        self.truncated += other.truncated
+        self.non_ip.update(other.non_ip)
+        for ts in (other.first_ts, other.last_ts):
+            if ts is not None:
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        flows = self.flows
+        for key, (p, b, first, last, flags) in other.flows.items():
+            f = flows.get(key)
+            if f is None:
+                flows[key] = [p, b, first, last, flags]
+            else:
+                f[0] += p
+                f[1] += b
+                f[2] = min(f[2], first)
+                f[3] = max(f[3], last)
+                f[4] |= flags
+        return self
+
+    def protocol_counts(self) -> Dict[str, int]:
+        """Packets per transport protocol, plus NON_IP."""
+        counts: Counter = Counter()
+        for (proto, *_), f in self.flows.items():
+            counts[PROTO_NAMES.get(proto, "IP_OTHER")] += f[0]
+        if self.non_ip:
+            counts["NON_IP"] = sum(self.non_ip.values())
+        return dict(counts.most_common())
+
+    def flow(self, key: FlowKey) -> Flow:
+        proto, src, sport, dst, dport = key
+        p, b, first, last, flags = self.flows[key]
+        return Flow(PROTO_NAMES.get(proto, str(proto)), _addr(src), sport, _addr(dst), dport,
+                    p, b, first, last, flags)
+
+    def top_flows(self, n: int = 10, by: str = "bytes") -> List[Flow]:
+        index = 1 if by == "bytes" else 0
+        keys = sorted(self.flows, key=lambda k: self.flows[k][index], reverse=True)[:n]
+        return [self.flow(k) for k in keys]
+
+    def top_sources(self, n: int = 5) -> List[Tuple[str, int]]:
+        """Source addresses by packets sent."""
+        counts: Counter = Counter()
+        for (_, src, _, _, _), f in self.flows.items():
+            counts[src] += f[0]
+        return [(_addr(a), c) for a, c in counts.most_common(n)]
+
+    def top_dst_ports(self, n: int = 5) -> List[Tuple[str, int]]:
+        """TCP/UDP destination ports by packets, as "tcp/80"."""
+        counts: Counter = Counter()
+        for (proto, _, _, _, dport), f in self.flows.items():
+            if proto in (6, 17):
+                counts[f"{PROTO_NAMES[proto].lower()}/{dport}"] += f[0]
+        return counts.most_common(n)
+
+    def tcp_conversations(self) -> int:
+        """Distinct TCP conversations (each direction pair counted once)."""
+        seen = set()
+        for proto, src, sport, dst, dport in self.flows:
+            if proto == 6:
+                seen.add((src, sport, dst, dport) if (src, sport) <= (dst, dport) else (dst, dport, src, sport))
+        return len(seen)
+
+
+def read_flows(path: Union[str, Path], table: Optional[FlowTable] = None,
+               start: int = 0, end: Optional[int] = None) -> FlowTable:
+    """Stream a pcap/pcapng capture (or the records starting in [start, end))
+    into a FlowTable (a new one or `table`)."""
+    table = table if table is not None else FlowTable()
+    with open(path, "rb") as fh:
+        if fh.seek(0, 2) == 0:
+            return table
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            _scan(buf, table, start, end)
+    return table
+
+
+def _scan(buf: mmap.mmap, table: FlowTable, start: int = 0, end: Optional[int] = None) -> None:
+    flows = table.flows
+    non_ip = table.non_ip
+    u16 = _U16.unpack_from
+    ports = _PORTS.unpack_from
+    ipv4 = _IPV4.unpack_from
+    ipv6 = _IPV6.unpack_from
+    packets = nbytes = truncated = 0
+    first, last = float("inf"), float("-inf")
+
+    for ts, off, caplen, wirelen, link in iter_records(buf, start, end):
+        packets += 1
+        nbytes += wirelen
+        # every record counts for the capture span, not only the IP ones
+        if ts < first:
+            first = ts
+        if ts > last:
+            last = ts
+        end = off + caplen
+
+        # ---- link layer -> (ethertype, l3 offset)
+        if link == LINKTYPE_ETHERNET:
+            if caplen < 14:
+                truncated += 1
+                continue
+            etype = u16(buf, off + 12)[0]
+            l3 = off + 14
+            while etype in ETH_VLAN and l3 + 4 <= end:
+                etype = u16(buf, l3 + 2)[0]
+                l3 += 4
+        elif link == LINKTYPE_LINUX_SLL:
+            if caplen < 16:
+                truncated += 1
+                continue
+            etype = u16(buf, off + 14)[0]
+            l3 = off + 16
+        elif link == LINKTYPE_LINUX_SLL2:
+            if caplen < 20:
+                truncated += 1
+                continue
+            etype = u16(buf, off)[0]
+            l3 = off + 20
+        elif link in (LINKTYPE_RAW, LINKTYPE_RAW_ALT, LINKTYPE_IPV4, LINKTYPE_IPV6):
+            if caplen < 1:
+                truncated += 1
+                continue
+            etype = ETH_IPV6 if buf[off] >> 4 == 6 else ETH_IPV4
+            l3 = off
+        else:
+            non_ip[f"link-{link}"] += 1
+            continue
+
+        # ---- network layer -> (proto, src, dst, l4 offset or -1 if no L4 header)
+        if etype == ETH_IPV4:
+            if l3 + 20 > end:
+                truncated += 1
+                continue
+            vihl, frag, proto, src, dst = ipv4(buf, l3)
+            l4 = l3 + ((vihl & 0x0F) << 2) if not frag & 0x1FFF else -1
+        elif etype == ETH_IPV6:
+            if l3 + 40 > end:
+                truncated += 1
+                continue
+            _plen, proto, src, dst = ipv6(buf, l3)
+            l4 = l3 + 40
+            while l4 + 8 <= end:
+                if proto in _IPV6_EXT:
+                    proto = buf[l4]
+                    l4 += (buf[l4 + 1] + 1) << 3
+                elif proto == _IPV6_FRAG:
+                    more = u16(buf, l4 + 2)[0] & 0xFFF8
+                    proto = buf[l4]
+                    l4 = l4 + 8 if not more else -1
+                    break
+                elif proto == _IPV6_AH:
+                    proto = buf[l4]
+                    l4 += (buf[l4 + 1] + 2) << 2
+                else:
+                    break
+        else:
+            non_ip[etype] += 1
+            continue
+
+        # ---- transport layer
+        sport = dport = flags = 0
+        if 0 <= l4:
+            if proto == 6 or proto == 17:
+                if l4 + 4 <= end:
+                    sport, dport = ports(buf, l4)
+                    if proto == 6 and l4 + 14 <= end:
+                        flags = buf[l4 + 13]
+                else:
+                    truncated += 1
+            elif (proto == 1 or proto == 58) and l4 + 2 <= end:
+                # ICMP type/code in the port field, as NetFlow does
+                dport = u16(buf, l4)[0]
+
+        key = (proto, src, sport, dst, dport)
+        f = flows.get(key)
+        if f is None:
+            flows[key] = [1, wirelen, ts, ts, flags]
+        else:
+            f[0] += 1
+            f[1] += wirelen
+            if ts > f[3]:
+                f[3] = ts
+            elif ts < f[2]:
+                f[2] = ts
+            f[4] |= flags
+
+    table.packets += packets
+    table.bytes += nbytes
+    table.truncated += truncated
+    if packets:
+        table.merge(FlowTable(first_ts=first, last_ts=last))
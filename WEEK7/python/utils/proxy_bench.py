@@ -0,0 +1,202 @@
+"""Benchmark for the packet_filter.py relay engines.
+
+Starts a local upstream server and one proxy per engine (all on 127.0.0.1),
+then measures:
+- connections per second: concurrent clients that connect, send a short
+  message, read the echo and close
+- throughput: parallel streams pushing bulk data through the proxy; the
+  upstream counts the bytes and reports the total back, so the reply also
+  crosses the proxy
+- proxy CPU time (user + system) for the whole run, from os.wait4
+
+Client, proxy and upstream share the machine, so compare engines on the
+same host rather than reading the numbers as absolute.
+
+Usage:
+- python3 python/utils/proxy_bench.py
+- python3 python/utils/proxy_bench.py --engines threads,splice --duration 10 --streams 8 --mb 512
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PROXY_SCRIPT = Path(__file__).resolve().parents[1] / "apps" / "packet_filter.py"
+MESSAGE = b"E" + b"x" * 63          # mode byte + payload
+CHUNK = 256 * 1024
+
+
+class _Upstream(asyncio.Protocol):
+    """First byte selects the mode: b"E" echo, b"S" count bytes and reply with the total at EOF."""
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+        self.mode = None
+        self.count = 0
+
+    def data_received(self, data: bytes) -> None:
+        if self.mode is None:
+            self.mode, data = data[:1], data[1:]
+        if self.mode == b"E":
+            self.transport.write(data)
+        else:
+            self.count += len(data)
+
+    def eof_received(self) -> bool:
+        if self.mode == b"S":
+            self.transport.write(struct.pack("!Q", self.count))
+        self.transport.close()
+        return True
+
+
+def _serve_upstream(port: int) -> None:
+    async def run() -> None:
+        server = await asyncio.get_running_loop().create_server(_Upstream, "127.0.0.1", port, backlog=1024)
+        await server.serve_forever()
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    asyncio.run(run())
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+async def _connections(port: int, duration: float, concurrency: int) -> Tuple[int, int]:
+    done = errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker() -> None:
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(MESSAGE)
+                await reader.readexactly(len(MESSAGE) - 1)
+                writer.close()
+                await writer.wait_closed()
+                done += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done, errors
+
+
+async def _throughput(port: int, streams: int, total_bytes: int) -> Tuple[int, bool]:
+    per_stream = total_bytes // streams
+    chunk = b"\0" * CHUNK
+
+    async def stream() -> bool:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"S")
+        left = per_stream
+        while left > 0:
+            writer.write(chunk[:min(left, CHUNK)])
+            left -= CHUNK
+            await writer.drain()
+        writer.write_eof()
+        count = struct.unpack("!Q", await reader.readexactly(8))[0]
+        writer.close()
+        return count == per_stream
+
+    ok = await asyncio.gather(*(stream() for _ in range(streams)))
+    return per_stream * streams, all(ok)
+
+
+def bench_proxy(cmd: List[str], listen_port: int, duration: float, concurrency: int, streams: int,
+                total_bytes: int) -> Dict[str, float]:
+    """Start the proxy command, measure it, stop it; return the results."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_port(listen_port)
+        start = time.perf_counter()
+        done, errors = asyncio.run(_connections(listen_port, duration, concurrency))
+        conn_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sent, ok = asyncio.run(_throughput(listen_port, streams, total_bytes))
+        bulk_time = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = 0
+    return {
+        "conn_per_s": done / conn_time,
+        "conn_errors": errors,
+        "mb_per_s": sent / bulk_time / 1e6,
+        "bulk_ok": ok,
+        "cpu_s": usage.ru_utime + usage.ru_stime,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Benchmark packet_filter.py relay engines (Week 7).")
+    p.add_argument("--engines", default="threads,selector,splice", help="Comma separated engines to compare")
+    p.add_argument("--duration", type=float, default=5.0, help="Seconds of connection churn per engine (default: 5)")
+    p.add_argument("--concurrency", type=int, default=50, help="Concurrent clients for connections/s (default: 50)")
+    p.add_argument("--streams", type=int, default=4, help="Parallel bulk streams (default: 4)")
+    p.add_argument("--mb", type=int, default=256, help="Total MB pushed through the proxy per engine (default: 256)")
+    return p
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    upstream_port = _free_port()
+    upstream = multiprocessing.Process(target=_serve_upstream, args=(upstream_port,), daemon=True)
+    upstream.start()
+    results: Dict[str, Optional[Dict[str, float]]] = {}
+    try:
+        _wait_port(upstream_port)
+        for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+            port = _free_port()
+            cmd = [sys.executable, str(PROXY_SCRIPT), "--listen-host", "127.0.0.1", "--listen-port", str(port),
+                   "--upstream-host", "127.0.0.1", "--upstream-port", str(upstream_port), "--engine", engine]
+            print(f"[bench] {engine} ...", flush=True)
+            try:
+                results[engine] = bench_proxy(cmd, port, args.duration, args.concurrency, args.streams, args.mb << 20)
+            except OSError as exc:
+                print(f"[bench] {engine} failed: {exc}")
+                results[engine] = None
+    finally:
+        upstream.terminate()
+        upstream.join()
+
+    print()
+    print(f"{'engine':<10} {'conn/s':>9} {'errors':>7} {'MB/s':>9} {'proxy CPU s':>12}")
+    for engine, r in results.items():
+        if r is None:
+            print(f"{engine:<10} {'failed':>9}")
+            continue
+        note = "" if r["bulk_ok"] else "  (byte count mismatch)"
+        print(f"{engine:<10} {r['conn_per_s']:>9.0f} {r['conn_errors']:>7} {r['mb_per_s']:>9.1f} {r['cpu_s']:>12.2f}{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
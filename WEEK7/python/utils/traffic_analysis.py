@@ -1,21 +1,32 @@
-"""Small helper to create a reproducible summary from a pcap using tshark.
+"""Small helper to create a reproducible summary from a pcap.
 
-This script is intentionally conservative: if tshark is missing it will not fail the workflow.
+The summary (TCP/UDP conversations and the packet counts for the demo ports)
+is computed in a single pass by pcap_analytics.py, so tshark is not needed.
+This script is intentionally conservative: a missing or unreadable pcap will
+not fail the workflow.
 """
 
 from __future__ import annotations
 
 import argparse
-import shutil
+import sys
 from pathlib import Path
 
-from python.utils.net_utils import run_cmd
+# Add the Week 7 root to the path when run as a script
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from python.utils.pcap_analytics import analyse_captures, format_summary  # noqa: E402
+
+DEMO_PORTS = [("tcp", 9090), ("udp", 9091)]
 
 
 def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(description="Create a short tshark summary from a pcap file.")
+    p = argparse.ArgumentParser(description="Create a short traffic summary from a pcap file.")
     p.add_argument("--pcap", required=True, help="Path to pcap file")
     p.add_argument("--out", required=True, help="Output text file")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
     return p
 
 
@@ -29,33 +40,13 @@ def main() -> int:
         out.write_text("pcap is missing, cannot analyse\n", encoding="utf-8")
         return 0
 
-    if shutil.which("tshark") is None:
-        out.write_text("tshark is not installed, skipping analysis\n", encoding="utf-8")
+    try:
+        agg = analyse_captures([str(pcap)], workers=args.workers)
+    except (OSError, ValueError) as exc:
+        out.write_text(f"cannot analyse {pcap}: {exc}\n", encoding="utf-8")
         return 0
 
-    lines: list[str] = []
-    lines.append(f"PCAP: {pcap}")
-    lines.append("")
-
-    # Conversation summaries
-    tcp_conv = run_cmd(["tshark", "-r", str(pcap), "-q", "-z", "conv,tcp"], timeout=30)
-    udp_conv = run_cmd(["tshark", "-r", str(pcap), "-q", "-z", "conv,udp"], timeout=30)
-
-    lines.append("=== TCP conversations ===")
-    lines.append(tcp_conv.stdout.strip() or "(no output)")
-    lines.append("")
-    lines.append("=== UDP conversations ===")
-    lines.append(udp_conv.stdout.strip() or "(no output)")
-    lines.append("")
-
-    # Simple packet counts
-    tcp_count = run_cmd(["bash", "-lc", f"tshark -r {pcap} -Y 'tcp.port==9090' | wc -l"], timeout=30)
-    udp_count = run_cmd(["bash", "-lc", f"tshark -r {pcap} -Y 'udp.port==9091' | wc -l"], timeout=30)
-
-    lines.append(f"Packets matching tcp.port==9090: {tcp_count.stdout.strip()}")
-    lines.append(f"Packets matching udp.port==9091: {udp_count.stdout.strip()}")
-
-    out.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    out.write_text(format_summary(agg, [str(pcap)], DEMO_PORTS), encoding="utf-8")
     return 0
 
 
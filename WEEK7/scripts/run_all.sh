@@ -31,9 +31,9 @@ if [[ "$MODE" != "--docker-only" ]]; then
   fi
 fi
 
-# Optional analysis with tshark
-if [[ -f "$ART_DIR/demo.pcap" ]] && command -v tshark >/dev/null 2>&1; then
-  echo "[demo] Generating tshark summary"
+# Traffic summary (single pass, no tshark needed)
+if [[ -f "$ART_DIR/demo.pcap" ]]; then
+  echo "[demo] Generating traffic summary"
   python3 python/utils/traffic_analysis.py --pcap "$ART_DIR/demo.pcap" --out "$ART_DIR/tshark_summary.txt" || true
 fi
 
@@ -22,10 +22,18 @@ CONTROL CONNECTION (port 3333):
 │   PWD                 - Display current directory                           │
 │   CWD <path>          - Change directory                                    │
 │   LIST                - List files                                          │
+│   PLIST <n> [<cursor>] - n entries after cursor over a data connection      │
+│                          (passive, n = 0: all); 226 gives the next cursor   │
 │   ACTIVE_GET <file>   - Download file in active mode                        │
 │   PASSIVE_GET <file>  - Download file in passive mode                       │
 │   ACTIVE_PUT <file>   - Upload file in active mode                          │
 │   PASSIVE_PUT <file>  - Upload file in passive mode                         │
+│   MODE STREAM|FRAME   - Data format for the next transfers (default FRAME)  │
+│   SIZE <file>         - File size in bytes                                  │
+│   REST <off> [<len>]  - Next GET sends only bytes off..off+len (resume)     │
+│   CODECS <names...>   - Codecs the client can decode (zlib, lz4, zstd)      │
+│   COMPRESS <policy>   - GET compression: OFF, ON (zlib-6), AUTO (sampled),  │
+│                         ZLIB-<1..9>, LZ4, ZSTD-<1..19>                      │
 │   QUIT                - End session                                         │
 └─────────────────────────────────────────────────────────────────────────────┘
 
@@ -41,18 +49,46 @@ DATA CONNECTION (dynamic port):
 │ Payload: N bytes (optionally compressed)                                    │
 └─────────────────────────────────────────────────────────────────────────────┘
 
+STREAMED FORMAT (MODE STREAM, version 2):
+┌─────────────────────────────────────────────────────────────────────────────┐
+│ Same 12-byte header: Version = 2, Flags |= 0x04 (stream),                   │
+│   Length = chunk size, CRC32 = 0                                            │
+│ Chunk frames: Length (4 bytes) + chunk (zlib stream if bit 0 is set)        │
+│ End: Length = 0, then trailer:                                              │
+│   total bytes (8) + CRC32 (4) + SHA-256 (32) of the uncompressed data       │
+│ Codec: Flags bits 4-6 (0/1 = zlib stream, 2 = lz4, 3 = zstd per chunk)      │
+│                                                                             │
+│ Both ends read/write the file chunk by chunk: memory use does not depend    │
+│ on the file size, and the receiver verifies integrity at the end.           │
+│ Uncompressed files are sent with sendfile() (header, then file body from    │
+│ the page cache); the receiver reads into one preallocated buffer.           │
+└─────────────────────────────────────────────────────────────────────────────┘
+
+ASYNC SERVER (server --async): one event loop, pre-bound data ports
+┌─────────────────────────────────────────────────────────────────────────────┐
+│ 227 Entering Passive Mode (<port>) TOKEN <hex>                              │
+│ The client connects to <port> and sends "<hex>\n" first; the token binds    │
+│ the data connection to its session, so one pool port serves many           │
+│ transfers at once.                                                          │
+└─────────────────────────────────────────────────────────────────────────────┘
+
 ═══════════════════════════════════════════════════════════════════════════════
 USAGE:
 ═══════════════════════════════════════════════════════════════════════════════
 
 # Server
 python3 ex_9_02_pseudo_ftp.py server --host 127.0.0.1 --port 3333 --root ./server-files
+python3 ex_9_02_pseudo_ftp.py server --async --data-ports 40000-40007
 
 # Client - individual commands
 python3 ex_9_02_pseudo_ftp.py client --host 127.0.0.1 --port 3333 --user test --password 12345 list
 python3 ex_9_02_pseudo_ftp.py client ... get hello.txt
 python3 ex_9_02_pseudo_ftp.py client ... put myfile.txt
 
+# Client - resume an interrupted download / parallel download
+python3 ex_9_02_pseudo_ftp.py client ... --resume get big.bin
+python3 ex_9_02_pseudo_ftp.py client ... --parallel 4 get big.bin
+
 # Client - interactive
 python3 ex_9_02_pseudo_ftp.py client ... --interactive
 """
@@ -60,16 +96,36 @@ python3 ex_9_02_pseudo_ftp.py client ... --interactive
 from __future__ import annotations
 
 import argparse
+import asyncio
+import base64
+import bisect
 import gzip
 import hashlib
+import itertools
+import mmap
 import os
+import re
+import secrets
 import socket
+import stat
 import struct
 import sys
 import threading
+import time
 import zlib
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
+
+# Optional faster codecs (pip install lz4 zstandard); zlib is always available
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 # =============================================================================
@@ -90,12 +146,204 @@ MAGIC = b"PF"  # Pseudo-FTP
 VERSION = 1
 FLAG_GZIP = 0x01
 
+# Streamed format (version 2): header, chunk frames, end marker, trailer
+STREAM_VERSION = 2
+FLAG_STREAM = 0x04
+STREAM_CHUNK_SIZE = 256 * 1024
+MAX_STREAM_CHUNK_SIZE = 16 * 1024 * 1024
+CHUNK_HEADER = struct.Struct("!I")        # chunk length on the wire (0 = end)
+STREAM_TRAILER = struct.Struct("!QI32s")  # total bytes, CRC32, SHA-256
+
+# Asyncio server: "227 Entering Passive Mode (port) TOKEN <hex>"
+PASV_TOKEN_RE = re.compile(r"\bTOKEN ([0-9a-f]+)")
+
+# Codec id in flag bits 4-6 of the version 2 header (needs FLAG_GZIP = "compressed")
+CODEC_SHIFT = 4
+CODEC_MASK = 0x70
+CODEC_NONE, CODEC_ZLIB, CODEC_LZ4, CODEC_ZSTD = 0, 1, 2, 3
+CODEC_NAMES = {CODEC_NONE: "none", CODEC_ZLIB: "zlib", CODEC_LZ4: "lz4", CODEC_ZSTD: "zstd"}
+CODEC_IDS = {name: codec for codec, name in CODEC_NAMES.items()}
+DEFAULT_LEVELS = {CODEC_ZLIB: 6, CODEC_LZ4: 0, CODEC_ZSTD: 3}
+
+# AUTO policy: compress the first chunk with the fastest codec both ends have,
+# keep it only if it saves enough bytes and enough bytes per CPU second
+AUTO_LEVELS = {CODEC_LZ4: 0, CODEC_ZSTD: 1, CODEC_ZLIB: 1}
+AUTO_PREFERENCE = (CODEC_LZ4, CODEC_ZSTD, CODEC_ZLIB)
+AUTO_MIN_SAMPLE = 1024
+AUTO_MAX_RATIO = 0.90                    # must save at least 10%
+AUTO_MIN_SAVED_RATE = 20 * 1000 * 1000   # wire bytes saved per CPU second
+
+
+# =============================================================================
+# Codecs (Presentation Layer - L6)
+# =============================================================================
+
+def available_codecs() -> tuple:
+    """Codec names usable in this process (zlib always, lz4/zstd if installed)."""
+    names = ["zlib"]
+    if lz4_frame is not None:
+        names.append("lz4")
+    if zstandard is not None:
+        names.append("zstd")
+    return tuple(names)
+
+
+Compression = Union[None, str, tuple]  # None (off), "auto" or (codec, level)
+
+
+def parse_compression(spec: Union[None, bool, str]) -> Compression:
+    """
+    Parse a compression policy: OFF, ON, AUTO, ZLIB-6, LZ4, ZSTD-3 ...
+    
+    Returns:
+        None (off), "auto" or (codec id, level)
+    
+    Raises:
+        ValueError: unknown codec or level
+    """
+    if spec is None or spec is False:
+        return None
+    if spec is True:
+        return (CODEC_ZLIB, DEFAULT_LEVELS[CODEC_ZLIB])
+    name, _, level = spec.strip().lower().partition("-")
+    if name == "off":
+        return None
+    if name == "auto":
+        return "auto"
+    if name == "on":
+        return (CODEC_ZLIB, DEFAULT_LEVELS[CODEC_ZLIB])
+    if name not in CODEC_IDS or name == "none":
+        raise ValueError(f"Unknown codec: {name}")
+    codec = CODEC_IDS[name]
+    level = int(level) if level else DEFAULT_LEVELS[codec]
+    limits = {CODEC_ZLIB: (0, 9), CODEC_LZ4: (0, 16), CODEC_ZSTD: (1, 22)}[codec]
+    if not limits[0] <= level <= limits[1]:
+        raise ValueError(f"Invalid level for {name}: {level}")
+    return (codec, level)
+
+
+def format_compression(policy: Compression) -> str:
+    if policy is None:
+        return "off"
+    if policy == "auto":
+        return "auto"
+    codec, level = policy
+    return CODEC_NAMES[codec] if codec == CODEC_LZ4 else f"{CODEC_NAMES[codec]}-{level}"
+
+
+class ChunkEncoder:
+    """
+    Compress a transfer chunk by chunk.
+    
+    zlib keeps one deflate stream across chunks (best ratio); lz4 and zstd
+    compress every chunk on its own, so each frame decodes to at most one
+    chunk and the receiver needs no streaming state.
+    """
+    
+    def __init__(self, codec: int, level: int):
+        self.codec = codec
+        if codec == CODEC_ZLIB:
+            self._zlib = zlib.compressobj(level)
+        elif codec == CODEC_ZSTD:
+            self._zstd = zstandard.ZstdCompressor(level=level)
+        self.level = level
+    
+    def encode(self, chunk) -> bytes:
+        if self.codec == CODEC_ZLIB:
+            return self._zlib.compress(chunk)
+        if self.codec == CODEC_LZ4:
+            return lz4_frame.compress(chunk, compression_level=self.level)
+        if self.codec == CODEC_ZSTD:
+            return self._zstd.compress(chunk)
+        return chunk
+    
+    def finish(self) -> bytes:
+        return self._zlib.flush() if self.codec == CODEC_ZLIB else b""
+
+
+class ChunkDecoder:
+    """Inverse of ChunkEncoder; output is produced at most `chunk_size` at a time."""
+    
+    def __init__(self, codec: int, chunk_size: int):
+        self.codec = codec
+        self.chunk_size = chunk_size
+        if codec == CODEC_ZLIB:
+            self._zlib = zlib.decompressobj()
+        elif codec == CODEC_LZ4 and lz4_frame is None:
+            raise ValueError("lz4 stream but the lz4 module is not installed")
+        elif codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstd stream but the zstandard module is not installed")
+            self._zstd = zstandard.ZstdDecompressor()
+        elif codec not in CODEC_NAMES:
+            raise ValueError(f"Unknown codec id: {codec}")
+    
+    def decode(self, payload):
+        """Yield the decoded pieces of one chunk frame."""
+        if self.codec == CODEC_ZLIB:
+            while True:
+                data = self._zlib.decompress(payload, self.chunk_size)
+                yield data
+                payload = self._zlib.unconsumed_tail
+                if not payload and len(data) < self.chunk_size:
+                    return
+        elif self.codec == CODEC_LZ4:
+            yield self._check(lz4_frame.decompress(payload))
+        elif self.codec == CODEC_ZSTD:
+            yield self._check(self._zstd.decompress(payload, max_output_size=self.chunk_size))
+        else:
+            yield payload
+    
+    def _check(self, data: bytes) -> bytes:
+        if len(data) > self.chunk_size:
+            raise ValueError(f"Chunk decodes to {len(data)} > {self.chunk_size} bytes")
+        return data
+    
+    def finish(self) -> bytes:
+        return self._zlib.flush() if self.codec == CODEC_ZLIB else b""
+
+
+def choose_compression(policy: Compression, sample, codecs=("zlib",)) -> tuple:
+    """
+    Resolve a policy to (codec, level, info) for one transfer.
+    
+    For "auto" the sample (first chunk) is compressed once with the fastest
+    codec in `codecs`; the transfer is compressed only if that saves at
+    least 10% and at least AUTO_MIN_SAVED_RATE wire bytes per CPU second.
+    Media and archives fail the first test, so they cost one sample only.
+    """
+    if policy is None:
+        return CODEC_NONE, 0, {"reason": "off"}
+    if policy != "auto":
+        return policy[0], policy[1], {"reason": "fixed"}
+    if len(sample) < AUTO_MIN_SAMPLE:
+        return CODEC_NONE, 0, {"reason": "small"}
+    
+    usable = [c for c in AUTO_PREFERENCE if CODEC_NAMES[c] in codecs
+              and CODEC_NAMES[c] in available_codecs()]
+    codec = usable[0] if usable else CODEC_ZLIB
+    level = AUTO_LEVELS[codec]
+    
+    start = time.process_time()
+    encoder = ChunkEncoder(codec, level)
+    size = len(encoder.encode(sample)) + len(encoder.finish())
+    cpu = max(time.process_time() - start, 1e-6)
+    
+    ratio = size / len(sample)
+    saved_rate = (len(sample) - size) / cpu
+    info = {"sample_ratio": round(ratio, 3), "saved_mb_per_cpu_s": round(saved_rate / 1e6, 1)}
+    if ratio > AUTO_MAX_RATIO:
+        return CODEC_NONE, 0, {**info, "reason": "incompressible"}
+    if saved_rate < AUTO_MIN_SAVED_RATE:
+        return CODEC_NONE, 0, {**info, "reason": "too slow"}
+    return codec, level, {**info, "reason": "sampled"}
+
 
 # =============================================================================
 # Protocol Functions (Presentation Layer - L6)
 # =============================================================================
 
-def pack_data(payload: bytes, use_gzip: bool = False) -> bytes:
+def pack_data(payload: bytes, use_gzip: bool = False, level: int = 6) -> bytes:
     """
     Pack payload with binary header (L6).
     
@@ -108,7 +356,7 @@ def pack_data(payload: bytes, use_gzip: bool = False) -> bytes:
     
     # Optional compression
     if use_gzip and len(payload) > 0:
-        payload = gzip.compress(payload)
+        payload = gzip.compress(payload, compresslevel=level)
     
     length = len(payload)
     crc = zlib.crc32(payload) & 0xFFFFFFFF
@@ -181,6 +429,517 @@ def recv_framed(sock: socket.socket) -> tuple[bytes, dict]:
     return unpack_data(header + payload)
 
 
+def _send_parts(sock: socket.socket, *parts, flags: int = 0) -> None:
+    """sendall() for several buffers without concatenating them (sendmsg)."""
+    views = [memoryview(p).cast("B") for p in parts if len(p)]
+    while views:
+        sent = sock.sendmsg(views, (), flags)
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views and sent:
+            views[0] = views[0][sent:]
+
+
+def _read_exact(rfile, length: int) -> bytes:
+    """Read exactly `length` bytes from a buffered socket file."""
+    data = rfile.read(length)
+    if len(data) != length:
+        raise ConnectionError("Connection closed prematurely")
+    return data
+
+
+def _read_exact_into(rfile, view: memoryview) -> memoryview:
+    """Fill `view` from a buffered socket file (recv_into, no new bytes objects)."""
+    filled = 0
+    while filled < len(view):
+        n = rfile.readinto(view[filled:])
+        if not n:
+            raise ConnectionError("Connection closed prematurely")
+        filled += n
+    return view
+
+
+class FileRegion:
+    """Byte range of an open file that a driver sends with sendfile()."""
+    
+    __slots__ = ("file", "offset", "count")
+    
+    def __init__(self, file, offset: int, count: int):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+
+def _drive_send(sock: socket.socket, frames) -> dict:
+    """
+    Write every batch of buffers from a frame producer to a blocking socket.
+    
+    A FileRegion goes out with socket.sendfile(); the buffers before it are
+    sent with MSG_MORE so the chunk header shares a segment with the data.
+    """
+    while True:
+        try:
+            parts = next(frames)
+        except StopIteration as stop:
+            return stop.value
+        region = parts[-1] if isinstance(parts[-1], FileRegion) else None
+        if region is None:
+            _send_parts(sock, *parts)
+            continue
+        _send_parts(sock, *parts[:-1], flags=getattr(socket, "MSG_MORE", 0))
+        if sock.sendfile(region.file, region.offset, region.count) != region.count:
+            raise ValueError("File shrank during transfer")
+
+
+def _first_frame(frames) -> tuple:
+    """
+    (parts, None) for the first batch of a frame producer, or (None, metadata)
+    if it yields nothing. StopIteration cannot cross run_in_executor.
+    """
+    try:
+        return next(frames), None
+    except StopIteration as stop:
+        return None, stop.value
+
+
+def _owned(parts) -> list:
+    """Buffers safe to queue after the producer moves on: views become bytes."""
+    return [p if type(p) is bytes else bytes(p) for p in parts]
+
+
+def _drive_recv(parser, read, read_into) -> dict:
+    """
+    Run a transfer parser: a byte count is answered with read(n) (exactly n
+    bytes), a memoryview is filled in place by read_into(view).
+    """
+    need = next(parser)
+    while True:
+        try:
+            need = parser.send(read(need) if isinstance(need, int) else read_into(need))
+        except StopIteration as stop:
+            return stop.value
+
+
+# Whole-file digests for sendfile transfers, keyed by file identity and range,
+# so that a file served again is not read by Python at all
+DIGEST_CACHE_SIZE = 256
+_digest_cache: OrderedDict = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def _sendfile_source(src) -> Optional[os.stat_result]:
+    """fstat() of `src` if it is a regular file that sendfile() can read."""
+    try:
+        st = os.fstat(src.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def region_digest(src, st: os.stat_result, start: int, end: int) -> tuple:
+    """
+    (CRC32, SHA-256) of bytes start..end of an open file.
+    
+    The file is hashed through mmap (no copies into Python objects) and the
+    result is cached until the file's size or mtime changes.
+    """
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, start, end)
+    with _digest_lock:
+        if key in _digest_cache:
+            _digest_cache.move_to_end(key)
+            return _digest_cache[key]
+    
+    crc = 0
+    sha = hashlib.sha256()
+    if end > start:
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for pos in range(start, end, STREAM_CHUNK_SIZE):
+                    piece = view[pos:min(pos + STREAM_CHUNK_SIZE, end)]
+                    crc = zlib.crc32(piece, crc)
+                    sha.update(piece)
+                    piece.release()
+            finally:
+                view.release()
+    
+    result = (crc, sha.digest())
+    with _digest_lock:
+        _digest_cache[key] = result
+        if len(_digest_cache) > DIGEST_CACHE_SIZE:
+            _digest_cache.popitem(last=False)
+    return result
+
+
+def _sendfile_stream_frames(src, st: os.stat_result, chunk_size: int,
+                            length: Optional[int], decision: dict):
+    """Uncompressed streamed format: chunk headers + FileRegions, then trailer."""
+    start = src.tell()
+    end = st.st_size if length is None else min(st.st_size, start + length)
+    end = max(end, start)
+    crc, digest = region_digest(src, st, start, end)
+    
+    yield (struct.pack(HEADER_FORMAT, MAGIC, STREAM_VERSION, FLAG_STREAM, chunk_size, 0),)
+    for pos in range(start, end, chunk_size):
+        count = min(chunk_size, end - pos)
+        yield (CHUNK_HEADER.pack(count), FileRegion(src, pos, count))
+    yield (CHUNK_HEADER.pack(0) + STREAM_TRAILER.pack(end - start, crc, digest),)
+    
+    chunks = -(-(end - start) // chunk_size)
+    return {
+        "raw_length": end - start,
+        "wire_length": HEADER_SIZE + end - start + (chunks + 1) * CHUNK_HEADER.size
+        + STREAM_TRAILER.size,
+        "crc": crc,
+        "sha256": digest.hex(),
+        "codec": "none",
+        "level": 0,
+        "decision": decision,
+        "sendfile": True,
+    }
+
+
+def stream_frames(src, compression: Compression = None, chunk_size: int = STREAM_CHUNK_SIZE,
+                  length: Optional[int] = None, codecs=("zlib",), zero_copy: bool = True):
+    """
+    Produce an open binary file in the streamed format (version 2).
+    
+    The file is read `chunk_size` bytes at a time from its current position
+    (at most `length` bytes if given); CRC32 and SHA-256 are computed as the
+    data goes out and sent in the trailer. The first chunk is read before
+    the header so that an "auto" policy can sample it; `codecs` are the ones
+    the receiver can decode.
+    
+    This is a generator that does no network I/O: it yields tuples of
+    buffers to write and returns the metadata, so the same code serves
+    blocking sockets (send_stream) and asyncio writers. Yielded buffers are
+    reused, so they must be written before the next one is requested.
+    
+    With `zero_copy`, an uncompressed regular file is yielded as FileRegions
+    for sendfile(); its digest comes from region_digest (cached).
+    
+    Returns:
+        metadata: raw_length, wire_length, crc, sha256, codec, level
+    """
+    st = _sendfile_source(src) if zero_copy else None
+    if st is not None and compression is None:
+        return (yield from _sendfile_stream_frames(src, st, chunk_size, length, {"reason": "off"}))
+    start = src.tell()
+    
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    remaining = length
+    
+    def read_chunk():
+        nonlocal remaining
+        if remaining is not None and remaining <= 0:
+            return view[:0]
+        n = src.readinto(view if remaining is None else view[:min(chunk_size, remaining)])
+        if remaining is not None:
+            remaining -= n
+        return view[:n]
+    
+    chunk = read_chunk()
+    codec, level, decision = choose_compression(compression, chunk, codecs)
+    if codec == CODEC_NONE and st is not None:
+        # Sampled and rejected: send the whole range from the page cache
+        src.seek(start)
+        return (yield from _sendfile_stream_frames(src, st, chunk_size, length, decision))
+    encoder = ChunkEncoder(codec, level)
+    
+    flags = FLAG_STREAM
+    if codec != CODEC_NONE:
+        flags |= FLAG_GZIP | (codec << CODEC_SHIFT)
+    yield (struct.pack(HEADER_FORMAT, MAGIC, STREAM_VERSION, flags, chunk_size, 0),)
+    wire = HEADER_SIZE
+    
+    crc = 0
+    sha = hashlib.sha256()
+    raw_length = 0
+    
+    while chunk:
+        crc = zlib.crc32(chunk, crc)
+        sha.update(chunk)
+        raw_length += len(chunk)
+        payload = encoder.encode(chunk)
+        if payload:
+            yield (CHUNK_HEADER.pack(len(payload)), payload)
+            wire += CHUNK_HEADER.size + len(payload)
+        chunk = read_chunk()
+    
+    tail = encoder.finish()
+    if tail:
+        yield (CHUNK_HEADER.pack(len(tail)), tail)
+        wire += CHUNK_HEADER.size + len(tail)
+    
+    digest = sha.digest()
+    yield (CHUNK_HEADER.pack(0) + STREAM_TRAILER.pack(raw_length, crc, digest),)
+    wire += CHUNK_HEADER.size + STREAM_TRAILER.size
+    
+    return {
+        "raw_length": raw_length,
+        "wire_length": wire,
+        "crc": crc,
+        "sha256": digest.hex(),
+        "codec": CODEC_NAMES[codec],
+        "level": level,
+        "decision": decision,
+    }
+
+
+def send_stream(sock: socket.socket, src, compression: Compression = None,
+                chunk_size: int = STREAM_CHUNK_SIZE, length: Optional[int] = None,
+                codecs=("zlib",), zero_copy: bool = True) -> dict:
+    """Send an open binary file in the streamed format (see stream_frames)."""
+    return _drive_send(sock, stream_frames(src, compression, chunk_size, length, codecs,
+                                           zero_copy))
+
+
+def recv_stream(rfile, dst, flags: int, chunk_size: int) -> dict:
+    """Receive chunk frames (after the version 2 header) into an open file."""
+    return _drive_recv(stream_parser(dst, flags, chunk_size),
+                       lambda n: _read_exact(rfile, n),
+                       lambda view: _read_exact_into(rfile, view))
+
+
+def stream_parser(dst, flags: int, chunk_size: int):
+    """
+    Parse chunk frames (after the version 2 header) into `dst`.
+    
+    Generator without I/O: yields how many bytes it needs next and must be
+    sent exactly that many (see _drive_recv); returns the metadata.
+    Uncompressed chunks are read into one preallocated buffer instead
+    (the parser yields a memoryview to fill).
+    Decompression output is capped at `chunk_size` per step, so a highly
+    compressible chunk does not expand into memory all at once.
+    
+    Raises:
+        ValueError: malformed frame or trailer mismatch (length, CRC, SHA-256)
+    """
+    if not 0 < chunk_size <= MAX_STREAM_CHUNK_SIZE:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    max_wire = 2 * chunk_size + 65536  # compressed output may lag/lead input
+    
+    codec = CODEC_NONE
+    if flags & FLAG_GZIP:
+        # Streams without codec bits (first version 2 senders) are zlib
+        codec = (flags & CODEC_MASK) >> CODEC_SHIFT or CODEC_ZLIB
+    decoder = ChunkDecoder(codec, chunk_size)
+    buf = memoryview(bytearray(chunk_size)) if codec == CODEC_NONE else None
+    crc = 0
+    sha = hashlib.sha256()
+    raw_length = 0
+    wire = HEADER_SIZE
+    
+    def write(data):
+        nonlocal crc, raw_length
+        if data:
+            dst.write(data)
+            crc = zlib.crc32(data, crc)
+            sha.update(data)
+            raw_length += len(data)
+    
+    while True:
+        (length,) = CHUNK_HEADER.unpack((yield CHUNK_HEADER.size))
+        wire += CHUNK_HEADER.size + length
+        if length == 0:
+            break
+        if length > max_wire:
+            raise ValueError(f"Chunk too large: {length} > {max_wire}")
+        if buf is not None and length <= chunk_size:
+            write((yield buf[:length]))
+            continue
+        for data in decoder.decode((yield length)):
+            write(data)
+    
+    write(decoder.finish())
+    
+    total, sent_crc, digest = STREAM_TRAILER.unpack((yield STREAM_TRAILER.size))
+    wire += STREAM_TRAILER.size
+    if total != raw_length:
+        raise ValueError(f"Incomplete stream: {raw_length} != {total}")
+    if sent_crc != crc:
+        raise ValueError(f"Invalid CRC: {crc:08x} != {sent_crc:08x}")
+    if digest != sha.digest():
+        raise ValueError("Invalid SHA-256")
+    
+    return {
+        "version": STREAM_VERSION,
+        "flags": flags,
+        "compressed": bool(flags & FLAG_GZIP),
+        "codec": CODEC_NAMES[codec],
+        "raw_length": raw_length,
+        "wire_length": wire,
+        "crc": crc,
+        "sha256": digest.hex(),
+    }
+
+
+def file_frames(src, stream: bool, compression: Compression = None,
+                length: Optional[int] = None, codecs=("zlib",), zero_copy: bool = True):
+    """
+    Frame producer for an open file positioned at the first byte to send:
+    the streamed format, or a single frame (version 1, gzip only).
+    
+    An uncompressed single frame is the 12-byte header followed by a
+    FileRegion when `zero_copy` is set and `src` is a regular file.
+    """
+    if stream:
+        return (yield from stream_frames(src, compression, length=length, codecs=codecs,
+                                         zero_copy=zero_copy))
+    
+    start = src.tell()
+    st = _sendfile_source(src) if zero_copy else None
+    if compression is None:
+        codec, level, decision = CODEC_NONE, 0, {"reason": "off"}
+    else:
+        sample = src.read(STREAM_CHUNK_SIZE if length is None else min(length, STREAM_CHUNK_SIZE))
+        codec, level, decision = choose_compression(compression, sample, ("zlib",))
+        src.seek(start)
+    
+    if codec == CODEC_NONE and st is not None:
+        end = st.st_size if length is None else min(st.st_size, start + length)
+        end = max(end, start)
+        crc, digest = region_digest(src, st, start, end)
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, end - start, crc)
+        yield (header, FileRegion(src, start, end - start)) if end > start else (header,)
+        return {
+            "raw_length": end - start,
+            "wire_length": HEADER_SIZE + end - start,
+            "crc": crc,
+            "sha256": digest.hex(),
+            "codec": "none",
+            "level": 0,
+            "decision": decision,
+            "sendfile": True,
+        }
+    
+    content = src.read() if length is None else src.read(length)
+    packed = pack_data(content, use_gzip=codec != CODEC_NONE, level=level)
+    yield (packed,)
+    return {
+        "raw_length": len(content),
+        "wire_length": len(packed),
+        "crc": struct.unpack(HEADER_FORMAT, packed[:HEADER_SIZE])[4],
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "codec": "gzip" if codec != CODEC_NONE else "none",
+        "level": level,
+        "decision": decision,
+    }
+
+
+def send_file(sock: socket.socket, path: Path, stream: bool, compression: Compression = None,
+              offset: int = 0, length: Optional[int] = None, codecs=("zlib",),
+              zero_copy: bool = True) -> dict:
+    """
+    Send a file (or the range offset..offset+length) in the streamed
+    format or as a single frame (version 1, gzip only).
+    """
+    with open(path, "rb") as src:
+        src.seek(offset)
+        return _drive_send(sock, file_frames(src, stream, compression, length, codecs, zero_copy))
+
+
+def transfer_parser(dst):
+    """
+    Parse one transfer in either format into `dst` (anything with write()).
+    
+    The version byte in the header selects the format. Like stream_parser
+    it yields byte counts and does no I/O itself.
+    """
+    header = yield HEADER_SIZE
+    magic, version, flags, length, crc = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC:
+        raise ValueError(f"Invalid magic: {magic}")
+    
+    if version == STREAM_VERSION and flags & FLAG_STREAM:
+        return (yield from stream_parser(dst, flags, length))
+    
+    if length and not flags & FLAG_GZIP:
+        # Uncompressed: receive straight into one preallocated buffer
+        payload = bytearray(length)
+        yield memoryview(payload)
+        calc_crc = zlib.crc32(payload)
+        if calc_crc != crc:
+            raise ValueError(f"Invalid CRC: {calc_crc:08x} != {crc:08x}")
+        dst.write(payload)
+        return {
+            "version": version,
+            "flags": flags,
+            "compressed": False,
+            "wire_length": length,
+            "crc": crc,
+            "raw_length": length,
+            "sha256": hashlib.sha256(payload).hexdigest(),
+        }
+    
+    payload = (yield length) if length else b""
+    content, meta = unpack_data(header + payload)
+    dst.write(content)
+    meta["raw_length"] = len(content)
+    meta["sha256"] = hashlib.sha256(content).hexdigest()
+    return meta
+
+
+def recv_into(sock: socket.socket, dst) -> dict:
+    """Receive one transfer in either format into `dst` (anything with write())."""
+    with sock.makefile("rb") as rfile:
+        return _drive_recv(transfer_parser(dst), lambda n: _read_exact(rfile, n),
+                           lambda view: _read_exact_into(rfile, view))
+
+
+def partial_path(path: Path) -> Path:
+    """Hidden file that holds an incomplete download of `path`."""
+    return path.with_name(f".{path.name}.part")
+
+
+def recv_file(sock: socket.socket, path: Path, offset: int = 0) -> dict:
+    """
+    Receive a file in either format and write it to `path`.
+    
+    Data goes to a hidden `.part` file that is renamed only after the
+    integrity check passes, so a failed transfer never leaves a truncated
+    `path`. With `offset` > 0 the data continues an existing `.part` file
+    (after REST). A dropped connection keeps the `.part` file so the
+    download can resume; an integrity error deletes it.
+    """
+    part = partial_path(path)
+    with open(part, "r+b" if offset else "wb") as dst:
+        dst.seek(offset)
+        dst.truncate()
+        try:
+            meta = recv_into(sock, dst)
+        except ValueError:
+            dst.close()
+            part.unlink(missing_ok=True)
+            raise
+    os.replace(part, path)
+    return meta
+
+
+class PositionalWriter:
+    """
+    write() target that stores data at a fixed file offset with os.pwrite.
+    
+    Several threads can share one descriptor, each with its own writer,
+    because pwrite does not move a shared file position.
+    """
+    
+    def __init__(self, fd: int, offset: int):
+        self.fd = fd
+        self.pos = offset
+    
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(self.fd, view, self.pos)
+            self.pos += n
+            view = view[n:]
+        return len(data)
+
+
 # =============================================================================
 # Session State (Session Layer - L5)
 # =============================================================================
@@ -200,6 +959,11 @@ class Session:
         self.authenticated = False
         self.username: Optional[str] = None
         self.cwd = Path('.')  # Relative current directory within root
+        self.stream = False   # MODE STREAM: version 2 chunked transfers
+        self.compress: Compression = "auto"  # COMPRESS policy for GET
+        self.codecs = ("zlib",)  # CODECS: what the client can decode
+        self.rest_offset = 0  # REST: range for the next GET only
+        self.rest_length: Optional[int] = None
         
     def is_authenticated(self) -> bool:
         return self.authenticated
@@ -231,6 +995,12 @@ class Session:
         
         return abs_path
     
+    def take_range(self) -> tuple[int, Optional[int]]:
+        """Return and clear the range set by REST."""
+        rng = (self.rest_offset, self.rest_length)
+        self.rest_offset, self.rest_length = 0, None
+        return rng
+    
     def change_dir(self, path: str) -> bool:
         """Change current directory."""
         try:
@@ -243,6 +1013,130 @@ class Session:
         return False
 
 
+# =============================================================================
+# Directory Listings
+# =============================================================================
+
+def format_entry(entry: os.DirEntry) -> Optional[str]:
+    """LIST line for one directory entry; None if it vanished meanwhile."""
+    try:
+        if entry.is_dir():
+            return f"drwxr-xr-x  - {entry.name}/"
+        return f"-rw-r--r--  {entry.stat().st_size:>8} {entry.name}"
+    except FileNotFoundError:
+        return None
+
+
+def encode_cursor(name: str) -> str:
+    """Opaque PLIST cursor for an entry name (names may contain spaces)."""
+    raw = name.encode("utf-8", "surrogateescape")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return raw.decode("utf-8", "surrogateescape")
+
+
+class DirectoryListing:
+    """Snapshot of one directory: names in sorted order and their LIST lines."""
+    
+    __slots__ = ("mtime_ns", "scanned_ns", "names", "lines", "_text")
+    
+    def __init__(self, mtime_ns: int, scanned_ns: int, names: list, lines: list):
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = scanned_ns
+        self.names = names
+        self.lines = lines
+        self._text: Optional[bytes] = None
+    
+    def page(self, after: Optional[str], limit: int) -> tuple[list, Optional[str]]:
+        """
+        Lines of up to `limit` entries (0 = all) whose name sorts after
+        `after`, and the name to continue from (None at the end).
+        """
+        start = 0 if after is None else bisect.bisect_right(self.names, after)
+        end = len(self.names) if limit <= 0 else min(len(self.names), start + limit)
+        last = self.names[end - 1] if end < len(self.names) else None
+        return self.lines[start:end], last
+    
+    def text(self) -> bytes:
+        """Whole listing in the classic LIST order (built once per snapshot)."""
+        if self._text is None:
+            self._text = ("\n".join(sorted(self.lines)) + "\n").encode("utf-8", "replace")
+        return self._text
+
+
+class DirectoryCache:
+    """
+    Directory listings shared by all sessions, rebuilt only when the
+    directory's mtime changes.
+    
+    A scan uses os.scandir (file type from the directory entry, one stat
+    per file for its size). Creating, deleting or renaming an entry changes
+    the directory mtime; a file rewritten in place does not, so its size
+    may be stale until the directory changes (uploads here finish with a
+    rename). Snapshots taken within RACY_NS of the last change are not
+    trusted, because a coarse mtime clock could hide a second change.
+    """
+    
+    RACY_NS = 1_000_000_000
+    
+    def __init__(self, max_dirs: int = 64):
+        self.max_dirs = max_dirs
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "scans": 0}
+    
+    def _lookup(self, key: str, mtime_ns: int) -> Optional[DirectoryListing]:
+        with self._lock:
+            listing = self._entries.get(key)
+            if (listing is not None and listing.mtime_ns == mtime_ns
+                    and listing.scanned_ns - mtime_ns > self.RACY_NS):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return listing
+        return None
+    
+    def cached(self, path: Path) -> Optional[DirectoryListing]:
+        """The cached listing if it is still current (one stat), else None."""
+        return self._lookup(str(path), os.stat(path).st_mtime_ns)
+    
+    def get(self, path: Path) -> DirectoryListing:
+        key = str(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        listing = self._lookup(key, mtime_ns)
+        if listing is not None:
+            return listing
+        
+        listing = self.scan(path, mtime_ns)
+        with self._lock:
+            self.stats["scans"] += 1
+            if self.max_dirs > 0:
+                self._entries[key] = listing
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_dirs:
+                    self._entries.popitem(last=False)
+        return listing
+    
+    @staticmethod
+    def scan(path: Path, mtime_ns: int) -> DirectoryListing:
+        scanned_ns = time.time_ns()
+        rows = []
+        with os.scandir(path) as it:
+            for entry in it:
+                line = format_entry(entry)
+                if line is not None:
+                    rows.append((entry.name, line))
+        rows.sort()
+        return DirectoryListing(mtime_ns, scanned_ns,
+                                [name for name, _ in rows], [line for _, line in rows])
+
+
 # =============================================================================
 # Pseudo-FTP Server
 # =============================================================================
@@ -250,11 +1144,15 @@ class Session:
 class PseudoFTPServer:
     """Pseudo-FTP server with session and active/passive mode support."""
     
-    def __init__(self, host: str, port: int, root_dir: Path):
+    def __init__(self, host: str, port: int, root_dir: Path, verbose: bool = True,
+                 zero_copy: bool = True):
         self.host = host
         self.port = port
         self.root_dir = root_dir.resolve()
         self.running = False
+        self.verbose = verbose
+        self.zero_copy = zero_copy  # sendfile() for uncompressed GETs
+        self.listings = DirectoryCache()
         
         # Ensure root directory exists
         self.root_dir.mkdir(parents=True, exist_ok=True)
@@ -268,15 +1166,15 @@ class PseudoFTPServer:
             server.bind((self.host, self.port))
             server.listen(5)
             
-            print(f"[SERVER] Pseudo-FTP started on {self.host}:{self.port}")
-            print(f"[SERVER] Root directory: {self.root_dir}")
-            print(f"[SERVER] Demo credentials: {DEFAULT_USER}/{DEFAULT_PASS}")
-            print("[SERVER] Ctrl+C to stop")
+            self._log(f"[SERVER] Pseudo-FTP started on {self.host}:{self.port}")
+            self._log(f"[SERVER] Root directory: {self.root_dir}")
+            self._log(f"[SERVER] Demo credentials: {DEFAULT_USER}/{DEFAULT_PASS}")
+            self._log("[SERVER] Ctrl+C to stop")
             
             while self.running:
                 try:
                     client, addr = server.accept()
-                    print(f"[SERVER] New connection from {addr}")
+                    self._log(f"[SERVER] New connection from {addr}")
                     
                     thread = threading.Thread(
                         target=self.handle_client,
@@ -292,6 +1190,9 @@ class PseudoFTPServer:
     def handle_client(self, client: socket.socket, addr):
         """Handler for a connected client."""
         session = Session(self.root_dir)
+        # Replies are small writes (227 then 226): without NODELAY the second
+        # one waits for the client's delayed ACK (~40 ms per transfer)
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         
         # Welcome message (similar to FTP)
         self.send_response(client, 220, "Pseudo-FTP Server Ready")
@@ -307,18 +1208,22 @@ class PseudoFTPServer:
                 if not command:
                     continue
                 
-                print(f"[{addr}] <- {command}")
+                self._log(f"[{addr}] <- {command}")
                 
                 # Process command
                 self.process_command(client, session, command)
                 
         except (ConnectionResetError, BrokenPipeError):
-            print(f"[{addr}] Connection lost")
+            self._log(f"[{addr}] Connection lost")
         except Exception as e:
-            print(f"[{addr}] Error: {e}")
+            self._log(f"[{addr}] Error: {e}")
         finally:
             client.close()
-            print(f"[{addr}] Disconnected")
+            self._log(f"[{addr}] Disconnected")
+    
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
     
     def send_response(self, client: socket.socket, code: int, message: str):
         """Send a response on the control connection."""
@@ -364,9 +1269,58 @@ class PseudoFTPServer:
             else:
                 self.send_response(client, 550, "Failed to change directory")
         
+        elif cmd == "MODE":
+            mode = arg.upper()
+            if mode in ("STREAM", "FRAME"):
+                session.stream = mode == "STREAM"
+                self.send_response(client, 200, f"Mode set to {mode}")
+            else:
+                self.send_response(client, 504, "Syntax: MODE STREAM|FRAME")
+        
+        elif cmd == "SIZE":
+            try:
+                file_path = session.get_absolute_path(arg)
+                if not file_path.is_file():
+                    raise FileNotFoundError
+                self.send_response(client, 213, str(file_path.stat().st_size))
+            except (PermissionError, FileNotFoundError):
+                self.send_response(client, 550, "File not found")
+        
+        elif cmd == "REST":
+            try:
+                values = [int(v) for v in arg.split()]
+                if not 1 <= len(values) <= 2 or min(values) < 0:
+                    raise ValueError
+            except ValueError:
+                self.send_response(client, 501, "Syntax: REST <offset> [<length>]")
+                return
+            session.rest_offset = values[0]
+            session.rest_length = values[1] if len(values) == 2 else None
+            self.send_response(client, 350, f"Restarting at {values[0]}")
+        
+        elif cmd == "CODECS":
+            offered = {name.lower() for name in arg.split()}
+            session.codecs = tuple(c for c in available_codecs() if c in offered) or ("zlib",)
+            self.send_response(client, 200, " ".join(session.codecs))
+        
+        elif cmd == "COMPRESS":
+            try:
+                policy = parse_compression(arg or "?")
+                if isinstance(policy, tuple) and CODEC_NAMES[policy[0]] not in session.codecs:
+                    raise ValueError
+            except ValueError:
+                self.send_response(client, 504, "Syntax: COMPRESS OFF|ON|AUTO|ZLIB-<n>|LZ4|ZSTD-<n>"
+                                   f" (codecs: {' '.join(session.codecs)})")
+                return
+            session.compress = policy
+            self.send_response(client, 200, f"Compression {format_compression(policy).upper()}")
+        
         elif cmd == "LIST":
             self.cmd_list(client, session)
         
+        elif cmd == "PLIST":
+            self.cmd_plist(client, session, arg)
+        
         elif cmd == "PASSIVE_GET":
             self.cmd_passive_get(client, session, arg)
         
@@ -385,33 +1339,95 @@ class PseudoFTPServer:
     def cmd_list(self, client: socket.socket, session: Session):
         """List files in current directory."""
         try:
-            dir_path = session.get_absolute_path(".")
-            files = []
-            
-            for item in dir_path.iterdir():
-                stat = item.stat()
-                if item.is_dir():
-                    files.append(f"drwxr-xr-x  - {item.name}/")
-                else:
-                    files.append(f"-rw-r--r--  {stat.st_size:>8} {item.name}")
-            
-            listing = "\n".join(sorted(files))
+            listing = self.listings.get(session.get_absolute_path("."))
             self.send_response(client, 150, "Opening data connection")
-            client.sendall(f"{listing}\n".encode("utf-8"))
+            client.sendall(listing.text())
             self.send_response(client, 226, "Directory listing complete")
             
         except Exception as e:
             self.send_response(client, 550, str(e))
     
+    def _page_request(self, client, arg: str) -> Optional[tuple]:
+        """Parse "PLIST <n> [<cursor>]" into (after, n); None after a 501."""
+        parts = arg.split()
+        try:
+            if not 1 <= len(parts) <= 2 or not parts[0].isdigit():
+                raise ValueError
+            after = decode_cursor(parts[1]) if len(parts) == 2 else None
+        except ValueError:
+            self.send_response(client, 501, "Syntax: PLIST <count> [<cursor>]")
+            return None
+        return after, int(parts[0])
+    
+    def _list_page(self, client, session: Session, arg: str) -> Optional[tuple]:
+        """Parse "PLIST <n> [<cursor>]" and take the page; None after a 501/550."""
+        request = self._page_request(client, arg)
+        if request is None:
+            return None
+        try:
+            listing = self.listings.get(session.get_absolute_path("."))
+        except OSError as e:
+            self.send_response(client, 550, str(e))
+            return None
+        return listing.page(*request)
+    
+    @staticmethod
+    def _page_reply(lines: list, last: Optional[str]) -> str:
+        if last is None:
+            return f"{len(lines)} entries, end of listing"
+        return f"{len(lines)} entries, next {encode_cursor(last)}"
+    
+    def cmd_plist(self, client: socket.socket, session: Session, arg: str):
+        """Paged listing over a passive data connection (one line per entry)."""
+        page = self._list_page(client, session, arg)
+        if page is None:
+            return
+        lines, last = page
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_server:
+                data_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                data_server.bind((self.host, 0))
+                data_server.listen(1)
+                data_port = data_server.getsockname()[1]
+                
+                self.send_response(client, 227, f"Entering Passive Mode ({data_port})")
+                
+                data_server.settimeout(30)
+                data_conn, _ = data_server.accept()
+                
+                with data_conn:
+                    for batch in _listing_batches(lines):
+                        data_conn.sendall(batch)
+            
+            self.send_response(client, 226, self._page_reply(lines, last))
+        except Exception as e:
+            self.send_response(client, 550, str(e))
+    
+    def _transfer_plan(self, session: Session, file_path: Path) -> Optional[dict]:
+        """Range (from REST) and compression for a GET; None if out of range."""
+        offset, length = session.take_range()
+        size = file_path.stat().st_size
+        if offset > size:
+            return None
+        span = size - offset if length is None else min(length, size - offset)
+        return {"offset": offset, "length": span, "compression": session.compress,
+                "codecs": session.codecs, "zero_copy": self.zero_copy}
+    
     def cmd_passive_get(self, client: socket.socket, session: Session, filename: str):
         """GET in passive mode - server opens a port for data."""
         try:
             file_path = session.get_absolute_path(filename)
             
             if not file_path.is_file():
+                session.take_range()
                 self.send_response(client, 550, "File not found")
                 return
             
+            plan = self._transfer_plan(session, file_path)
+            if plan is None:
+                self.send_response(client, 554, "Restart offset beyond end of file")
+                return
+            
             # Open a socket for data
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_server:
                 data_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -427,14 +1443,12 @@ class PseudoFTPServer:
                 data_conn, _ = data_server.accept()
                 
                 with data_conn:
-                    # Read and send file
-                    content = file_path.read_bytes()
-                    packed = pack_data(content, use_gzip=len(content) > 1024)
-                    data_conn.sendall(packed)
+                    # Read and send file (whole or chunk by chunk)
+                    meta = send_file(data_conn, file_path, session.stream, **plan)
                     
-                    # Calculate hash for verification
-                    sha256 = hashlib.sha256(content).hexdigest()
-                    self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
+                # Hash for verification (computed while sending)
+                sha256 = meta["sha256"]
+                self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
                     
         except Exception as e:
             self.send_response(client, 550, str(e))
@@ -452,9 +1466,15 @@ class PseudoFTPServer:
             file_path = session.get_absolute_path(filename)
             
             if not file_path.is_file():
+                session.take_range()
                 self.send_response(client, 550, "File not found")
                 return
             
+            plan = self._transfer_plan(session, file_path)
+            if plan is None:
+                self.send_response(client, 554, "Restart offset beyond end of file")
+                return
+            
             # Get client IP from control connection
             client_host = client.getpeername()[0]
             
@@ -462,12 +1482,10 @@ class PseudoFTPServer:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_conn:
                 data_conn.connect((client_host, data_port))
                 
-                content = file_path.read_bytes()
-                packed = pack_data(content, use_gzip=len(content) > 1024)
-                data_conn.sendall(packed)
-                
-                sha256 = hashlib.sha256(content).hexdigest()
-                self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
+                meta = send_file(data_conn, file_path, session.stream, **plan)
+            
+            sha256 = meta["sha256"]
+            self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
                 
         except Exception as e:
             self.send_response(client, 550, str(e))
@@ -489,19 +1507,11 @@ class PseudoFTPServer:
                 data_conn, _ = data_server.accept()
                 
                 with data_conn:
-                    # Receive data
-                    raw_data = b""
-                    while True:
-                        chunk = data_conn.recv(BUFFER_SIZE)
-                        if not chunk:
-                            break
-                        raw_data += chunk
-                    
-                    content, meta = unpack_data(raw_data)
-                    file_path.write_bytes(content)
-                    
-                    sha256 = hashlib.sha256(content).hexdigest()
-                    self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
+                    # Receive data straight to disk (either format)
+                    meta = recv_file(data_conn, file_path)
+                
+                sha256 = meta["sha256"]
+                self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
                     
         except Exception as e:
             self.send_response(client, 550, str(e))
@@ -523,23 +1533,368 @@ class PseudoFTPServer:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_conn:
                 data_conn.connect((client_host, data_port))
                 
-                raw_data = b""
-                while True:
-                    chunk = data_conn.recv(BUFFER_SIZE)
-                    if not chunk:
-                        break
-                    raw_data += chunk
-                
-                content, meta = unpack_data(raw_data)
-                file_path.write_bytes(content)
-                
-                sha256 = hashlib.sha256(content).hexdigest()
-                self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
+                meta = recv_file(data_conn, file_path)
+            
+            sha256 = meta["sha256"]
+            self.send_response(client, 226, f"Transfer complete (SHA256: {sha256[:16]}...)")
                 
         except Exception as e:
             self.send_response(client, 550, str(e))
 
 
+def _listing_batches(lines: list, batch: int = 4096):
+    """Encoded listing lines, `batch` entries at a time (bounded memory)."""
+    for i in range(0, len(lines), batch):
+        yield ("\n".join(lines[i:i + batch]) + "\n").encode("utf-8", "replace")
+
+
+class _ControlChannel:
+    """
+    Socket-like view of an asyncio control connection (sendall, getpeername),
+    so the synchronous command handlers of PseudoFTPServer can be reused.
+    """
+    
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+    
+    def sendall(self, data: bytes):
+        self.writer.write(data)
+    
+    def getpeername(self):
+        return self.writer.get_extra_info("peername")
+
+
+class AsyncPseudoFTPServer(PseudoFTPServer):
+    """
+    Event-driven Pseudo-FTP server: one asyncio loop for every control and
+    data connection, no thread per client.
+    
+    Passive data connections arrive on a pool of listening ports bound at
+    start-up instead of a new ephemeral listener per transfer. Each 227
+    reply carries a one-time token that the client sends as the first line
+    of the data connection; the token (and the client address) selects the
+    waiting session, so one port serves many transfers at the same time.
+    
+    Commands without a data connection reuse PseudoFTPServer.process_command.
+    Work that grows with a file or directory runs in the default executor:
+    directory scans on a listing cache miss and the setup of each GET (the
+    sendfile digest, the compression sample). The rest of a transfer runs on
+    the loop thread one 256 KiB chunk (read and (de)compress) at a time.
+    """
+    
+    DATA_TIMEOUT = 30.0   # seconds to wait for the client's data connection
+    TOKEN_TIMEOUT = 10.0  # seconds to wait for the token line
+    
+    def __init__(self, host: str, port: int, root_dir: Path, data_ports=None,
+                 pool_size: int = 8, verbose: bool = True, zero_copy: bool = True):
+        super().__init__(host, port, root_dir, verbose, zero_copy)
+        # Fixed ports (e.g. range(40000, 40008)) or `pool_size` ephemeral ones
+        self.data_ports = list(data_ports) if data_ports else [0] * pool_size
+        self.bound_data_ports: list[int] = []
+        self._pending: dict[str, tuple] = {}  # token -> (client host, future)
+        self._next_port = itertools.count()
+        self._loop = None
+        self._stop_event = None
+        self._sessions: dict = {}  # control task -> writer (closed on stop)
+        self.stats = {"sessions": 0, "transfers": 0, "data_rejected": 0, "data_timeouts": 0}
+    
+    async def serve(self):
+        """Server coroutine: runs until stop()."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        control = await asyncio.start_server(self._on_control, self.host, self.port,
+                                             reuse_address=True, backlog=1024)
+        self.port = control.sockets[0].getsockname()[1]
+        servers = [control]
+        for data_port in self.data_ports:
+            data = await asyncio.start_server(self._on_data, self.host, data_port,
+                                              reuse_address=True, backlog=1024)
+            servers.append(data)
+            self.bound_data_ports.append(data.sockets[0].getsockname()[1])
+        
+        self.running = True
+        self._log(f"[SERVER] Pseudo-FTP (asyncio) started on {self.host}:{self.port}")
+        self._log(f"[SERVER] Data ports: {', '.join(map(str, self.bound_data_ports))}")
+        self._log(f"[SERVER] Root directory: {self.root_dir}")
+        self._log(f"[SERVER] Demo credentials: {DEFAULT_USER}/{DEFAULT_PASS}")
+        try:
+            await self._stop_event.wait()
+        finally:
+            self.running = False
+            for server in servers:
+                server.close()
+            # Closing the control connections ends the sessions without
+            # cancelling their tasks mid-transfer
+            for writer in self._sessions.values():
+                writer.close()
+            if self._sessions:
+                await asyncio.wait(list(self._sessions), timeout=self.TOKEN_TIMEOUT)
+            for server in servers:
+                await server.wait_closed()
+    
+    def start(self):
+        """Start the server (blocking)."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\n[SERVER] Stopping...")
+        finally:
+            self.running = False
+    
+    def stop(self):
+        """Stop the server (thread-safe)."""
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+    
+    async def _on_control(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        addr = writer.get_extra_info("peername")
+        control = _ControlChannel(writer)
+        session = Session(self.root_dir)
+        self.stats["sessions"] += 1
+        task = asyncio.current_task()
+        self._sessions[task] = writer
+        handlers = {
+            "PASSIVE_GET": self._passive_get,
+            "PASSIVE_PUT": self._passive_put,
+            "ACTIVE_GET": self._active_get,
+            "ACTIVE_PUT": self._active_put,
+            "PLIST": self._passive_list,
+            "LIST": self._list,
+        }
+        
+        self.send_response(control, 220, "Pseudo-FTP Server Ready")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                if not command:
+                    continue
+                self._log(f"[{addr}] <- {command}")
+                
+                cmd, _, arg = command.partition(" ")
+                handler = handlers.get(cmd.upper())
+                if handler and session.is_authenticated():
+                    await handler(control, session, arg.strip())
+                else:
+                    self.process_command(control, session, command)
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            self._log(f"[{addr}] Connection lost: {e}")
+        finally:
+            del self._sessions[task]
+            writer.close()
+            self._log(f"[{addr}] Disconnected")
+    
+    async def _on_data(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Pool port: read the token and hand the connection to its session."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.TOKEN_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            line = b""
+        entry = self._pending.pop(line.decode("ascii", "replace").strip(), None)
+        peer = writer.get_extra_info("peername")
+        if entry is None or entry[0] != peer[0] or entry[1].done():
+            self.stats["data_rejected"] += 1
+            writer.close()
+            return
+        entry[1].set_result((reader, writer))
+    
+    async def _open_passive(self, control: _ControlChannel):
+        """227 with a pool port and token; returns (reader, writer) or None."""
+        token = secrets.token_hex(16)
+        port = self.bound_data_ports[next(self._next_port) % len(self.bound_data_ports)]
+        future = self._loop.create_future()
+        self._pending[token] = (control.getpeername()[0], future)
+        
+        self.send_response(control, 227, f"Entering Passive Mode ({port}) TOKEN {token}")
+        await control.writer.drain()
+        try:
+            return await asyncio.wait_for(future, self.DATA_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats["data_timeouts"] += 1
+            self.send_response(control, 425, "Can't open data connection")
+            return None
+        finally:
+            self._pending.pop(token, None)
+    
+    async def _send_frames(self, writer: asyncio.StreamWriter, frames) -> dict:
+        """
+        Asyncio counterpart of _drive_send; closes the data connection.
+        
+        The first step does the per-transfer setup (the region_digest of a
+        sendfile range, the compression sample, or all of a single-frame
+        GET), so it runs in the default executor; later steps are one chunk.
+        
+        The producers reuse their chunk buffers, and asyncio transports may
+        queue the views they are given without copying (3.12+), while
+        drain() returns as soon as the buffer is below the low-water mark.
+        Every part that is not immutable bytes is therefore copied first.
+        """
+        try:
+            parts, meta = await self._loop.run_in_executor(None, _first_frame, frames)
+            if parts is None:
+                return meta
+            while True:
+                if isinstance(parts[-1], FileRegion):
+                    region = parts[-1]
+                    writer.writelines(_owned(parts[:-1]))
+                    sent = await self._loop.sendfile(writer.transport, region.file,
+                                                     region.offset, region.count)
+                    if sent != region.count:
+                        raise ValueError("File shrank during transfer")
+                else:
+                    writer.writelines(_owned(parts))
+                    await writer.drain()
+                try:
+                    parts = next(frames)
+                except StopIteration as stop:
+                    return stop.value
+        finally:
+            writer.close()
+    
+    async def _recv_transfer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                             dst) -> dict:
+        """Asyncio counterpart of recv_into; closes the data connection."""
+        parser = transfer_parser(dst)
+        try:
+            need = next(parser)
+            while True:
+                try:
+                    if isinstance(need, int):
+                        data = await reader.readexactly(need)
+                    else:
+                        need[:] = await reader.readexactly(len(need))
+                        data = need
+                except asyncio.IncompleteReadError:
+                    raise ConnectionError("Connection closed prematurely") from None
+                try:
+                    need = parser.send(data)
+                except StopIteration as stop:
+                    return stop.value
+        finally:
+            writer.close()
+    
+    async def _send_file(self, control: _ControlChannel, session: Session, filename: str,
+                         connect) -> None:
+        """GET in either mode; `connect` returns the data connection (or None)."""
+        try:
+            file_path = session.get_absolute_path(filename)
+            if not file_path.is_file():
+                session.take_range()
+                self.send_response(control, 550, "File not found")
+                return
+            plan = self._transfer_plan(session, file_path)
+            if plan is None:
+                self.send_response(control, 554, "Restart offset beyond end of file")
+                return
+            
+            conn = await connect()
+            if conn is None:
+                return
+            with open(file_path, "rb") as src:
+                src.seek(plan["offset"])
+                meta = await self._send_frames(conn[1], file_frames(
+                    src, session.stream, plan["compression"], plan["length"], plan["codecs"],
+                    plan["zero_copy"]))
+            
+            self.stats["transfers"] += 1
+            self.send_response(control, 226, f"Transfer complete (SHA256: {meta['sha256'][:16]}...)")
+        except Exception as e:
+            self.send_response(control, 550, str(e))
+    
+    async def _recv_file(self, control: _ControlChannel, session: Session, filename: str,
+                         connect) -> None:
+        """PUT in either mode, through a `.part` file like recv_file."""
+        try:
+            file_path = session.get_absolute_path(filename)
+            conn = await connect()
+            if conn is None:
+                return
+            part = partial_path(file_path)
+            with open(part, "wb") as dst:
+                try:
+                    meta = await self._recv_transfer(*conn, dst)
+                except ValueError:
+                    dst.close()
+                    part.unlink(missing_ok=True)
+                    raise
+            os.replace(part, file_path)
+            
+            self.stats["transfers"] += 1
+            self.send_response(control, 226, f"Transfer complete (SHA256: {meta['sha256'][:16]}...)")
+        except Exception as e:
+            self.send_response(control, 550, str(e))
+    
+    def _active_target(self, control: _ControlChannel, arg: str, syntax: str):
+        """(filename, connect coroutine function) for ACTIVE_GET/PUT, or None."""
+        parts = arg.split()
+        if len(parts) != 2 or not parts[1].isdigit():
+            self.send_response(control, 501, f"Syntax: {syntax} <filename> <port>")
+            return None
+        host = control.getpeername()[0]
+        return parts[0], lambda: asyncio.open_connection(host, int(parts[1]))
+    
+    async def _listing(self, session: Session) -> DirectoryListing:
+        """Directory listing for the session's cwd; a scan runs in the executor."""
+        path = session.get_absolute_path(".")
+        listing = self.listings.cached(path)
+        if listing is None:
+            listing = await self._loop.run_in_executor(None, self.listings.get, path)
+        return listing
+    
+    async def _list(self, control, session, arg):
+        try:
+            listing = await self._listing(session)
+            self.send_response(control, 150, "Opening data connection")
+            control.sendall(listing.text())
+            self.send_response(control, 226, "Directory listing complete")
+        except Exception as e:
+            self.send_response(control, 550, str(e))
+    
+    async def _passive_list(self, control, session, arg):
+        request = self._page_request(control, arg)
+        if request is None:
+            return
+        try:
+            listing = await self._listing(session)
+        except OSError as e:
+            self.send_response(control, 550, str(e))
+            return
+        lines, last = listing.page(*request)
+        conn = await self._open_passive(control)
+        if conn is None:
+            return
+        writer = conn[1]
+        try:
+            for batch in _listing_batches(lines):
+                writer.write(batch)
+                await writer.drain()
+        except ConnectionError as e:
+            self.send_response(control, 550, str(e))
+            return
+        finally:
+            writer.close()
+        self.send_response(control, 226, self._page_reply(lines, last))
+    
+    async def _passive_get(self, control, session, filename):
+        await self._send_file(control, session, filename, lambda: self._open_passive(control))
+    
+    async def _passive_put(self, control, session, filename):
+        await self._recv_file(control, session, filename, lambda: self._open_passive(control))
+    
+    async def _active_get(self, control, session, arg):
+        target = self._active_target(control, arg, "ACTIVE_GET")
+        if target:
+            await self._send_file(control, session, *target)
+    
+    async def _active_put(self, control, session, arg):
+        target = self._active_target(control, arg, "ACTIVE_PUT")
+        if target:
+            await self._recv_file(control, session, *target)
+
+
 # =============================================================================
 # Pseudo-FTP Client
 # =============================================================================
@@ -547,15 +1902,27 @@ class PseudoFTPServer:
 class PseudoFTPClient:
     """Pseudo-FTP client with active/passive mode support."""
     
-    def __init__(self, host: str, port: int, local_dir: Path):
+    # Ranges smaller than this are not worth an extra connection
+    MIN_PARALLEL_RANGE = 1024 * 1024
+    
+    def __init__(self, host: str, port: int, local_dir: Path, stream: bool = True,
+                 verbose: bool = True):
         self.host = host
         self.port = port
         self.local_dir = local_dir.resolve()
+        self.stream = stream  # Request MODE STREAM after login
+        self.verbose = verbose
+        self._credentials: Optional[tuple[str, str]] = None
+        self.codecs = ("zlib",)  # Agreed with CODECS after login
         self.control: Optional[socket.socket] = None
         self._ctrl_buf: bytes = b""  # Buffer for line-based control channel parsing
         
         self.local_dir.mkdir(parents=True, exist_ok=True)
     
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+    
     def connect(self):
         """Establish control connection."""
         self.control = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -565,7 +1932,7 @@ class PseudoFTPClient:
         
         # Read welcome message
         response = self.recv_response()
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
     
     def close(self):
         """Close connection."""
@@ -601,19 +1968,32 @@ class PseudoFTPClient:
     def login(self, username: str, password: str) -> bool:
         """Authentication."""
         response = self.send_command(f"USER {username}")
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
         
         if not response.startswith("331"):
             return False
         
         response = self.send_command(f"PASS {password}")
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
         
-        return response.startswith("230")
+        if not response.startswith("230"):
+            return False
+        self._credentials = (username, password)
+        
+        if self.stream:
+            # Servers without MODE keep the single-frame format
+            response = self.send_command("MODE STREAM")
+            self.stream = response.startswith("200")
+        if self.stream:
+            # Codecs both sides have; older servers answer 502 and keep zlib
+            response = self.send_command("CODECS " + " ".join(available_codecs()))
+            if response.startswith("200"):
+                self.codecs = tuple(response.split()[1:])
+        return True
     
     def list_files(self, path: str = ".") -> str:
         response = self.send_command(f"LIST {path}")
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
 
         if not response.startswith("150"):
             return ""
@@ -623,59 +2003,231 @@ class PseudoFTPClient:
             line = self.recv_response()
             # Control responses are framed as: 'XYZ message' where XYZ are digits
             if len(line) >= 4 and line[:3].isdigit() and line[3] == " ":
-                print(f"[CLIENT] {line}")
+                self._log(f"[CLIENT] {line}")
                 break
             listing_lines.append(line)
 
         return "\n".join([l for l in listing_lines if l.strip()])
-    def passive_get(self, filename: str, use_gzip: bool = False) -> bool:
-        """Download a file in passive mode."""
+    
+    def list_page(self, count: int = 1000, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+        """
+        One page of the listing (PLIST) over a data connection.
+        
+        Returns:
+            (lines, next cursor or None at the end)
+        
+        Raises:
+            ConnectionError: refused command or failed transfer
+        """
+        response = self.send_command(f"PLIST {count}" + (f" {cursor}" if cursor else ""))
+        data_port = self._passive_port(response) if response.startswith("227") else None
+        if data_port is None:
+            raise ConnectionError(response)
+        
+        chunks = []
+        with self._connect_data(data_port, response) as data_conn:
+            while True:
+                chunk = data_conn.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        final = self.recv_response()
+        if not final.startswith("226"):
+            raise ConnectionError(final)
+        
+        lines = b"".join(chunks).decode("utf-8", "replace").splitlines()
+        words = final.split()
+        return lines, (words[-1] if words[-2] == "next" else None)
+    
+    def iter_listing(self, page_size: int = 1000):
+        """All listing lines, fetched page by page with the PLIST cursor."""
+        cursor = None
+        while True:
+            lines, cursor = self.list_page(page_size, cursor)
+            yield from lines
+            if cursor is None:
+                return
+    
+    def _connect_data(self, data_port: int, response: str) -> socket.socket:
+        """
+        Open a passive data connection; if the 227 reply carries a token
+        (asyncio server), send it first so the server can match the session.
+        """
+        data_conn = socket.create_connection((self.host, data_port), timeout=30)
+        token = PASV_TOKEN_RE.search(response)
+        if token:
+            data_conn.sendall(token.group(1).encode() + b"\n")
+        return data_conn
+    
+    @staticmethod
+    def _passive_port(response: str) -> Optional[int]:
+        """Port from "227 Entering Passive Mode (12345)"."""
+        try:
+            return int(response.split("(")[1].split(")")[0])
+        except (IndexError, ValueError):
+            return None
+    
+    def _set_compression(self, compression: Union[None, bool, str]):
+        """
+        COMPRESS policy for the next GET (None leaves the server default).
+        
+        Accepts True/False or a policy string ("auto", "zlib-1", "lz4" ...).
+        """
+        if compression is None:
+            return
+        policy = parse_compression(compression)
+        response = self.send_command(f"COMPRESS {format_compression(policy).upper()}")
+        if not response.startswith("200"):
+            self._log(f"[CLIENT] {response}")
+    
+    def size(self, filename: str) -> Optional[int]:
+        """File size on the server (SIZE), or None."""
+        response = self.send_command(f"SIZE {filename}")
+        if response.startswith("213"):
+            return int(response.split()[1])
+        self._log(f"[CLIENT] {response}")
+        return None
+    
+    def passive_get(self, filename: str, compression: Union[None, bool, str] = None,
+                    resume: bool = False) -> bool:
+        """
+        Download a file in passive mode.
+        
+        With resume=True an existing `.part` file from an interrupted
+        download is continued with REST instead of starting over.
+        """
+        local_path = self.local_dir / filename
+        part = partial_path(local_path)
+        offset = part.stat().st_size if resume and part.exists() else 0
+        
+        self._set_compression(compression)
+        if offset:
+            response = self.send_command(f"REST {offset}")
+            self._log(f"[CLIENT] {response}")
+            if not response.startswith("350"):
+                return False
+        
         response = self.send_command(f"PASSIVE_GET {filename}")
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
         
         if not response.startswith("227"):
             return False
         
         # Extract port from response
         # Format: "227 Entering Passive Mode (12345)"
-        try:
-            port_str = response.split("(")[1].split(")")[0]
-            data_port = int(port_str)
-        except (IndexError, ValueError):
-            print(f"[CLIENT] Cannot extract port from: {response}")
+        data_port = self._passive_port(response)
+        if data_port is None:
+            self._log(f"[CLIENT] Cannot extract port from: {response}")
             return False
         
-        # Connect for data
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_conn:
-            data_conn.connect((self.host, data_port))
-            
-            # Receive data
-            raw_data = b""
-            while True:
-                chunk = data_conn.recv(BUFFER_SIZE)
-                if not chunk:
-                    break
-                raw_data += chunk
-        
-        # Unpack and save
+        # Connect for data, unpack and save as it arrives
         try:
-            content, meta = unpack_data(raw_data)
-            local_path = self.local_dir / filename
-            local_path.write_bytes(content)
+            with self._connect_data(data_port, response) as data_conn:
+                meta = recv_file(data_conn, local_path, offset=offset)
             
-            print(f"[CLIENT] Saved: {local_path} ({len(content)} bytes)")
+            self._log(f"[CLIENT] Saved: {local_path} ({offset + meta['raw_length']} bytes"
+                      + (f", resumed at {offset}" if offset else "") + ")")
             if meta["compressed"]:
-                print(f"[CLIENT] (compressed on wire: {meta['wire_length']} bytes)")
+                self._log(f"[CLIENT] (compressed on wire: {meta['wire_length']} bytes"
+                          f", {meta.get('codec', 'gzip')})")
             
             # Read confirmation
             final = self.recv_response()
-            print(f"[CLIENT] {final}")
+            self._log(f"[CLIENT] {final}")
             
             return True
             
         except Exception as e:
-            print(f"[CLIENT] Error: {e}")
+            self._log(f"[CLIENT] Error: {e}")
+            return False
+    
+    def get_range(self, filename: str, offset: int, length: int, dst,
+                  compression: Union[None, bool, str] = None) -> dict:
+        """
+        Download bytes offset..offset+length of a file into `dst` (write()).
+        
+        Raises:
+            ConnectionError/ValueError: refused command or failed transfer
+        """
+        self._set_compression(compression)
+        response = self.send_command(f"REST {offset} {length}")
+        if not response.startswith("350"):
+            raise ConnectionError(response)
+        response = self.send_command(f"PASSIVE_GET {filename}")
+        data_port = self._passive_port(response) if response.startswith("227") else None
+        if data_port is None:
+            raise ConnectionError(response)
+        
+        with self._connect_data(data_port, response) as data_conn:
+            meta = recv_into(data_conn, dst)
+        final = self.recv_response()
+        if not final.startswith("226"):
+            raise ConnectionError(final)
+        if meta["raw_length"] != length:
+            raise ValueError(f"Short range: {meta['raw_length']} != {length}")
+        return meta
+    
+    def parallel_get(self, filename: str, streams: int = 4,
+                     compression: Union[None, bool, str] = False) -> bool:
+        """
+        Download a file over `streams` concurrent passive data connections.
+        
+        The file is split into equal ranges; each range uses its own control
+        session (REST offset length + PASSIVE_GET) and is written in place
+        with os.pwrite into a preallocated `.part` file.
+        """
+        if not self._credentials:
+            raise ConnectionError("Not logged in")
+        size = self.size(filename)
+        if size is None:
+            return False
+        if size == 0:
+            # Nothing to split: one ordinary transfer creates and checks the empty file
+            return self.passive_get(filename, compression=compression)
+
+        streams = max(1, min(streams, size // self.MIN_PARALLEL_RANGE))
+        step = -(-size // streams)
+        ranges = [(off, min(step, size - off)) for off in range(0, size, step)]
+        
+        local_path = self.local_dir / filename
+        part = partial_path(local_path)
+        fd = os.open(part, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        errors: list[str] = []
+        
+        def worker(offset: int, length: int):
+            session = PseudoFTPClient(self.host, self.port, self.local_dir,
+                                      stream=self.stream, verbose=False)
+            try:
+                session.connect()
+                if not session.login(*self._credentials):
+                    raise ConnectionError("Login failed")
+                session.get_range(filename, offset, length,
+                                  PositionalWriter(fd, offset), compression=compression)
+                session.send_command("QUIT")
+            except Exception as e:
+                errors.append(f"range {offset}+{length}: {e}")
+            finally:
+                session.close()
+        
+        try:
+            os.ftruncate(fd, size)
+            threads = [threading.Thread(target=worker, args=rng, daemon=True) for rng in ranges]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            os.close(fd)
+        
+        if errors:
+            for error in errors:
+                self._log(f"[CLIENT] Error: {error}")
+            part.unlink(missing_ok=True)
             return False
+        
+        os.replace(part, local_path)
+        self._log(f"[CLIENT] Saved: {local_path} ({size} bytes, {len(ranges)} streams)")
+        return True
     
     def active_get(self, filename: str) -> bool:
         """Download a file in active mode."""
@@ -688,7 +2240,7 @@ class PseudoFTPClient:
             
             # Send command with our port
             response = self.send_command(f"ACTIVE_GET {filename} {data_port}")
-            print(f"[CLIENT] {response}")
+            self._log(f"[CLIENT] {response}")
             
             if response.startswith("5"):
                 return False
@@ -697,39 +2249,43 @@ class PseudoFTPClient:
             data_server.settimeout(30)
             data_conn, _ = data_server.accept()
             
-            with data_conn:
-                raw_data = b""
-                while True:
-                    chunk = data_conn.recv(BUFFER_SIZE)
-                    if not chunk:
-                        break
-                    raw_data += chunk
+            try:
+                local_path = self.local_dir / filename
+                with data_conn:
+                    meta = recv_file(data_conn, local_path)
+            except Exception as e:
+                self._log(f"[CLIENT] Error: {e}")
+                return False
         
         try:
-            content, meta = unpack_data(raw_data)
-            local_path = self.local_dir / filename
-            local_path.write_bytes(content)
-            
-            print(f"[CLIENT] Saved: {local_path} ({len(content)} bytes)")
+            self._log(f"[CLIENT] Saved: {local_path} ({meta['raw_length']} bytes)")
             
-            final = self.recv_response()
-            print(f"[CLIENT] {final}")
+            # The server connects before replying, so the 226 may already
+            # be the reply to ACTIVE_GET itself
+            final = response if response.startswith("226") else self.recv_response()
+            if final is not response:
+                self._log(f"[CLIENT] {final}")
             
             return True
             
         except Exception as e:
-            print(f"[CLIENT] Error: {e}")
+            self._log(f"[CLIENT] Error: {e}")
             return False
     
-    def passive_put(self, filename: str, use_gzip: bool = False) -> bool:
-        """Upload a file in passive mode."""
+    def passive_put(self, filename: str, compression: Union[None, bool, str] = False) -> bool:
+        """
+        Upload a file in passive mode.
+        
+        The server accepts every codec it has installed; "auto" samples the
+        first chunk here, exactly as the server does for GET.
+        """
         local_path = self.local_dir / filename
         if not local_path.is_file():
-            print(f"[CLIENT] File does not exist: {local_path}")
+            self._log(f"[CLIENT] File does not exist: {local_path}")
             return False
         
         response = self.send_command(f"PASSIVE_PUT {filename}")
-        print(f"[CLIENT] {response}")
+        self._log(f"[CLIENT] {response}")
         
         if not response.startswith("227"):
             return False
@@ -740,15 +2296,12 @@ class PseudoFTPClient:
         except (IndexError, ValueError):
             return False
         
-        content = local_path.read_bytes()
-        packed = pack_data(content, use_gzip=use_gzip)
-        
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as data_conn:
-            data_conn.connect((self.host, data_port))
-            data_conn.sendall(packed)
+        with self._connect_data(data_port, response) as data_conn:
+            send_file(data_conn, local_path, self.stream, parse_compression(compression),
+                      codecs=self.codecs)
         
         final = self.recv_response()
-        print(f"[CLIENT] {final}")
+        self._log(f"[CLIENT] {final}")
         
         return final.startswith("226")
     
@@ -820,11 +2373,15 @@ def main():
 Examples:
   # Server
   %(prog)s server --host 127.0.0.1 --port 3333 --root ./server-files
+  %(prog)s server --async --data-ports 40000-40007
   
   # Client - commands
   %(prog)s client --host 127.0.0.1 --port 3333 --user test --password 12345 list
   %(prog)s client ... get hello.txt
   %(prog)s client ... --mode active get hello.txt
+  %(prog)s client ... --resume get big.bin
+  %(prog)s client ... --parallel 4 get big.bin
+  %(prog)s client ... --page 1000 list
   
   # Client - interactive
   %(prog)s client ... --interactive
@@ -838,6 +2395,12 @@ Examples:
     server_p.add_argument("--host", default=DEFAULT_HOST, help="Bind address")
     server_p.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port")
     server_p.add_argument("--root", default="./server-files", help="Root directory")
+    server_p.add_argument("--async", dest="use_async", action="store_true",
+                          help="asyncio server with a pre-bound data-port pool")
+    server_p.add_argument("--data-ports", metavar="FIRST-LAST",
+                          help="--async: data port range (default: 8 ephemeral ports)")
+    server_p.add_argument("--no-sendfile", dest="zero_copy", action="store_false",
+                          help="Read + send uncompressed files instead of sendfile()")
     
     # Client
     client_p = subparsers.add_parser("client", help="Start the client")
@@ -847,7 +2410,17 @@ Examples:
     client_p.add_argument("--password", default=DEFAULT_PASS, help="Password")
     client_p.add_argument("--local-dir", default="./client-files", help="Local directory")
     client_p.add_argument("--mode", dest="transfer_mode", choices=["passive", "active"], default="passive", help="Transfer mode")
-    client_p.add_argument("--gzip", action="store_true", help="Use compression")
+    client_p.add_argument("--gzip", action="store_true", help="Use compression (same as --compress on)")
+    client_p.add_argument("--compress", metavar="POLICY",
+                          help="off, on, auto, zlib-<1..9>, lz4, zstd-<1..19> (default: server's auto)")
+    client_p.add_argument("--no-stream", dest="stream", action="store_false",
+                          help="Single-frame transfers (version 1) instead of MODE STREAM")
+    client_p.add_argument("--resume", action="store_true",
+                          help="get: continue an interrupted download (REST)")
+    client_p.add_argument("--parallel", type=int, default=0, metavar="N",
+                          help="get: download over N concurrent data connections")
+    client_p.add_argument("--page", type=int, default=0, metavar="N",
+                          help="list: fetch the listing N entries at a time (PLIST)")
     client_p.add_argument("--interactive", "-i", action="store_true", help="Interactive mode")
     client_p.add_argument("command", nargs="?", help="Command: list, get, put")
     client_p.add_argument("argument", nargs="?", help="Argument for command")
@@ -855,11 +2428,26 @@ Examples:
     args = parser.parse_args()
     
     if args.role == "server":
-        server = PseudoFTPServer(args.host, args.port, Path(args.root))
+        if args.use_async:
+            data_ports = None
+            if args.data_ports:
+                first, _, last = args.data_ports.partition("-")
+                data_ports = range(int(first), int(last or first) + 1)
+            server = AsyncPseudoFTPServer(args.host, args.port, Path(args.root), data_ports,
+                                          zero_copy=args.zero_copy)
+        else:
+            server = PseudoFTPServer(args.host, args.port, Path(args.root),
+                                     zero_copy=args.zero_copy)
         server.start()
     
     elif args.role == "client":
-        client = PseudoFTPClient(args.host, args.port, Path(args.local_dir))
+        client = PseudoFTPClient(args.host, args.port, Path(args.local_dir), stream=args.stream)
+        compression = args.compress or ("on" if args.gzip else None)
+        try:
+            parse_compression(compression)
+        except ValueError as e:
+            print(f"[CLIENT] {e}")
+            return 1
         
         try:
             client.connect()
@@ -873,7 +2461,11 @@ Examples:
             elif args.command:
                 cmd = args.command.lower()
                 
-                if cmd == "list":
+                if cmd == "list" and args.page > 0:
+                    for line in client.iter_listing(args.page):
+                        print(line)
+                
+                elif cmd == "list":
                     listing = client.list_files()
                     if listing:
                         print(listing)
@@ -885,14 +2477,18 @@ Examples:
                     
                     if args.transfer_mode == "active":
                         client.active_get(args.argument)
+                    elif args.parallel > 1:
+                        client.parallel_get(args.argument, args.parallel,
+                                            compression=compression or False)
                     else:
-                        client.passive_get(args.argument, use_gzip=args.gzip)
+                        client.passive_get(args.argument, compression=compression,
+                                           resume=args.resume)
                 
                 elif cmd == "put":
                     if not args.argument:
                         print("Usage: put <filename>")
                         return 1
-                    client.passive_put(args.argument, use_gzip=args.gzip)
+                    client.passive_put(args.argument, compression=compression or False)
                 
                 else:
                     print(f"Unknown command: {cmd}")
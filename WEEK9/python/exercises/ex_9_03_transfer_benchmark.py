@@ -0,0 +1,779 @@
+#!/usr/bin/env python3
+"""
+Exercise 9.03 – Pseudo-FTP Transfer Benchmarks
+
+═══════════════════════════════════════════════════════════════════════════════
+OBJECTIVES:
+═══════════════════════════════════════════════════════════════════════════════
+1. Measuring transfer throughput instead of guessing it
+2. Seeing why one TCP connection is limited by window / RTT
+3. Comparing one data connection with N parallel ranges (REST + pwrite)
+4. Pricing compression: CPU seconds per GB against wire bytes saved
+5. Loading the threaded and the asyncio server with hundreds of clients
+6. Measuring the sendfile() (zero-copy) path against read + send
+7. Listing huge directories: cached scandir snapshot and paged PLIST
+
+═══════════════════════════════════════════════════════════════════════════════
+SIMULATED LATENCY:
+═══════════════════════════════════════════════════════════════════════════════
+
+Loopback has almost no latency, so a local delay proxy sits between client
+and server:
+
+    client ──► DelayProxy (:control) ──► PseudoFTPServer
+       │                                        │
+       └──────► DelayProxy (:data, per 227) ────┘
+
+Each direction of each connection forwards at most `window` bytes, then
+waits `delay` seconds. One connection therefore moves at most window/delay
+bytes per second, like a TCP flow whose window is full for a whole RTT.
+The proxy rewrites "227 Entering Passive Mode (port)" replies so data
+connections also go through it.
+
+In Mininet the same effect can be obtained with tc netem on the links
+(delay 20ms); the proxy works without root.
+
+═══════════════════════════════════════════════════════════════════════════════
+USAGE:
+═══════════════════════════════════════════════════════════════════════════════
+
+python3 ex_9_03_transfer_benchmark.py parallel
+python3 ex_9_03_transfer_benchmark.py parallel --size-mb 64 --rtt 0 20 50 --streams 1 2 4 8
+python3 ex_9_03_transfer_benchmark.py parallel --json > parallel.json
+python3 ex_9_03_transfer_benchmark.py compression --size-mb 64
+python3 ex_9_03_transfer_benchmark.py compression --kinds text --policies off zlib-1 zlib-6 auto
+python3 ex_9_03_transfer_benchmark.py stress --clients 500 --servers async thread
+python3 ex_9_03_transfer_benchmark.py sendfile --size-mb 1024
+python3 ex_9_03_transfer_benchmark.py listing --files 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ex_9_02_pseudo_ftp import (DEFAULT_PASS, DEFAULT_USER, AsyncPseudoFTPServer,
+                                DirectoryCache, PseudoFTPClient, PseudoFTPServer,
+                                available_codecs, parse_compression, recv_stream, send_stream)
+
+
+# =============================================================================
+# Delay proxy
+# =============================================================================
+
+PASV_RE = re.compile(rb"^227 Entering Passive Mode \((\d+)\)", re.MULTILINE)
+
+
+class DelayProxy:
+    """
+    TCP proxy that adds latency and limits bytes in flight per connection.
+
+    Connections to `self.port` are control connections: replies from the
+    server are forwarded line by line so that 227 replies can be rewritten
+    to point at a new proxied data port.
+    """
+
+    def __init__(self, target_host: str, target_port: int, delay: float,
+                 window: int = 256 * 1024, host: str = "127.0.0.1"):
+        self.target = (target_host, target_port)
+        self.delay = delay
+        self.window = window
+        self.host = host
+        self.listener = socket.create_server((host, 0), backlog=128)
+        self.port = self.listener.getsockname()[1]
+        self.running = False
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._accept_loop, args=(self.listener, self.target, True),
+                         daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.listener.close()
+
+    def _accept_loop(self, listener: socket.socket, target: tuple, control: bool,
+                     once: bool = False):
+        while self.running:
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                break
+            try:
+                upstream = socket.create_connection(target)
+            except OSError:
+                client.close()
+                continue
+            self._link(client, upstream, control)
+            if once:
+                listener.close()
+                break
+
+    def _link(self, client: socket.socket, upstream: socket.socket, control: bool):
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Both sockets are closed by whichever direction finishes last
+        done = threading.Semaphore(0)
+        pair = (client, upstream)
+        threading.Thread(target=self._pump, args=(client, upstream, None, done, pair),
+                         daemon=True).start()
+        threading.Thread(target=self._pump,
+                         args=(upstream, client, self._rewrite_pasv if control else None,
+                               done, pair),
+                         daemon=True).start()
+
+    def _rewrite_pasv(self, data: bytes) -> bytes:
+        """Replace the server data port in 227 replies with a proxied one."""
+        def replace(match):
+            listener = socket.create_server((self.host, 0), backlog=1)
+            threading.Thread(target=self._accept_loop,
+                             args=(listener, (self.target[0], int(match.group(1))), False, True),
+                             daemon=True).start()
+            return f"227 Entering Passive Mode ({listener.getsockname()[1]})".encode()
+        return PASV_RE.sub(replace, data)
+
+    def _pump(self, src: socket.socket, dst: socket.socket, rewrite, done, pair):
+        pending = b""
+        try:
+            while True:
+                data = src.recv(self.window)
+                if not data:
+                    break
+                if self.delay:
+                    time.sleep(self.delay)
+                if rewrite:
+                    # Only complete lines can be rewritten safely
+                    pending += data
+                    cut = pending.rfind(b"\n") + 1
+                    data, pending = rewrite(pending[:cut]), pending[cut:]
+                if data:
+                    dst.sendall(data)
+            if pending:
+                dst.sendall(pending)
+            dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        finally:
+            if done.acquire(blocking=False):
+                for sock in pair:
+                    sock.close()
+            else:
+                done.release()
+
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+def make_test_file(path: Path, size: int, kind: str = "random") -> Path:
+    """Create a test file: random (incompressible), text or mixed halves."""
+    block = 1024 * 1024
+    text = b"".join(b"%08d the quick brown fox jumps over the lazy dog\n" % i
+                    for i in range(block // 56 + 1))[:block]
+    with open(path, "wb") as f:
+        written = 0
+        i = 0
+        while written < size:
+            n = min(block, size - written)
+            if kind == "text" or (kind == "mixed" and i % 2 == 0):
+                f.write(text[:n])
+            else:
+                f.write(os.urandom(n))
+            written += n
+            i += 1
+    return path
+
+
+def _serve(root: str, port: int, delay: float, window: int, kind: str, zero_copy: bool,
+           ready, proxy_port):
+    """Child process: server and (optionally) the delay proxy in front of it."""
+    server_class = AsyncPseudoFTPServer if kind == "async" else PseudoFTPServer
+    server = server_class("127.0.0.1", port, Path(root), verbose=False, zero_copy=zero_copy)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.2)
+    if delay:
+        proxy = DelayProxy("127.0.0.1", port, delay, window)
+        proxy.start()
+        proxy_port.value = proxy.port
+    else:
+        proxy_port.value = port
+    ready.set()
+    while True:
+        time.sleep(3600)
+
+
+class ServerProcess:
+    """Context manager: Pseudo-FTP server (+ proxy) in a separate process."""
+
+    def __init__(self, root: Path, port: int, delay: float = 0.0, window: int = 256 * 1024,
+                 kind: str = "thread", zero_copy: bool = True):
+        self.args = (str(root), port, delay, window, kind, zero_copy)
+
+    def __enter__(self) -> int:
+        ready = multiprocessing.Event()
+        self._port = multiprocessing.Value("i", 0)
+        self.proc = multiprocessing.Process(target=_serve, args=(*self.args, ready, self._port),
+                                            daemon=True)
+        self.proc.start()
+        if not ready.wait(10):
+            raise RuntimeError("Server did not start")
+        return self._port.value
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.join()
+
+    def cpu_seconds(self) -> float:
+        """User + system CPU time of the server process so far (Linux /proc)."""
+        with open(f"/proc/{self.proc.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _client(port: int, local_dir: Path) -> PseudoFTPClient:
+    client = PseudoFTPClient("127.0.0.1", port, local_dir, verbose=False)
+    client.connect()
+    if not client.login(DEFAULT_USER, DEFAULT_PASS):
+        raise ConnectionError("Login failed")
+    return client
+
+
+# =============================================================================
+# Parallel ranges vs latency
+# =============================================================================
+
+def run_parallel_benchmark(size_mb: int = 64, rtts_ms: list = None, streams: list = None,
+                           window: int = 256 * 1024, port: int = 13390,
+                           quiet: bool = False) -> list:
+    """
+    Download one random file with 1..N streams for each simulated RTT.
+
+    Compression is off so the numbers show the network effect, not zlib.
+    """
+    rtts_ms = rtts_ms if rtts_ms is not None else [0, 20, 50]
+    streams = streams or [1, 2, 4, 8]
+    work = Path(tempfile.mkdtemp(prefix="pf_bench_"))
+    root, local = work / "root", work / "client"
+    root.mkdir()
+    local.mkdir()
+    size = size_mb * 1024 * 1024
+    make_test_file(root / "bench.bin", size, "random")
+
+    say = (lambda *a: None) if quiet else print
+    say("=" * 72)
+    say(f"PARALLEL GET: {size_mb} MiB, window {window // 1024} KiB per connection")
+    say("=" * 72)
+    say(f"{'RTT ms':>7} {'streams':>8} {'seconds':>9} {'MB/s':>9} {'limit MB/s':>11}")
+    say("-" * 72)
+
+    rows = []
+    try:
+        for i, rtt in enumerate(rtts_ms):
+            delay = rtt / 2000.0
+            with ServerProcess(root, port + i, delay, window) as entry_port:
+                client = _client(entry_port, local)
+                try:
+                    for n in streams:
+                        (local / "bench.bin").unlink(missing_ok=True)
+                        start = time.perf_counter()
+                        if n == 1:
+                            ok = client.passive_get("bench.bin", compression=False)
+                        else:
+                            ok = client.parallel_get("bench.bin", n, compression=False)
+                        elapsed = time.perf_counter() - start
+                        ok = ok and (local / "bench.bin").stat().st_size == size
+                        limit = n * window / delay / 1e6 if delay else None
+                        row = {"rtt_ms": rtt, "streams": n, "ok": ok, "seconds": elapsed,
+                               "mb_per_s": size / elapsed / 1e6 if ok else 0.0,
+                               "limit_mb_per_s": limit}
+                        rows.append(row)
+                        say(f"{rtt:>7} {n:>8} {elapsed:>9.2f} {row['mb_per_s']:>9.1f} "
+                            f"{(f'{limit:.1f}' if limit else '-'):>11}"
+                            + ("" if ok else "  FAILED"))
+                finally:
+                    client.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    say("-" * 72)
+    say("limit = streams x window / one-way delay (proxy model); RTT 0 = direct")
+    return rows
+
+
+# =============================================================================
+# Compression cost
+# =============================================================================
+
+def default_policies() -> list:
+    """off, zlib levels, lz4/zstd when installed, and the adaptive policy."""
+    policies = ["off", "zlib-1", "zlib-6", "zlib-9"]
+    if "lz4" in available_codecs():
+        policies.append("lz4")
+    if "zstd" in available_codecs():
+        policies += ["zstd-1", "zstd-3"]
+    return policies + ["auto"]
+
+
+class _Sink:
+    """Receiver side: counts bytes and wire bytes, keeps nothing."""
+
+    def __init__(self):
+        self.raw = 0
+
+    def write(self, data):
+        self.raw += len(data)
+
+
+def _measure_stream(path: Path, policy: str) -> dict:
+    """Send one file through a socketpair with send_stream/recv_stream."""
+    sender, receiver = socket.socketpair()
+    result: dict = {}
+
+    def receive():
+        cpu = time.thread_time()
+        rfile = receiver.makefile("rb")
+        header = rfile.read(12)
+        flags, chunk_size = header[3], int.from_bytes(header[4:8], "big")
+        sink = _Sink()
+        result["meta"] = recv_stream(rfile, sink, flags, chunk_size)
+        result["rx_cpu"] = time.thread_time() - cpu
+        rfile.close()
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+    start = time.perf_counter()
+    cpu = time.thread_time()
+    with open(path, "rb") as src:
+        meta = send_stream(sender, src, parse_compression(policy),
+                           codecs=available_codecs())
+    tx_cpu = time.thread_time() - cpu
+    sender.close()
+    thread.join()
+    elapsed = time.perf_counter() - start
+    receiver.close()
+    return {"policy": policy, "codec": meta["codec"], "level": meta["level"],
+            "raw": meta["raw_length"], "wire": meta["wire_length"], "seconds": elapsed,
+            "tx_cpu": tx_cpu, "rx_cpu": result["rx_cpu"],
+            "ok": result["meta"]["sha256"] == meta["sha256"]}
+
+
+def run_compression_benchmark(size_mb: int = 64, kinds: list = None, policies: list = None,
+                              quiet: bool = False) -> list:
+    """
+    Stream text, random and mixed files with every compression policy.
+
+    CPU time is per thread (sender = compress + hash, receiver = decompress
+    + verify) and scaled to seconds per GB of file data; "off" is the cost
+    of hashing and copying alone.
+    """
+    kinds = kinds or ["text", "mixed", "random"]
+    policies = policies or default_policies()
+    work = Path(tempfile.mkdtemp(prefix="pf_comp_"))
+    size = size_mb * 1024 * 1024
+
+    say = (lambda *a: None) if quiet else print
+    say("=" * 78)
+    say(f"COMPRESSION: {size_mb} MiB per file, codecs available: {' '.join(available_codecs())}")
+    say("=" * 78)
+    say(f"{'file':<7} {'policy':<8} {'codec':<9} {'wire %':>7} {'tx CPU s/GB':>12} "
+        f"{'rx CPU s/GB':>12} {'MB/s':>8}")
+    say("-" * 78)
+
+    rows = []
+    try:
+        for kind in kinds:
+            path = make_test_file(work / f"{kind}.bin", size, kind)
+            for policy in policies:
+                row = {"kind": kind, **_measure_stream(path, policy)}
+                gb = row["raw"] / 1e9
+                row.update(wire_pct=100.0 * row["wire"] / row["raw"],
+                           tx_cpu_s_per_gb=row["tx_cpu"] / gb,
+                           rx_cpu_s_per_gb=row["rx_cpu"] / gb,
+                           mb_per_s=row["raw"] / row["seconds"] / 1e6)
+                rows.append(row)
+                codec = row["codec"] if row["codec"] in ("none", "lz4") \
+                    else f"{row['codec']}-{row['level']}"
+                say(f"{kind:<7} {policy:<8} {codec:<9} {row['wire_pct']:>7.1f} "
+                    f"{row['tx_cpu_s_per_gb']:>12.2f} {row['rx_cpu_s_per_gb']:>12.2f} "
+                    f"{row['mb_per_s']:>8.1f}" + ("" if row["ok"] else "  FAILED"))
+            path.unlink()
+            say("-" * 78)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    say("wire % = bytes on the wire / file bytes; auto decides from the first 256 KiB chunk")
+    return rows
+
+
+# =============================================================================
+# Many concurrent clients
+# =============================================================================
+
+STRESS_OPS = ("LIST", "GET", "GET", "PUT")  # GET twice as likely
+
+
+def _stress_client(i: int, port: int, local_root: Path, ops: int, barrier,
+                   results: list) -> None:
+    """One client thread: connect at the barrier, then `ops` random commands."""
+    local = local_root / f"c{i}"
+    local.mkdir()
+    (local / f"up_{i}.bin").write_bytes(os.urandom(16 * 1024))
+    rng = random.Random(i)
+    client = PseudoFTPClient("127.0.0.1", port, local, verbose=False)
+    try:
+        barrier.wait()
+        start = time.perf_counter()
+        client.connect()
+        ok = client.login(DEFAULT_USER, DEFAULT_PASS)
+        results.append(("connect", ok, time.perf_counter() - start))
+        for _ in range(ops if ok else 0):
+            op = rng.choice(STRESS_OPS)
+            start = time.perf_counter()
+            if op == "LIST":
+                ok = "data.bin" in client.list_files()
+            elif op == "GET":
+                ok = client.passive_get("data.bin")
+            else:
+                ok = client.passive_put(f"up_{i}.bin")
+            results.append((op, ok, time.perf_counter() - start))
+        client.send_command("QUIT")
+    except (OSError, threading.BrokenBarrierError):
+        results.append(("connect", False, 0.0))
+    finally:
+        client.close()
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_stress_test(clients: int = 500, ops: int = 4, servers: list = None,
+                    file_kb: int = 64, port: int = 13490, quiet: bool = False) -> list:
+    """
+    `clients` threads connect at the same moment and run a random mix of
+    LIST, GET and PUT against the threaded and the asyncio server.
+    """
+    servers = servers or ["async", "thread"]
+    work = Path(tempfile.mkdtemp(prefix="pf_stress_"))
+    root = work / "root"
+    root.mkdir()
+    make_test_file(root / "data.bin", file_kb * 1024, "text")
+
+    say = (lambda *a: None) if quiet else print
+    say("=" * 78)
+    say(f"STRESS: {clients} clients x {ops} ops (LIST/GET/PUT), GET file {file_kb} KiB")
+    say("=" * 78)
+    say(f"{'server':<7} {'op':<8} {'ok':>6} {'failed':>7} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'ops/s':>8} {'wall s':>7}")
+    say("-" * 78)
+
+    rows = []
+    try:
+        for n, kind in enumerate(servers):
+            local_root = work / f"clients_{kind}"
+            local_root.mkdir()
+            results: list = []
+            with ServerProcess(root, port + n, kind=kind) as entry_port:
+                barrier = threading.Barrier(clients, timeout=60)
+                threads = [threading.Thread(target=_stress_client,
+                                            args=(i, entry_port, local_root, ops, barrier, results),
+                                            daemon=True)
+                           for i in range(clients)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall = time.perf_counter() - start
+
+            for op in ("connect", "LIST", "GET", "PUT"):
+                done = [r for r in results if r[0] == op]
+                times = [r[2] for r in done if r[1]]
+                row = {"server": kind, "op": op, "ok": len(times),
+                       "failed": len(done) - len(times),
+                       "p50_ms": _percentile(times, 50) * 1000,
+                       "p99_ms": _percentile(times, 99) * 1000,
+                       "ops_per_s": len(times) / wall, "wall_s": wall}
+                rows.append(row)
+                say(f"{kind:<7} {op:<8} {row['ok']:>6} {row['failed']:>7} {row['p50_ms']:>9.1f} "
+                    f"{row['p99_ms']:>9.1f} {row['ops_per_s']:>8.1f} {wall:>7.2f}")
+            say("-" * 78)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return rows
+
+
+# =============================================================================
+# sendfile() vs read + send
+# =============================================================================
+
+def run_sendfile_benchmark(size_mb: int = 1024, modes: list = None, port: int = 13590,
+                           quiet: bool = False) -> list:
+    """
+    GET one uncompressed file twice per (format, zero_copy) combination.
+
+    The second GET of the zero-copy server takes its digest from the cache,
+    so the file body never passes through Python on the server. Server CPU
+    comes from /proc; the client (recv_into + CRC32 + SHA-256) shares the
+    machine, so MB/s is the end-to-end rate.
+    """
+    modes = modes or ["stream", "frame"]
+    work = Path(tempfile.mkdtemp(prefix="pf_sendfile_"))
+    root, local = work / "root", work / "client"
+    root.mkdir()
+    local.mkdir()
+    size = size_mb * 1024 * 1024
+    make_test_file(root / "big.bin", size, "random")
+
+    say = (lambda *a: None) if quiet else print
+    say("=" * 72)
+    say(f"SENDFILE: GET {size_mb} MiB uncompressed, server read+send vs sendfile()")
+    say("=" * 72)
+    say(f"{'format':<7} {'server':<9} {'GET':>4} {'seconds':>9} {'MB/s':>9} {'server CPU s/GB':>16}")
+    say("-" * 72)
+
+    rows = []
+    try:
+        n = 0
+        for mode in modes:
+            for zero_copy in (False, True):
+                server = ServerProcess(root, port + n, zero_copy=zero_copy)
+                n += 1
+                with server as entry_port:
+                    client = PseudoFTPClient("127.0.0.1", entry_port, local,
+                                             stream=mode == "stream", verbose=False)
+                    client.connect()
+                    client.login(DEFAULT_USER, DEFAULT_PASS)
+                    try:
+                        for attempt in (1, 2):
+                            (local / "big.bin").unlink(missing_ok=True)
+                            cpu = server.cpu_seconds()
+                            start = time.perf_counter()
+                            ok = client.passive_get("big.bin", compression=False)
+                            elapsed = time.perf_counter() - start
+                            cpu = server.cpu_seconds() - cpu
+                            ok = ok and (local / "big.bin").stat().st_size == size
+                            row = {"format": mode, "sendfile": zero_copy, "get": attempt,
+                                   "ok": ok, "seconds": elapsed,
+                                   "mb_per_s": size / elapsed / 1e6 if ok else 0.0,
+                                   "server_cpu_s_per_gb": cpu / (size / 1e9)}
+                            rows.append(row)
+                            say(f"{mode:<7} {'sendfile' if zero_copy else 'copy':<9} "
+                                f"{attempt:>4} {elapsed:>9.2f} {row['mb_per_s']:>9.1f} "
+                                f"{row['server_cpu_s_per_gb']:>16.2f}" + ("" if ok else "  FAILED"))
+                    finally:
+                        client.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    say("-" * 72)
+    return rows
+
+
+# =============================================================================
+# Huge directory listings
+# =============================================================================
+
+def _iterdir_listing(path: Path) -> bytes:
+    """LIST as it was built before the cache: iterdir + stat + is_dir, sort."""
+    files = []
+    for item in path.iterdir():
+        stat = item.stat()
+        if item.is_dir():
+            files.append(f"drwxr-xr-x  - {item.name}/")
+        else:
+            files.append(f"-rw-r--r--  {stat.st_size:>8} {item.name}")
+    return ("\n".join(sorted(files)) + "\n").encode("utf-8")
+
+
+def _timed(fn, memory: bool = False) -> tuple:
+    """(seconds, peak MiB or None, result) of one call."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def run_listing_benchmark(files: int = 100000, page: int = 1000, port: int = 13690,
+                          quiet: bool = False) -> list:
+    """
+    Server-side cost of one listing (old iterdir scan, scandir scan, cache
+    hit) and client-visible LIST/PLIST times against a running server.
+    """
+    work = Path(tempfile.mkdtemp(prefix="pf_list_"))
+    root = work / "root"
+    big = root / "big"
+    big.mkdir(parents=True)
+    for i in range(files):
+        (big / f"file_{i:07d}.dat").write_bytes(b"x" * (i % 100))
+    # Snapshots of directories changed within the last second are not reused
+    time.sleep(DirectoryCache.RACY_NS / 1e9 + 0.1)
+
+    say = (lambda *a: None) if quiet else print
+    say("=" * 72)
+    say(f"LISTING: directory with {files} files")
+    say("=" * 72)
+    say(f"{'operation':<44} {'ms':>10} {'peak MiB':>10}")
+    say("-" * 72)
+
+    rows = []
+
+    def add(name: str, seconds: float, peak: Optional[float] = None):
+        rows.append({"operation": name, "ms": seconds * 1000, "peak_mib": peak})
+        say(f"{name:<44} {seconds * 1000:>10.1f} {(f'{peak:.1f}' if peak else '-'):>10}")
+
+    try:
+        cache = DirectoryCache()
+        seconds, peak, _ = _timed(lambda: _iterdir_listing(big), memory=True)
+        add("iterdir + stat + sort (before)", seconds, peak)
+        seconds, peak, _ = _timed(lambda: cache.get(big).text(), memory=True)
+        add("scandir snapshot (cache miss)", seconds, peak)
+        seconds, _, _ = _timed(lambda: cache.get(big).text())
+        add("cache hit (mtime unchanged)", seconds)
+        seconds, _, _ = _timed(lambda: cache.get(big).page(None, page))
+        add(f"cache hit, one page of {page}", seconds)
+
+        with ServerProcess(root, port) as entry_port:
+            client = _client(entry_port, work)
+            try:
+                client.send_command("CWD big")
+                for attempt in ("first", "cached"):
+                    seconds, _, listing = _timed(client.list_files)
+                    add(f"client LIST on control channel ({attempt})", seconds)
+                seconds, _, _ = _timed(lambda: client.list_page(100))
+                add("client PLIST 100 (first page)", seconds)
+                seconds, _, lines = _timed(lambda: list(client.iter_listing(page)))
+                add(f"client PLIST all, pages of {page}", seconds)
+                if len(lines) != files or len(listing.splitlines()) != files:
+                    raise RuntimeError("Listing incomplete")
+            finally:
+                client.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    say("-" * 72)
+    return rows
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Pseudo-FTP transfer benchmarks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s parallel
+  %(prog)s parallel --size-mb 128 --rtt 0 20 50 --streams 1 2 4 8
+  %(prog)s parallel --json > parallel.json
+  %(prog)s compression --size-mb 32 --kinds text random
+  %(prog)s stress --clients 500 --servers async thread
+  %(prog)s sendfile --size-mb 1024
+  %(prog)s listing --files 100000
+        """
+    )
+    sub = parser.add_subparsers(dest="bench")
+
+    par = sub.add_parser("parallel", help="1..N parallel ranges under simulated RTT")
+    par.add_argument("--size-mb", type=int, default=64)
+    par.add_argument("--rtt", type=int, nargs="+", default=[0, 20, 50], help="RTT values (ms)")
+    par.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8])
+    par.add_argument("--window-kb", type=int, default=256, help="Bytes in flight per connection")
+    par.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    comp = sub.add_parser("compression", help="CPU s/GB vs wire bytes per codec/level")
+    comp.add_argument("--size-mb", type=int, default=64)
+    comp.add_argument("--kinds", nargs="+", choices=["text", "mixed", "random"],
+                      default=["text", "mixed", "random"])
+    comp.add_argument("--policies", nargs="+", help="e.g. off zlib-1 zlib-6 lz4 zstd-3 auto")
+    comp.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    stress = sub.add_parser("stress", help="Many concurrent clients: threaded vs asyncio server")
+    stress.add_argument("--clients", type=int, default=500)
+    stress.add_argument("--ops", type=int, default=4, help="Commands per client")
+    stress.add_argument("--servers", nargs="+", choices=["async", "thread"],
+                        default=["async", "thread"])
+    stress.add_argument("--file-kb", type=int, default=64, help="Size of the GET file")
+    stress.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    sendf = sub.add_parser("sendfile", help="Uncompressed GET: read + send vs sendfile()")
+    sendf.add_argument("--size-mb", type=int, default=1024)
+    sendf.add_argument("--formats", nargs="+", choices=["stream", "frame"],
+                       default=["stream", "frame"])
+    sendf.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    listing = sub.add_parser("listing", help="Huge directory: LIST cache and paged PLIST")
+    listing.add_argument("--files", type=int, default=100000)
+    listing.add_argument("--page", type=int, default=1000, help="PLIST page size")
+    listing.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.bench == "listing":
+        rows = run_listing_benchmark(args.files, args.page, quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.bench == "sendfile":
+        rows = run_sendfile_benchmark(args.size_mb, args.formats, quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        return 0 if all(r["ok"] for r in rows) else 1
+
+    if args.bench == "stress":
+        rows = run_stress_test(args.clients, args.ops, args.servers, args.file_kb,
+                               quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        return 0 if all(r["failed"] == 0 for r in rows) else 1
+
+    if args.bench == "compression":
+        try:
+            for policy in args.policies or []:
+                parse_compression(policy)
+        except ValueError as e:
+            parser.error(str(e))
+        rows = run_compression_benchmark(args.size_mb, args.kinds, args.policies,
+                                         quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        return 0 if all(r["ok"] for r in rows) else 1
+
+    if args.bench == "parallel":
+        rows = run_parallel_benchmark(args.size_mb, args.rtt, args.streams,
+                                      args.window_kb * 1024, quiet=args.json)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        return 0 if all(r["ok"] for r in rows) else 1
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
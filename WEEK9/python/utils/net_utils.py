@@ -59,7 +59,8 @@ FLAG_SHA256 = 0x02
 # Framing Functions (L6 - Presentation)
 # =============================================================================
 
-def pack_data(payload: bytes, use_gzip: bool = False, include_sha256: bool = False) -> bytes:
+def pack_data(payload: bytes, use_gzip: bool = False, include_sha256: bool = False,
+              level: int = 6) -> bytes:
     """
     Pack payload with binary header for transfer.
     
@@ -72,6 +73,7 @@ def pack_data(payload: bytes, use_gzip: bool = False, include_sha256: bool = Fal
         payload: Data to pack
         use_gzip: Enable gzip compression
         include_sha256: Add SHA256 hash after payload
+        level: gzip level (6: ~3x faster than 9 for a few % more bytes)
         
     Returns:
         bytes: Header (12 bytes) + payload (optionally compressed)
@@ -80,7 +82,7 @@ def pack_data(payload: bytes, use_gzip: bool = False, include_sha256: bool = Fal
     
     # Optional compression
     if use_gzip and len(payload) > 0:
-        payload = gzip.compress(payload)
+        payload = gzip.compress(payload, compresslevel=level)
         flags |= FLAG_GZIP
     
     # Optional SHA256 (added at end of payload)
@@ -245,7 +247,7 @@ def verify_sha256(data: bytes, expected_hash: str) -> bool:
 # Compression Utilities
 # =============================================================================
 
-def compress_gzip(data: bytes, level: int = 9) -> bytes:
+def compress_gzip(data: bytes, level: int = 6) -> bytes:
     """Compress with gzip."""
     return gzip.compress(data, compresslevel=level)
 